@@ -0,0 +1,25 @@
+"""
+Benchmarks de las utilidades con datos sintéticos reproducibles.
+
+    python -m benchmarks --escala 100000                  # compara contra la referencia
+    python -m benchmarks --escala 100000 --guardar-base   # rehace la referencia
+
+La referencia es benchmarks/base.json y está en el repositorio: escala 100000,
+con la máquina y las versiones anotadas en su "meta". Los tiempos dependen de la
+máquina: en otra, crear primero una referencia propia (--guardar-base, o --base
+con otra ruta para no tocar la del repositorio) y comparar contra ella. Al
+aceptar una mejora o un cambio de coste, se actualiza base.json en el mismo commit.
+
+- generador: tablas de movimientos, inventario y tipo RDCD (semilla, filas,
+  cardinalidad de claves, duplicados, nulos, mezcla de formatos de fecha) y
+  volcados EQUIPMENT.
+- casos: un caso por utilidad medida.
+- ejecutar: tiempo, pico de memoria y filas/s en JSON y comparación con la referencia.
+"""
+import os
+import sys
+
+# Los módulos del repositorio están en la raíz (no son un paquete)
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _RAIZ not in sys.path:
+    sys.path.insert(0, _RAIZ)
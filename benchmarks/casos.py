@@ -0,0 +1,255 @@
+import os
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import generador as gen
+
+# Cada caso prepara sus datos (fuera de la medición) y devuelve
+# (función sin argumentos a medir, nº de filas de entrada).
+Preparacion = Callable[[int, int, str], Tuple[Callable[[], object], int]]
+CASOS: Dict[str, Preparacion] = {}
+
+
+def _caso(nombre: str):
+    def registrar(preparar: Preparacion) -> Preparacion:
+        CASOS[nombre] = preparar
+        return preparar
+    return registrar
+
+
+def _piezas(escala: int) -> int:
+    return max(10, escala // 10)
+
+
+def _rdcd_pareja(escala: int, semilla: int) -> Tuple[pd.DataFrame, pd.DataFrame, list]:
+    izq = gen.rdcd(escala, semilla=semilla)
+    der = gen.pareja_rdcd(izq, semilla=semilla + 1)
+    return izq, der, [c for c in izq.columns if c.startswith("k")]
+
+
+@_caso("comparar_tablas")
+def _comparar_tablas(escala: int, semilla: int, dir_tmp: str):
+    from comparar_tablas_mejorado import comparar_tablas
+    izq, der, keys = _rdcd_pareja(escala, semilla)
+    return (lambda: comparar_tablas(izq, der, keys, compare_on=["importe", "estado"])), len(izq) + len(der)
+
+
+@_caso("comparar_tablas_codigos")
+def _comparar_tablas_codigos(escala: int, semilla: int, dir_tmp: str):
+    from comparar_tablas_mejorado import comparar_tablas
+    izq, der, keys = _rdcd_pareja(escala, semilla)
+    return (lambda: comparar_tablas(izq, der, keys, compare_on=["importe", "estado"], codigos_exactos=True)), len(izq) + len(der)
+
+
+@_caso("exportar_parquet")
+def _exportar_parquet(escala: int, semilla: int, dir_tmp: str):
+    from comparar_tablas_mejorado import comparar_tablas
+    from exportar_resultados import exportar_parquet
+    izq, der, keys = _rdcd_pareja(escala, semilla)
+    res = comparar_tablas(izq, der, keys, compare_on=["importe", "estado"])
+    return (lambda: exportar_parquet(res, os.path.join(dir_tmp, "resultado"))), len(res)
+
+
+@_caso("emparejar_aproximado")
+def _emparejar_aproximado(escala: int, semilla: int, dir_tmp: str):
+    from emparejamiento_aproximado import emparejar_aproximado
+    from piezas_utils import comparar_por_clave
+    f1 = gen.inventario(escala, escala, semilla=semilla).drop_duplicates(["pn", "sn"])
+    # Un tercio de los SN de f2 escritos de otra forma ("SN000012345" -> "sn 000012345-01")
+    f2 = f1.sample(frac=1.0, random_state=semilla).reset_index(drop=True)
+    cambia = np.arange(len(f2)) % 3 == 0
+    f2.loc[cambia, "sn"] = "sn " + f2.loc[cambia, "sn"].str.slice(2) + "-01"
+    solo_f1, solo_f2, _ = comparar_por_clave(f1, f2, ["pn", "sn"])
+    return (
+        lambda: emparejar_aproximado(solo_f1, solo_f2, "sn", bloquear_por="pn", uno_a_uno=True)
+    ), len(solo_f1) + len(solo_f2)
+
+
+@_caso("comparar_por_clave")
+def _comparar_por_clave(escala: int, semilla: int, dir_tmp: str):
+    from piezas_utils import comparar_por_clave
+    f1 = gen.inventario(escala, _piezas(escala), semilla=semilla)
+    f2 = gen.inventario(escala, _piezas(escala), desplazamiento=_piezas(escala) // 2, semilla=semilla + 1)
+    return (lambda: comparar_por_clave(f1, f2, ["pieza", "pn"])), len(f1) + len(f2)
+
+
+@_caso("piezas_por_presencia")
+def _piezas_por_presencia(escala: int, semilla: int, dir_tmp: str):
+    from piezas_utils import piezas_por_presencia
+    n = _piezas(escala)
+    fs = [gen.inventario(escala, n, desplazamiento=i * n // 3, semilla=semilla + i) for i in range(3)]
+    return (lambda: piezas_por_presencia(*fs, "pieza", en_f1=True, en_f2=False, en_f3=True)), 3 * escala
+
+
+@_caso("max_fecha_por_pieza")
+def _max_fecha(escala: int, semilla: int, dir_tmp: str):
+    from piezas_utils import max_fecha_por_pieza
+    movs = gen.movimientos(escala, _piezas(escala), semilla=semilla)
+    return (lambda: max_fecha_por_pieza(movs, "pieza", "fecha_movimiento")), len(movs)
+
+
+@_caso("min_fecha_por_pieza_texto")
+def _min_fecha_texto(escala: int, semilla: int, dir_tmp: str):
+    from piezas_utils import min_fecha_por_pieza
+    movs = gen.movimientos(escala, _piezas(escala), mezcla_fechas={"ymd": 1.0}, tasa_nan=0.01, semilla=semilla)
+    return (lambda: min_fecha_por_pieza(movs, "pieza", "fecha_movimiento", keep_rows=False)), len(movs)
+
+
+@_caso("chequear_primer_movimiento_no_valor")
+def _primer_movimiento(escala: int, semilla: int, dir_tmp: str):
+    from piezas_utils import chequear_primer_movimiento_no_valor
+    n = _piezas(escala)
+    movs = gen.movimientos(escala, n, semilla=semilla)
+    f2 = gen.inventario(escala // 2, n, desplazamiento=n // 2, semilla=semilla + 1)
+    f3 = gen.inventario(escala // 2, n, desplazamiento=n // 4, semilla=semilla + 2)
+    return (
+        lambda: chequear_primer_movimiento_no_valor(
+            movs, "pieza", "fecha_movimiento", "movimiento", {"RET", "BAJA"},
+            f2=f2, f3=f3, condicion_en_f2=True, condicion_en_f3=False,
+        )
+    ), len(movs) + len(f2) + len(f3)
+
+
+@_caso("validar_secuencias")
+def _validar_secuencias(escala: int, semilla: int, dir_tmp: str):
+    from reglas_secuencia import nada_despues_de, precedido_por, primero_prohibido, sin_repetir, validar_secuencias
+    n = _piezas(escala)
+    movs = gen.movimientos(escala, n, semilla=semilla)
+    f2 = gen.inventario(escala // 2, n, desplazamiento=n // 2, semilla=semilla + 1)
+    reglas = [
+        primero_prohibido("primero_no_ret", {"RET", "BAJA"}, en=["f2"]),
+        precedido_por("ret_tras_inst", "RET", "INST"),
+        sin_repetir("inst_sin_ret", "INST", entre="RET"),
+        nada_despues_de("nada_tras_ret", "RET"),
+    ]
+    return (
+        lambda: validar_secuencias(movs, "pieza", "fecha_movimiento", "movimiento", reglas, fuentes={"f2": f2})
+    ), len(movs) + len(f2)
+
+
+@_caso("marcar_casi_duplicados")
+def _casi_duplicados(escala: int, semilla: int, dir_tmp: str):
+    from duplicados_movimientos import marcar_casi_duplicados
+    movs = gen.movimientos(escala, _piezas(escala), semilla=semilla)
+    return (
+        lambda: marcar_casi_duplicados(movs, "pieza", "fecha_movimiento", iguales="movimiento", ventana="3D")
+    ), len(movs)
+
+
+@_caso("marcar_duplicados_exactos")
+def _duplicados_exactos(escala: int, semilla: int, dir_tmp: str):
+    from duplicados_movimientos import marcar_duplicados_exactos
+    movs = gen.movimientos(escala, _piezas(escala), semilla=semilla)
+    return (lambda: marcar_duplicados_exactos(movs)), len(movs)
+
+
+@_caso("concatenar_por_clave")
+def _concatenar(escala: int, semilla: int, dir_tmp: str):
+    from piezas_utils import comparar_por_clave, concatenar_por_clave
+    n = _piezas(escala)
+    fs = [
+        gen.inventario(escala, n, desplazamiento=i * n // 4, semilla=semilla + i).drop_duplicates("pieza")
+        for i in range(3)
+    ]
+    base = comparar_por_clave(fs[0], fs[1], "pieza")[2]
+    return (lambda: concatenar_por_clave(base, fs, "pieza")), len(base) + sum(len(f) for f in fs)
+
+
+@_caso("movimientos_a_fecha")
+def _a_fecha(escala: int, semilla: int, dir_tmp: str):
+    from piezas_utils import MovementHistory
+    movs = gen.movimientos(escala, _piezas(escala), semilla=semilla)
+    consultas = movs[["pieza"]].drop_duplicates().reset_index(drop=True)
+    consultas["fecha_consulta"] = pd.Timestamp("2010-01-01")
+    return (lambda: MovementHistory(movs, "pieza", "fecha_movimiento").a_fecha(consultas, "fecha_consulta")), len(movs)
+
+
+@_caso("check_date")
+def _check_date(escala: int, semilla: int, dir_tmp: str):
+    from fechas_quality_check import check_date
+    movs = gen.movimientos(escala, _piezas(escala), mezcla_fechas=gen.MEZCLA_FECHAS_DEFECTO, tasa_nan=0.01, semilla=semilla)
+    return (lambda: check_date(movs, "fecha_incorrecta", "fecha_movimiento", col_interp_name="interpretacion")), len(movs)
+
+
+@_caso("comparar_fechas_mixtas")
+def _fechas_mixtas(escala: int, semilla: int, dir_tmp: str):
+    from parseo_fechas import comparar_fechas_mixtas
+    df = gen.rdcd(escala, tasa_nan=0.01, semilla=semilla)[["fecha_a", "fecha_b"]]
+    return (lambda: comparar_fechas_mixtas(df, "fecha_a", "fecha_b")), len(df)
+
+
+@_caso("filtro_descripciones")
+def _filtro_descripciones(escala: int, semilla: int, dir_tmp: str):
+    from filtro_descripciones import FiltroDescripciones
+    df = gen.rdcd(escala, semilla=semilla)[["descripcion"]]
+    reglas = {
+        "matiz_saludo": "matiz & (hola | adios)",
+        "fluidos": "(bomba | valvula | tubo) & ~junta",
+        "electrico": "cable | sensor | antena",
+    }
+    # Filtro nuevo en cada llamada: se mide el escaneo, no sólo la memoria de descripciones
+    return (lambda: FiltroDescripciones(reglas).mascaras(df["descripcion"])), len(df)
+
+
+@_caso("cubo_consultas")
+def _cubo_consultas(escala: int, semilla: int, dir_tmp: str):
+    from cubo_consultas import CuboConsultas
+    movs = gen.movimientos(escala, _piezas(escala), semilla=semilla)
+    tipos = sorted(movs["movimiento"].dropna().unique())
+
+    def construir_y_consultar():
+        cubo = CuboConsultas(movs, ["movimiento", "avion"], fecha_col="fecha_movimiento", frecuencia="M",
+                             medidas={"posicion_media": ("posicion", "mean")})
+        for tipo in tipos:
+            cubo.consultar({"movimiento": [tipo]}, por=["fecha_movimiento"])
+            cubo.consultar({"movimiento": [tipo]}, por=["avion"])
+        return cubo
+    return construir_y_consultar, len(movs)
+
+
+@_caso("parse_equipment_file")
+def _parser_equipos(escala: int, semilla: int, dir_tmp: str):
+    from parser_registros import parse_equipment_file
+    ruta = os.path.join(dir_tmp, "equipos.txt")
+    filas = gen.volcado_equipos(ruta, max(1, escala // 4), semilla=semilla)
+    return (lambda: parse_equipment_file(ruta)), filas
+
+
+# --- Arranque: subprocesos nuevos (cada "fila" es un arranque). Una regresión aquí
+# suele ser un import pesado (pandas, numpy...) que se ha colado en el camino de import.
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ARRANQUES = 5
+_SIN_PANDAS = "import sys; assert 'pandas' not in sys.modules and 'numpy' not in sys.modules, 'import pesado'"
+
+
+def _arranques(*argumentos: str, codigo_salida: int = 0) -> Callable[[], None]:
+    import subprocess
+    import sys
+
+    entorno = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [_RAIZ, os.environ.get("PYTHONPATH")]))}
+
+    def arrancar():
+        for _ in range(_ARRANQUES):
+            r = subprocess.run([sys.executable, *argumentos], cwd=_RAIZ, env=entorno, capture_output=True, text=True)
+            if r.returncode != codigo_salida:
+                raise RuntimeError(f"{argumentos}: código {r.returncode}\n{r.stderr}")
+    return arrancar
+
+
+@_caso("arranque_import_paquete")
+def _arranque_import(escala: int, semilla: int, dir_tmp: str):
+    return _arranques("-c", f"import cosasutiles; {_SIN_PANDAS}"), _ARRANQUES
+
+
+@_caso("arranque_cli_ayuda")
+def _arranque_ayuda(escala: int, semilla: int, dir_tmp: str):
+    return _arranques("-m", "cosasutiles", "compare", "--help"), _ARRANQUES
+
+
+@_caso("arranque_cli_validacion")
+def _arranque_validacion(escala: int, semilla: int, dir_tmp: str):
+    # Fichero inexistente: error de argumentos (código 2) antes de cargar nada pesado
+    falta = os.path.join(dir_tmp, "no_existe.csv")
+    return _arranques("-m", "cosasutiles", "compare", falta, falta, "--keys", "pn", codigo_salida=2), _ARRANQUES
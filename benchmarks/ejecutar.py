@@ -0,0 +1,208 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.casos import CASOS
+
+BASE_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "base.json")
+
+
+def medir(funcion: Callable[[], object], repeticiones: int = 3) -> Dict[str, float]:
+    """
+    Tiempo (perf_counter) de 'repeticiones' ejecuciones y pico de memoria de una
+    ejecución aparte con tracemalloc (tracemalloc ralentiza: no se mezcla con los tiempos).
+
+    El pico cuenta la memoria pedida por Python y numpy; la de Arrow (columnas
+    'string[pyarrow]') no pasa por tracemalloc y no se cuenta.
+    """
+    tiempos = []
+    for _ in range(max(1, repeticiones)):
+        gc.collect()
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "segundos": statistics.median(tiempos),
+        "segundos_min": min(tiempos),
+        "pico_mb": pico / 2**20,
+    }
+
+
+def ejecutar_benchmarks(
+    escala: int = 100_000,
+    semilla: int = 0,
+    casos: Optional[Iterable[str]] = None,
+    repeticiones: int = 3,
+    verbose: bool = True,
+) -> dict:
+    """
+    Ejecuta los casos de benchmarks.casos con datos sintéticos de 'escala' filas.
+
+    Retorna
+    -------
+    dict serializable a JSON:
+        {"meta": {escala, semilla, repeticiones, fecha, python, pandas, numpy, plataforma},
+         "resultados": {caso: {segundos, segundos_min, pico_mb, filas, filas_s} o {error}}}
+    """
+    nombres = list(CASOS) if casos is None else list(casos)
+    desconocidos = [c for c in nombres if c not in CASOS]
+    if desconocidos:
+        raise ValueError(f"Casos desconocidos: {desconocidos}. Disponibles: {list(CASOS)}")
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        for nombre in nombres:
+            try:
+                funcion, filas = CASOS[nombre](escala, semilla, dir_tmp)
+                r = medir(funcion, repeticiones)
+                r["filas"] = int(filas)
+                # filas/s con el mejor tiempo: es la medida menos sensible al ruido de la máquina
+                r["filas_s"] = filas / r["segundos_min"] if r["segundos_min"] > 0 else float("inf")
+            except Exception as e:
+                r = {"error": f"{type(e).__name__}: {e}"}
+            resultados[nombre] = r
+            if verbose:
+                if "error" in r:
+                    print(f"{nombre:40s} ERROR {r['error']}")
+                else:
+                    print(f"{nombre:40s} {r['segundos']:9.3f} s {r['pico_mb']:9.1f} MB {r['filas_s']:12,.0f} filas/s")
+
+    return {
+        "meta": {
+            "escala": escala,
+            "semilla": semilla,
+            "repeticiones": repeticiones,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+        },
+        "resultados": resultados,
+    }
+
+
+def guardar_resultados(resultados: dict, ruta: str) -> None:
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+def cargar_resultados(ruta: str) -> dict:
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def comparar_con_base(actual: dict, base: dict, tolerancia: float = 0.25) -> pd.DataFrame:
+    """
+    Compara dos resultados de ejecutar_benchmarks.
+
+    El tiempo se compara en filas/s y la memoria por pico en MB. Sólo se juzga con
+    la misma escala: con pocas filas dominan los costes fijos y las filas/s no son
+    comparables con las de una escala mayor.
+    Estado por caso:
+      - "REGRESION" -> filas/s o pico de memoria empeoran más que 'tolerancia' (0.25 = 25 %)
+      - "MEJORA"    -> filas/s mejora más que 'tolerancia' y la memoria no empeora
+      - "ESCALA_DISTINTA" -> la base es de otra escala: se muestran las filas/s
+        (y ratio_tiempo, sólo orientativo) pero no se juzga
+      - "OK", "NUEVO" (no está en la base), "ERROR" (falló en la ejecución actual)
+
+    Retorna
+    -------
+    DataFrame [caso, filas_s_base, filas_s, ratio_tiempo, pico_mb_base, pico_mb, ratio_memoria, estado]
+    (ratio > 1 = peor que la base).
+    """
+    misma_escala = actual.get("meta", {}).get("escala") == base.get("meta", {}).get("escala")
+    filas = []
+    for caso, r in actual["resultados"].items():
+        b = base.get("resultados", {}).get(caso)
+        fila = {"caso": caso, "filas_s_base": np.nan, "filas_s": r.get("filas_s", np.nan),
+                "ratio_tiempo": np.nan, "pico_mb_base": np.nan, "pico_mb": r.get("pico_mb", np.nan),
+                "ratio_memoria": np.nan}
+        if "error" in r:
+            fila["estado"] = "ERROR"
+        elif b is None or "error" in b:
+            fila["estado"] = "NUEVO"
+        else:
+            fila["filas_s_base"] = b["filas_s"]
+            fila["ratio_tiempo"] = b["filas_s"] / r["filas_s"]
+            fila["pico_mb_base"] = b["pico_mb"]
+            if not misma_escala:
+                fila["estado"] = "ESCALA_DISTINTA"
+                filas.append(fila)
+                continue
+            if b["pico_mb"] > 0:
+                fila["ratio_memoria"] = r["pico_mb"] / b["pico_mb"]
+            peor_memoria = fila["ratio_memoria"] > 1 + tolerancia
+            if fila["ratio_tiempo"] > 1 + tolerancia or peor_memoria:
+                fila["estado"] = "REGRESION"
+            elif fila["ratio_tiempo"] < 1 / (1 + tolerancia):
+                fila["estado"] = "MEJORA"
+            else:
+                fila["estado"] = "OK"
+        filas.append(fila)
+    return pd.DataFrame(filas, columns=[
+        "caso", "filas_s_base", "filas_s", "ratio_tiempo", "pico_mb_base", "pico_mb", "ratio_memoria", "estado",
+    ])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks con datos sintéticos de las utilidades de comparación, piezas, fechas y parser.",
+    )
+    p.add_argument("--escala", type=int, default=100_000, help="filas por tabla (por defecto 100000)")
+    p.add_argument("--semilla", type=int, default=0)
+    p.add_argument("--repeticiones", type=int, default=3)
+    p.add_argument("--casos", nargs="*", help=f"casos a ejecutar (por defecto todos): {', '.join(CASOS)}")
+    p.add_argument("--salida", help="fichero JSON donde guardar los resultados")
+    p.add_argument("--base", default=BASE_DEFECTO, help="JSON de referencia para detectar regresiones")
+    p.add_argument("--guardar-base", action="store_true", help="guarda estos resultados como referencia")
+    p.add_argument("--tolerancia", type=float, default=0.25)
+    args = p.parse_args(argv)
+
+    res = ejecutar_benchmarks(args.escala, args.semilla, args.casos, args.repeticiones)
+    if args.salida:
+        guardar_resultados(res, args.salida)
+    if args.guardar_base:
+        guardar_resultados(res, args.base)
+        print(f"Referencia guardada en {args.base}")
+        return 0
+    if not os.path.exists(args.base):
+        print(f"No hay referencia en {args.base} (usar --guardar-base para crearla)")
+        return 0
+
+    comparacion = comparar_con_base(res, cargar_resultados(args.base), args.tolerancia)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(comparacion.round(3).to_string(index=False))
+    if (comparacion["estado"] == "ESCALA_DISTINTA").any():
+        print(f"La referencia {args.base} es de otra escala: no se comprueban regresiones "
+              f"(usar la misma --escala o crear otra referencia con --guardar-base --base ...)")
+    regresiones = comparacion["estado"].isin(["REGRESION", "ERROR"])
+    if regresiones.any():
+        print(f"{int(regresiones.sum())} caso(s) con regresión o error: {comparacion.loc[regresiones, 'caso'].tolist()}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
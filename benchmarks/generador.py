@@ -0,0 +1,266 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Formatos de fecha en texto que aparecen en los ficheros reales
+# ("excel" = número de serie de Excel, como llega al leer celdas numéricas)
+FORMATOS_FECHA: Dict[str, Optional[str]] = {
+    "dmy": "%d/%m/%Y",
+    "mdy": "%m/%d/%Y",
+    "ymd": "%Y-%m-%d",
+    "dmy_hora": "%d/%m/%Y %H:%M",
+    "mdy_hora": "%m/%d/%Y %H:%M:%S",
+    "excel": None,
+}
+MEZCLA_FECHAS_DEFECTO: Dict[str, float] = {"dmy": 0.5, "mdy": 0.2, "ymd": 0.2, "excel": 0.1}
+
+MOVIMIENTOS = ["INST", "RET", "REV", "RECEP", "BAJA"]
+_PESOS_MOVIMIENTOS = [0.35, 0.3, 0.15, 0.15, 0.05]
+_PALABRAS = [
+    "matiz", "hola", "adios", "bomba", "valvula", "filtro", "sensor", "panel",
+    "motor", "cable", "junta", "tornillo", "soporte", "modulo", "antena", "tubo",
+]
+
+
+def _rng(semilla: int) -> np.random.Generator:
+    return np.random.default_rng(semilla)
+
+
+def claves(n: int, prefijo: str = "PZ", ancho: int = 7, inicio: int = 0) -> np.ndarray:
+    """Textos de clave únicos y ordenables: PZ0000000, PZ0000001, ..."""
+    return np.array([f"{prefijo}{i:0{ancho}d}" for i in range(inicio, inicio + n)], dtype=object)
+
+
+def fechas_aleatorias(
+    rng: np.random.Generator,
+    n: int,
+    inicio: str = "1995-01-01",
+    fin: str = "2025-12-31",
+    con_hora: bool = False,
+) -> np.ndarray:
+    """n fechas uniformes entre inicio y fin (datetime64[ns]); con_hora añade hora:minuto."""
+    a, b = pd.Timestamp(inicio).value, pd.Timestamp(fin).value
+    dia = 86_400 * 10**9
+    valores = rng.integers(a // dia, b // dia, size=n) * dia
+    if con_hora:
+        valores = valores + rng.integers(0, 24 * 60, size=n) * 60 * 10**9
+    return valores.astype("datetime64[ns]")
+
+
+def fechas_como_texto(
+    rng: np.random.Generator,
+    fechas: np.ndarray,
+    mezcla: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """
+    Convierte fechas a texto con una mezcla de formatos (ver FORMATOS_FECHA).
+    mezcla : formato -> proporción (se normaliza). NaT -> None.
+    """
+    mezcla = mezcla or MEZCLA_FECHAS_DEFECTO
+    nombres = list(mezcla)
+    pesos = np.array([mezcla[k] for k in nombres], dtype=float)
+    elegido = rng.choice(len(nombres), size=len(fechas), p=pesos / pesos.sum())
+
+    fechas = pd.DatetimeIndex(fechas)
+    out = np.full(len(fechas), None, dtype=object)
+    for i, nombre in enumerate(nombres):
+        sel = np.flatnonzero(elegido == i)
+        if len(sel) == 0:
+            continue
+        trozo = fechas[sel]
+        if FORMATOS_FECHA[nombre] is None:
+            dias = (trozo - pd.Timestamp("1899-12-30")) / pd.Timedelta(days=1)
+            texto = np.where(dias % 1 == 0, np.char.mod("%d", dias.fillna(0)), np.char.mod("%.6f", dias.fillna(0)))
+        else:
+            texto = np.asarray(trozo.strftime(FORMATOS_FECHA[nombre]), dtype=object)
+        out[sel] = texto
+    out[np.asarray(fechas.isna())] = None
+    return out
+
+
+def _aplicar_nulos(rng: np.random.Generator, df: pd.DataFrame, tasa: float, columnas: Iterable[str]) -> pd.DataFrame:
+    """Pone a nulo una proporción 'tasa' de valores de cada columna indicada."""
+    if tasa <= 0:
+        return df
+    for c in columnas:
+        df[c] = df[c].mask(rng.random(len(df)) < tasa)
+    return df
+
+
+def _aplicar_duplicados(rng: np.random.Generator, df: pd.DataFrame, tasa: float) -> pd.DataFrame:
+    """Sustituye una proporción 'tasa' de filas por copias exactas de otras filas (mismo nº de filas)."""
+    n = len(df)
+    n_dup = int(round(n * tasa))
+    if n_dup == 0:
+        return df
+    orden = np.arange(n)
+    orden[rng.choice(n, size=n_dup, replace=False)] = rng.integers(0, n, size=n_dup)
+    return df.take(orden).reset_index(drop=True)
+
+
+def movimientos(
+    n_filas: int = 100_000,
+    n_piezas: int = 10_000,
+    tasa_duplicados: float = 0.01,
+    tasa_nan: float = 0.0,
+    mezcla_fechas: Optional[Dict[str, float]] = None,
+    semilla: int = 0,
+) -> pd.DataFrame:
+    """
+    Movimientos de piezas: [pieza, avion, posicion, movimiento, fecha_movimiento, almacen].
+
+    Parámetros
+    ----------
+    n_filas : nº de movimientos.
+    n_piezas : cardinalidad de la clave pieza (movimientos por pieza ~ n_filas / n_piezas).
+    tasa_duplicados : proporción de filas que son copia exacta de otra.
+    tasa_nan : proporción de nulos en movimiento, fecha_movimiento y almacen.
+    mezcla_fechas : None -> fecha_movimiento datetime64; dict formato -> proporción ->
+                    fecha en texto con esa mezcla de formatos (ver FORMATOS_FECHA).
+    semilla : misma semilla -> mismos datos.
+    """
+    rng = _rng(semilla)
+    piezas = claves(n_piezas)
+    n_aviones = max(1, n_piezas // 50)
+    fechas = fechas_aleatorias(rng, n_filas)
+    df = pd.DataFrame({
+        "pieza": piezas[rng.integers(0, n_piezas, size=n_filas)],
+        "avion": claves(n_aviones, "AC", 4)[rng.integers(0, n_aviones, size=n_filas)],
+        "posicion": rng.integers(1, 40, size=n_filas),
+        "movimiento": np.array(MOVIMIENTOS, dtype=object)[rng.choice(len(MOVIMIENTOS), size=n_filas, p=_PESOS_MOVIMIENTOS)],
+        "fecha_movimiento": fechas if mezcla_fechas is None else fechas_como_texto(rng, fechas, mezcla_fechas),
+        "almacen": claves(20, "ALM", 2)[rng.integers(0, 20, size=n_filas)],
+    })
+    df = _aplicar_nulos(rng, df, tasa_nan, ["movimiento", "fecha_movimiento", "almacen"])
+    return _aplicar_duplicados(rng, df, tasa_duplicados)
+
+
+def inventario(
+    n_filas: int = 100_000,
+    n_piezas: int = 10_000,
+    desplazamiento: int = 0,
+    tasa_duplicados: float = 0.0,
+    tasa_nan: float = 0.0,
+    semilla: int = 0,
+) -> pd.DataFrame:
+    """
+    Inventario: [pieza, pn, sn, acbm, ubicacion, cantidad, f_inst].
+
+    Las piezas salen de PZ{desplazamiento} ... PZ{desplazamiento + n_piezas - 1}:
+    dos inventarios con desplazamientos distintos se solapan sólo en parte
+    (presencia en uno / otro / ambos). pn tiene ~n_piezas / 10 valores; sn es casi único.
+    """
+    rng = _rng(semilla)
+    pieza_i = rng.integers(0, n_piezas, size=n_filas) + desplazamiento
+    n_pn = max(1, n_piezas // 10)
+    df = pd.DataFrame({
+        "pieza": np.array([f"PZ{i:07d}" for i in pieza_i], dtype=object),
+        "pn": claves(n_pn, "PN", 6)[pieza_i % n_pn],
+        "sn": np.array([f"SN{i:09d}" for i in rng.integers(0, 10 * max(n_filas, 1), size=n_filas)], dtype=object),
+        "acbm": claves(max(1, n_piezas // 50), "AC", 4)[pieza_i % max(1, n_piezas // 50)],
+        "ubicacion": claves(50, "UB", 3)[rng.integers(0, 50, size=n_filas)],
+        "cantidad": rng.integers(0, 100, size=n_filas).astype(float),
+        "f_inst": fechas_aleatorias(rng, n_filas),
+    })
+    df = _aplicar_nulos(rng, df, tasa_nan, ["ubicacion", "cantidad", "f_inst"])
+    return _aplicar_duplicados(rng, df, tasa_duplicados)
+
+
+def rdcd(
+    n_filas: int = 100_000,
+    n_columnas_clave: int = 13,
+    cardinalidad: int = 20,
+    tasa_duplicados: float = 0.0,
+    tasa_nan: float = 0.0,
+    mezcla_fechas: Optional[Dict[str, float]] = None,
+    tasa_fechas_distintas: float = 0.05,
+    semilla: int = 0,
+) -> pd.DataFrame:
+    """
+    Tabla tipo RDCD con clave compuesta ancha: [k01..kNN, descripcion, importe, estado, fecha_a, fecha_b].
+
+    Cada columna clave tiene 'cardinalidad' valores distintos; la combinación es
+    única por fila (salvo tasa_duplicados). fecha_a y fecha_b son la misma fecha
+    escrita con formatos elegidos por separado (mezcla_fechas); en una proporción
+    tasa_fechas_distintas, fecha_b es otro día.
+    """
+    rng = _rng(semilla)
+    ids = rng.permutation(n_filas).astype(np.int64)
+    datos = {}
+    resto = ids
+    for j in range(n_columnas_clave):
+        datos[f"k{j + 1:02d}"] = claves(cardinalidad, f"K{j + 1}_", 3)[resto % cardinalidad]
+        resto = resto // cardinalidad
+    palabras = np.array(_PALABRAS, dtype=object)
+    datos["descripcion"] = (
+        pd.Series(palabras[rng.integers(0, len(palabras), size=n_filas)])
+        + " " + palabras[rng.integers(0, len(palabras), size=n_filas)]
+        + " " + pd.Series(rng.integers(0, 1000, size=n_filas)).astype(str)
+    ).to_numpy(dtype=object)
+    datos["importe"] = np.round(rng.random(n_filas) * 10_000, 2)
+    datos["estado"] = np.array(["ABIERTO", "CERRADO", "PENDIENTE"], dtype=object)[rng.integers(0, 3, size=n_filas)]
+
+    fechas = fechas_aleatorias(rng, n_filas, con_hora=True)
+    otras = fechas.copy()
+    distintas = rng.random(n_filas) < tasa_fechas_distintas
+    otras[distintas] = otras[distintas] + np.timedelta64(1, "D")
+    mezcla = mezcla_fechas or {"dmy_hora": 0.6, "mdy_hora": 0.3, "excel": 0.1}
+    datos["fecha_a"] = fechas_como_texto(rng, fechas, mezcla)
+    datos["fecha_b"] = fechas_como_texto(rng, otras, mezcla)
+
+    df = pd.DataFrame(datos)
+    df = _aplicar_nulos(rng, df, tasa_nan, ["descripcion", "importe", "estado", "fecha_a", "fecha_b"])
+    return _aplicar_duplicados(rng, df, tasa_duplicados)
+
+
+def pareja_rdcd(
+    df: pd.DataFrame,
+    tasa_cambios: float = 0.05,
+    tasa_bajas: float = 0.02,
+    tasa_altas: float = 0.02,
+    semilla: int = 1,
+) -> pd.DataFrame:
+    """
+    Segunda versión de una tabla rdcd para comparar contra la primera: quita una
+    proporción de filas (bajas), cambia importe/estado en otra (cambios) y añade
+    filas con claves nuevas (altas).
+    """
+    rng = _rng(semilla)
+    n = len(df)
+    out = df.loc[rng.random(n) >= tasa_bajas].copy()
+    cambia = rng.random(len(out)) < tasa_cambios
+    out.loc[cambia, "importe"] = out.loc[cambia, "importe"] + 1
+    out.loc[cambia, "estado"] = "REVISADO"
+
+    n_altas = int(round(n * tasa_altas))
+    if n_altas:
+        altas = out.sample(n=min(n_altas, len(out)), random_state=semilla).copy()
+        claves_cols = [c for c in df.columns if c.startswith("k")]
+        altas[claves_cols[0]] = claves(len(altas), "NUEVA", 7)
+        out = pd.concat([out, altas], ignore_index=True)
+    return out.sample(frac=1, random_state=semilla).reset_index(drop=True)
+
+
+def volcado_equipos(ruta: str, n_equipos: int = 1_000, n_lri: int = 2, n_sw: int = 2, semilla: int = 0) -> int:
+    """
+    Escribe un volcado EQUIPMENT (formato de 'new 6.txt') con n_equipos registros,
+    n_lri bloques LRI_NO y n_sw SW_CONFIG por equipo (cada SW_CONFIG con 2
+    MODULE_FILE y 2 HW_VERSIONS). Devuelve el nº de filas que dará parse_equipment_file.
+    """
+    rng = _rng(semilla)
+    tipos = rng.integers(0, 200, size=n_equipos)
+    with open(ruta, "w", encoding="utf-8", newline="\n") as f:
+        for e in range(n_equipos):
+            lineas = ["EQUIPMENT", f".equipment_type => T{tipos[e]:03d}", f".lri_type_code => {e % 256:02X}", ".keyword => FFFF"]
+            for l in range(1, n_lri + 1):
+                lineas += [f"LRI_NO({l})", f".ident_code => A{l}", ".bus_ident => VOID", ".rt_address => 99"]
+            for s in range(1, n_sw + 1):
+                lineas += [f"SW_CONFIG({s})", f".sw_part_number => S{e:06d}-{s:02d}", f".sw_modification_code => {s:04d}"]
+                for m in (1, 2):
+                    lineas += [f"MODULE_FILE({m})", f".module_id => M{m}", ".apsw_crcc => FFFFFFFF", f".file_id(1) => f{e}_{s}_{m}.sre"]
+                for h in (1, 2):
+                    lineas += [f"HW_VERSIONS({h})", f".hw_part_number => HW{e:06d}{h}", f".hw_part_number_code => {h:04X}"]
+            lineas.append("#")
+            f.write("\n".join(lineas) + "\n")
+    return n_equipos * n_lri * n_sw
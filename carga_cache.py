@@ -0,0 +1,321 @@
+import glob
+import hashlib
+import os
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+
+# Tipos que Parquet guarda sin problemas en una columna object
+_TIPOS_SEGUROS = {
+    "string", "empty", "boolean", "integer", "floating", "mixed-integer-float",
+    "decimal", "datetime64", "datetime", "date", "timedelta64", "timedelta", "bytes",
+}
+DIR_CACHE_DEFECTO = ".cache_tablas"
+
+
+def _formato_cache() -> str:
+    """'parquet' si hay un motor Parquet instalado; si no, 'pickle' (sin proyección en lectura)."""
+    for motor in ("pyarrow", "fastparquet"):
+        try:
+            __import__(motor)
+            return "parquet"
+        except ImportError:
+            continue
+    return "pickle"
+
+
+def _sha1(*partes) -> str:
+    return hashlib.sha1("|".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+
+
+def _forma_estable(valor):
+    """
+    Forma de un argumento de lectura que no cambia entre procesos, para la firma
+    de la caché. Las funciones (converters, date_format...) se firman por su nombre
+    completo: las lambdas y funciones locales no tienen uno único y se rechazan.
+    """
+    if isinstance(valor, dict):
+        return sorted((str(k), _forma_estable(v)) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return [_forma_estable(v) for v in valor]
+    if isinstance(valor, (set, frozenset)):
+        return sorted(repr(_forma_estable(v)) for v in valor)
+    if callable(valor) and hasattr(valor, "__qualname__"):
+        nombre = f"{getattr(valor, '__module__', '')}.{valor.__qualname__}"
+        if "<lambda>" in nombre or "<locals>" in nombre:
+            raise ValueError(
+                f"leer_kwargs con una función sin nombre único ({nombre}): la caché no puede "
+                "firmarla. Usar una función de módulo o usar_cache=False."
+            )
+        return nombre
+    texto = repr(valor)
+    if " at 0x" in texto:
+        raise ValueError(f"leer_kwargs con un valor que no se puede firmar para la caché: {texto}")
+    return texto
+
+
+def ruta_cache(
+    ruta: str,
+    hoja: Union[int, str] = 0,
+    dir_cache: Optional[str] = None,
+    leer_kwargs: Optional[dict] = None,
+) -> str:
+    """
+    Ruta del fichero de caché de (ruta, hoja). El nombre incluye una firma de
+    tamaño + fecha de modificación del origen, así que cualquier cambio del
+    fichero apunta a una caché nueva, y de leer_kwargs (ValueError si alguno no
+    tiene una forma estable entre procesos, p.ej. una lambda).
+    """
+    origen = os.path.abspath(ruta)
+    st = os.stat(origen)
+    if dir_cache is None:
+        dir_cache = os.path.join(os.path.dirname(origen), DIR_CACHE_DEFECTO)
+    prefijo = _sha1(origen, hoja)[:12]
+    firma = _sha1(st.st_size, st.st_mtime_ns, _forma_estable(leer_kwargs or {}))[:12]
+    ext = "parquet" if _formato_cache() == "parquet" else "pkl"
+    nombre = f"{os.path.basename(origen)}.{prefijo}.{firma}.{ext}"
+    return os.path.join(dir_cache, nombre)
+
+
+def _leer_origen(ruta: str, hoja: Union[int, str], leer_kwargs: Optional[dict]) -> pd.DataFrame:
+    leer_kwargs = dict(leer_kwargs or {})
+    ruta_l = ruta.lower()
+    if ruta_l.endswith((".csv", ".txt")):
+        return pd.read_csv(ruta, **leer_kwargs)
+    if ruta_l.endswith((".xlsx", ".xlsm", ".xls", ".ods")):
+        return pd.read_excel(ruta, sheet_name=hoja, **leer_kwargs)
+    raise ValueError("Formato no reconocido. Usa .csv, .xlsx o .xls")
+
+
+def _preparar_para_cache(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajusta el DataFrame para poder guardarlo en Parquet:
+      - nombres de columna como texto
+      - columnas object con tipos mezclados (p.ej. números y texto) -> texto (los nulos se mantienen)
+    """
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for c in df.columns:
+        if df[c].dtype == object:
+            tipo = pd.api.types.infer_dtype(df[c], skipna=True)
+            if tipo not in _TIPOS_SEGUROS:
+                s = df[c]
+                df[c] = s.where(s.isna(), s.astype(str))
+    return df
+
+
+def _escribir_cache(df: pd.DataFrame, destino: str) -> None:
+    """Escritura atómica: fichero temporal + os.replace."""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    if destino.endswith(".parquet"):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp, compression=None)
+    os.replace(tmp, destino)
+
+
+def _borrar_obsoletas(destino: str) -> None:
+    """Borra cachés anteriores del mismo (fichero, hoja) con otra firma."""
+    base = os.path.basename(destino)
+    nombre, prefijo = base.rsplit(".", 3)[0], base.rsplit(".", 3)[1]
+    for r in glob.glob(os.path.join(os.path.dirname(destino), f"{glob.escape(nombre)}.{prefijo}.*")):
+        if r != destino and not r.endswith(".tmp"):
+            try:
+                os.remove(r)
+            except OSError:
+                pass
+
+
+def cargar_tabla(
+    ruta: str,
+    hoja: Union[int, str] = 0,
+    columnas: Optional[List[str]] = None,
+    dtypes: Optional[Dict[str, object]] = None,
+    dir_cache: Optional[str] = None,
+    usar_cache: bool = True,
+    leer_kwargs: Optional[dict] = None,
+) -> pd.DataFrame:
+    """
+    Carga un .csv / .xlsx / .xls pasando por una caché columnar (Parquet).
+
+    La primera vez se parsea el fichero completo (lo lento, sobre todo en Excel)
+    y se guarda en la caché. Las siguientes cargas leen la caché, y sólo las
+    columnas pedidas. La caché se invalida si cambia la ruta, la hoja, el
+    tamaño o la fecha de modificación del fichero.
+
+    Notas:
+      - Los nombres de columna se guardan como texto.
+      - Las columnas con tipos mezclados (números y texto) se guardan como texto.
+      - Sin pyarrow/fastparquet la caché es un pickle y la proyección de
+        columnas se hace después de leerlo.
+
+    Parámetros
+    ----------
+    ruta : fichero de origen.
+    hoja : hoja de Excel (índice o nombre). Se ignora en CSV.
+    columnas : columnas a devolver (None = todas).
+    dtypes : tipos fijos por columna, aplicados al cargar (p.ej. {"pn": "string"}).
+    dir_cache : carpeta de caché (por defecto '.cache_tablas' junto al fichero).
+    usar_cache : False para leer siempre el origen.
+    leer_kwargs : argumentos extra para pd.read_csv / pd.read_excel (forman parte de la firma).
+
+    Retorna
+    -------
+    DataFrame
+    """
+    if not usar_cache:
+        df = _leer_origen(ruta, hoja, leer_kwargs)
+    else:
+        destino = ruta_cache(ruta, hoja, dir_cache, leer_kwargs)
+        if os.path.exists(destino):
+            return _leer_cache(destino, columnas, dtypes)
+        df = _guardar_en_cache(_leer_origen(ruta, hoja, leer_kwargs), destino)
+    return _proyectar(df, columnas, dtypes)
+
+
+def _leer_cache(destino: str, columnas: Optional[List[str]], dtypes: Optional[Dict[str, object]]) -> pd.DataFrame:
+    if destino.endswith(".parquet"):
+        df = pd.read_parquet(destino, columns=None if columnas is None else list(columnas))
+        return _proyectar(df, None, dtypes)
+    return _proyectar(pd.read_pickle(destino), columnas, dtypes)
+
+
+def _guardar_en_cache(df: pd.DataFrame, destino: str) -> pd.DataFrame:
+    df = _preparar_para_cache(df)
+    _escribir_cache(df, destino)
+    _borrar_obsoletas(destino)
+    return df
+
+
+def _proyectar(df: pd.DataFrame, columnas: Optional[List[str]], dtypes: Optional[Dict[str, object]]) -> pd.DataFrame:
+    if columnas is not None:
+        df = df[list(columnas)]
+    if dtypes:
+        df = df.astype({c: t for c, t in dtypes.items() if c in df.columns})
+    return df
+
+
+def cargar_hojas(
+    ruta: str,
+    hojas: Optional[List[Union[int, str]]] = None,
+    columnas: Optional[List[str]] = None,
+    dtypes: Optional[Dict[str, object]] = None,
+    dir_cache: Optional[str] = None,
+    usar_cache: bool = True,
+    leer_kwargs: Optional[dict] = None,
+) -> Dict[Union[int, str], Union[pd.DataFrame, Exception]]:
+    """
+    Como cargar_tabla, pero para varias hojas de un mismo libro Excel: las que no
+    estén en la caché se parsean juntas, abriendo el libro una sola vez
+    (pd.read_excel con una lista de hojas), en lugar de un read_excel por hoja.
+
+    Parámetros
+    ----------
+    hojas : hojas a cargar (índice o nombre; None = todas, por nombre).
+    Los demás, como en cargar_tabla.
+
+    Retorna
+    -------
+    Diccionario hoja -> DataFrame, o la excepción si esa hoja no se pudo cargar
+    (una hoja que falla no impide cargar las demás). En CSV, una única hoja 0.
+    """
+    es_csv = ruta.lower().endswith((".csv", ".txt"))
+    out: Dict[Union[int, str], Union[pd.DataFrame, Exception]] = {}
+    xl = None
+    try:
+        if es_csv:
+            hojas = [0]
+        elif hojas is None:
+            xl = pd.ExcelFile(ruta)
+            hojas = list(xl.sheet_names)
+
+        pendientes = []
+        for hoja in hojas:
+            destino = ruta_cache(ruta, hoja, dir_cache, leer_kwargs) if usar_cache else None
+            if destino is not None and os.path.exists(destino):
+                out[hoja] = _leer_cache(destino, columnas, dtypes)
+            else:
+                pendientes.append(hoja)
+        if not pendientes:
+            return out
+
+        if es_csv:
+            leidas = {}
+            try:
+                leidas[0] = _leer_origen(ruta, 0, leer_kwargs)
+            except Exception as e:
+                out[0] = e
+        else:
+            if xl is None:
+                xl = pd.ExcelFile(ruta)
+            leidas = _leer_hojas_excel(xl, pendientes, leer_kwargs, out)
+    finally:
+        if xl is not None:
+            xl.close()
+
+    for hoja, df in leidas.items():
+        try:
+            if usar_cache:
+                df = _guardar_en_cache(df, ruta_cache(ruta, hoja, dir_cache, leer_kwargs))
+            out[hoja] = _proyectar(df, columnas, dtypes)
+        except Exception as e:
+            out[hoja] = e
+    return {h: out[h] for h in hojas}
+
+
+def _leer_hojas_excel(xl: pd.ExcelFile, hojas: list, leer_kwargs: Optional[dict], errores: dict) -> dict:
+    """Lee varias hojas de un libro ya abierto de una vez; las que fallan van a 'errores'."""
+    nombres = list(xl.sheet_names)
+    validas = []
+    for hoja in hojas:
+        if hoja in nombres if isinstance(hoja, str) else -len(nombres) <= hoja < len(nombres):
+            validas.append(hoja)
+        else:
+            errores[hoja] = ValueError(f"Worksheet {hoja!r} not found")
+    try:
+        return pd.read_excel(xl, sheet_name=validas, **dict(leer_kwargs or {})) if validas else {}
+    except Exception:
+        # Alguna hoja no se puede leer: se leen por separado para saber cuál
+        leidas = {}
+        for hoja in validas:
+            try:
+                leidas[hoja] = pd.read_excel(xl, sheet_name=hoja, **dict(leer_kwargs or {}))
+            except Exception as e:
+                errores[hoja] = e
+        return leidas
+
+
+def columnas_tabla(
+    ruta: str,
+    hoja: Union[int, str] = 0,
+    dir_cache: Optional[str] = None,
+    usar_cache: bool = True,
+    leer_kwargs: Optional[dict] = None,
+) -> List[str]:
+    """
+    Nombres de columna de (ruta, hoja) sin cargar los datos: se leen del esquema
+    de la caché (que se crea si no existe) o, sin caché, de la cabecera del origen.
+    """
+    if not usar_cache:
+        cabecera = _leer_origen(ruta, hoja, dict(leer_kwargs or {}, nrows=0))
+        return [str(c) for c in cabecera.columns]
+    destino = ruta_cache(ruta, hoja, dir_cache, leer_kwargs)
+    if not os.path.exists(destino):
+        cargar_tabla(ruta, hoja, dir_cache=dir_cache, leer_kwargs=leer_kwargs)
+    if destino.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+            return list(pq.read_schema(destino).names)
+        except ImportError:
+            return list(pd.read_parquet(destino).columns)
+    return list(pd.read_pickle(destino).columns)
+
+
+def limpiar_cache(dir_cache: str) -> int:
+    """Borra todos los ficheros de caché de una carpeta. Devuelve cuántos se borraron."""
+    n = 0
+    for r in glob.glob(os.path.join(dir_cache, "*.parquet")) + glob.glob(os.path.join(dir_cache, "*.pkl")):
+        os.remove(r)
+        n += 1
+    return n
@@ -0,0 +1,149 @@
+import glob
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from carga_cache import cargar_hojas
+
+EXTENSIONES = (".xlsx", ".xlsm", ".xls", ".csv")
+
+# Resultado de cargar una hoja (o un CSV). df es None si hubo error.
+ResultadoCarga = namedtuple("ResultadoCarga", ["fichero", "hoja", "df", "filas", "segundos", "error"])
+
+
+def expandir_rutas(rutas: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Convierte una lista de rutas, carpetas y globs ("datos/**/*.xlsx") en la lista
+    ordenada de ficheros a cargar (sólo extensiones de EXTENSIONES, sin temporales "~$").
+    """
+    if isinstance(rutas, str):
+        rutas = [rutas]
+    ficheros = set()
+    for r in rutas:
+        if os.path.isdir(r):
+            candidatos = [os.path.join(r, f) for f in os.listdir(r)]
+        elif glob.has_magic(r):
+            candidatos = glob.glob(r, recursive=True)
+        else:
+            candidatos = [r]
+        for c in candidatos:
+            nombre = os.path.basename(c)
+            if os.path.isfile(c) and c.lower().endswith(EXTENSIONES) and not nombre.startswith("~$"):
+                ficheros.add(os.path.abspath(c))
+    return sorted(ficheros)
+
+
+def _cargar_fichero(args: tuple) -> List[ResultadoCarga]:
+    """
+    Trabajo de un proceso: carga todas las hojas pedidas de un fichero. Las hojas
+    que no están en la caché se parsean juntas, abriendo el libro una sola vez.
+    """
+    ruta, hojas, columnas, dtypes, usar_cache, dir_cache, leer_kwargs = args
+    t0 = time.perf_counter()
+    try:
+        cargadas = cargar_hojas(ruta, hojas, columnas, dtypes, dir_cache, usar_cache, leer_kwargs)
+    except Exception as e:
+        return [ResultadoCarga(ruta, None, None, 0, time.perf_counter() - t0, f"{type(e).__name__}: {e}")]
+
+    # El parseo es conjunto: el tiempo del fichero se reparte entre sus hojas
+    segundos = (time.perf_counter() - t0) / max(len(cargadas), 1)
+    out = []
+    for hoja, df in cargadas.items():
+        if isinstance(df, Exception):
+            out.append(ResultadoCarga(ruta, hoja, None, 0, segundos, f"{type(df).__name__}: {df}"))
+        else:
+            out.append(ResultadoCarga(ruta, hoja, df, len(df), segundos, None))
+    return out
+
+
+def iterar_en_bloque(
+    rutas: Union[str, Iterable[str]],
+    hojas: Optional[List[Union[int, str]]] = None,
+    n_procesos: Optional[int] = None,
+    columnas: Optional[List[str]] = None,
+    dtypes: Optional[Dict[str, object]] = None,
+    usar_cache: bool = True,
+    dir_cache: Optional[str] = None,
+    leer_kwargs: Optional[dict] = None,
+) -> Iterator[ResultadoCarga]:
+    """
+    Carga muchos libros Excel / CSV en paralelo (un proceso por fichero a la vez)
+    y va devolviendo cada hoja según termina. Un fichero que falla no detiene el lote:
+    su ResultadoCarga trae el error y df=None.
+
+    Parámetros
+    ----------
+    rutas : ficheros, carpetas o globs (ver expandir_rutas).
+    hojas : hojas a cargar de cada libro (None = todas).
+    n_procesos : nº de procesos (None = nº de CPUs; 1 = sin procesos).
+    columnas, dtypes, usar_cache, dir_cache, leer_kwargs : ver carga_cache.cargar_tabla.
+    """
+    ficheros = expandir_rutas(rutas)
+    tareas = [(f, hojas, columnas, dtypes, usar_cache, dir_cache, leer_kwargs) for f in ficheros]
+    if not tareas:
+        return
+    if n_procesos == 1 or len(tareas) == 1:
+        for t in tareas:
+            yield from _cargar_fichero(t)
+        return
+    with ProcessPoolExecutor(max_workers=n_procesos) as ex:
+        futuros = {ex.submit(_cargar_fichero, t): t[0] for t in tareas}
+        for fut in as_completed(futuros):
+            try:
+                yield from fut.result()
+            except Exception as e:  # el proceso murió (memoria, etc.)
+                yield ResultadoCarga(futuros[fut], None, None, 0, 0.0, f"{type(e).__name__}: {e}")
+
+
+def cargar_en_bloque(
+    rutas: Union[str, Iterable[str]],
+    hojas: Optional[List[Union[int, str]]] = None,
+    n_procesos: Optional[int] = None,
+    columnas: Optional[List[str]] = None,
+    dtypes: Optional[Dict[str, object]] = None,
+    usar_cache: bool = True,
+    dir_cache: Optional[str] = None,
+    leer_kwargs: Optional[dict] = None,
+    col_fichero: str = "fichero_origen",
+    col_hoja: str = "hoja_origen",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Igual que iterar_en_bloque pero junta todo en un único DataFrame.
+
+    Retorna
+    -------
+    (df, informe)
+      - df: todas las hojas concatenadas, con columnas col_fichero y col_hoja
+            (categóricas) y los dtypes fijados aplicados. col_fichero es la ruta
+            relativa a la carpeta común de todos los ficheros (el nombre del
+            fichero si están en la misma carpeta), así que "2023/datos.xlsx" y
+            "2024/datos.xlsx" de un glob recursivo no se confunden.
+      - informe: una fila por fichero/hoja con [fichero, hoja, filas, segundos, error].
+    """
+    ficheros = expandir_rutas(rutas)
+    base = os.path.commonpath([os.path.dirname(f) for f in ficheros]) if ficheros else ""
+    partes = []
+    informe = []
+    for r in iterar_en_bloque(ficheros, hojas, n_procesos, columnas, dtypes, usar_cache, dir_cache, leer_kwargs):
+        informe.append({"fichero": r.fichero, "hoja": r.hoja, "filas": r.filas, "segundos": r.segundos, "error": r.error})
+        if r.df is not None:
+            nombre = os.path.relpath(r.fichero, base).replace(os.sep, "/")
+            partes.append(r.df.assign(**{col_fichero: nombre, col_hoja: str(r.hoja)}))
+
+    informe = pd.DataFrame(informe, columns=["fichero", "hoja", "filas", "segundos", "error"])
+    if len(informe):
+        informe["hoja"] = informe["hoja"].astype(str)
+        informe = informe.sort_values(["fichero", "hoja"], kind="stable").reset_index(drop=True)
+    if not partes:
+        return pd.DataFrame(columns=(columnas or []) + [col_fichero, col_hoja]), informe
+
+    df = pd.concat(partes, ignore_index=True, sort=False)
+    df[col_fichero] = df[col_fichero].astype("category")
+    df[col_hoja] = df[col_hoja].astype("category")
+    if dtypes:
+        df = df.astype({c: t for c, t in dtypes.items() if c in df.columns})
+    return df, informe
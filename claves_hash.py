@@ -0,0 +1,218 @@
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from piezas_utils import _codigos_claves, _plan_union, _tomar
+
+# Clave del segundo hash (modo 128 bits): independiente de la de pandas por defecto
+_HASH_KEY_2 = "c0sasUtiles-h128"
+
+
+def _enteros_exactos(s: pd.Series) -> bool:
+    """True si todos los valores no nulos de una columna float son enteros representables en int64."""
+    v = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    v = v[~np.isnan(v)]
+    return bool(np.all((v == np.floor(v)) & (np.abs(v) < 2.0 ** 63)))
+
+
+def _numerico_comun(columnas: List[pd.Series]) -> List[pd.Series]:
+    """
+    Columnas numéricas de tipos distintos -> un tipo común sin perder valores:
+      - todas enteras (o float con valores enteros) -> int64 (Int64 si hay nulos);
+      - si no, float64 cuando los enteros caben exactos en float (|v| <= 2^53);
+      - si no, object con los float enteros pasados a int (1.0 -> 1), para que
+        los enteros grandes no se confundan entre sí.
+    """
+    enteras = [pd.api.types.is_integer_dtype(c) for c in columnas]
+    if all(enteras[i] or _enteros_exactos(c) for i, c in enumerate(columnas)):
+        hay_nulos = any(c.isna().any() for c in columnas)
+        return [c.astype("Int64" if hay_nulos else "int64") for c in columnas]
+    limite = 2 ** 53
+    if all(not e or c.empty or c.abs().max() <= limite for e, c in zip(enteras, columnas)):
+        return [c.astype("float64") for c in columnas]
+    out = []
+    for e, c in zip(enteras, columnas):
+        v = c.astype(object)
+        if not e:
+            v = v.map(lambda x: int(x) if pd.notna(x) and float(x).is_integer() else x)
+        out.append(v)
+    return out
+
+
+def _normalizar_claves(dfs: List[pd.DataFrame], keys: List[str]) -> List[pd.DataFrame]:
+    """
+    Lleva cada columna clave a un tipo común en todas las tablas, para que el
+    mismo valor dé el mismo hash / código (p.ej. 1 en int64 y 1.0 en float64)
+    sin que dos valores distintos pasen a ser iguales (enteros > 2^53 en float64).
+    """
+    out = [df[keys] for df in dfs]
+    copiado = False
+    for k in keys:
+        tipos = {df[k].dtype for df in out}
+        if len(tipos) == 1:
+            continue
+        if not copiado:
+            out = [df.copy() for df in out]
+            copiado = True
+        if all(pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t) for t in tipos):
+            for df, col in zip(out, _numerico_comun([df[k] for df in out])):
+                df[k] = col
+            continue
+        if all(pd.api.types.is_datetime64_dtype(t) for t in tipos):
+            comun = "datetime64[ns]"
+        else:
+            comun = object
+        for df in out:
+            df[k] = df[k].astype(comun)
+    return out
+
+
+def hash_claves(df: pd.DataFrame, keys: List[str], bits: int = 64) -> np.ndarray:
+    """
+    Hash vectorizado de una clave compuesta (varias columnas) por fila.
+
+    Parámetros
+    ----------
+    df : DataFrame con las columnas clave.
+    keys : columnas que forman la clave.
+    bits : 64 -> array uint64 de forma (n,)
+           128 -> array uint64 de forma (n, 2) (dos hashes independientes).
+
+    Retorna
+    -------
+    np.ndarray con el hash de cada fila. Claves iguales -> hash igual; claves
+    distintas pueden colisionar (muy improbable): ver filas_en_colision.
+    """
+    if bits not in (64, 128):
+        raise ValueError("bits debe ser 64 o 128")
+    sel = df[list(keys)]
+    h1 = pd.util.hash_pandas_object(sel, index=False).to_numpy()
+    if bits == 64:
+        return h1
+    h2 = pd.util.hash_pandas_object(sel, index=False, hash_key=_HASH_KEY_2).to_numpy()
+    return np.column_stack([h1, h2])
+
+
+def _filas_iguales(a: pd.DataFrame, b: pd.DataFrame) -> np.ndarray:
+    """Fila a fila, True si todas las columnas coinciden (NaN == NaN)."""
+    iguales = np.ones(len(a), dtype=bool)
+    for c in a.columns:
+        x, y = a[c], b[c]
+        if isinstance(x.dtype, pd.api.extensions.ExtensionDtype) or isinstance(y.dtype, pd.api.extensions.ExtensionDtype):
+            eq = np.array(x.reset_index(drop=True).eq(y.reset_index(drop=True)).fillna(False), dtype=bool)
+        else:
+            eq = np.array(x.to_numpy() == y.to_numpy(), dtype=bool)
+        # Sólo en las posiciones distintas se mira si son dos nulos
+        dif = np.flatnonzero(~eq)
+        if len(dif):
+            eq[dif] = pd.isna(x.to_numpy()[dif]) & pd.isna(y.to_numpy()[dif])
+        iguales &= eq
+    return iguales
+
+
+def filas_en_colision(claves: pd.DataFrame, codigos: np.ndarray) -> np.ndarray:
+    """
+    Verificación exacta: True en las filas cuyo código de hash (0..n-1 por hash
+    distinto, p.ej. pd.factorize(hash_claves(...))) lo comparte alguna otra fila con una clave distinta. Sólo se comparan las
+    filas con hash repetido, contra la primera fila de su hash.
+    """
+    n = len(codigos)
+    out = np.zeros(n, dtype=bool)
+    if n == 0:
+        return out
+    primera = np.empty(int(codigos.max()) + 1, dtype=np.int64)
+    primera[codigos[::-1]] = np.arange(n - 1, -1, -1)
+    rep = primera[codigos]
+    cand = np.flatnonzero(rep != np.arange(n))
+    if len(cand) == 0:
+        return out
+    distintas = ~_filas_iguales(claves.iloc[cand], claves.iloc[rep[cand]])
+    if distintas.any():
+        out = np.isin(codigos, np.unique(codigos[cand[distintas]]))
+    return out
+
+
+def unir_por_hash(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    keys: List[str],
+    how: str = "outer",
+    indicator: bool = False,
+) -> pd.DataFrame:
+    """
+    Equivalente a left.merge(right, on=keys, how=how, indicator=indicator)
+    pero cruzando por un único código entero de la clave compuesta en vez de por
+    las columnas clave.
+
+    El código es exacto (no un hash): cada columna clave se factoriza una sola
+    vez sobre las dos tablas y los códigos se combinan, así que no hay colisiones
+    que verificar (hashear las columnas de texto con hash_claves costaba más que
+    el propio merge).
+
+    Diferencias con merge:
+      - Orden de filas: las de left en su orden (con sus parejas de right en el
+        orden de right) y después las que sólo están en right. No se ordena por clave.
+      - how: 'left', 'inner' u 'outer'.
+      - left y right no pueden compartir columnas aparte de las claves.
+      - Claves de tipos distintos en left y right (int64 / float64...) salen en
+        el tipo común de _normalizar_claves.
+
+    Retorna
+    -------
+    DataFrame con las columnas de left y después las de right que no son clave
+    (y "_merge" si indicator=True).
+    """
+    keys = list(keys)
+    if how not in ("left", "inner", "outer"):
+        raise ValueError("how debe ser 'left', 'inner' u 'outer'")
+    comunes = (set(left.columns) & set(right.columns)) - set(keys)
+    if comunes:
+        raise ValueError(f"Columnas repetidas en left y right (renómbralas antes): {sorted(comunes)}")
+
+    claves = pd.concat(_normalizar_claves([left, right], keys), ignore_index=True)
+    codigos, n_codigos = _codigos_claves(claves, keys)
+    fila_l, fila_r = _plan_union(codigos[: len(left)], codigos[len(left):], n_codigos, how)
+
+    columnas = {}
+    # Clave: la de left si existe; si no, la de right (una sola toma sobre las dos tablas)
+    fila_clave = np.where(fila_l >= 0, fila_l, len(left) + fila_r)
+    for c in left.columns:
+        columnas[c] = _tomar(claves[c], fila_clave) if c in keys else _tomar(left[c], fila_l)
+    for c in right.columns:
+        if c not in keys:
+            columnas[c] = _tomar(right[c], fila_r)
+    out = pd.DataFrame(columnas, columns=list(left.columns) + [c for c in right.columns if c not in keys])
+
+    if indicator:
+        estado = np.where(fila_l < 0, 1, np.where(fila_r < 0, 0, 2))
+        out["_merge"] = pd.Categorical.from_codes(estado, categories=["left_only", "right_only", "both"])
+    return out
+
+
+def presencia_por_hash(
+    f1: pd.DataFrame,
+    f2: pd.DataFrame,
+    keys: List[str],
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    (solo_f1, solo_f2, en_ambos) por el código entero de la clave compuesta (ver
+    comparar_por_clave y unir_por_hash: el código es exacto, sin colisiones).
+    Las claves salen en orden de primera aparición (f1 y después f2).
+    """
+    keys = list(keys)
+    todas = pd.concat(_normalizar_claves([f1, f2], keys), ignore_index=True)
+    codigos, n_codigos = _codigos_claves(todas, keys)
+
+    n1 = len(f1)
+    en_1 = np.zeros(n_codigos, dtype=bool)
+    en_2 = np.zeros(n_codigos, dtype=bool)
+    en_1[codigos[:n1]] = True
+    en_2[codigos[n1:]] = True
+    primera = np.empty(n_codigos, dtype=np.int64)
+    primera[codigos[::-1]] = np.arange(len(codigos) - 1, -1, -1)
+
+    def _claves(mascara: np.ndarray) -> pd.DataFrame:
+        return todas.iloc[primera[mascara]].reset_index(drop=True)
+
+    return _claves(en_1 & ~en_2), _claves(en_2 & ~en_1), _claves(en_1 & en_2)
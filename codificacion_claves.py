@@ -0,0 +1,171 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Dominio lógico -> columnas que lo usan (en cualquiera de los ficheros)
+DOMINIOS_DEFECTO: Dict[str, List[str]] = {
+    "pieza": ["pieza"],
+    "pn": ["pn", "c_pn"],
+    "sn": ["sn", "c_sn"],
+    "avion": ["acbm", "c_acbm"],
+}
+
+
+class CodificadorClaves:
+    """
+    Diccionarios compartidos por dominio de clave (pieza, PN, SN, avión...) para
+    todos los ficheros de un mismo trabajo.
+
+    Cada columna de un dominio se convierte a categórica con exactamente las
+    mismas categorías en todos los ficheros. Así:
+      - cada texto se guarda una vez (el DataFrame guarda códigos enteros);
+      - merge, isin y drop_duplicates trabajan con los códigos;
+      - _factorizar_claves (PresenceIndex, MovementHistory, concatenar_por_clave)
+        y la comparación de comparar_tablas usan los códigos directamente;
+      - al mostrar o exportar se ven los textos originales (decodificar si hace falta object).
+
+    Ejemplo
+    -------
+        cod = CodificadorClaves({"pn": ["pn", "c_pn"], "sn": ["sn", "c_sn"]})
+        f1, f2, f3 = cod.codificar_todos([f1, f2, f3])
+        solo_f1, solo_f2, en_ambos = comparar_por_clave(f1, f2, ["pn", "sn"])
+
+    Parámetros
+    ----------
+    dominios : dict dominio -> columnas del dominio. Por defecto DOMINIOS_DEFECTO.
+    """
+
+    def __init__(self, dominios: Optional[Dict[str, Iterable[str]]] = None):
+        dominios = DOMINIOS_DEFECTO if dominios is None else dominios
+        self.dominios = {d: list(cols) for d, cols in dominios.items()}
+        self._columna_a_dominio = {c: d for d, cols in self.dominios.items() for c in cols}
+        self._tipos: Dict[str, pd.CategoricalDtype] = {}
+
+    def tipo(self, dominio: str) -> pd.CategoricalDtype:
+        """Tipo categórico (diccionario) actual de un dominio."""
+        return self._tipos[dominio]
+
+    def _factorizar(self, df: pd.DataFrame) -> Dict[str, tuple]:
+        """Columna de dominio -> (códigos, valores únicos): cada texto se hashea una sola vez."""
+        out = {}
+        for c in df.columns:
+            if c not in self._columna_a_dominio:
+                continue
+            s = df[c]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                out[c] = (s.cat.codes.to_numpy(), pd.Index(s.cat.categories))
+            else:
+                codigos, unicos = pd.factorize(s)
+                out[c] = (codigos, pd.Index(unicos))
+        return out
+
+    def _registrar_unicos(self, factorizados: List[Dict[str, tuple]]) -> None:
+        for dominio, cols in self.dominios.items():
+            partes = [f[c][1] for f in factorizados for c in cols if c in f]
+            if not partes:
+                continue
+            valores = partes[0].append(partes[1:]).unique() if len(partes) > 1 else partes[0].unique()
+            actual = self._tipos.get(dominio)
+            if actual is not None:
+                valores = valores[~valores.isin(actual.categories)]
+                if len(valores) == 0:
+                    continue
+            try:
+                valores = valores.sort_values()
+            except TypeError:
+                pass  # tipos mezclados (números y texto): orden de aparición
+            categorias = valores if actual is None else actual.categories.append(valores)
+            self._tipos[dominio] = pd.CategoricalDtype(categorias)
+
+    def _codificar(self, df: pd.DataFrame, factorizado: Dict[str, tuple]) -> pd.DataFrame:
+        df = df.copy()
+        for c, (codigos, unicos) in factorizado.items():
+            tipo = self._tipos.get(self._columna_a_dominio[c])
+            if tipo is None or df[c].dtype == tipo:
+                continue
+            # Sólo los valores únicos se buscan en el diccionario; -1 (nulo) sigue siendo -1
+            mapa = np.append(tipo.categories.get_indexer(unicos), -1)
+            df[c] = pd.Categorical.from_codes(mapa[codigos], dtype=tipo)
+        return df
+
+    def registrar(self, *dfs: pd.DataFrame) -> None:
+        """
+        Añade al diccionario de cada dominio los valores nuevos de estos ficheros.
+        La primera vez las categorías quedan ordenadas; los valores que llegan
+        después se añaden al final (los códigos ya asignados no cambian).
+        """
+        self._registrar_unicos([self._factorizar(df) for df in dfs])
+
+    def codificar(self, df: pd.DataFrame, registrar: bool = True) -> pd.DataFrame:
+        """
+        Copia de df con las columnas de los dominios como categóricas compartidas.
+        Con registrar=False, los valores que no estén en el diccionario quedan NaN.
+
+        Si df trae valores nuevos, el diccionario crece y el tipo categórico del
+        dominio pasa a ser otro: los ficheros codificados antes conservan el tipo
+        anterior (sus categorías son el principio de las nuevas). Para tener todos
+        con el mismo tipo, codificar_todos de una vez, o pasar los anteriores por
+        actualizar (no vuelve a hashear textos: reutiliza los códigos).
+        """
+        factorizado = self._factorizar(df)
+        if registrar:
+            self._registrar_unicos([factorizado])
+        return self._codificar(df, factorizado)
+
+    def codificar_todos(self, dfs: Iterable[pd.DataFrame]) -> List[pd.DataFrame]:
+        """Registra los valores de todos los ficheros y después los codifica con el mismo diccionario."""
+        dfs = list(dfs)
+        factorizados = [self._factorizar(df) for df in dfs]
+        self._registrar_unicos(factorizados)
+        return [self._codificar(df, f) for df, f in zip(dfs, factorizados)]
+
+    def actualizar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Copia de df con sus columnas codificadas llevadas al diccionario actual
+        (después de que codificar / registrar hayan añadido valores). Como las
+        categorías nuevas se añaden al final, los códigos valen tal cual.
+
+        Ejemplo
+        -------
+            e1 = cod.codificar(f1)
+            e2 = cod.codificar(f2)     # f2 trae PN nuevos
+            e1 = cod.actualizar(e1)    # e1.pn.dtype == e2.pn.dtype
+        """
+        df = df.copy()
+        for c in df.columns:
+            dominio = self._columna_a_dominio.get(c)
+            s = df[c]
+            if dominio not in self._tipos or not isinstance(s.dtype, pd.CategoricalDtype):
+                continue
+            tipo = self._tipos[dominio]
+            if s.dtype == tipo:
+                continue
+            viejas = s.cat.categories
+            if tipo.categories[:len(viejas)].equals(viejas):
+                codigos = s.cat.codes.to_numpy()
+            else:
+                # Otro diccionario: se traducen sólo las categorías
+                codigos = np.append(tipo.categories.get_indexer(viejas), -1)[s.cat.codes.to_numpy()]
+            df[c] = pd.Categorical.from_codes(codigos, dtype=tipo)
+        return df
+
+    def decodificar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Copia de df con las columnas codificadas de vuelta a object (textos originales)."""
+        df = df.copy()
+        for c in df.columns:
+            if isinstance(df[c].dtype, pd.CategoricalDtype) and df[c].dtype in self._tipos.values():
+                df[c] = df[c].astype(object)
+        return df
+
+    def resumen(self) -> pd.DataFrame:
+        """Nº de valores distintos por dominio y bytes de su diccionario."""
+        filas = [
+            {
+                "dominio": d,
+                "valores": len(t.categories),
+                "bytes_diccionario": int(t.categories.memory_usage(deep=True)),
+            }
+            for d, t in self._tipos.items()
+        ]
+        return pd.DataFrame(filas, columns=["dominio", "valores", "bytes_diccionario"])
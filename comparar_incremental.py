@@ -0,0 +1,237 @@
+import os
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from comparar_tablas_mejorado import _resolver_columnas, comparar_tablas
+
+_VERSION_SNAPSHOT = 2
+_SIN_ESTADO = -1  # clave sin estado guardado (repetida en algún lado): se recompara siempre
+
+
+def _claves_hashables(df: pd.DataFrame, keys: List[str], normalizar: bool) -> pd.DataFrame:
+    """
+    Claves tal cual o, si el tipo difiere entre lados, en una forma común: números
+    como float64 (1 y 1.0 son la misma clave, como en el merge) y el resto como texto.
+    """
+    if not normalizar:
+        return df[keys]
+    sel = {}
+    for k in keys:
+        s = df[k]
+        if is_numeric_dtype(s.dtype) and not is_bool_dtype(s.dtype):
+            sel[k] = s.astype("float64") + 0.0  # -0.0 -> 0.0
+        else:
+            sel[k] = s.astype(str)
+    return pd.DataFrame(sel)
+
+
+def _hash_claves(df: pd.DataFrame, keys: List[str], normalizar: bool) -> np.ndarray:
+    """Hash uint64 de las claves de cada fila."""
+    return pd.util.hash_pandas_object(_claves_hashables(df, keys, normalizar), index=False).to_numpy()
+
+
+def _huellas_por_clave(claves_hash: np.ndarray, filas_hash: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Huella por clave = suma (uint64, con desbordamiento) de los hashes de sus filas.
+    La suma no depende del orden de las filas y cuenta duplicados.
+    Devuelve (claves_hash únicas ordenadas, huella, nº de filas).
+    """
+    if len(claves_hash) == 0:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    orden = np.argsort(claves_hash, kind="stable")
+    kh = claves_hash[orden]
+    inicios = np.flatnonzero(np.r_[True, kh[1:] != kh[:-1]])
+    with np.errstate(over="ignore"):
+        huella = np.add.reduceat(filas_hash[orden], inicios)
+    return kh[inicios], huella, np.diff(np.r_[inicios, len(kh)])
+
+
+def _alinear(claves: np.ndarray, sub_claves: np.ndarray, valores: np.ndarray, vacio=0) -> np.ndarray:
+    """
+    Lleva 'valores' (indexados por sub_claves) a la rejilla 'claves'. Ausente -> vacio.
+    Las sub_claves que no están en 'claves' (p.ej. claves del snapshot que ya no
+    existen) se descartan.
+    """
+    out = np.full(len(claves), vacio, dtype=valores.dtype)
+    pos = np.searchsorted(claves, sub_claves)
+    esta = pos < len(claves)
+    esta[esta] = claves[pos[esta]] == sub_claves[esta]
+    out[pos[esta]] = valores[esta]
+    return out
+
+
+def leer_snapshot(ruta: str) -> Optional[dict]:
+    """
+    Lee un snapshot de comparar_tablas_incremental (None si no existe o es de otra versión).
+
+    Es compacto: por clave sólo guarda su hash, la huella de sus filas en cada lado
+    y el estado y las diferencias del último resultado (no las filas del resultado).
+    """
+    if not os.path.exists(ruta):
+        return None
+    snap = pd.read_pickle(ruta)
+    if not isinstance(snap, dict) or snap.get("version") != _VERSION_SNAPSHOT:
+        return None
+    return snap
+
+
+def comparar_tablas_incremental(
+    df_left: pd.DataFrame,
+    df_right: pd.DataFrame,
+    keys: List[str],
+    snapshot: str,
+    include_left: Optional[Iterable[str]] = None,
+    include_right: Optional[Iterable[str]] = None,
+    left_name: str = "left",
+    right_name: str = "right",
+    compare_on: Optional[Iterable[str]] = None,
+    normalize_text_on: Optional[Iterable[str]] = None,
+    strip: bool = True,
+    lower: bool = True,
+    atol: float = 0.0,
+    rtol: float = 0.0,
+    ordenar: bool = True,
+) -> pd.DataFrame:
+    """
+    comparar_tablas en modo delta contra el snapshot de la ejecución anterior.
+
+    El snapshot (fichero local, pickle; admite compresión por extensión, p.ej. ".pkl.gz")
+    guarda por clave su hash, una huella de sus filas en cada lado y el estado y las
+    diferencias que salieron (unos 30 bytes por clave, sin las filas del resultado).
+    En cada ejecución:
+      1) Se calcula la huella de cada clave en las tablas nuevas.
+      2) Se detectan claves insertadas, eliminadas y modificadas en cada lado.
+      3) Sólo esas claves se vuelven a comparar con comparar_tablas.
+      4) Las demás se cruzan sin comparar columnas y toman el estado y las
+         diferencias del snapshot; después se guarda el snapshot nuevo.
+
+    Las claves repetidas en algún lado no guardan estado (cada combinación de filas
+    tiene el suyo) y se comparan en cada ejecución.
+
+    Si no hay snapshot, o se compara con otros parámetros, se hace la comparación completa.
+    El resultado es el mismo que el de comparar_tablas (con ordenar=True, también el orden).
+
+    Parámetros
+    ----------
+    snapshot : ruta del fichero de snapshot (se crea / sobrescribe).
+    ordenar : ordenar el resultado por claves, como el merge outer de comparar_tablas.
+    Resto : los mismos que comparar_tablas.
+
+    Retorna
+    -------
+    DataFrame con las columnas de comparar_tablas. En resultado.attrs["delta"] queda
+    el resumen de cambios (claves insertadas / eliminadas / modificadas por lado).
+    """
+    keys = list(keys)
+    include_left, include_right = _resolver_columnas(df_left, df_right, keys, include_left, include_right)
+    parametros = {
+        "keys": keys,
+        "include_left": include_left,
+        "include_right": include_right,
+        "left_name": left_name,
+        "right_name": right_name,
+        "compare_on": None if compare_on is None else list(compare_on),
+        "normalize_text_on": None if normalize_text_on is None else list(normalize_text_on),
+        "strip": strip,
+        "lower": lower,
+        "atol": atol,
+        "rtol": rtol,
+    }
+    kwargs_comparar = {k: v for k, v in parametros.items() if k != "keys"}
+
+    # 1) Huellas de las tablas nuevas. Si el tipo de las claves difiere entre lados,
+    #    se normalizan para que la misma clave dé el mismo hash en ambos.
+    normalizar = any(df_left[k].dtype != df_right[k].dtype for k in keys)
+    kh_left = _hash_claves(df_left, keys, normalizar)
+    kh_right = _hash_claves(df_right, keys, normalizar)
+    fh_left = pd.util.hash_pandas_object(df_left[keys + include_left], index=False).to_numpy()
+    fh_right = pd.util.hash_pandas_object(df_right[keys + include_right], index=False).to_numpy()
+    ul, hl, nl = _huellas_por_clave(kh_left, fh_left)
+    ur, hr, nr = _huellas_por_clave(kh_right, fh_right)
+    claves = np.union1d(ul, ur)
+    huella_left = _alinear(claves, ul, hl)
+    huella_right = _alinear(claves, ur, hr)
+    unica = (_alinear(claves, ul, nl) <= 1) & (_alinear(claves, ur, nr) <= 1)
+
+    previo = leer_snapshot(snapshot)
+    completo = (
+        previo is None
+        or previo["parametros"] != parametros
+        or previo.get("claves_normalizadas") != normalizar
+    )
+
+    if completo:
+        resultado = comparar_tablas(df_left, df_right, keys, **kwargs_comparar)
+        resumen = {"completo": True, "claves_recomparadas": int(len(claves))}
+    else:
+        # 2) Claves cambiadas: huella distinta en algún lado (incluye altas y bajas)
+        todas = np.union1d(claves, previo["claves"])
+        antes_left = _alinear(todas, previo["claves"], previo["huella_left"])
+        antes_right = _alinear(todas, previo["claves"], previo["huella_right"])
+        ahora_left = _alinear(todas, claves, huella_left)
+        ahora_right = _alinear(todas, claves, huella_right)
+        cambia = (antes_left != ahora_left) | (antes_right != ahora_right)
+
+        resumen = {"completo": False}
+        for lado, antes, ahora in (
+            (left_name, antes_left, ahora_left),
+            (right_name, antes_right, ahora_right),
+        ):
+            resumen[f"insertadas_{lado}"] = int(((antes == 0) & (ahora != 0)).sum())
+            resumen[f"eliminadas_{lado}"] = int(((antes != 0) & (ahora == 0)).sum())
+            resumen[f"modificadas_{lado}"] = int(((antes != 0) & (ahora != 0) & (antes != ahora)).sum())
+
+        # Se recomparan las cambiadas y las que no tienen estado guardado
+        estado_previo = _alinear(claves, previo["claves"], previo["estado"], _SIN_ESTADO)
+        dif_previa = _alinear(claves, previo["claves"], previo["diferencias"], -1)
+        recomparar = cambia[np.searchsorted(todas, claves)] | (estado_previo == _SIN_ESTADO)
+        resumen["claves_recomparadas"] = int(recomparar.sum())
+
+        # 3) Recomparar sólo las filas de las claves cambiadas
+        fila_left = recomparar[np.searchsorted(claves, kh_left)]
+        fila_right = recomparar[np.searchsorted(claves, kh_right)]
+        parcial = comparar_tablas(df_left[fila_left], df_right[fila_right], keys, **kwargs_comparar)
+
+        # 4) Las demás: cruce sin comparar columnas + estado y diferencias del snapshot
+        iguales = comparar_tablas(df_left[~fila_left], df_right[~fila_right], keys,
+                                  **dict(kwargs_comparar, compare_on=[]))
+        pos = np.searchsorted(claves, _hash_claves(iguales, keys, normalizar))
+        iguales["estado"] = pd.Categorical.from_codes(estado_previo[pos], dtype=iguales["estado"].dtype)
+        iguales["diferencias"] = np.asarray(previo["textos_diferencias"], dtype=object)[dif_previa[pos]]
+        # Sin las partes vacías: su concat cambiaría el dtype de las columnas de texto
+        resultado = pd.concat([p for p in (iguales, parcial) if len(p)] or [parcial], ignore_index=True)
+
+    if ordenar and len(resultado):
+        resultado = resultado.sort_values(keys, kind="stable").reset_index(drop=True)
+
+    # Estado y diferencias por clave para la próxima ejecución (sólo claves sin repetir)
+    estado = np.full(len(claves), _SIN_ESTADO, dtype=np.int8)
+    diferencias = np.full(len(claves), -1, dtype=np.int32)
+    textos = np.empty(0, dtype=object)
+    if len(resultado):
+        pos = np.searchsorted(claves, _hash_claves(resultado, keys, normalizar))
+        guardar = unica[pos]
+        codigos_dif, textos = pd.factorize(resultado["diferencias"].to_numpy()[guardar])
+        estado[pos[guardar]] = resultado["estado"].cat.codes.to_numpy()[guardar]
+        diferencias[pos[guardar]] = codigos_dif
+
+    pd.to_pickle(
+        {
+            "version": _VERSION_SNAPSHOT,
+            "parametros": parametros,
+            "claves_normalizadas": normalizar,
+            "claves": claves,
+            "huella_left": huella_left,
+            "huella_right": huella_right,
+            "estado": estado,
+            "diferencias": diferencias,
+            "textos_diferencias": list(textos),
+        },
+        snapshot,
+    )
+
+    resultado.attrs["delta"] = resumen
+    return resultado
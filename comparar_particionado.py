@@ -0,0 +1,419 @@
+import glob
+import math
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+from comparar_tablas_mejorado import comparar_tablas
+from piezas_utils import comparar_por_clave
+
+Fuente = Union[str, pd.DataFrame]
+
+# Cuántas veces el tamaño de una partición hace falta para reconciliarla
+# (las dos entradas + merge outer + columnas de salida).
+_FACTOR_MEMORIA = 4
+_FILAS_MUESTRA = 1000
+
+
+def _es_parquet(ruta: str) -> bool:
+    return ruta.lower().endswith((".parquet", ".pq"))
+
+
+def _leer_en_trozos(
+    fuente: Fuente,
+    filas_por_trozo: int,
+    columnas: Optional[List[str]] = None,
+    leer_kwargs: Optional[dict] = None,
+) -> Iterator[pd.DataFrame]:
+    """Lee una fuente (DataFrame, CSV o Parquet) en trozos de 'filas_por_trozo' filas."""
+    leer_kwargs = dict(leer_kwargs or {})
+    if isinstance(fuente, pd.DataFrame):
+        df = fuente if columnas is None else fuente[columnas]
+        for ini in range(0, len(df), filas_por_trozo):
+            yield df.iloc[ini:ini + filas_por_trozo]
+        return
+
+    if _es_parquet(fuente):
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(fuente)
+        for lote in pf.iter_batches(batch_size=filas_por_trozo, columns=columnas):
+            yield lote.to_pandas()
+        return
+
+    if columnas is not None:
+        leer_kwargs.setdefault("usecols", columnas)
+    with pd.read_csv(fuente, chunksize=filas_por_trozo, **leer_kwargs) as lector:
+        for trozo in lector:
+            yield trozo
+
+
+def _estimar_memoria(
+    fuente: Fuente,
+    columnas: Optional[List[str]] = None,
+    leer_kwargs: Optional[dict] = None,
+) -> Tuple[float, float]:
+    """
+    Estima (bytes_por_fila, bytes_totales) en memoria de una fuente sin cargarla entera.
+    Para CSV se extrapola a partir del tamaño en disco de una muestra.
+    """
+    if isinstance(fuente, pd.DataFrame):
+        df = fuente if columnas is None else fuente[columnas]
+        total = float(df.memory_usage(deep=True).sum())
+        return total / max(len(df), 1), total
+
+    muestra = next(_leer_en_trozos(fuente, _FILAS_MUESTRA, columnas, leer_kwargs), None)
+    if muestra is None or muestra.empty:
+        return 0.0, 0.0
+    por_fila = float(muestra.memory_usage(deep=True).sum()) / len(muestra)
+
+    if _es_parquet(fuente):
+        import pyarrow.parquet as pq
+
+        filas = pq.ParquetFile(fuente).metadata.num_rows
+    else:
+        # Filas aproximadas = tamaño fichero / bytes medios por línea de la muestra
+        with open(fuente, "rb") as fh:
+            cabecera = [fh.readline() for _ in range(_FILAS_MUESTRA + 1)]
+        bytes_linea = sum(len(l) for l in cabecera[1:]) / max(len(cabecera) - 1, 1)
+        filas = os.path.getsize(fuente) / max(bytes_linea, 1.0)
+    return por_fila, por_fila * filas
+
+
+def _particion_de(df: pd.DataFrame, keys: List[str], n_particiones: int) -> np.ndarray:
+    """
+    Número de partición de cada fila según el hash de sus claves. El mismo valor
+    cae en la misma partición aunque el tipo cambie de una fuente o de un trozo a
+    otro: los números se hashean como float64 (1 en int64 y 1.0 en float64), las
+    fechas en ns y el resto como texto. Que dos claves distintas compartan
+    partición (enteros enormes iguales en float64) no cambia el resultado.
+    """
+    canon = {}
+    for k in keys:
+        s = df[k]
+        if is_numeric_dtype(s) and not is_bool_dtype(s):
+            canon[k] = s.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0  # -0.0 -> 0.0
+        elif is_datetime64_any_dtype(s):
+            if getattr(s.dt, "tz", None) is not None:
+                s = s.dt.tz_convert(None)
+            canon[k] = s.to_numpy().astype("datetime64[ns]")
+        else:
+            canon[k] = s.astype(str)
+    h = pd.util.hash_pandas_object(pd.DataFrame(canon), index=False).to_numpy()
+    return (h % np.uint64(n_particiones)).astype(np.int64)
+
+
+def _tipos_fuente(fuente: Fuente, keys: List[str], leer_kwargs: Optional[dict]) -> Dict[str, Optional[object]]:
+    """dtype de cada clave en la fuente; None en un CSV sin dtype fijado (se adapta a la otra fuente)."""
+    if isinstance(fuente, pd.DataFrame):
+        return {k: fuente[k].dtype for k in keys}
+    if _es_parquet(fuente):
+        import pyarrow.parquet as pq
+
+        esquema = pq.read_schema(fuente).empty_table().to_pandas()
+        return {k: esquema[k].dtype for k in keys}
+    fijado = (leer_kwargs or {}).get("dtype")
+    if fijado is not None and not isinstance(fijado, dict):
+        fijado = {k: fijado for k in keys}
+    fijado = fijado or {}
+    return {k: pd.api.types.pandas_dtype(fijado[k]) if k in fijado else None for k in keys}
+
+
+def _tipo_comun(a, b) -> Optional[str]:
+    """
+    Tipo al que llevar una clave en las dos fuentes (None = dejarla como está).
+    Un CSV sin dtype fijado toma el tipo de la otra fuente; dos CSV, texto.
+    Números con números no se tocan (int64 y float64 se cruzan por valor);
+    fechas con fechas, a ns; el resto de mezclas, a texto en los dos lados.
+    """
+    def numero(t):
+        return is_numeric_dtype(t) and not is_bool_dtype(t)
+
+    if a is None and b is None:
+        return "str"
+    if a is None or b is None:
+        t = a if b is None else b
+        if pd.api.types.is_integer_dtype(t):
+            return "Int64"  # entero con nulos posibles, sin pasar por float
+        if numero(t):
+            return "float64"
+        if is_datetime64_any_dtype(t):
+            return "datetime64[ns]"
+        return "str"
+    if a == b or (numero(a) and numero(b)):
+        return None
+    if is_datetime64_any_dtype(a) and is_datetime64_any_dtype(b):
+        return "datetime64[ns]"
+    return "str"
+
+
+def _ajustar_claves(trozo: pd.DataFrame, tipos: Dict[str, Optional[str]]) -> pd.DataFrame:
+    """Lleva las claves del trozo al tipo común (los nulos siguen siendo nulos)."""
+    cambios = {}
+    for k, t in tipos.items():
+        s = trozo[k]
+        if t is None or str(s.dtype) == t:
+            continue
+        if t == "str":
+            cambios[k] = s.astype(object).where(s.isna(), s.astype(str))
+        elif t == "datetime64[ns]":
+            s = pd.to_datetime(s)
+            if getattr(s.dt, "tz", None) is not None:
+                s = s.dt.tz_convert(None)
+            cambios[k] = s.astype(t)
+        else:
+            cambios[k] = s.astype(t)
+    return trozo.assign(**cambios) if cambios else trozo
+
+
+def _tipos_claves(
+    fuente_1: Fuente,
+    fuente_2: Fuente,
+    keys: List[str],
+    leer_kwargs_1: Optional[dict],
+    leer_kwargs_2: Optional[dict],
+) -> Dict[str, Optional[str]]:
+    """Tipo común de cada clave en las dos fuentes (ver _tipo_comun)."""
+    t1 = _tipos_fuente(fuente_1, keys, leer_kwargs_1)
+    t2 = _tipos_fuente(fuente_2, keys, leer_kwargs_2)
+    return {k: _tipo_comun(t1[k], t2[k]) for k in keys}
+
+
+def _kwargs_lectura(
+    fuente: Fuente,
+    keys: List[str],
+    leer_kwargs: Optional[dict],
+    tipos: Dict[str, Optional[str]],
+) -> Optional[dict]:
+    """
+    En CSV, fija el dtype de las claves (el tipo común con la otra fuente, o texto)
+    para que no cambie de un trozo a otro, salvo que el usuario fije otro dtype.
+    Las fechas se leen como texto y se convierten en _ajustar_claves.
+    """
+    if isinstance(fuente, pd.DataFrame) or _es_parquet(fuente):
+        return leer_kwargs
+    kw = dict(leer_kwargs or {})
+    dtype = kw.get("dtype")
+    por_defecto = {k: str if tipos[k] in (None, "str", "datetime64[ns]") else tipos[k] for k in keys}
+    if dtype is None:
+        kw["dtype"] = por_defecto
+    elif isinstance(dtype, dict):
+        kw["dtype"] = {**por_defecto, **dtype}
+    return kw
+
+
+def _volcar_particiones(
+    fuente: Fuente,
+    lado: str,
+    keys: List[str],
+    columnas: Optional[List[str]],
+    n_particiones: int,
+    filas_por_trozo: int,
+    directorio: str,
+    leer_kwargs: Optional[dict],
+    tipos: Dict[str, Optional[str]],
+) -> None:
+    """Lee la fuente en trozos y reparte sus filas en ficheros de volcado por partición."""
+    esquema = None
+    for n_trozo, trozo in enumerate(_leer_en_trozos(fuente, filas_por_trozo, columnas, leer_kwargs)):
+        trozo = _ajustar_claves(trozo, tipos)
+        if esquema is None:
+            esquema = trozo.iloc[:0]
+            esquema.to_pickle(os.path.join(directorio, f"{lado}-esquema.pkl"))
+        if trozo.empty:
+            continue
+        particion = _particion_de(trozo, keys, n_particiones)
+        for p, idx in pd.Series(particion).groupby(particion).indices.items():
+            ruta = os.path.join(directorio, f"{lado}-{p:05d}-{n_trozo:06d}.pkl")
+            trozo.take(idx).to_pickle(ruta)
+    if esquema is None:
+        raise ValueError(f"La fuente '{lado}' no tiene cabecera ni filas.")
+
+
+def _cargar_particion(directorio: str, lado: str, p: int) -> pd.DataFrame:
+    trozos = [pd.read_pickle(r) for r in sorted(glob.glob(os.path.join(directorio, f"{lado}-{p:05d}-*.pkl")))]
+    if not trozos:
+        return pd.read_pickle(os.path.join(directorio, f"{lado}-esquema.pkl"))
+    return pd.concat(trozos, ignore_index=True) if len(trozos) > 1 else trozos[0]
+
+
+def _hay_particion(directorio: str, lado: str, p: int) -> bool:
+    return bool(glob.glob(os.path.join(directorio, f"{lado}-{p:05d}-*.pkl")))
+
+
+def _comparar_particion(args: tuple) -> pd.DataFrame:
+    directorio, p, keys, kwargs = args
+    left = _cargar_particion(directorio, "left", p)
+    right = _cargar_particion(directorio, "right", p)
+    return comparar_tablas(left, right, keys, **kwargs)
+
+
+def _comparar_particion_por_clave(args: tuple) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    directorio, p, clave_cols = args
+    f1 = _cargar_particion(directorio, "left", p)
+    f2 = _cargar_particion(directorio, "right", p)
+    return comparar_por_clave(f1, f2, clave_cols)
+
+
+def _planificar(
+    fuentes: List[Tuple[Fuente, Optional[List[str]], Optional[dict]]],
+    memoria_mb: float,
+    n_procesos: int,
+    n_particiones: Optional[int],
+) -> Tuple[int, Dict[int, int]]:
+    """
+    Decide el nº de particiones y las filas por trozo de lectura de cada fuente
+    para que ni la lectura ni la reconciliación de una partición superen el presupuesto.
+    """
+    presupuesto = memoria_mb * 1024 ** 2 / max(n_procesos, 1)
+    estimaciones = [_estimar_memoria(f, c, k) for f, c, k in fuentes]
+    total = sum(t for _, t in estimaciones)
+    if n_particiones is None:
+        n_particiones = max(1, math.ceil(_FACTOR_MEMORIA * total / presupuesto))
+    filas = {
+        i: max(_FILAS_MUESTRA, int(presupuesto / (_FACTOR_MEMORIA * max(por_fila, 1.0))))
+        for i, (por_fila, _) in enumerate(estimaciones)
+    }
+    return n_particiones, filas
+
+
+def _ejecutar_particiones(funcion, tareas: Iterable[tuple], n_procesos: int) -> Iterator:
+    """Ejecuta las tareas en orden, con como mucho 'n_procesos' resultados en vuelo."""
+    if n_procesos <= 1:
+        for t in tareas:
+            yield funcion(t)
+        return
+    with ProcessPoolExecutor(max_workers=n_procesos) as ex:
+        en_vuelo = deque()
+        for t in tareas:
+            en_vuelo.append(ex.submit(funcion, t))
+            if len(en_vuelo) >= n_procesos:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+def comparar_tablas_particionado(
+    fuente_left: Fuente,
+    fuente_right: Fuente,
+    keys: List[str],
+    include_left: Optional[Iterable[str]] = None,
+    include_right: Optional[Iterable[str]] = None,
+    memoria_mb: float = 1024,
+    n_procesos: int = 1,
+    n_particiones: Optional[int] = None,
+    dir_trabajo: Optional[str] = None,
+    leer_kwargs_left: Optional[dict] = None,
+    leer_kwargs_right: Optional[dict] = None,
+    **kwargs_comparar,
+) -> Iterator[pd.DataFrame]:
+    """
+    Versión fuera de memoria de comparar_tablas para tablas que no caben en RAM.
+
+    1) Lee cada fuente (CSV, Parquet o DataFrame) en trozos.
+    2) Reparte las filas por hash de 'keys' en ficheros de volcado en disco.
+    3) Reconcilia cada partición por separado con comparar_tablas
+       (opcionalmente en paralelo con n_procesos).
+
+    Todas las filas con la misma clave caen en la misma partición, así que el
+    resultado es el mismo que el de comparar_tablas; sólo cambia el orden de las
+    filas (ordenado por clave dentro de cada partición).
+
+    Parámetros
+    ----------
+    fuente_left, fuente_right : ruta .csv / .parquet o DataFrame.
+    keys : columnas clave.
+    include_left, include_right : columnas a incluir (sólo se leen esas + keys).
+    memoria_mb : presupuesto de memoria total (se reparte entre procesos).
+    n_procesos : nº de procesos para reconciliar particiones en paralelo.
+    n_particiones : fuerza el nº de particiones (por defecto se calcula del presupuesto).
+    dir_trabajo : carpeta donde crear los volcados temporales (por defecto, la del sistema).
+    leer_kwargs_left, leer_kwargs_right : argumentos extra para pd.read_csv.
+        Por defecto las claves de un CSV se leen con el tipo de las de la otra
+        fuente (texto si las dos son CSV), para que no cambie de un trozo a otro.
+        Si las claves tienen tipos incompatibles en las dos fuentes (texto y
+        número...), se comparan como texto en los dos lados.
+    **kwargs_comparar : resto de argumentos de comparar_tablas
+        (left_name, right_name, compare_on, normalize_text_on, atol, rtol...).
+
+    Retorna
+    -------
+    Iterador de DataFrames (uno por partición) con las columnas de comparar_tablas.
+
+    Ejemplo
+    -------
+        for i, parte in enumerate(comparar_tablas_particionado("rdcd.csv", "inv.csv", ["pn", "sn"])):
+            parte.to_csv("resultado.csv", mode="a", header=(i == 0), index=False)
+    """
+    keys = list(keys)
+    cols_left = None if include_left is None else keys + [c for c in include_left if c not in keys]
+    cols_right = None if include_right is None else keys + [c for c in include_right if c not in keys]
+    tipos = _tipos_claves(fuente_left, fuente_right, keys, leer_kwargs_left, leer_kwargs_right)
+    leer_left = _kwargs_lectura(fuente_left, keys, leer_kwargs_left, tipos)
+    leer_right = _kwargs_lectura(fuente_right, keys, leer_kwargs_right, tipos)
+
+    n_part, filas = _planificar(
+        [(fuente_left, cols_left, leer_left), (fuente_right, cols_right, leer_right)],
+        memoria_mb, n_procesos, n_particiones,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="comparar_", dir=dir_trabajo) as directorio:
+        _volcar_particiones(fuente_left, "left", keys, cols_left, n_part, filas[0], directorio, leer_left, tipos)
+        _volcar_particiones(fuente_right, "right", keys, cols_right, n_part, filas[1], directorio, leer_right, tipos)
+
+        tareas = (
+            (directorio, p, keys, kwargs_comparar)
+            for p in range(n_part)
+            if _hay_particion(directorio, "left", p) or _hay_particion(directorio, "right", p)
+        )
+        for parte in _ejecutar_particiones(_comparar_particion, tareas, n_procesos):
+            yield parte
+
+
+def comparar_por_clave_particionado(
+    f1: Fuente,
+    f2: Fuente,
+    clave_cols: Union[str, List[str]],
+    memoria_mb: float = 1024,
+    n_procesos: int = 1,
+    n_particiones: Optional[int] = None,
+    dir_trabajo: Optional[str] = None,
+    leer_kwargs_f1: Optional[dict] = None,
+    leer_kwargs_f2: Optional[dict] = None,
+) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+    """
+    Versión fuera de memoria de comparar_por_clave. Sólo lee las columnas clave.
+
+    Retorna
+    -------
+    Iterador de tuplas (solo_f1, solo_f2, en_ambos), una por partición.
+    """
+    if isinstance(clave_cols, str):
+        clave_cols = [clave_cols]
+    clave_cols = list(clave_cols)
+    tipos = _tipos_claves(f1, f2, clave_cols, leer_kwargs_f1, leer_kwargs_f2)
+    leer_1 = _kwargs_lectura(f1, clave_cols, leer_kwargs_f1, tipos)
+    leer_2 = _kwargs_lectura(f2, clave_cols, leer_kwargs_f2, tipos)
+
+    n_part, filas = _planificar(
+        [(f1, clave_cols, leer_1), (f2, clave_cols, leer_2)],
+        memoria_mb, n_procesos, n_particiones,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="comparar_", dir=dir_trabajo) as directorio:
+        _volcar_particiones(f1, "left", clave_cols, clave_cols, n_part, filas[0], directorio, leer_1, tipos)
+        _volcar_particiones(f2, "right", clave_cols, clave_cols, n_part, filas[1], directorio, leer_2, tipos)
+
+        tareas = (
+            (directorio, p, clave_cols)
+            for p in range(n_part)
+            if _hay_particion(directorio, "left", p) or _hay_particion(directorio, "right", p)
+        )
+        for parte in _ejecutar_particiones(_comparar_particion_por_clave, tareas, n_procesos):
+            yield parte
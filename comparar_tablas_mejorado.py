@@ -1,135 +1,413 @@
-import pandas as pd
-import numpy as np
-from typing import Iterable, List, Optional
-
-def comparar_tablas(
-    df_left: pd.DataFrame,
-    df_right: pd.DataFrame,
-    keys: List[str],
-    include_left: Optional[Iterable[str]] = None,
-    include_right: Optional[Iterable[str]] = None,
-    left_name: str = "left",
-    right_name: str = "right",
-    # ¿qué columnas comparar para decidir OK/DISCREPANCIA?
-    compare_on: Optional[Iterable[str]] = None,  # por nombre base (sin sufijo). Si None => intersección de incluidas
-    # normalización de texto antes de comparar
-    normalize_text_on: Optional[Iterable[str]] = None,  # por nombre base
-    strip: bool = True,
-    lower: bool = True,
-    # tolerancia numérica
-    atol: float = 0.0,
-    rtol: float = 0.0,
-) -> pd.DataFrame:
-    """
-    Compara df_left y df_right por 'keys' y devuelve:
-      - keys (tal cual, una sola vez)
-      - columnas seleccionadas de left con sufijo _{left_name}
-      - columnas seleccionadas de right con sufijo _{right_name}
-      - 'estado' y 'diferencias'
-
-    Estados:
-      - "OK"                       -> existe en ambos y no hay diferencias en compare_on
-      - "DISCREPANCIA"             -> existe en ambos y hay diferencias
-      - "Está en {left} pero no en {right}"
-      - "Está en {right} pero no en {left}"
-    """
-    # Validar claves
-    faltan_left = [k for k in keys if k not in df_left.columns]
-    faltan_right = [k for k in keys if k not in df_right.columns]
-    if faltan_left or faltan_right:
-        raise ValueError(f"Claves ausentes. Left:{faltan_left}  Right:{faltan_right}")
-
-    # Si no especifican columnas a incluir, tomamos todas las no-clave
-    if include_left is None:
-        include_left = [c for c in df_left.columns if c not in keys]
-    else:
-        include_left = [c for c in include_left if c in df_left.columns]
-
-    if include_right is None:
-        include_right = [c for c in df_right.columns if c not in keys]
-    else:
-        include_right = [c for c in include_right if c in df_right.columns]
-
-    # Seleccionar y renombrar con sufijos
-    left_sel = df_left[keys + list(include_left)].copy()
-    right_sel = df_right[keys + list(include_right)].copy()
-
-    left_ren = {c: f"{c}_{left_name}" for c in include_left}
-    right_ren = {c: f"{c}_{right_name}" for c in include_right}
-
-    left_sel = left_sel.rename(columns=left_ren)
-    right_sel = right_sel.rename(columns=right_ren)
-
-    # Outer merge para conservar todo
-    merged = left_sel.merge(
-        right_sel,
-        on=keys,
-        how="outer",
-        indicator=True
-    )
-
-    # Determinar columnas base a comparar
-    left_bases  = {c.rsplit(f"_{left_name}", 1)[0] for c in left_ren.values()}
-    right_bases = {c.rsplit(f"_{right_name}", 1)[0] for c in right_ren.values()}
-    if compare_on is None:
-        compare_bases = sorted(list(left_bases & right_bases))
-    else:
-        compare_bases = [c for c in compare_on if (c in left_bases and c in right_bases)]
-
-    # Normalización de texto previa (si procede) SOLO en las columnas incluidas
-    if normalize_text_on:
-        for base in normalize_text_on:
-            col_l = f"{base}_{left_name}"
-            col_r = f"{base}_{right_name}"
-            if col_l in merged.columns:
-                s = merged[col_l].astype("string")
-                if strip: s = s.str.strip()
-                if lower: s = s.str.lower()
-                merged[col_l] = s
-            if col_r in merged.columns:
-                s = merged[col_r].astype("string")
-                if strip: s = s.str.strip()
-                if lower: s = s.str.lower()
-                merged[col_r] = s
-
-    # Helpers de comparación
-    def iguales(v1, v2) -> bool:
-        # NaN == NaN
-        if pd.isna(v1) and pd.isna(v2):
-            return True
-        # Intentar numérico con tolerancia
-        try:
-            return np.isclose(float(v1), float(v2), atol=atol, rtol=rtol, equal_nan=True)
-        except Exception:
-            # Fallback: string comparado ya normalizado si tocaba
-            return str(v1) == str(v2)
-
-    # Construir estado + diferencias
-    estados = []
-    difs = []
-    for _, row in merged.iterrows():
-        where = row["_merge"]
-        if where == "left_only":
-            estados.append(f"Está en {left_name} pero no en {right_name}")
-            difs.append([])
-            continue
-        if where == "right_only":
-            estados.append(f"Está en {right_name} pero no en {left_name}")
-            difs.append([])
-            continue
-        # En ambos: comparar compare_bases
-        distintos = []
-        for base in compare_bases:
-            v1 = row.get(f"{base}_{left_name}", pd.NA)
-            v2 = row.get(f"{base}_{right_name}", pd.NA)
-            if not iguales(v1, v2):
-                distintos.append(base)
-        estados.append("OK" if not distintos else "DISCREPANCIA")
-        difs.append(distintos)
-
-    merged["estado"] = estados
-    merged["diferencias"] = [", ".join(d) if d else "" for d in difs]
-
-    # Orden de salida: keys + (left incluidas) + (right incluidas) + estado + diferencias
-    out_cols = list(keys) + [f"{c}_{left_name}" for c in include_left] + [f"{c}_{right_name}" for c in include_right] + ["estado", "diferencias"]
-    return merged[out_cols]
+import pandas as pd
+import numpy as np
+from enum import IntEnum
+from typing import Iterable, List, Optional, Tuple
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_extension_array_dtype,
+    is_numeric_dtype,
+    is_timedelta64_dtype,
+)
+
+from claves_hash import unir_por_hash
+from instrumentacion import etapa, medido
+
+# Textos que, comparados contra un nulo, pueden resultar iguales con str()/float()
+_TEXTOS_NULOS = ["nan", "+nan", "-nan", "none", "<na>", "nat"]
+
+
+class EstadoComparacion(IntEnum):
+    """
+    Estado de una fila de comparar_tablas. La columna 'estado' es categórica y su
+    código es este valor: res["estado"].cat.codes == EstadoComparacion.DISCREPANCIA.
+    El texto ("Está en left pero no en right"...) es sólo la etiqueta para mostrar.
+    """
+
+    OK = 0
+    DISCREPANCIA = 1
+    SOLO_IZQUIERDA = 2
+    SOLO_DERECHA = 3
+
+    def etiqueta(self, left_name: str = "left", right_name: str = "right") -> str:
+        if self is EstadoComparacion.SOLO_IZQUIERDA:
+            return f"Está en {left_name} pero no en {right_name}"
+        if self is EstadoComparacion.SOLO_DERECHA:
+            return f"Está en {right_name} pero no en {left_name}"
+        return self.name
+
+
+def etiquetas_estado(left_name: str = "left", right_name: str = "right") -> List[str]:
+    """Categorías de la columna 'estado', en el orden de EstadoComparacion."""
+    return [e.etiqueta(left_name, right_name) for e in EstadoComparacion]
+
+
+def codigos_estado(estado: pd.Series, left_name: str = "left", right_name: str = "right") -> np.ndarray:
+    """
+    Código EstadoComparacion (int8) de cada fila; -1 si la etiqueta no es un estado.
+    Admite la columna categórica de comparar_tablas (sin mirar los textos) o una
+    columna de texto con las mismas etiquetas (resultados guardados antes).
+    """
+    etiquetas = etiquetas_estado(left_name, right_name)
+    if isinstance(estado.dtype, pd.CategoricalDtype) and list(estado.cat.categories) == etiquetas:
+        return estado.cat.codes.to_numpy().astype(np.int8)
+    # Texto (o categórica con otras categorías): se traduce cada etiqueta distinta una vez
+    codigos, unicos = pd.factorize(estado)
+    por_etiqueta = {e: i for i, e in enumerate(etiquetas)}
+    traduccion = np.array([por_etiqueta.get(u, -1) for u in unicos] + [-1], dtype=np.int8)
+    return traduccion[codigos]
+
+
+def _iguales_escalar(v1, v2, atol: float, rtol: float) -> bool:
+    """Comparación celda a celda (referencia). Sólo se usa para los casos raros."""
+    # NaN == NaN
+    if pd.isna(v1) and pd.isna(v2):
+        return True
+    # Intentar numérico con tolerancia
+    try:
+        return bool(np.isclose(float(v1), float(v2), atol=atol, rtol=rtol, equal_nan=True))
+    except Exception:
+        # Fallback: string comparado ya normalizado si tocaba
+        return str(v1) == str(v2)
+
+
+def _unicos(s: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    """(código de cada fila, valores distintos) con pd.factorize; los nulos tienen código -1."""
+    codigos, unicos = pd.factorize(s)
+    return codigos, pd.Series(unicos, dtype=s.dtype if isinstance(s.dtype, pd.StringDtype) else object)
+
+
+def _por_codigo(por_unico: np.ndarray, codigos: np.ndarray, nulo) -> np.ndarray:
+    """Valor de cada fila a partir del de su valor distinto; código -1 (nulo) -> 'nulo'."""
+    return np.append(por_unico, np.array([nulo], dtype=por_unico.dtype))[codigos]
+
+
+def _es_texto(s: pd.Series) -> bool:
+    return s.dtype == object or isinstance(s.dtype, pd.StringDtype)
+
+
+def _a_numerico(s: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte una columna a float64 imitando float(v) celda a celda.
+    Devuelve (valores, convertible). Las fechas NO se consideran numéricas.
+    En columnas object / texto la conversión se hace una vez por valor distinto.
+    """
+    n = len(s)
+    if is_datetime64_any_dtype(s) or is_timedelta64_dtype(s):
+        return np.full(n, np.nan), np.zeros(n, dtype=bool)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(object)
+    if (is_numeric_dtype(s) or is_bool_dtype(s)) and not is_extension_array_dtype(s):
+        return s.to_numpy(dtype=np.float64), np.ones(n, dtype=bool)
+    if not _es_texto(s):
+        return _a_numerico_celdas(s)
+    codigos, unicos = _unicos(s)
+    valores, convertible = _a_numerico_celdas(unicos)
+    return _por_codigo(valores, codigos, np.nan), _por_codigo(convertible, codigos, False)
+
+
+def _a_numerico_celdas(s: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """_a_numerico valor a valor (para columnas object / texto, sobre sus valores distintos)."""
+    valores = pd.to_numeric(s, errors="coerce")
+    valores = np.asarray(valores, dtype=np.float64)
+    convertible = ~np.isnan(valores)
+    faltan = np.flatnonzero(~convertible)
+    if len(faltan) and _es_texto(s):
+        resto = s.iloc[faltan]
+        tipos = np.fromiter((type(v) for v in resto), dtype=object, count=len(resto))
+        # "nan" / "NaN" en texto también es convertible con float(). Sólo los str pasan
+        # por .str: en columnas mezcladas (Excel) hay fechas, bytes... entre los números.
+        es_str = tipos == str
+        if es_str.any():
+            txt = resto[es_str].astype(object)
+            es_texto_nan = txt.str.strip().str.lower().isin(_TEXTOS_NULOS[:3]).to_numpy(dtype=bool)
+            convertible[faltan[es_str][es_texto_nan]] = True
+        # Otros tipos que float() acepta y to_numeric no (bytes, objetos con __float__)
+        for tipo in set(tipos[~es_str]):
+            if issubclass(tipo, (bytes, bytearray)) or hasattr(tipo, "__float__") or hasattr(tipo, "__index__"):
+                for i in faltan[tipos == tipo]:
+                    try:
+                        valores[i] = float(s.iat[i])
+                        convertible[i] = not pd.isna(s.iat[i])
+                    except (TypeError, ValueError):
+                        pass
+    return valores, convertible
+
+
+def _parece_nulo(s: pd.Series) -> np.ndarray:
+    """Textos tipo "nan" / "None" (que la comparación celda a celda daba por nulos), por valor distinto."""
+    codigos, unicos = _unicos(s)
+    return _por_codigo(unicos.astype(str).str.strip().str.lower().isin(_TEXTOS_NULOS).to_numpy(dtype=bool),
+                       codigos, False)
+
+
+def _como_texto(s: pd.Series) -> np.ndarray:
+    """str(v) vectorizado para valores no nulos."""
+    if is_datetime64_any_dtype(s) or is_timedelta64_dtype(s):
+        return np.array([str(v) for v in s], dtype=object)
+    tipo = pd.api.types.infer_dtype(s, skipna=True)
+    if tipo == "string":
+        # Sólo textos: str(v) es el propio valor
+        return s.to_numpy(dtype=object)
+    texto = s.astype(object).astype(str).to_numpy(dtype=object)
+    if tipo not in ("integer", "floating", "mixed-integer-float"):
+        # astype(str) decodifica los bytes (b"x" -> "x"); str(b"x") es "b'x'"
+        valores = s.to_numpy(dtype=object)
+        for i in np.flatnonzero([isinstance(v, (bytes, bytearray)) for v in valores]):
+            texto[i] = str(valores[i])
+    return texto
+
+
+def _distintas_por_codigos(a: pd.Series, b: pd.Series, atol: float, rtol: float) -> np.ndarray:
+    """
+    Categóricas con el mismo diccionario (ver codificacion_claves): mismo código
+    -> mismo valor. Cada pareja distinta de códigos se compara una sola vez con
+    las reglas de _columnas_distintas, sobre los valores originales.
+    """
+    ca = a.cat.codes.to_numpy().astype(np.int64)
+    cb = b.cat.codes.to_numpy().astype(np.int64)
+    distintos = np.zeros(len(a), dtype=bool)
+    dif = np.flatnonzero(ca != cb)
+    if len(dif) == 0:
+        return distintos
+    k = len(a.cat.categories) + 1
+    pares, inv = np.unique((ca[dif] + 1) * k + (cb[dif] + 1), return_inverse=True)
+    va = pd.Series(pd.Categorical.from_codes(pares // k - 1, dtype=a.dtype)).astype(object)
+    vb = pd.Series(pd.Categorical.from_codes(pares % k - 1, dtype=b.dtype)).astype(object)
+    distintos[dif] = _columnas_distintas(va, vb, atol=atol, rtol=rtol)[inv.ravel()]
+    return distintos
+
+
+def _columnas_distintas(a: pd.Series, b: pd.Series, atol: float = 0.0, rtol: float = 0.0) -> np.ndarray:
+    """
+    Compara dos columnas completas (alineadas por posición) y devuelve un array
+    booleano con True donde los valores difieren.
+
+    Reglas (las mismas que la comparación celda a celda):
+      - nulo vs nulo -> iguales
+      - nulo vs valor -> distintos
+      - ambos convertibles a número -> np.isclose(atol, rtol), NaN == NaN
+      - resto -> comparación de texto str(v1) == str(v2)
+    """
+    if isinstance(a.dtype, pd.CategoricalDtype) and a.dtype == b.dtype:
+        return _distintas_por_codigos(a, b, atol, rtol)
+
+    na_a = a.isna().to_numpy(dtype=bool)
+    na_b = b.isna().to_numpy(dtype=bool)
+    distintos = np.zeros(len(a), dtype=bool)
+
+    # 1) Sólo un lado nulo: distintos, salvo textos tipo "nan"/"None" (se resuelven uno a uno)
+    uno = np.flatnonzero(na_a ^ na_b)
+    if len(uno):
+        distintos[uno] = True
+        sospechosos = np.zeros(len(uno), dtype=bool)
+        for s in (a, b):
+            if _es_texto(s):
+                sospechosos |= _parece_nulo(s.iloc[uno])
+        for i in uno[sospechosos]:
+            distintos[i] = not _iguales_escalar(a.iat[i], b.iat[i], atol, rtol)
+
+    ambos = ~na_a & ~na_b
+    if not ambos.any():
+        return distintos
+
+    # 2) Fechas con el mismo dtype: comparación directa
+    if a.dtype == b.dtype and (is_datetime64_any_dtype(a) or is_timedelta64_dtype(a)):
+        distintos[ambos] = a.to_numpy()[ambos] != b.to_numpy()[ambos]
+        return distintos
+
+    # 3) Numérico con tolerancia donde ambos lados son convertibles
+    num_a, conv_a = _a_numerico(a)
+    num_b, conv_b = _a_numerico(b)
+    numerico = ambos & conv_a & conv_b
+    if numerico.any():
+        distintos[numerico] = ~np.isclose(
+            num_a[numerico], num_b[numerico], atol=atol, rtol=rtol, equal_nan=True
+        )
+
+    # 4) Resto: igualdad de texto
+    texto = np.flatnonzero(ambos & ~numerico)
+    if len(texto):
+        distintos[texto] = _como_texto(a.iloc[texto]) != _como_texto(b.iloc[texto])
+    return distintos
+
+
+def _diferencias_desde_mascara(mascara: np.ndarray, bases: List[str]) -> np.ndarray:
+    """
+    Traduce la máscara de bits (filas x palabras uint64) al texto 'diferencias'.
+    El texto se construye una sola vez por combinación distinta de columnas.
+    """
+    if len(mascara) == 0:
+        return np.empty(0, dtype=object)
+    if mascara.shape[1] == 1:
+        codigos, unicos = pd.factorize(mascara[:, 0])
+        unicos = unicos.reshape(-1, 1)
+    else:
+        unicos, codigos = np.unique(mascara, axis=0, return_inverse=True)
+        codigos = codigos.ravel()
+
+    textos = np.empty(len(unicos), dtype=object)
+    for u, palabras in enumerate(unicos):
+        nombres = [
+            base for j, base in enumerate(bases)
+            if (int(palabras[j // 64]) >> (j % 64)) & 1
+        ]
+        textos[u] = ", ".join(nombres)
+    return textos[codigos]
+
+
+def _resolver_columnas(
+    df_left: pd.DataFrame,
+    df_right: pd.DataFrame,
+    keys: List[str],
+    include_left: Optional[Iterable[str]],
+    include_right: Optional[Iterable[str]],
+) -> Tuple[List[str], List[str]]:
+    """Valida las claves y resuelve las columnas incluidas de cada lado."""
+    # Validar claves
+    faltan_left = [k for k in keys if k not in df_left.columns]
+    faltan_right = [k for k in keys if k not in df_right.columns]
+    if faltan_left or faltan_right:
+        raise ValueError(f"Claves ausentes. Left:{faltan_left}  Right:{faltan_right}")
+
+    # Si no especifican columnas a incluir, tomamos todas las no-clave
+    if include_left is None:
+        include_left = [c for c in df_left.columns if c not in keys]
+    else:
+        include_left = [c for c in include_left if c in df_left.columns]
+
+    if include_right is None:
+        include_right = [c for c in df_right.columns if c not in keys]
+    else:
+        include_right = [c for c in include_right if c in df_right.columns]
+
+    return list(include_left), list(include_right)
+
+
+@medido()
+def comparar_tablas(
+    df_left: pd.DataFrame,
+    df_right: pd.DataFrame,
+    keys: List[str],
+    include_left: Optional[Iterable[str]] = None,
+    include_right: Optional[Iterable[str]] = None,
+    left_name: str = "left",
+    right_name: str = "right",
+    # ¿qué columnas comparar para decidir OK/DISCREPANCIA?
+    compare_on: Optional[Iterable[str]] = None,  # por nombre base (sin sufijo). Si None => intersección de incluidas
+    # normalización de texto antes de comparar
+    normalize_text_on: Optional[Iterable[str]] = None,  # por nombre base
+    strip: bool = True,
+    lower: bool = True,
+    # tolerancia numérica
+    atol: float = 0.0,
+    rtol: float = 0.0,
+    # cruce por un código entero exacto de la clave compuesta
+    codigos_exactos: bool = False,
+) -> pd.DataFrame:
+    """
+    Compara df_left y df_right por 'keys' y devuelve:
+      - keys (tal cual, una sola vez)
+      - columnas seleccionadas de left con sufijo _{left_name}
+      - columnas seleccionadas de right con sufijo _{right_name}
+      - 'estado' y 'diferencias'
+
+    Estados ('estado' es categórica; su código es EstadoComparacion):
+      - "OK"                       -> existe en ambos y no hay diferencias en compare_on
+      - "DISCREPANCIA"             -> existe en ambos y hay diferencias
+      - "Está en {left} pero no en {right}"   (SOLO_IZQUIERDA)
+      - "Está en {right} pero no en {left}"   (SOLO_DERECHA)
+    Para separar por estado sin comparar textos:
+        cod = res["estado"].cat.codes
+        discrepancias = res[cod == EstadoComparacion.DISCREPANCIA]
+
+    Con muchas columnas clave (p.ej. 13 columnas object), codigos_exactos=True cruza
+    las tablas por un código entero exacto de la clave compuesta en vez de por las
+    columnas (ver claves_hash.unir_por_hash). En ese modo las filas no salen
+    ordenadas por clave (primero las de left en su orden, después las de right).
+    """
+    include_left, include_right = _resolver_columnas(df_left, df_right, keys, include_left, include_right)
+
+    # Seleccionar y renombrar con sufijos
+    left_sel = df_left[keys + list(include_left)].copy()
+    right_sel = df_right[keys + list(include_right)].copy()
+
+    left_ren = {c: f"{c}_{left_name}" for c in include_left}
+    right_ren = {c: f"{c}_{right_name}" for c in include_right}
+
+    left_sel = left_sel.rename(columns=left_ren)
+    right_sel = right_sel.rename(columns=right_ren)
+
+    # Outer merge para conservar todo
+    with etapa("merge", entrada=[left_sel, right_sel]) as e:
+        if codigos_exactos:
+            merged = unir_por_hash(left_sel, right_sel, keys, how="outer", indicator=True)
+        else:
+            merged = left_sel.merge(
+                right_sel,
+                on=keys,
+                how="outer",
+                indicator=True
+            )
+        e.salida(merged)
+
+    # Determinar columnas base a comparar
+    left_bases  = {c.rsplit(f"_{left_name}", 1)[0] for c in left_ren.values()}
+    right_bases = {c.rsplit(f"_{right_name}", 1)[0] for c in right_ren.values()}
+    if compare_on is None:
+        compare_bases = sorted(list(left_bases & right_bases))
+    else:
+        compare_bases = [c for c in compare_on if (c in left_bases and c in right_bases)]
+
+    # Normalización de texto previa (si procede) SOLO en las columnas incluidas
+    if normalize_text_on:
+        with etapa("normalizar_texto"):
+            for base in normalize_text_on:
+                col_l = f"{base}_{left_name}"
+                col_r = f"{base}_{right_name}"
+                if col_l in merged.columns:
+                    s = merged[col_l].astype("string")
+                    if strip: s = s.str.strip()
+                    if lower: s = s.str.lower()
+                    merged[col_l] = s
+                if col_r in merged.columns:
+                    s = merged[col_r].astype("string")
+                    if strip: s = s.str.strip()
+                    if lower: s = s.str.lower()
+                    merged[col_r] = s
+
+    # Construir estado + diferencias columna a columna (sin iterrows)
+    if left_name == right_name:
+        raise ValueError("left_name y right_name deben ser distintos.")
+    origen = merged["_merge"].cat
+    estado_de_origen = {
+        "left_only": EstadoComparacion.SOLO_IZQUIERDA,
+        "right_only": EstadoComparacion.SOLO_DERECHA,
+        "both": EstadoComparacion.OK,
+    }
+    codigos = np.array([estado_de_origen[c] for c in origen.categories], dtype=np.int8)[origen.codes.to_numpy()]
+    idx_ambos = np.flatnonzero(codigos == EstadoComparacion.OK)
+
+    # Máscara de bits por fila: bit j encendido -> compare_bases[j] difiere
+    mascara = np.zeros((len(idx_ambos), max(1, -(-len(compare_bases) // 64))), dtype=np.uint64)
+    for j, base in enumerate(compare_bases):
+        with etapa(f"comparar:{base}"):
+            col_l = merged[f"{base}_{left_name}"].take(idx_ambos)
+            col_r = merged[f"{base}_{right_name}"].take(idx_ambos)
+            distintos = _columnas_distintas(col_l, col_r, atol=atol, rtol=rtol)
+            mascara[:, j // 64] |= distintos.astype(np.uint64) << np.uint64(j % 64)
+
+    hay_dif = mascara.any(axis=1)
+    codigos[idx_ambos[hay_dif]] = EstadoComparacion.DISCREPANCIA
+
+    with etapa("diferencias"):
+        difs = np.full(len(merged), "", dtype=object)
+        difs[idx_ambos] = _diferencias_desde_mascara(mascara, compare_bases)
+
+    # Categórica: 1 byte por fila; el texto de cada estado se guarda una sola vez
+    merged["estado"] = pd.Categorical.from_codes(codigos, categories=etiquetas_estado(left_name, right_name))
+    merged["diferencias"] = difs
+
+    # Orden de salida: keys + (left incluidas) + (right incluidas) + estado + diferencias
+    out_cols = list(keys) + [f"{c}_{left_name}" for c in include_left] + [f"{c}_{right_name}" for c in include_right] + ["estado", "diferencias"]
+    return merged[out_cols]
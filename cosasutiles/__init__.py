@@ -0,0 +1,71 @@
+"""
+cosasutiles: punto de entrada único a las utilidades de conciliación.
+
+Los módulos siguen siendo los ficheros sueltos de la raíz (from piezas_utils import
+...) y este paquete sólo los reexporta. La carga es perezosa: importar el paquete
+no importa pandas ni numpy; cada nombre se resuelve al usarlo por primera vez.
+
+    import cosasutiles as cu
+    res = cu.comparar_tablas(left, right, ["pn", "sn"])   # aquí se importa comparar_tablas_mejorado
+    cu.piezas_utils.MovementHistory                       # también los módulos enteros
+
+Línea de comandos: python -m cosasutiles --help (ver cosasutiles.cli).
+"""
+from __future__ import annotations
+
+# Sin 'typing' (ni nada que lo importe): es lo más caro del arranque de la biblioteca estándar
+import importlib
+
+__version__ = "0.1.0"
+
+# Módulo de la raíz -> nombres públicos que se reexportan
+_EXPORTACIONES: dict[str, list[str]] = {
+    "carga_cache": ["ruta_cache", "cargar_tabla", "cargar_hojas", "columnas_tabla", "limpiar_cache"],
+    "carga_masiva": ["expandir_rutas", "iterar_en_bloque", "cargar_en_bloque"],
+    "claves_hash": ["hash_claves", "filas_en_colision", "unir_por_hash", "presencia_por_hash"],
+    "codificacion_claves": ["CodificadorClaves"],
+    "comparar_incremental": ["leer_snapshot", "comparar_tablas_incremental"],
+    "comparar_particionado": ["comparar_tablas_particionado", "comparar_por_clave_particionado"],
+    "comparar_tablas_mejorado": ["EstadoComparacion", "etiquetas_estado", "codigos_estado", "comparar_tablas"],
+    "cubo_consultas": ["CuboConsultas"],
+    "duplicados_movimientos": ["marcar_duplicados_exactos", "marcar_casi_duplicados"],
+    "emparejamiento_aproximado": ["normalizar_clave", "pendientes_de_resultado", "emparejar_aproximado"],
+    "exportar_resultados": ["nombres_hojas", "exportar_excel", "exportar_parquet"],
+    "fechas_quality_check": ["check_date"],
+    "filtrar_movs": ["filtra_ultimo_movimiento", "filtra_movimiento_a_fecha"],
+    "filtro_descripciones": ["FiltroDescripciones"],
+    "indice_elementos": ["construir_indice", "cargar_indice", "leer_elemento", "filas_caracteristicas",
+                         "leer_caracteristicas"],
+    "instrumentacion": ["Informe", "activa", "etapa", "medido", "instrumentar", "comparar_informes"],
+    "limpieza_utils": ["eliminar_columnas", "construir_columna", "añade_col_condicional", "limpia_f_inst_si_hueco"],
+    "lote_conciliaciones": ["leer_manifiesto", "ejecutar_trabajo", "ejecutar_lote", "resumen_lote"],
+    "parseo_fechas": ["parsear_fechas", "comparar_fechas_mixtas"],
+    "parser_registros": ["registros_desde_lineas", "iterar_registros", "filas_equipo", "iterar_lotes",
+                         "escribir_parquet", "iterar_equipos_lotes", "equipos_a_parquet", "parse_equipment_file"],
+    "piezas_utils": ["PresenceIndex", "MovementHistory", "max_fecha_por_pieza", "min_fecha_por_pieza",
+                     "comparar_por_clave", "chequear_primer_movimiento_no_valor", "piezas_por_presencia",
+                     "concatenar_por_clave"],
+    "pipeline_limpieza": ["Condicion", "col", "PipelineLimpieza"],
+    "reglas_secuencia": ["ReglaSecuencia", "primero_prohibido", "ultimo_prohibido", "precedido_por", "seguido_por",
+                         "sin_repetir", "nada_despues_de", "reglas_desde_config", "validar_secuencias",
+                         "resumen_violaciones"],
+}
+_MODULO_DE = {nombre: modulo for modulo, nombres in _EXPORTACIONES.items() for nombre in nombres}
+
+__all__ = sorted(_MODULO_DE) + sorted(_EXPORTACIONES)
+
+
+def __getattr__(nombre: str):
+    """Importa el módulo al pedir uno de sus nombres (PEP 562) y lo deja en el paquete."""
+    if nombre in _EXPORTACIONES:
+        valor = importlib.import_module(nombre)
+    elif nombre in _MODULO_DE:
+        valor = getattr(importlib.import_module(_MODULO_DE[nombre]), nombre)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
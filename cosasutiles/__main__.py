@@ -0,0 +1,5 @@
+import sys
+
+from cosasutiles.cli import main
+
+sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Línea de comandos de cosasutiles:
+
+    python -m cosasutiles compare    rdcd.xlsx inv.xlsx --keys pn sn --compare-on cantidad -o conciliacion.xlsx
+    python -m cosasutiles presence   rdcd.xlsx inv.xlsx --keys pn sn -o presencia/
+    python -m cosasutiles dates      fechas.csv fecha_a fecha_b -o fechas_revisadas.csv
+    python -m cosasutiles parse-dump EQUIPMENT.txt -o equipos.parquet
+    python -m cosasutiles lote       manifiesto.json --salida resultados_lote
+
+(o el comando 'cosasutiles' si el paquete está instalado).
+
+Este módulo sólo importa la biblioteca estándar: --help y los errores de
+argumentos (fichero que no existe, extensión desconocida...) salen sin cargar
+pandas. Los módulos pesados se importan dentro de cada subcomando, después de
+validar los argumentos.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+EXT_TABLA = (".csv", ".xlsx", ".xls", ".parquet", ".pq")
+EXT_SALIDA = (".csv", ".xlsx", ".parquet")
+
+
+def _comprobar_entrada(p: argparse.ArgumentParser, ruta: str, extensiones=EXT_TABLA) -> None:
+    if not os.path.isfile(ruta):
+        p.error(f"no existe el fichero: {ruta}")
+    if extensiones and not ruta.lower().endswith(extensiones):
+        p.error(f"{ruta}: extensión no soportada (se esperaba {', '.join(extensiones)})")
+
+
+def _comprobar_salida(p: argparse.ArgumentParser, ruta: str | None) -> None:
+    if ruta is not None and not ruta.lower().endswith(EXT_SALIDA):
+        p.error(f"{ruta}: la salida debe ser {', '.join(EXT_SALIDA)}")
+
+
+def _guardar_tabla(df, ruta: str) -> None:
+    """DataFrame -> .csv / .xlsx / .parquet según la extensión."""
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(carpeta, exist_ok=True)
+    if ruta.lower().endswith(".parquet"):
+        df.to_parquet(ruta, index=False)
+    elif ruta.lower().endswith(".xlsx"):
+        df.to_excel(ruta, index=False)
+    else:
+        df.to_csv(ruta, index=False)
+
+
+def _leer_tabla(ruta: str, hoja: str | None):
+    from lote_conciliaciones import _leer_lado
+    return _leer_lado(ruta, hoja, None)
+
+
+def _hoja(valor: str | None):
+    """--hoja-left 2 -> hoja por posición; cualquier otro texto es el nombre de la hoja."""
+    return int(valor) if valor is not None and valor.isdigit() else valor
+
+
+# --------------------------------------------------------------------------- compare
+
+def _compare(args: argparse.Namespace) -> int:
+    from lote_conciliaciones import ejecutar_trabajo
+
+    # El resultado sale por el mismo camino que un trabajo de lote_conciliaciones
+    salida = args.salida or "conciliacion"
+    base, ext = os.path.splitext(os.path.abspath(salida))
+    formato = {".xlsx": "excel", ".csv": "csv"}.get(ext.lower(), "parquet")
+    if ext.lower() == ".parquet":
+        base = os.path.abspath(salida)
+    trabajo = {
+        "nombre": os.path.basename(base), "left": args.left, "right": args.right,
+        "hoja_left": _hoja(args.hoja_left), "hoja_right": _hoja(args.hoja_right),
+        "salida": "ninguna" if args.sin_salida else formato,
+        "keys": args.keys, "compare_on": args.compare_on, "left_name": args.left_name,
+        "right_name": args.right_name, "atol": args.atol, "rtol": args.rtol,
+        "codigos_exactos": args.codigos_exactos or None,
+    }
+    trabajo = {k: v for k, v in trabajo.items() if v is not None}
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    r = ejecutar_trabajo(trabajo, os.path.dirname(base))
+    if r["estado"] != "ok":
+        print(r.get("traceback", ""), file=sys.stderr)
+        print(f"error: {r['error']}", file=sys.stderr)
+        return 1
+    print(f"{r['filas_left']} filas {args.left_name} / {r['filas_right']} filas {args.right_name} "
+          f"-> {r['filas_resultado']} filas en {r['segundos']:.1f} s")
+    for estado in ("OK", "DISCREPANCIA", "SOLO_IZQUIERDA", "SOLO_DERECHA"):
+        print(f"  {estado:<15} {r[estado]}")
+    if r["salida"]:
+        print(f"resultado: {r['salida']}")
+    return 0
+
+
+# --------------------------------------------------------------------------- presence
+
+def _presence(args: argparse.Namespace) -> int:
+    from piezas_utils import comparar_por_clave
+
+    f1 = _leer_tabla(args.left, _hoja(args.hoja_left))
+    f2 = _leer_tabla(args.right, _hoja(args.hoja_right))
+    faltan = [(n, c) for n, f in ((args.left, f1), (args.right, f2)) for c in args.keys if c not in f.columns]
+    if faltan:
+        print(f"error: columnas clave que no existen: {faltan}", file=sys.stderr)
+        return 1
+    partes = dict(zip(("solo_left", "solo_right", "en_ambos"),
+                      comparar_por_clave(f1, f2, args.keys, codigos_exactos=args.codigos_exactos)))
+    for nombre, df in partes.items():
+        print(f"  {nombre:<11} {len(df)}")
+    if args.salida:
+        for nombre, df in partes.items():
+            _guardar_tabla(df, os.path.join(args.salida, f"{nombre}.{args.formato}"))
+        print(f"resultado: {os.path.abspath(args.salida)}")
+    return 0
+
+
+# --------------------------------------------------------------------------- dates
+
+def _dates(args: argparse.Namespace) -> int:
+    from parseo_fechas import comparar_fechas_mixtas
+
+    df = _leer_tabla(args.fichero, _hoja(args.hoja))
+    faltan = [c for c in (args.col1, args.col2) if c not in df.columns]
+    if faltan:
+        print(f"error: columnas que no existen en {args.fichero}: {faltan}", file=sys.stderr)
+        return 1
+    df = comparar_fechas_mixtas(df, args.col1, args.col2, out_col=args.columna_resultado)
+    conteo = df[args.columna_resultado].value_counts()
+    for valor in ("ok", "revisar"):
+        print(f"  {valor:<8} {int(conteo.get(valor, 0))}")
+    if args.salida:
+        _guardar_tabla(df, args.salida)
+        print(f"resultado: {os.path.abspath(args.salida)}")
+    return 0
+
+
+# --------------------------------------------------------------------------- parse-dump
+
+def _parse_dump(args: argparse.Namespace) -> int:
+    from parser_registros import equipos_a_parquet, parse_equipment_file
+
+    if args.salida.lower().endswith(".parquet"):
+        # En streaming: el volcado no se junta en memoria
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        filas = equipos_a_parquet(args.fichero, args.salida, args.tam_lote, args.encoding)
+    else:
+        df = parse_equipment_file(args.fichero, args.encoding)
+        _guardar_tabla(df, args.salida)
+        filas = len(df)
+    print(f"{filas} filas -> {os.path.abspath(args.salida)}")
+    return 0
+
+
+# --------------------------------------------------------------------------- parser
+
+def _args_dos_tablas(sp: argparse.ArgumentParser) -> None:
+    sp.add_argument("left", help="tabla izquierda (.csv, .xlsx, .xls, .parquet)")
+    sp.add_argument("right", help="tabla derecha")
+    sp.add_argument("--keys", nargs="+", required=True, help="columna(s) clave")
+    sp.add_argument("--hoja-left", help="hoja de Excel de left (nombre o posición; por defecto la primera)")
+    sp.add_argument("--hoja-right", help="hoja de Excel de right")
+    sp.add_argument("--codigos-exactos", action="store_true",
+                    help="cruzar por un código entero de la clave compuesta (claves de muchas columnas)")
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="cosasutiles",
+        description="Utilidades de conciliación de inventarios y movimientos.",
+    )
+    p.add_argument("--version", action="version", version=f"%(prog)s {_version()}")
+    sub = p.add_subparsers(dest="comando", metavar="comando")
+    sub.required = True
+
+    sp = sub.add_parser("compare", help="compara dos tablas por clave (comparar_tablas)",
+                        description="Compara dos tablas por clave: OK, DISCREPANCIA, sólo en left, sólo en right.")
+    _args_dos_tablas(sp)
+    sp.add_argument("--compare-on", nargs="+", help="columnas a comparar (por defecto las comunes no clave)")
+    sp.add_argument("--left-name", default="left", help="nombre de la tabla izquierda en el resultado")
+    sp.add_argument("--right-name", default="right", help="nombre de la tabla derecha en el resultado")
+    sp.add_argument("--atol", type=float, help="tolerancia absoluta en columnas numéricas")
+    sp.add_argument("--rtol", type=float, help="tolerancia relativa en columnas numéricas")
+    salida = sp.add_mutually_exclusive_group()
+    salida.add_argument("-o", "--salida", help="resultado: .xlsx (una hoja por estado), .csv o carpeta Parquet "
+                                               "(por defecto ./conciliacion)")
+    salida.add_argument("--sin-salida", action="store_true", help="sólo contar, sin guardar el resultado")
+    sp.set_defaults(func=_compare)
+
+    sp = sub.add_parser("presence", help="claves sólo en left, sólo en right y en ambas",
+                        description="Presencia de claves entre dos tablas (comparar_por_clave).")
+    _args_dos_tablas(sp)
+    sp.add_argument("-o", "--salida", help="carpeta donde guardar solo_left, solo_right y en_ambos")
+    sp.add_argument("--formato", choices=("csv", "xlsx", "parquet"), default="csv", help="formato de los ficheros")
+    sp.set_defaults(func=_presence)
+
+    sp = sub.add_parser("dates", help="compara dos columnas de fechas con formato mixto",
+                        description="Compara dos columnas de fechas D/M/Y o M/D/Y: 'ok' si son la misma "
+                                    "fecha, 'revisar' si no (comparar_fechas_mixtas).")
+    sp.add_argument("fichero", help="tabla (.csv, .xlsx, .xls, .parquet)")
+    sp.add_argument("col1", help="primera columna de fecha")
+    sp.add_argument("col2", help="segunda columna de fecha")
+    sp.add_argument("--hoja", help="hoja de Excel (nombre o posición)")
+    sp.add_argument("--columna-resultado", default="resultado", help="columna de salida (por defecto resultado)")
+    sp.add_argument("-o", "--salida", help="tabla de salida (.csv, .xlsx, .parquet)")
+    sp.set_defaults(func=_dates)
+
+    sp = sub.add_parser("parse-dump", help="convierte un volcado EQUIPMENT a tabla",
+                        description="Parsea un volcado EQUIPMENT (una fila por LRI_NO / SW_CONFIG de cada "
+                                    "equipo). A .parquet se escribe en streaming.")
+    sp.add_argument("fichero", help="volcado de texto")
+    sp.add_argument("-o", "--salida", required=True, help="tabla de salida (.parquet, .csv, .xlsx)")
+    sp.add_argument("--encoding", default="utf-8", help="codificación del volcado (por defecto utf-8)")
+    sp.add_argument("--tam-lote", type=int, default=100_000, help="filas por lote al escribir Parquet")
+    sp.set_defaults(func=_parse_dump)
+
+    # Sólo para la ayuda: los argumentos de 'lote' los interpreta lote_conciliaciones.main (ver main)
+    sub.add_parser("lote", help="ejecuta un manifiesto de conciliaciones (ver lote --help)")
+    return p
+
+
+def _version() -> str:
+    from cosasutiles import __version__
+    return __version__
+
+
+def _validar(p: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Comprobaciones baratas (sin pandas) antes de ejecutar el subcomando."""
+    if args.comando in ("compare", "presence"):
+        _comprobar_entrada(p, args.left)
+        _comprobar_entrada(p, args.right)
+    elif args.comando == "dates":
+        _comprobar_entrada(p, args.fichero)
+    elif args.comando == "parse-dump":
+        _comprobar_entrada(p, args.fichero, extensiones=None)
+    if args.comando in ("dates", "parse-dump"):
+        _comprobar_salida(p, args.salida)
+    if args.comando == "compare" and args.salida and os.path.splitext(args.salida)[1].lower() not in ("", *EXT_SALIDA):
+        p.error(f"{args.salida}: la salida debe ser .xlsx, .csv o una carpeta (Parquet)")
+    if getattr(args, "tam_lote", 1) < 1:
+        p.error("--tam-lote debe ser positivo")
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["lote"]:
+        from lote_conciliaciones import main as main_lote
+        return main_lote(argv[1:], prog="cosasutiles lote")
+    p = crear_parser()
+    args = p.parse_args(argv)
+    _validar(p, args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from instrumentacion import medido
+
+_VERSION_CUBO = 1
+_AGREGADOS = ("sum", "count", "min", "max", "mean")
+# Cómo se combinan las celdas ya agregadas de cada columna interna
+_COMBINAR = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+_COL_N = "n_filas"
+
+
+class CuboConsultas:
+    """
+    Resultados pre-agregados por las dimensiones de filtro de un dashboard
+    (p.ej. estado, avión y fecha) para responder a cada interacción sin tocar
+    las filas originales.
+
+    Al construirlo se agrupan las filas UNA vez por todas las dimensiones (y la
+    fecha truncada a 'frecuencia'): el cubo resultante tiene una fila por
+    combinación presente, normalmente órdenes de magnitud menos que las filas.
+    Cada consulta filtra y re-agrupa sólo esas celdas, y las últimas consultas
+    se guardan en una caché LRU. Cuando llega una ejecución nueva, anadir() o
+    reemplazar() agregan sólo las filas nuevas y vacían la caché.
+
+    Ejemplo
+    -------
+        res = comparar_tablas(izq, der, keys, ...)
+        cubo = CuboConsultas(res, ["estado", "avion"], fecha_col="fecha",
+                             medidas={"importe": ("importe_left", "sum")})
+        cubo.consultar({"estado": ["DISCREPANCIA"], "avion": None}, por=["fecha"])
+        cubo.totales({"avion": ["AC0001"]})
+
+    Parámetros
+    ----------
+    df : filas a agregar (p.ej. la salida de comparar_tablas).
+    dimensiones : columnas por las que se filtra o agrupa (sin la fecha).
+    medidas : dict nombre -> (columna, agregado), agregado en "sum", "count"
+              (no nulos), "min", "max" o "mean". Siempre se añade n_filas.
+    fecha_col : columna de fecha (opcional); se trunca a 'frecuencia'.
+    frecuencia : "D" (día), "M" (mes) o "Y" (año).
+    max_cache : nº de consultas recientes que se guardan.
+    """
+
+    @medido("CuboConsultas")
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        dimensiones: Iterable[str],
+        medidas: Optional[Dict[str, Tuple[str, str]]] = None,
+        fecha_col: Optional[str] = None,
+        frecuencia: str = "D",
+        max_cache: int = 128,
+    ):
+        self.dimensiones = list(dimensiones)
+        self.medidas = dict(medidas or {})
+        for nombre, (col, agg) in self.medidas.items():
+            if agg not in _AGREGADOS:
+                raise ValueError(f"Agregado no válido en la medida {nombre!r}: {agg!r}. Válidos: {list(_AGREGADOS)}")
+            if nombre == _COL_N:
+                raise ValueError(f"{_COL_N!r} es una medida reservada.")
+        if frecuencia not in ("D", "M", "Y"):
+            raise ValueError(f"Frecuencia no válida: {frecuencia!r} (usar 'D', 'M' o 'Y').")
+        self.fecha_col = fecha_col
+        self.frecuencia = frecuencia
+        self.max_cache = max_cache
+        self._cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self._celdas = self._agregar(df)
+
+    # --- construcción ---
+
+    @property
+    def ejes(self) -> List[str]:
+        """Dimensiones + fecha: las columnas que identifican una celda."""
+        return self.dimensiones + ([self.fecha_col] if self.fecha_col else [])
+
+    def _internas(self) -> Dict[str, Tuple[str, str]]:
+        """Columnas internas del cubo -> (columna origen, agregado combinable). mean = suma / cuenta."""
+        internas = {_COL_N: (None, "size")}
+        for nombre, (col, agg) in self.medidas.items():
+            if agg == "mean":
+                internas[f"__suma_{nombre}"] = (col, "sum")
+                internas[f"__cuenta_{nombre}"] = (col, "count")
+            else:
+                internas[nombre] = (col, agg)
+        return internas
+
+    def _agregar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Celdas del cubo para las filas de df."""
+        cols = list(dict.fromkeys(self.dimensiones + [c for c, _ in self.medidas.values()]))
+        w = df[cols].copy()
+        if self.fecha_col:
+            fechas = pd.to_datetime(df[self.fecha_col], errors="coerce")
+            if getattr(fechas.dt, "tz", None) is not None:
+                fechas = fechas.dt.tz_localize(None)
+            # Truncar sin to_period: datetime64 -> unidad de la frecuencia -> ns
+            w[self.fecha_col] = fechas.to_numpy().astype(f"datetime64[{self.frecuencia}]").astype("datetime64[ns]")
+        espec = {
+            interna: (col if col is not None else self.ejes[0], agg if agg != "size" else "size")
+            for interna, (col, agg) in self._internas().items()
+        }
+        if not self.ejes:
+            celdas = pd.DataFrame({k: [w[c].agg(a) if a != "size" else len(w)] for k, (c, a) in espec.items()})
+        else:
+            celdas = w.groupby(self.ejes, dropna=False, sort=False, observed=True).agg(**espec).reset_index()
+        return self._compactar(celdas)
+
+    def _compactar(self, celdas: pd.DataFrame) -> pd.DataFrame:
+        # Dimensiones como categóricas: los isin y groupby de cada consulta van sobre códigos
+        for c in self.dimensiones:
+            if not isinstance(celdas[c].dtype, pd.CategoricalDtype):
+                celdas[c] = celdas[c].astype("category")
+        return celdas.reset_index(drop=True)
+
+    def _combinar(self, celdas: pd.DataFrame, por: List[str], ordenar: bool = True) -> pd.DataFrame:
+        """Re-agrupa celdas ya agregadas por 'por' (lista vacía = una sola fila de totales)."""
+        espec = {
+            interna: (interna, _COMBINAR.get(agg, "sum"))
+            for interna, (_, agg) in self._internas().items()
+        }
+        if not por:
+            return pd.DataFrame({k: [celdas[c].agg(a)] for k, (c, a) in espec.items()})
+        return celdas.groupby(por, dropna=False, sort=ordenar, observed=True).agg(**espec).reset_index()
+
+    def __len__(self) -> int:
+        """Nº de celdas del cubo."""
+        return len(self._celdas)
+
+    @property
+    def celdas(self) -> pd.DataFrame:
+        """Copia de las celdas agregadas (con las columnas internas)."""
+        return self._celdas.copy()
+
+    # --- actualización incremental ---
+
+    def _sustituir_celdas(self, partes: List[pd.DataFrame]) -> None:
+        # Unir las categorías de las partes (sin pasar por los valores) y re-agrupar
+        partes = [p.copy() for p in partes]
+        for c in self.dimensiones:
+            # union_categoricals exige el mismo tipo de categorías (p.ej. avion int en el
+            # cubo y texto en la ejecución nueva): se llevan todas al tipo común
+            categorias = [p[c].cat.categories for p in partes]
+            comun = categorias[0].append(categorias[1:]).dtype
+            for p in partes:
+                if p[c].cat.categories.dtype != comun:
+                    p[c] = p[c].cat.rename_categories(p[c].cat.categories.astype(comun))
+            # Categorías ordenadas por valor, como en un cubo construido de cero (si los
+            # valores no se pueden ordenar entre sí, p.ej. números y textos, en orden de unión)
+            try:
+                union = union_categoricals([p[c].array for p in partes], sort_categories=True).categories
+            except TypeError:
+                union = union_categoricals([p[c].array for p in partes]).categories
+            for p in partes:
+                p[c] = p[c].cat.set_categories(union)
+        celdas = pd.concat(partes, ignore_index=True)
+        self._celdas = self._compactar(self._combinar(celdas, self.ejes, ordenar=False))
+        self._cache.clear()
+
+    @medido("CuboConsultas.anadir")
+    def anadir(self, df: pd.DataFrame) -> "CuboConsultas":
+        """Suma al cubo las filas de df (p.ej. una ejecución con fechas nuevas)."""
+        if len(df):
+            self._sustituir_celdas([self._celdas, self._agregar(df)])
+        return self
+
+    @medido("CuboConsultas.reemplazar")
+    def reemplazar(self, df: pd.DataFrame, por: Union[str, List[str]]) -> "CuboConsultas":
+        """
+        Sustituye una parte del cubo por las filas de df: se quitan las celdas cuyos
+        valores de 'por' (dimensiones) aparecen en df y se agregan las filas nuevas.
+        P.ej. una re-ejecución de la conciliación de algunos aviones:
+            cubo.reemplazar(res_nuevo, por="avion")
+        """
+        por = [por] if isinstance(por, str) else list(por)
+        desconocidas = [c for c in por if c not in self.ejes]
+        if desconocidas:
+            raise KeyError(f"No son dimensiones del cubo: {desconocidas}")
+        nuevas = self._agregar(df)
+        if len(por) == 1:
+            quitar = self._celdas[por[0]].isin(nuevas[por[0]].unique())
+        else:
+            quitar = pd.MultiIndex.from_frame(self._celdas[por]).isin(pd.MultiIndex.from_frame(nuevas[por]))
+        self._sustituir_celdas([self._celdas[~np.asarray(quitar)], nuevas])
+        return self
+
+    # --- consultas ---
+
+    def valores(self, dimension: str) -> list:
+        """Valores presentes de una dimensión, ordenados (para las opciones de los filtros)."""
+        s = self._celdas[dimension]
+        presentes = s.cat.remove_unused_categories().cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else s.dropna().unique()
+        return sorted(presentes, key=lambda v: (str(type(v)), v))
+
+    def _clave_cache(self, filtros, por, desde, hasta) -> tuple:
+        normalizados = []
+        for dim, vals in sorted((filtros or {}).items()):
+            if vals is None or (not isinstance(vals, str) and len(vals) == 0):
+                continue  # sin selección = todos (como un multiselect vacío)
+            vals = [vals] if isinstance(vals, str) or not isinstance(vals, Iterable) else vals
+            normalizados.append((dim, tuple(sorted(set(vals), key=repr))))
+        return tuple(normalizados), tuple(por), desde, hasta
+
+    def consultar(
+        self,
+        filtros: Optional[Dict[str, Any]] = None,
+        por: Optional[Iterable[str]] = None,
+        desde: Any = None,
+        hasta: Any = None,
+    ) -> pd.DataFrame:
+        """
+        Medidas agregadas de las celdas que cumplen los filtros.
+
+        Parámetros
+        ----------
+        filtros : dict dimensión -> valor o lista de valores (None o lista vacía = todos).
+        por : dimensiones (o la fecha) por las que agrupar el resultado; None = totales.
+        desde, hasta : rango de fechas (incluido) sobre fecha_col truncada.
+
+        Retorna
+        -------
+        DataFrame [*por, n_filas, *medidas] (una fila si por es None). Es una copia:
+        se puede modificar sin afectar a la caché.
+        """
+        por = [] if por is None else ([por] if isinstance(por, str) else list(por))
+        desconocidas = [c for c in list(por) + list((filtros or {}).keys()) if c not in self.ejes]
+        if desconocidas:
+            raise KeyError(f"No son dimensiones del cubo: {desconocidas}. Disponibles: {self.ejes}")
+        desde = None if desde is None else pd.Timestamp(desde)
+        hasta = None if hasta is None else pd.Timestamp(hasta)
+        clave = self._clave_cache(filtros, por, desde, hasta)
+        if clave in self._cache:
+            self.aciertos += 1
+            self._cache.move_to_end(clave)
+            return self._cache[clave].copy()
+        self.fallos += 1
+        res = self._calcular(clave[0], por, desde, hasta)
+        self._cache[clave] = res
+        if len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+        return res.copy()
+
+    @medido("CuboConsultas.consultar")
+    def _calcular(self, filtros: tuple, por: List[str], desde, hasta) -> pd.DataFrame:
+        celdas = self._celdas
+        mascara = np.ones(len(celdas), dtype=bool)
+        for dim, vals in filtros:
+            mascara &= np.asarray(celdas[dim].isin(list(vals)))
+        if self.fecha_col and (desde is not None or hasta is not None):
+            f = celdas[self.fecha_col]
+            if desde is not None:
+                mascara &= np.asarray(f >= desde)
+            if hasta is not None:
+                mascara &= np.asarray(f <= hasta)
+        res = self._combinar(celdas[mascara], por)
+        for c in por:
+            if isinstance(res[c].dtype, pd.CategoricalDtype):
+                res[c] = res[c].astype(res[c].cat.categories.dtype)
+        # Medidas finales: mean = suma / cuenta; fuera las columnas internas
+        for nombre, (_, agg) in self.medidas.items():
+            if agg == "mean":
+                res[nombre] = res.pop(f"__suma_{nombre}") / res.pop(f"__cuenta_{nombre}").replace(0, np.nan)
+        return res[por + [_COL_N] + list(self.medidas)]
+
+    def totales(self, filtros: Optional[Dict[str, Any]] = None, desde: Any = None, hasta: Any = None) -> Dict[str, Any]:
+        """Medidas totales (para KPIs) como dict nombre -> valor."""
+        return self.consultar(filtros, None, desde, hasta).iloc[0].to_dict()
+
+    # --- persistencia ---
+
+    def guardar(self, ruta: str) -> None:
+        """Guarda el cubo (sin la caché) para que el dashboard arranque sin re-agregar."""
+        pd.to_pickle({
+            "version": _VERSION_CUBO,
+            "dimensiones": self.dimensiones,
+            "medidas": self.medidas,
+            "fecha_col": self.fecha_col,
+            "frecuencia": self.frecuencia,
+            "celdas": self._celdas,
+        }, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str, max_cache: int = 128) -> "CuboConsultas":
+        datos = pd.read_pickle(ruta)
+        if not isinstance(datos, dict) or datos.get("version") != _VERSION_CUBO:
+            raise ValueError(f"{ruta} no es un cubo guardado con esta versión.")
+        cubo = cls.__new__(cls)
+        cubo.dimensiones = datos["dimensiones"]
+        cubo.medidas = datos["medidas"]
+        cubo.fecha_col = datos["fecha_col"]
+        cubo.frecuencia = datos["frecuencia"]
+        cubo.max_cache = max_cache
+        cubo._cache = OrderedDict()
+        cubo.aciertos = 0
+        cubo.fallos = 0
+        cubo._celdas = datos["celdas"]
+        return cubo
@@ -0,0 +1,257 @@
+import warnings
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from claves_hash import filas_en_colision
+from instrumentacion import etapa, medido
+from piezas_utils import MovementHistory, _codigos_columna, _factorizar_claves
+
+SUPERVIVIENTES = ("primero", "ultimo")
+
+
+def _marcas(
+    index: pd.Index,
+    pos: np.ndarray,
+    grupo: np.ndarray,
+    pos_superviviente: np.ndarray,
+) -> pd.DataFrame:
+    """
+    DataFrame de marcas alineado con 'index' a partir de los grupos de las filas
+    'pos' (las demás filas van solas). grupo: id de grupo por fila de 'pos' (0..k-1);
+    pos_superviviente: posición de la fila que se queda de cada grupo.
+    """
+    n = len(index)
+    tam = np.bincount(grupo, minlength=len(pos_superviviente))
+    # Sólo los grupos de 2 o más filas son duplicados; se renumeran 0..m-1 por orden de superviviente
+    repetido = tam >= 2
+    orden_grupos = np.flatnonzero(repetido)[np.argsort(pos_superviviente[repetido], kind="stable")]
+    id_grupo = np.full(len(tam), -1, dtype=np.int64)
+    id_grupo[orden_grupos] = np.arange(len(orden_grupos))
+
+    out_grupo = np.full(n, -1, dtype=np.int64)
+    out_tam = np.ones(n, dtype=np.int64)
+    out_sup = np.arange(n)
+    out_grupo[pos] = id_grupo[grupo]
+    out_tam[pos] = tam[grupo]
+    out_sup[pos] = pos_superviviente[grupo]
+    return pd.DataFrame({
+        "grupo_duplicado": out_grupo,
+        "tam_grupo": out_tam,
+        "superviviente": out_sup == np.arange(n),
+        "fila_superviviente": index[out_sup],
+    }, index=index)
+
+
+def _mezclar(h: np.ndarray) -> np.ndarray:
+    """Finalizador de splitmix64: mezcla bien los bits de un uint64 (con desbordamiento)."""
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def _hash_filas(df: pd.DataFrame, columnas: List[str]) -> np.ndarray:
+    """
+    Hash uint64 por fila de las columnas: se factoriza cada columna (NaN es un
+    valor más) y se encadenan sus códigos. Factorizar texto es más barato que
+    hashearlo entero, y los códigos de una categórica salen gratis.
+    """
+    h = np.zeros(len(df), dtype=np.uint64)
+    for c in columnas:
+        codigos, _ = _codigos_columna(df[c], sort=False)
+        h = _mezclar(h + codigos.astype(np.uint64) + np.uint64(1))
+    return h
+
+
+@medido()
+def marcar_duplicados_exactos(
+    df: pd.DataFrame,
+    columnas: Optional[Union[str, List[str]]] = None,
+    keep: str = "first",
+) -> pd.DataFrame:
+    """
+    Duplicados exactos sobre 'columnas' (por defecto todas), como
+    df.duplicated(columnas, keep=keep) pero marcando además el grupo de cada fila
+    y cuál se queda.
+
+    Cada fila se reduce a un hash entero de las columnas elegidas y los grupos
+    salen de factorizar ese hash. Las filas con hash repetido se verifican contra
+    las columnas reales (claves_hash.filas_en_colision); si hubiera una colisión
+    se avisa y se agrupa por las columnas.
+
+    Parámetros
+    ----------
+    df : DataFrame.
+    columnas : columna(s) que deben coincidir (None = todas).
+    keep : "first" o "last": qué fila del grupo se queda.
+
+    Retorna
+    -------
+    DataFrame con el índice de df y columnas:
+      grupo_duplicado : id del grupo de duplicados (0, 1, ...) o -1 si la fila es única.
+      tam_grupo : filas del grupo (1 si es única).
+      superviviente : True en la fila que se queda (y en las únicas).
+      fila_superviviente : etiqueta (índice de df) de la fila que se queda de su grupo.
+
+    Ejemplo
+    -------
+        marcas = marcar_duplicados_exactos(df, ["pn", "sn", "movimiento", "fecha_movimiento"])
+        df_sin_dupes = df[marcas["superviviente"]]
+    """
+    if keep not in ("first", "last"):
+        raise ValueError("keep debe ser 'first' o 'last'.")
+    columnas = list(df.columns) if columnas is None else ([columnas] if isinstance(columnas, str) else list(columnas))
+    with etapa("hash", entrada=df[columnas]):
+        codigos, unicos = pd.factorize(_hash_filas(df, columnas))
+        codigos, n_codigos = codigos.astype(np.int64, copy=False), len(unicos)
+    with etapa("verificar"):
+        if filas_en_colision(df[columnas], codigos).any():
+            warnings.warn("Colisión de hash en las columnas: se agrupa por las columnas.", RuntimeWarning, stacklevel=2)
+            codigos, unicos = _factorizar_claves(df, columnas)
+            n_codigos = len(unicos)
+    n = len(df)
+    superviviente = np.empty(n_codigos, dtype=np.int64)
+    if keep == "first":
+        superviviente[codigos[::-1]] = np.arange(n - 1, -1, -1)
+    else:
+        superviviente[codigos] = np.arange(n)
+    return _marcas(df.index, np.arange(n), codigos, superviviente)
+
+
+def _rango_preferencia(df: pd.DataFrame, preferir: Tuple[str, Sequence]) -> np.ndarray:
+    """Rango de cada fila según la lista de valores preferidos (los que no están, al final)."""
+    col, orden = preferir
+    rango = pd.Index(list(orden)).get_indexer(df[col])
+    return np.where(rango < 0, len(orden), rango)
+
+
+def _ventana_en_unidad(ventana: Union[str, pd.Timedelta], fechas: np.ndarray) -> int:
+    """
+    Ventana como entero en la unidad de 'fechas' (datetime64[s], [ms], [us], [ns]...):
+    las fechas ordenadas del historial son enteros en esa unidad, no siempre en ns.
+    Se trunca hacia abajo (una diferencia entera <= ventana truncada equivale a <= ventana).
+    """
+    unidad = np.datetime_data(fechas.dtype)[0]
+    ventana_ns = np.timedelta64(pd.Timedelta(ventana).value, "ns")
+    return int(ventana_ns.astype(f"timedelta64[{unidad}]").astype(np.int64))
+
+
+def _inicios_desde_primero(g: np.ndarray, f: np.ndarray, inicio_pieza: np.ndarray, ventana: int) -> np.ndarray:
+    """
+    Inicios de grupo con ventana fija desde el primer movimiento del grupo: el
+    siguiente grupo de la pieza empieza en el primer movimiento posterior a
+    (inicio + ventana). Se avanza a saltos, todas las piezas a la vez.
+    """
+    inicio = np.zeros(len(g), dtype=bool)
+    fin_pieza = np.r_[inicio_pieza[1:], len(g)]
+    # Clave ordenada (pieza, fecha) para buscar el salto con searchsorted
+    rango_f, fechas_unicas = pd.factorize(f, sort=True)
+    n_f = max(len(fechas_unicas), 1)
+    compuesta = g * n_f + rango_f
+    actual, fin = inicio_pieza.copy(), fin_pieza.copy()
+    while len(actual):
+        inicio[actual] = True
+        limite = np.searchsorted(fechas_unicas, f[actual] + ventana, side="right")
+        siguiente = np.searchsorted(compuesta, g[actual] * n_f + limite, side="left")
+        sigue = siguiente < fin
+        actual, fin = siguiente[sigue], fin[sigue]
+    return inicio
+
+
+@medido()
+def marcar_casi_duplicados(
+    df: pd.DataFrame,
+    clave_cols: Union[str, List[str]],
+    fecha_col: str,
+    iguales: Optional[Union[str, List[str]]] = None,
+    ventana: Union[str, pd.Timedelta] = "3D",
+    ventana_desde: str = "anterior",
+    superviviente: str = "primero",
+    preferir: Optional[Tuple[str, Sequence]] = None,
+) -> pd.DataFrame:
+    """
+    Casi duplicados: la misma pieza con el mismo movimiento (columnas 'iguales')
+    registrada varias veces con pocos días de diferencia (p.ej. desde dos sistemas).
+    Son los que duplican los conteos en filtra_ultimo_movimiento / max_fecha_por_pieza
+    y que drop_duplicates no ve porque la fecha no es idéntica.
+
+    Se ordena UNA vez por (claves, iguales, fecha) (MovementHistory) y cada fila se
+    compara sólo con la anterior desplazando arrays: misma pieza y movimiento y
+    fecha a <= 'ventana' -> mismo grupo. No hay comparaciones por parejas.
+
+    Parámetros
+    ----------
+    df : movimientos.
+    clave_cols : columna(s) que identifican la pieza (p.ej. ["pn", "sn"]).
+    fecha_col : fecha del movimiento.
+    iguales : columna(s) que además deben coincidir (p.ej. "movimiento", "avion").
+    ventana : diferencia máxima de fecha ("3D", "12h", pd.Timedelta...).
+    ventana_desde : "anterior" -> cada movimiento se compara con el anterior del
+                    grupo (encadena: A, A+2d, A+4d con ventana 3D es un solo grupo);
+                    "primero" -> la ventana cuenta desde el primer movimiento del
+                    grupo (A y A+2d juntos, A+4d abre otro).
+    superviviente : fila que se queda de cada grupo: "primero" (fecha más antigua)
+                    o "ultimo" (más reciente).
+    preferir : (columna, [valores por orden de preferencia]), p.ej.
+               ("sistema", ["AMOS", "SAP"]): se queda la fila del valor preferido;
+               a igualdad, la que indique 'superviviente'.
+
+    Las filas sin fecha válida o con claves / iguales nulos no se agrupan (quedan solas).
+
+    Retorna
+    -------
+    DataFrame con el índice de df y columnas grupo_duplicado, tam_grupo, superviviente,
+    fila_superviviente (como marcar_duplicados_exactos) y desfase: fecha de la fila
+    menos la del superviviente (NaT en las filas únicas).
+
+    Ejemplo
+    -------
+        marcas = marcar_casi_duplicados(movs, ["pn", "sn"], "fecha_movimiento", iguales="movimiento", ventana="3D")
+        movs_limpios = movs[marcas["superviviente"]]
+        revisar = movs.join(marcas)[marcas["grupo_duplicado"] >= 0].sort_values(["grupo_duplicado", "fecha_movimiento"])
+    """
+    clave_cols = [clave_cols] if isinstance(clave_cols, str) else list(clave_cols)
+    iguales = [] if iguales is None else ([iguales] if isinstance(iguales, str) else list(iguales))
+    if ventana_desde not in ("anterior", "primero"):
+        raise ValueError("ventana_desde debe ser 'anterior' o 'primero'.")
+    if superviviente not in SUPERVIVIENTES:
+        raise ValueError(f"superviviente debe ser uno de {SUPERVIVIENTES}.")
+    if pd.Timedelta(ventana) < pd.Timedelta(0):
+        raise ValueError("ventana no puede ser negativa.")
+
+    hist = MovementHistory(df, clave_cols + iguales, fecha_col)
+    with etapa("agrupar"):
+        ventana_f = _ventana_en_unidad(ventana, hist.fechas)
+        pos = hist._orden
+        f = hist._fechas_orden
+        inicio_pieza = hist._inicio
+        g = np.repeat(np.arange(len(inicio_pieza)), hist._fin - inicio_pieza)
+        if ventana_desde == "anterior":
+            # Desplazamiento: ¿misma pieza / movimiento y cerca de la fila anterior?
+            inicio = np.ones(len(pos), dtype=bool)
+            if len(pos):
+                inicio[1:] = (g[1:] != g[:-1]) | (f[1:] - f[:-1] > ventana_f)
+        else:
+            inicio = _inicios_desde_primero(g, f, inicio_pieza, ventana_f)
+        grupo = np.cumsum(inicio) - 1
+        inicios = np.flatnonzero(inicio)
+
+    with etapa("superviviente"):
+        if preferir is None:
+            fin = np.r_[inicios[1:], len(pos)] if len(inicios) else inicios
+            elegida = inicios if superviviente == "primero" else fin - 1
+        else:
+            rango = _rango_preferencia(df, preferir)[pos]
+            desempate = np.arange(len(pos)) if superviviente == "primero" else -np.arange(len(pos))
+            # Orden por (grupo, preferencia, fecha): la primera de cada grupo es la elegida
+            orden = np.lexsort((desempate, rango, grupo))
+            elegida = orden[inicios]
+        marcas = _marcas(df.index, pos, grupo, pos[elegida])
+
+    # Desfase respecto al superviviente (posición de cada fila -> la de su superviviente)
+    pos_sup = np.arange(len(df))
+    pos_sup[pos] = pos[elegida][grupo]
+    desfase = pd.Series(hist.fechas - hist.fechas[pos_sup], index=df.index)
+    marcas["desfase"] = desfase.where(marcas["grupo_duplicado"] >= 0)
+    return marcas
@@ -0,0 +1,427 @@
+import re
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from comparar_tablas_mejorado import EstadoComparacion, codigos_estado
+from instrumentacion import etapa, medido
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar_clave(s: pd.Series) -> pd.Series:
+    """Minúsculas, sin espacios ni signos ("12345-01 " -> "1234501"). Nulos -> ""."""
+    codigos, unicos = pd.factorize(s)
+    normalizados = np.array([_NO_ALFANUMERICO.sub("", str(u).lower()) for u in unicos] + [""], dtype=object)
+    return pd.Series(normalizados[codigos], index=s.index)
+
+
+def _ngramas_valores(valores: pd.Series, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    n-gramas de cada valor, con marcas de inicio y fin (así los textos cortos también
+    tienen): pares (nº de valor, n-grama). Vectorizado por posición dentro del texto.
+    """
+    t = "^" + valores.astype(str) + "$"
+    largo = t.str.len().to_numpy()
+    idx, grams = [np.flatnonzero(largo <= n)], [t.to_numpy()[largo <= n]]
+    for i in range(int(largo.max(initial=0)) - n + 1):
+        pos = np.flatnonzero(largo >= i + n)
+        idx.append(pos)
+        grams.append(t.iloc[pos].str.slice(i, i + n).to_numpy())
+    return np.concatenate(idx), np.concatenate(grams)
+
+
+def pendientes_de_resultado(
+    resultado: pd.DataFrame,
+    keys: List[str],
+    left_name: str = "left",
+    right_name: str = "right",
+    col_estado: str = "estado",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Filas (sólo keys) de un resultado de comparar_tablas que están en un solo lado: (solo_izq, solo_der)."""
+    codigos = codigos_estado(resultado[col_estado], left_name, right_name)
+    solo_izq = resultado.loc[codigos == EstadoComparacion.SOLO_IZQUIERDA, keys]
+    solo_der = resultado.loc[codigos == EstadoComparacion.SOLO_DERECHA, keys]
+    return solo_izq, solo_der
+
+
+def _bloques(izq: pd.DataFrame, der: pd.DataFrame, texto_izq, texto_der, bloquear_por, bloquear_por_der, long_prefijo):
+    """Código de bloque por fila (compartido por los dos lados): columnas exactas + prefijo de la 1ª columna normalizada."""
+    piezas_izq = [normalizar_clave(izq[c]) for c in bloquear_por]
+    piezas_der = [normalizar_clave(der[c]) for c in bloquear_por_der]
+    if long_prefijo:
+        piezas_izq.append(texto_izq.str.slice(0, long_prefijo))
+        piezas_der.append(texto_der.str.slice(0, long_prefijo))
+    if not piezas_izq:
+        return np.zeros(len(izq), dtype=np.int64), np.zeros(len(der), dtype=np.int64)
+    claves = pd.concat([
+        pd.DataFrame({i: p.to_numpy() for i, p in enumerate(piezas_izq)}),
+        pd.DataFrame({i: p.to_numpy() for i, p in enumerate(piezas_der)}),
+    ], ignore_index=True)
+    codigos = claves.groupby(list(claves.columns), sort=False).ngroup().to_numpy().astype(np.int64)
+    return codigos[:len(izq)], codigos[len(izq):]
+
+
+def _tramos(ordenado: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Valores distintos de un array ordenado, con el inicio y tamaño de su tramo."""
+    inicio = np.flatnonzero(np.r_[True, ordenado[1:] != ordenado[:-1]]) if len(ordenado) else np.empty(0, dtype=np.int64)
+    return ordenado[inicio], inicio, np.diff(np.r_[inicio, len(ordenado)])
+
+
+def _producto_por_tramos(tam_a: np.ndarray, tam_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Producto cartesiano de varios tramos a la vez: para cada tramo t con tam_a[t] x tam_b[t]
+    parejas, devuelve (tramo, desplazamiento en a, desplazamiento en b) de cada pareja.
+    """
+    rep = tam_a * tam_b
+    tramo = np.repeat(np.arange(len(rep)), rep)
+    k = np.arange(int(rep.sum())) - np.repeat(np.cumsum(rep) - rep, rep)
+    return tramo, k // tam_b[tramo], k % tam_b[tramo]
+
+
+def _pares_candidatos(
+    post_izq: Tuple[np.ndarray, np.ndarray],
+    post_der: Tuple[np.ndarray, np.ndarray],
+    max_pares_por_ngrama: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Índice invertido: parejas (registro izq, registro der) que comparten alguna clave de
+    posting (bloque + n-grama) y nº de n-gramas compartidos. Las claves demasiado
+    frecuentes (más de max_pares_por_ngrama parejas) no generan candidatos.
+    """
+    vacio = np.empty(0, dtype=np.int64)
+    clave_i, texto_i = post_izq
+    clave_d, texto_d = post_der
+    if len(clave_i) == 0 or len(clave_d) == 0:
+        return vacio, vacio, vacio
+    orden_i = np.argsort(clave_i, kind="stable")
+    orden_d = np.argsort(clave_d, kind="stable")
+    clave_i, texto_i = clave_i[orden_i], texto_i[orden_i]
+    clave_d, texto_d = clave_d[orden_d], texto_d[orden_d]
+
+    # Tramo de cada clave en cada lado; sólo las claves de los dos lados y no demasiado frecuentes
+    claves_i, ini_i, tam_i = _tramos(clave_i)
+    claves_d, ini_d, tam_d = _tramos(clave_d)
+    pos = np.minimum(np.searchsorted(claves_d, claves_i), len(claves_d) - 1)
+    ok = (claves_d[pos] == claves_i) & (tam_i * tam_d[pos] <= max_pares_por_ngrama)
+    ini_i, tam_i, pos = ini_i[ok], tam_i[ok], pos[ok]
+
+    tramo, da, db = _producto_por_tramos(tam_i, tam_d[pos])
+    if len(tramo) == 0:
+        return vacio, vacio, vacio
+    rep_izq = texto_i[ini_i[tramo] + da]
+    rep_der = texto_d[ini_d[pos[tramo]] + db]
+
+    # n-gramas compartidos por pareja (ordenar + contar tramos)
+    n_der = int(texto_d.max()) + 1
+    pares = rep_izq * n_der + rep_der
+    pares.sort()
+    unicos, _, compartidos = _tramos(pares)
+    return unicos // n_der, unicos % n_der, compartidos
+
+
+def _registros(bloque: np.ndarray, codigos_cols: List[np.ndarray], validas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Registros distintos (bloque + valor de cada columna) de las filas válidas:
+    (registro de cada fila válida, una fila de cada registro).
+    """
+    claves = pd.DataFrame({i: c[validas] for i, c in enumerate([bloque, *codigos_cols])})
+    registro = claves.groupby(list(claves.columns), sort=False).ngroup().to_numpy().astype(np.int64)
+    n_registros = int(registro.max()) + 1 if len(registro) else 0
+    fila = np.empty(n_registros, dtype=np.int64)
+    fila[registro[::-1]] = validas[::-1]
+    return registro, fila
+
+
+def _ngramas_registros(
+    fila: np.ndarray,
+    codigos_cols: List[np.ndarray],
+    ngramas_cols: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    n_vocab: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Conjunto de n-gramas de cada registro (la unión de los de sus columnas) en forma
+    CSR: (inicio, tamaño, n-grama), ordenado por registro y n-grama.
+    """
+    registros, grams = [], []
+    for codigos, (ini, tam, gram) in zip(codigos_cols, ngramas_cols):
+        valor = codigos[fila]
+        registro, k, _ = _producto_por_tramos(tam[valor], np.ones(len(valor), dtype=np.int64))
+        registros.append(registro)
+        grams.append(gram[ini[valor[registro]] + k])
+    clave = np.concatenate(registros) * n_vocab + np.concatenate(grams)
+    clave.sort()
+    if len(clave):
+        clave = clave[np.r_[True, clave[1:] != clave[:-1]]]
+    tam = np.bincount(clave // n_vocab, minlength=len(fila))
+    return np.cumsum(tam) - tam, tam, clave % n_vocab
+
+
+def _prefijos(
+    ngramas: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    rango_gram: np.ndarray,
+    jaccard: float,
+    bloque: np.ndarray,
+    n_vocab: int,
+) -> Tuple[Tuple[np.ndarray, np.ndarray], np.ndarray]:
+    """
+    Postings (bloque + n-grama, registro) del prefijo de cada registro: sus n-gramas
+    más raros. Con un orden global de n-gramas, si dos conjuntos con Jaccard >= j
+    comparten m >= ceil(j |x|) n-gramas, los k primeros compartidos (k <= m) están
+    entre los |x| - ceil(j |x|) + k primeros de cada uno. Se usa k = 2 (o 1 si el
+    registro es muy corto): retorna también ese k, el mínimo de compartidos en prefijo.
+    """
+    ini, tam, gram = ngramas
+    registro = np.repeat(np.arange(len(tam)), tam)
+    orden = np.argsort(registro * n_vocab + rango_gram[gram], kind="stable")
+    registro, gram = registro[orden], gram[orden]
+    minimo = np.ceil(jaccard * tam - 1e-9).astype(np.int64)
+    k = np.clip(minimo, 1, 2)
+    largo = np.minimum(tam - minimo + k, tam)
+    prefijo = np.arange(len(registro)) - ini[registro] < largo[registro]
+    registro = registro[prefijo]
+    return (bloque[registro] * n_vocab + gram[prefijo], registro), k
+
+
+def _bits_encendidos(firmas: np.ndarray) -> np.ndarray:
+    """Nº de bits a 1 de cada fila de firmas uint64 (np.bitwise_count sólo existe desde NumPy 2.0)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(firmas).sum(axis=1)
+    return np.unpackbits(np.ascontiguousarray(firmas).view(np.uint8), axis=1).sum(axis=1)
+
+
+def _firmas(ngramas: Tuple[np.ndarray, np.ndarray, np.ndarray], palabras: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Firma de bits de cada registro (cada n-grama enciende un bit de 64 * palabras) y
+    cuántos de sus n-gramas caen en un bit ya encendido por otro n-grama suyo.
+    """
+    _, tam, gram = ngramas
+    registro = np.repeat(np.arange(len(tam)), tam)
+    bit = (gram * 2654435761) % (64 * palabras)
+    firmas = np.zeros(len(tam) * palabras, dtype=np.uint64)
+    np.bitwise_or.at(firmas, registro * palabras + bit // 64, np.left_shift(np.uint64(1), (bit % 64).astype(np.uint64)))
+    firmas = firmas.reshape(len(tam), palabras)
+    return firmas, tam - _bits_encendidos(firmas)
+
+
+def _cota_solapamiento(
+    ti: np.ndarray,
+    td: np.ndarray,
+    firmas_izq: Tuple[np.ndarray, np.ndarray],
+    firmas_der: Tuple[np.ndarray, np.ndarray],
+    parejas_por_trozo: int = 1_000_000,
+) -> np.ndarray:
+    """
+    Cota superior de los n-gramas compartidos por cada pareja: bits comunes de las
+    firmas + colisiones dentro de la firma izq (dos n-gramas compartidos sólo pueden
+    caer en el mismo bit si colisionan en izq).
+    """
+    firma_i, colisiones_i = firmas_izq
+    firma_d, _ = firmas_der
+    cota = np.empty(len(ti), dtype=np.int64)
+    for a in range(0, len(ti), parejas_por_trozo):
+        ti_t, td_t = ti[a:a + parejas_por_trozo], td[a:a + parejas_por_trozo]
+        comunes = _bits_encendidos(firma_i[ti_t] & firma_d[td_t])
+        cota[a:a + parejas_por_trozo] = comunes + colisiones_i[ti_t]
+    return cota
+
+
+def _solapamiento(
+    ti: np.ndarray,
+    td: np.ndarray,
+    ngramas_izq: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    ngramas_der: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    n_vocab: int,
+    parejas_por_trozo: int = 200_000,
+) -> np.ndarray:
+    """Nº exacto de n-gramas compartidos por cada pareja (ti, td): los de ti buscados en los de td."""
+    ini_i, tam_i, gram_i = ngramas_izq
+    _, tam_d, gram_d = ngramas_der
+    clave_d = np.repeat(np.arange(len(tam_d)), tam_d) * n_vocab + gram_d  # ya ordenada
+    comunes = np.zeros(len(ti), dtype=np.int64)
+    if len(clave_d) == 0:
+        return comunes
+    for a in range(0, len(ti), parejas_por_trozo):
+        ti_t, td_t = ti[a:a + parejas_por_trozo], td[a:a + parejas_por_trozo]
+        par, k, _ = _producto_por_tramos(tam_i[ti_t], np.ones(len(ti_t), dtype=np.int64))
+        buscada = td_t[par] * n_vocab + gram_i[ini_i[ti_t[par]] + k]
+        pos = np.minimum(np.searchsorted(clave_d, buscada), len(clave_d) - 1)
+        comunes[a:a + parejas_por_trozo] = np.bincount(par, weights=clave_d[pos] == buscada, minlength=len(ti_t))
+    return comunes
+
+
+@medido()
+def emparejar_aproximado(
+    izq: pd.DataFrame,
+    der: pd.DataFrame,
+    columnas: Union[str, List[str]],
+    columnas_der: Optional[Union[str, List[str]]] = None,
+    bloquear_por: Optional[Union[str, List[str]]] = None,
+    bloquear_por_der: Optional[Union[str, List[str]]] = None,
+    long_prefijo: int = 2,
+    n: int = 3,
+    umbral: float = 0.6,
+    max_candidatos: int = 5,
+    max_pares_por_ngrama: int = 50_000,
+    uno_a_uno: bool = False,
+    left_name: str = "left",
+    right_name: str = "right",
+) -> pd.DataFrame:
+    """
+    Propone parejas aproximadas entre filas que sólo están en un lado (p.ej. las
+    "Está en X pero no en Y" de comparar_tablas, o solo_f1 / solo_f2 de
+    comparar_por_clave): "12345" ~ "12345-01", "AB 12" ~ "ab12"...
+
+    1) Normaliza las columnas (minúsculas, sin espacios ni signos).
+    2) Bloquea: sólo se comparan filas con los mismos valores (normalizados) de
+       'bloquear_por' y el mismo prefijo de 'long_prefijo' caracteres en la
+       primera columna.
+    3) Índice invertido de n-gramas por bloque, con filtro de prefijo: cada fila se
+       indexa sólo por sus n-gramas más raros, los mínimos para no perder ninguna
+       pareja que llegue al umbral. Los candidatos son las parejas que comparten
+       alguno, sin comparar todas contra todas.
+    4) Puntúa los candidatos con el coeficiente de Dice sobre los n-gramas de sus
+       columnas (1.0 = iguales tras normalizar) y propone los 'max_candidatos'
+       mejores de cada fila izq.
+
+    Parámetros
+    ----------
+    izq, der : filas sin pareja de cada lado.
+    columnas : columna(s) a comparar en izq; columnas_der en der (por defecto las mismas).
+    bloquear_por : columna(s) que deben coincidir (normalizadas) para ser candidatos;
+                   bloquear_por_der en der (por defecto las mismas).
+    long_prefijo : caracteres iniciales del texto normalizado que deben coincidir
+                   (0 = sin bloqueo por prefijo; más lento y con más candidatos).
+    n : tamaño de los n-gramas.
+    umbral : similitud mínima para proponer una pareja.
+    max_candidatos : parejas que se proponen por cada fila de izq.
+    max_pares_por_ngrama : límite de seguridad: un n-grama de prefijo que emparejaría
+                           más filas que esto dentro de un bloque no genera candidatos
+                           (se pueden perder parejas; sólo pasa con bloques enormes
+                           de textos casi iguales).
+    uno_a_uno : si True, cada fila aparece como mucho en una pareja (asignación
+                voraz por similitud descendente).
+    left_name, right_name : sufijos de las columnas de salida.
+
+    Retorna
+    -------
+    DataFrame [fila_{left}, fila_{right}, columnas_{left}..., columnas_{right}...,
+    similitud, rango] ordenado por fila izq y similitud descendente. fila_* son las
+    etiquetas del índice de izq / der; rango 1 = mejor candidato de esa fila izq.
+    """
+    columnas = [columnas] if isinstance(columnas, str) else list(columnas)
+    columnas_der = columnas if columnas_der is None else ([columnas_der] if isinstance(columnas_der, str) else list(columnas_der))
+    bloquear_por = [] if bloquear_por is None else ([bloquear_por] if isinstance(bloquear_por, str) else list(bloquear_por))
+    bloquear_por_der = bloquear_por if bloquear_por_der is None else (
+        [bloquear_por_der] if isinstance(bloquear_por_der, str) else list(bloquear_por_der))
+    if len(columnas) != len(columnas_der) or len(bloquear_por) != len(bloquear_por_der):
+        raise ValueError("columnas / columnas_der y bloquear_por / bloquear_por_der deben tener la misma longitud.")
+
+    if not 0 < umbral <= 1:
+        raise ValueError("umbral debe estar en (0, 1].")
+
+    with etapa("normalizar", entrada=[izq, der]):
+        norm_izq = [normalizar_clave(izq[c]) for c in columnas]
+        norm_der = [normalizar_clave(der[c]) for c in columnas_der]
+        bloque_izq, bloque_der = _bloques(izq, der, norm_izq[0], norm_der[0], bloquear_por, bloquear_por_der, long_prefijo)
+
+    # Filas sin nada que comparar (todas las columnas nulas o vacías) no se emparejan
+    validas_izq = np.flatnonzero(np.any([p.str.len().to_numpy() > 0 for p in norm_izq], axis=0))
+    validas_der = np.flatnonzero(np.any([p.str.len().to_numpy() > 0 for p in norm_der], axis=0))
+
+    with etapa("indice_ngramas"):
+        # n-gramas de los valores distintos de cada columna (los dos lados juntos); los de
+        # columnas distintas no se mezclan: "123" en el PN no cuenta como "123" en el SN
+        cod_izq, cod_der, ngramas_cols, n_vocab = [], [], [], 0
+        for p_izq, p_der in zip(norm_izq, norm_der):
+            codigos, valores = pd.factorize(pd.concat([p_izq, p_der], ignore_index=True))
+            num, grams = _ngramas_valores(pd.Series(valores), n)
+            gram, vocab = pd.factorize(grams)
+            tam = np.bincount(num, minlength=len(valores))
+            ngramas_cols.append((np.cumsum(tam) - tam, tam, gram[np.argsort(num, kind="stable")] + n_vocab))
+            n_vocab += len(vocab)
+            cod_izq.append(codigos[:len(p_izq)])
+            cod_der.append(codigos[len(p_izq):])
+        n_vocab = max(n_vocab, 1)
+        # Se trabaja con registros distintos (bloque + valores): las filas repetidas se puntúan una vez
+        unid_izq, fila_reg_izq = _registros(bloque_izq, cod_izq, validas_izq)
+        unid_der, fila_reg_der = _registros(bloque_der, cod_der, validas_der)
+        ngramas_izq = _ngramas_registros(fila_reg_izq, cod_izq, ngramas_cols, n_vocab)
+        ngramas_der = _ngramas_registros(fila_reg_der, cod_der, ngramas_cols, n_vocab)
+
+    with etapa("candidatos"):
+        # Filtro de prefijo: cada registro sólo se indexa por sus n-gramas más raros (en
+        # los dos lados). Dice >= umbral equivale a Jaccard >= umbral / (2 - umbral)
+        frecuencia = np.bincount(ngramas_izq[2], minlength=n_vocab) + np.bincount(ngramas_der[2], minlength=n_vocab)
+        rango_gram = np.empty(n_vocab, dtype=np.int64)
+        rango_gram[np.lexsort((np.arange(n_vocab), frecuencia))] = np.arange(n_vocab)
+        jaccard = umbral / (2.0 - umbral)
+        post_izq, k_izq = _prefijos(ngramas_izq, rango_gram, jaccard, bloque_izq[fila_reg_izq], n_vocab)
+        post_der, k_der = _prefijos(ngramas_der, rango_gram, jaccard, bloque_der[fila_reg_der], n_vocab)
+        ti, td, compartidos = _pares_candidatos(post_izq, post_der, max_pares_por_ngrama)
+        ok = compartidos >= np.minimum(k_izq[ti], k_der[td])
+        ti, td = ti[ok], td[ok]
+        # Filtro de longitud: con tamaños muy distintos no se puede llegar al umbral
+        tam_i, tam_d = ngramas_izq[1][ti], ngramas_der[1][td]
+        ok = (tam_d >= jaccard * tam_i - 1e-9) & (tam_i >= jaccard * tam_d - 1e-9)
+        ti, td = ti[ok], td[ok]
+        # Filtro por firmas: descarta sin mirar los n-gramas las parejas que ni en el mejor caso llegan
+        cota = _cota_solapamiento(ti, td, _firmas(ngramas_izq), _firmas(ngramas_der))
+        ok = 2.0 * cota >= umbral * (ngramas_izq[1][ti] + ngramas_der[1][td]) - 1e-9
+        ti, td = ti[ok], td[ok]
+
+    with etapa("puntuar"):
+        # Dice exacto con todos los n-gramas; se quedan los max_candidatos mejores de cada registro izq
+        comunes = _solapamiento(ti, td, ngramas_izq, ngramas_der, n_vocab)
+        similitud = 2.0 * comunes / (ngramas_izq[1][ti] + ngramas_der[1][td])
+        ok = similitud >= umbral
+        ti, td, similitud = ti[ok], td[ok], similitud[ok]
+        orden = np.lexsort((-similitud, ti))
+        ti, td, similitud = ti[orden], td[orden], similitud[orden]
+        mejores = np.arange(len(ti)) - np.searchsorted(ti, ti) < max_candidatos
+        ti, td, similitud = ti[mejores], td[mejores], similitud[mejores]
+
+    with etapa("resultado"):
+        # De registros a filas: cada pareja de registros -> todas sus filas
+        orden_i = validas_izq[np.argsort(unid_izq, kind="stable")]
+        orden_d = validas_der[np.argsort(unid_der, kind="stable")]
+        tam_ui = np.bincount(unid_izq, minlength=len(fila_reg_izq))
+        tam_ud = np.bincount(unid_der, minlength=len(fila_reg_der))
+        ini_ui = np.cumsum(tam_ui) - tam_ui
+        ini_ud = np.cumsum(tam_ud) - tam_ud
+        par, da, db = _producto_por_tramos(tam_ui[ti], tam_ud[td])
+        pos_izq = orden_i[ini_ui[ti[par]] + da]
+        pos_der = orden_d[ini_ud[td[par]] + db]
+        sim = similitud[par]
+
+        orden = np.lexsort((-sim, pos_izq))
+        pos_izq, pos_der, sim = pos_izq[orden], pos_der[orden], sim[orden]
+        if uno_a_uno:
+            pos_izq, pos_der, sim = _asignar_uno_a_uno(pos_izq, pos_der, sim)
+
+        out = pd.DataFrame({
+            f"fila_{left_name}": izq.index[pos_izq],
+            f"fila_{right_name}": der.index[pos_der],
+        })
+        for c in columnas:
+            out[f"{c}_{left_name}"] = izq[c].to_numpy()[pos_izq]
+        for c in columnas_der:
+            out[f"{c}_{right_name}"] = der[c].to_numpy()[pos_der]
+        out["similitud"] = sim
+        out["rango"] = (np.arange(len(pos_izq)) - np.searchsorted(pos_izq, pos_izq) + 1) if len(pos_izq) else np.empty(0, dtype=np.int64)
+    return out
+
+
+def _asignar_uno_a_uno(pos_izq: np.ndarray, pos_der: np.ndarray, sim: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Voraz: de mayor a menor similitud, se acepta la pareja si ninguna de sus filas está ya usada."""
+    usada_izq, usada_der = set(), set()
+    aceptadas = []
+    for k in np.argsort(-sim, kind="stable").tolist():
+        a, b = int(pos_izq[k]), int(pos_der[k])
+        if a not in usada_izq and b not in usada_der:
+            usada_izq.add(a)
+            usada_der.add(b)
+            aceptadas.append(k)
+    aceptadas = np.sort(np.asarray(aceptadas, dtype=np.int64))
+    return pos_izq[aceptadas], pos_der[aceptadas], sim[aceptadas]
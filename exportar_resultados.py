@@ -0,0 +1,237 @@
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from comparar_tablas_mejorado import EstadoComparacion, codigos_estado
+from instrumentacion import medido
+
+Resultado = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+_MAX_FILAS_EXCEL = 1_048_576
+_MAX_NOMBRE_HOJA = 31
+_CARACTERES_HOJA = re.compile(r"[\[\]:*?/\\]")
+
+
+def _partes(resultado: Resultado) -> Iterator[pd.DataFrame]:
+    """Un DataFrame o un iterable de DataFrames (p.ej. comparar_tablas_particionado)."""
+    if isinstance(resultado, pd.DataFrame):
+        yield resultado
+    else:
+        yield from resultado
+
+
+def _trozos_por_estado(
+    resultado: Resultado,
+    col_estado: str,
+    left_name: str,
+    right_name: str,
+    filas_por_trozo: int,
+) -> Iterator[tuple]:
+    """
+    (estado, trozo) con como mucho 'filas_por_trozo' filas de cada estado. Sólo se
+    copia el trozo en curso: nunca una partición completa ni el resultado entero.
+    """
+    for parte in _partes(resultado):
+        codigos = codigos_estado(parte[col_estado], left_name, right_name)
+        for estado in EstadoComparacion:
+            pos = np.flatnonzero(codigos == estado)
+            for ini in range(0, len(pos), filas_por_trozo):
+                yield estado, parte.iloc[pos[ini:ini + filas_por_trozo]]
+
+
+def nombres_hojas(left_name: str = "left", right_name: str = "right") -> Dict[EstadoComparacion, str]:
+    """Nombre de hoja / partición por defecto de cada estado."""
+    return {
+        EstadoComparacion.OK: "OK",
+        EstadoComparacion.DISCREPANCIA: "DISCREPANCIA",
+        EstadoComparacion.SOLO_IZQUIERDA: f"Solo en {left_name}",
+        EstadoComparacion.SOLO_DERECHA: f"Solo en {right_name}",
+    }
+
+
+def _nombre_hoja(nombre: str, n: int) -> str:
+    """Nombre válido de hoja de Excel; n > 0 para las hojas de continuación ("OK (2)")."""
+    nombre = _CARACTERES_HOJA.sub("_", nombre)
+    sufijo = f" ({n + 1})" if n else ""
+    return nombre[:_MAX_NOMBRE_HOJA - len(sufijo)] + sufijo
+
+
+def _valores_celda(s: pd.Series) -> list:
+    """Columna -> lista de valores que entiende xlsxwriter (nulos -> None, fechas sin zona)."""
+    if isinstance(s.dtype, pd.DatetimeTZDtype):
+        s = s.dt.tz_localize(None)
+    valores = s.astype(object)
+    return valores.where(s.notna(), None).tolist()
+
+
+class _HojaEstado:
+    """Hoja(s) de un estado: abre una nueva al llegar al límite de filas de Excel."""
+
+    def __init__(self, libro, nombre: str, columnas: List[str], max_filas: int):
+        self.libro = libro
+        self.nombre = nombre
+        self.columnas = columnas
+        self.max_filas = max_filas
+        self.n_hojas = 0
+        self.filas = 0
+        self._nueva()
+
+    def _nueva(self) -> None:
+        self.hoja = self.libro.add_worksheet(_nombre_hoja(self.nombre, self.n_hojas))
+        self.hoja.write_row(0, 0, self.columnas)
+        self.n_hojas += 1
+        self.fila = 1
+
+    def escribir(self, trozo: pd.DataFrame) -> None:
+        columnas = [_valores_celda(trozo[c]) for c in self.columnas]
+        for valores in zip(*columnas):
+            if self.fila >= self.max_filas:
+                self._nueva()
+            # constant_memory: las filas de cada hoja se escriben en orden y se vuelcan a disco
+            self.hoja.write_row(self.fila, 0, valores)
+            self.fila += 1
+            self.filas += 1
+
+
+@medido()
+def exportar_excel(
+    resultado: Resultado,
+    ruta: str,
+    col_estado: str = "estado",
+    left_name: str = "left",
+    right_name: str = "right",
+    hojas: Optional[Dict[EstadoComparacion, str]] = None,
+    incluir_vacias: bool = True,
+    filas_por_trozo: int = 50_000,
+    formato_fecha: str = "yyyy-mm-dd hh:mm:ss",
+    max_filas_hoja: int = _MAX_FILAS_EXCEL,
+) -> Dict[str, int]:
+    """
+    Escribe el resultado de comparar_tablas en un libro con una hoja por estado
+    (OK, DISCREPANCIA, Solo en left, Solo en right) sin copiar cada partición.
+
+    Usa xlsxwriter en modo constant_memory: cada fila se escribe en orden y se
+    vuelca a disco, así que la memoria no crece con el tamaño del libro. Las filas
+    se toman del resultado por trozos de 'filas_por_trozo' (sólo se copia el trozo).
+    Si un estado supera el límite de filas de Excel, sigue en "OK (2)", "OK (3)"...
+
+    Parámetros
+    ----------
+    resultado : DataFrame de comparar_tablas o iterable de DataFrames
+                (p.ej. las partes de comparar_tablas_particionado).
+    ruta : fichero .xlsx de salida.
+    col_estado : columna de estado (categórica de comparar_tablas o texto con sus etiquetas).
+    left_name, right_name : los usados en comparar_tablas (para las etiquetas y hojas).
+    hojas : nombre de hoja por estado (por defecto nombres_hojas(left_name, right_name)).
+    incluir_vacias : crear también las hojas de estados sin filas (sólo con la cabecera).
+    formato_fecha : formato de Excel para las columnas de fecha.
+    max_filas_hoja : filas por hoja, cabecera incluida (límite de Excel por defecto).
+
+    Retorna
+    -------
+    dict nombre de hoja base -> nº de filas escritas.
+    """
+    try:
+        import xlsxwriter
+    except ImportError as e:
+        raise ImportError("exportar_excel necesita xlsxwriter (pip install xlsxwriter).") from e
+    nombres = {**nombres_hojas(left_name, right_name), **(hojas or {})}
+    libro = xlsxwriter.Workbook(ruta, {
+        "constant_memory": True,
+        "default_date_format": formato_fecha,
+        # Los textos son datos: sin buscar URLs ni fórmulas en cada celda (y sin ejecutar "=...")
+        "strings_to_urls": False,
+        "strings_to_formulas": False,
+    })
+    abiertas: Dict[EstadoComparacion, _HojaEstado] = {}
+    columnas: Optional[List[str]] = None
+    try:
+        for estado, trozo in _trozos_por_estado(resultado, col_estado, left_name, right_name, filas_por_trozo):
+            columnas = columnas or list(trozo.columns)
+            if estado not in abiertas:
+                abiertas[estado] = _HojaEstado(libro, nombres[estado], columnas, max_filas_hoja)
+            abiertas[estado].escribir(trozo)
+        if incluir_vacias and columnas is not None:
+            for estado in EstadoComparacion:
+                if estado not in abiertas:
+                    abiertas[estado] = _HojaEstado(libro, nombres[estado], columnas, max_filas_hoja)
+    finally:
+        libro.close()
+    return {nombres[e]: abiertas[e].filas for e in EstadoComparacion if e in abiertas}
+
+
+def _esquema_arrow(trozo: pd.DataFrame):
+    """Esquema Arrow del primer trozo; las columnas sin ningún valor se toman como texto."""
+    import pyarrow as pa
+
+    esquema = pa.Schema.from_pandas(trozo, preserve_index=False)
+    for i, campo in enumerate(esquema):
+        if pa.types.is_null(campo.type):
+            esquema = esquema.set(i, pa.field(campo.name, pa.string()))
+    return esquema
+
+
+@medido()
+def exportar_parquet(
+    resultado: Resultado,
+    directorio: str,
+    col_estado: str = "estado",
+    left_name: str = "left",
+    right_name: str = "right",
+    filas_por_trozo: int = 250_000,
+    compresion: str = "snappy",
+) -> Dict[str, int]:
+    """
+    Escribe el resultado de comparar_tablas como Parquet particionado por estado
+    (estilo Hive): directorio/estado=OK/parte-0.parquet, estado=DISCREPANCIA/...
+    Cada trozo se añade como un row group, sin juntar la partición en memoria.
+
+    La columna de estado no se guarda dentro de los ficheros: sale del nombre de
+    la carpeta (nombre de EstadoComparacion). Para leer sólo una partición:
+        pd.read_parquet(directorio, filters=[("estado", "=", "DISCREPANCIA")])
+
+    Parámetros
+    ----------
+    resultado : DataFrame de comparar_tablas o iterable de DataFrames.
+    directorio : carpeta de salida (se crea; se borran las particiones de una exportación anterior).
+    col_estado, left_name, right_name : como en exportar_excel.
+    filas_por_trozo : filas por row group.
+
+    Retorna
+    -------
+    dict nombre de estado -> nº de filas escritas.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("exportar_parquet necesita pyarrow (pip install pyarrow).") from e
+    # Quitar las particiones de una exportación anterior (también las de estados que ahora no salen)
+    for estado in EstadoComparacion:
+        carpeta = os.path.join(directorio, f"{col_estado}={estado.name}")
+        if os.path.isdir(carpeta):
+            for viejo in os.listdir(carpeta):
+                if viejo.endswith(".parquet"):
+                    os.remove(os.path.join(carpeta, viejo))
+    escritores: Dict[EstadoComparacion, "pq.ParquetWriter"] = {}
+    filas: Dict[str, int] = {}
+    esquema = None
+    try:
+        for estado, trozo in _trozos_por_estado(resultado, col_estado, left_name, right_name, filas_por_trozo):
+            trozo = trozo.drop(columns=[col_estado])
+            if esquema is None:
+                esquema = _esquema_arrow(trozo)
+            if estado not in escritores:
+                carpeta = os.path.join(directorio, f"{col_estado}={estado.name}")
+                os.makedirs(carpeta, exist_ok=True)
+                escritores[estado] = pq.ParquetWriter(os.path.join(carpeta, "parte-0.parquet"), esquema, compression=compresion)
+            tabla = pa.Table.from_pandas(trozo, schema=esquema, preserve_index=False)
+            escritores[estado].write_table(tabla)
+            filas[estado.name] = filas.get(estado.name, 0) + len(trozo)
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+    return filas
@@ -1,5 +1,9 @@
 import pandas as pd
 
+from instrumentacion import medido
+from piezas_utils import MovementHistory
+
+@medido()
 def filtra_ultimo_movimiento(
     df: pd.DataFrame,
     claves: list[str],
@@ -16,32 +20,68 @@ def filtra_ultimo_movimiento(
 
     Retorna:
     - DataFrame filtrado con las filas más recientes por grupo.
+
+    Con varias filas en la fecha más reciente de un grupo, se queda la última
+    en el orden original del DataFrame.
+
+    Las filas sin fecha válida (NaT) o con alguna clave nula no cuentan como
+    movimiento y no salen en el resultado (para agrupar también las claves
+    nulas, rellenarlas antes: df[claves].fillna(...)).
+
+    Si se van a hacer varias consultas sobre los mismos movimientos, es mejor
+    construir un MovementHistory una vez y llamar a .ultimo() / .primero() / .nth().
     """
-    df = df.copy()
+    return MovementHistory(df, claves, col_fecha).ultimo()
 
-    # Convertir la columna de fecha a datetime por seguridad
-    df[col_fecha] = pd.to_datetime(df[col_fecha], errors="coerce")
 
-    # Ordenar por claves y fecha
-    df = df.sort_values(claves + [col_fecha])
+@medido()
+def filtra_movimiento_a_fecha(
+    df: pd.DataFrame,
+    claves: list[str],
+    consultas: pd.DataFrame,
+    col_fecha: str = "fecha_movimiento",
+    col_fecha_consulta: str = "fecha_consulta"
+) -> pd.DataFrame:
+    """
+    Versión "a fecha" de filtra_ultimo_movimiento, para muchas fechas a la vez.
+    Para cada fila de 'consultas' (claves + fecha de consulta) devuelve el último
+    movimiento de ese grupo con fecha <= fecha de consulta.
+
+    Sustituye al bucle de filtrar por fecha + filtra_ultimo_movimiento por cada
+    fecha: los movimientos se ordenan una vez y cada consulta es una búsqueda binaria.
+
+    Parámetros:
+    - df: DataFrame de movimientos.
+    - claves: lista de columnas que definen el grupo (ej. ['avion', 'posicion']).
+    - consultas: DataFrame con las columnas 'claves' + col_fecha_consulta.
+    - col_fecha: columna con la fecha del movimiento.
+    - col_fecha_consulta: columna de 'consultas' con la fecha a consultar.
 
-    # Eliminar duplicados quedándote con el último (fecha más grande)
-    df_ultimo = df.drop_duplicates(subset=claves, keep="last")
+    Retorna:
+    - DataFrame con las consultas + columnas del movimiento encontrado (NaN si no hay).
+    """
+    return MovementHistory(df, claves, col_fecha).a_fecha(consultas, col_fecha_consulta)
 
-    return df_ultimo
 
+if __name__ == "__main__":
+    #modo de uso
+    data = {
+        "equipo": ["E1", "E1", "E2", "E2", "E2"],
+        "componente": ["C1", "C1", "C2", "C2", "C3"],
+        "movimiento": ["INST", "RET", "INST", "REV", "RET"],
+        "fecha_movimiento": [
+            "2024-01-01", "2024-03-01", "2023-05-01", "2023-07-01", "2023-02-01"
+        ]
+    }
 
-#modo de uso
-data = {
-    "equipo": ["E1", "E1", "E2", "E2", "E2"],
-    "componente": ["C1", "C1", "C2", "C2", "C3"],
-    "movimiento": ["INST", "RET", "INST", "REV", "RET"],
-    "fecha_movimiento": [
-        "2024-01-01", "2024-03-01", "2023-05-01", "2023-07-01", "2023-02-01"
-    ]
-}
+    df = pd.DataFrame(data)
 
-df = pd.DataFrame(data)
+    df_filtrado = filtra_ultimo_movimiento(df, claves=["equipo", "componente"], col_fecha="fecha_movimiento")
+    print(df_filtrado)
 
-df_filtrado = filtra_ultimo_movimiento(df, claves=["equipo", "componente"], col_fecha="fecha_movimiento")
-print(df_filtrado)
\ No newline at end of file
+    consultas = pd.DataFrame({
+        "equipo": ["E1", "E1", "E2"],
+        "componente": ["C1", "C1", "C2"],
+        "fecha_consulta": ["2024-02-01", "2024-06-01", "2023-06-01"],
+    })
+    print(filtra_movimiento_a_fecha(df, ["equipo", "componente"], consultas))
\ No newline at end of file
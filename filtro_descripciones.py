@@ -0,0 +1,334 @@
+import re
+from typing import Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from instrumentacion import medido
+
+# Separador entre descripciones al escanearlas juntas (no puede estar en una palabra clave)
+_SEP = "\x00"
+_TOKEN_EXPR = re.compile(r"""\s*(?:(?P<op>[&|~()])|"(?P<c1>[^"]*)"|'(?P<c2>[^']*)'|(?P<palabra>[^\s&|~()"']+))""")
+
+
+def _parsear_expresion(texto: str) -> tuple:
+    """
+    Expresión de regla -> árbol: ("kw", palabra) | ("no", a) | ("y", a, b) | ("o", a, b).
+    Gramática: o := y ('|' y)* ; y := no ('&' no)* ; no := '~' no | '(' o ')' | palabra.
+    Palabras con espacios u operadores, entre comillas: "dos palabras".
+    """
+    tokens = []
+    pos = 0
+    texto = texto.strip()
+    while pos < len(texto):
+        m = _TOKEN_EXPR.match(texto, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f"Expresión no válida cerca de: {texto[pos:]!r}")
+        pos = m.end()
+        if m.group("op"):
+            tokens.append(("op", m.group("op")))
+        else:
+            palabra = next(g for g in (m.group("c1"), m.group("c2"), m.group("palabra")) if g is not None)
+            if not palabra:
+                raise ValueError(f"Palabra vacía en la expresión: {texto!r}")
+            tokens.append(("kw", palabra.lower()))
+    i = 0
+
+    def ver(op=None):
+        return i < len(tokens) and (op is None or tokens[i] == ("op", op))
+
+    def o():
+        nonlocal i
+        a = y()
+        while ver("|"):
+            i += 1
+            a = ("o", a, y())
+        return a
+
+    def y():
+        nonlocal i
+        a = no()
+        while ver("&"):
+            i += 1
+            a = ("y", a, no())
+        return a
+
+    def no():
+        nonlocal i
+        if not ver():
+            raise ValueError(f"Expresión incompleta: {texto!r}")
+        tipo, valor = tokens[i]
+        i += 1
+        if tipo == "kw":
+            return ("kw", valor)
+        if valor == "~":
+            return ("no", no())
+        if valor == "(":
+            a = o()
+            if not ver(")"):
+                raise ValueError(f"Falta ')' en la expresión: {texto!r}")
+            i += 1
+            return a
+        raise ValueError(f"Operador inesperado {valor!r} en la expresión: {texto!r}")
+
+    arbol = o()
+    if i != len(tokens):
+        raise ValueError(f"Sobra texto en la expresión: {texto!r}")
+    return arbol
+
+
+def _regex_trie(palabras: Iterable[str]) -> str:
+    """
+    Alternativa regex de las palabras con los prefijos comunes factorizados
+    (["hol", "hola", "holanda"] -> "hol(?:a(?:nda)?)?"). En cada posición el motor
+    sigue un solo camino en vez de probar todas las palabras una a una, y al ser
+    codicioso encuentra primero la palabra más larga.
+    """
+    trie: dict = {}
+    for p in palabras:
+        nodo = trie
+        for ch in p:
+            nodo = nodo.setdefault(ch, {})
+        nodo[""] = {}
+
+    def construir(nodo: dict) -> str:
+        fin = "" in nodo
+        ramas = [re.escape(ch) + construir(hijo) for ch, hijo in sorted(nodo.items()) if ch != ""]
+        if not ramas:
+            return ""
+        cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+        if fin:
+            return f"(?:{cuerpo})?" if len(ramas) == 1 else f"{cuerpo}?"
+        return cuerpo
+
+    return construir(trie)
+
+
+def _palabras(arbol: tuple) -> List[str]:
+    if arbol[0] == "kw":
+        return [arbol[1]]
+    return [p for hijo in arbol[1:] for p in _palabras(hijo)]
+
+
+def _evaluar(arbol: tuple, columna) -> np.ndarray:
+    tipo = arbol[0]
+    if tipo == "kw":
+        return columna(arbol[1])
+    if tipo == "no":
+        return ~_evaluar(arbol[1], columna)
+    a, b = _evaluar(arbol[1], columna), _evaluar(arbol[2], columna)
+    return a & b if tipo == "y" else a | b
+
+
+class FiltroDescripciones:
+    """
+    Motor de reglas de texto sobre una columna de descripciones (p.ej. las filas
+    de RDCD a eliminar). Todas las palabras clave de todas las reglas se buscan a
+    la vez, en una sola pasada:
+
+      - cada descripción distinta se pasa a minúsculas y se escanea UNA vez
+        (memoizado: las descripciones ya vistas en llamadas anteriores no se vuelven
+        a escanear);
+      - las palabras clave se compilan en una única expresión regular combinada;
+      - las reglas (Y / O / NO entre palabras) se evalúan de forma vectorizada sobre
+        las descripciones que contienen alguna palabra clave.
+
+    Semántica: la de str.contains(palabra, case=False, regex=False, na=False) por
+    palabra (subcadena, sin distinguir mayúsculas); con palabra_completa=True sólo
+    cuentan palabras completas. Una descripción nula no contiene ninguna palabra.
+
+    Ejemplo
+    -------
+        filtro = FiltroDescripciones({
+            "matiz_saludo": "matiz & (hola | adios)",
+            "prueba": '"pieza de prueba" & ~real',
+        })
+        eliminar, conservar = filtro.mascaras(df["descripcion"])
+        df_filtrado = df[conservar]
+        df["reglas"] = filtro.reglas_por_fila(df["descripcion"])
+
+    Parámetros
+    ----------
+    reglas : dict nombre -> expresión, o lista de (nombre, expresión[, acción]).
+             Expresión: palabras unidas con & (y), | (o), ~ (no) y paréntesis;
+             palabras con espacios entre comillas.
+             Acción: "eliminar" (por defecto, cuenta en la máscara de eliminar) o "marcar".
+    palabra_completa : buscar sólo palabras completas (\\b...\\b).
+    max_memo : nº máximo de descripciones memorizadas (al superarlo se vacía).
+    """
+
+    def __init__(
+        self,
+        reglas: Union[Dict[str, str], Iterable[tuple]],
+        palabra_completa: bool = False,
+        max_memo: int = 2_000_000,
+    ):
+        if isinstance(reglas, dict):
+            reglas = list(reglas.items())
+        self.nombres: List[str] = []
+        self.acciones: List[str] = []
+        self._arboles: List[tuple] = []
+        for r in reglas:
+            nombre, expresion = r[0], r[1]
+            accion = r[2] if len(r) > 2 else "eliminar"
+            if accion not in ("eliminar", "marcar"):
+                raise ValueError(f"Acción no válida en la regla {nombre!r}: {accion!r}")
+            if nombre in self.nombres:
+                raise ValueError(f"Regla repetida: {nombre!r}")
+            self.nombres.append(nombre)
+            self.acciones.append(accion)
+            self._arboles.append(_parsear_expresion(expresion))
+
+        self.palabras: List[str] = list(dict.fromkeys(p for a in self._arboles for p in _palabras(a)))
+        if any(_SEP in p for p in self.palabras):
+            raise ValueError("Las palabras clave no pueden contener el carácter nulo.")
+        self._id_palabra = {p: i for i, p in enumerate(self.palabras)}
+        self.palabra_completa = palabra_completa
+        self.max_memo = max_memo
+        self._memo: Dict[str, Tuple[int, ...]] = {}
+
+        # Una sola expresión: en cada posición, la palabra más larga que empieza ahí
+        # (lookahead: las coincidencias pueden solaparse)
+        borde = r"\b" if palabra_completa else ""
+        self._patron = re.compile(f"(?=({borde}{_regex_trie(self.palabras)}{borde}))") if self.palabras else None
+
+        # Palabras contenidas en otras: si "holanda" aparece, "hola" también.
+        # En formato CSR: las implicadas por la palabra i son _impl[_impl_ini[i]:_impl_ini[i + 1]]
+        implicadas = [
+            [j for j, q in enumerate(self.palabras)
+             if (re.search(rf"\b{re.escape(q)}\b", p) if palabra_completa else q in p)]
+            for p in self.palabras
+        ]
+        self._impl = np.array([j for lista in implicadas for j in lista], dtype=np.int64)
+        self._impl_ini = np.cumsum([0] + [len(lista) for lista in implicadas]).astype(np.int64)
+
+    # --- escaneo ---
+
+    def _escanear(self, textos: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Palabras clave que contiene cada texto (ya en minúsculas), en una sola pasada.
+        Retorna pares (texto, palabra) sin repetir, ordenados por texto y palabra.
+        """
+        vacio = np.empty(0, dtype=np.int64)
+        if self._patron is None or not textos:
+            return vacio, vacio
+        bloque = _SEP.join(textos)
+        inicios = np.cumsum([0] + [len(t) + 1 for t in textos[:-1]])
+        id_palabra = self._id_palabra
+        posiciones, ids = [], []
+        for m in self._patron.finditer(bloque):
+            posiciones.append(m.start())
+            ids.append(id_palabra[m.group(1)])
+        if not posiciones:
+            return vacio, vacio
+        texto_de = np.searchsorted(inicios, np.asarray(posiciones), side="right") - 1
+        ids = np.asarray(ids, dtype=np.int64)
+
+        # Cada coincidencia aporta su palabra y las contenidas en ella (vectorizado)
+        cuantas = self._impl_ini[ids + 1] - self._impl_ini[ids]
+        desde = np.repeat(self._impl_ini[ids] - np.cumsum(cuantas) + cuantas, cuantas)
+        palabra = self._impl[desde + np.arange(int(cuantas.sum()))]
+        pares = np.repeat(texto_de, cuantas) * len(self.palabras) + palabra
+        pares.sort()
+        pares = pares[np.r_[True, pares[1:] != pares[:-1]]]
+        return np.divmod(pares, len(self.palabras))
+
+    def _palabras_unicas(self, serie: pd.Series) -> Tuple[np.ndarray, int, np.ndarray, np.ndarray]:
+        """
+        (códigos por fila, nº de descripciones distintas, pares (descripción, palabra)).
+        Código -1 = nulo. Sólo se escanean las descripciones que no están memorizadas.
+        """
+        codigos, unicos = pd.factorize(serie)
+        textos = [str(u).lower() for u in unicos]
+        memo = self._memo
+        previos = [memo.get(t) for t in textos]
+        pendientes = [k for k, r in enumerate(previos) if r is None]
+
+        pares_t = [k for k, r in enumerate(previos) if r for _ in r]
+        pares_p = [p for r in previos if r for p in r]
+        if pendientes:
+            texto, palabra = self._escanear([textos[k] for k in pendientes])
+            pendientes_arr = np.asarray(pendientes, dtype=np.int64)
+            if len(memo) + len(pendientes) > self.max_memo:
+                memo.clear()
+            # Memorizar: () para las que no tienen ninguna palabra
+            lista_t, lista_p = texto.tolist(), palabra.tolist()
+            cortes = [0] + (np.flatnonzero(np.diff(texto)) + 1).tolist() + [len(lista_t)]
+            con_palabras = {lista_t[i]: tuple(lista_p[i:j]) for i, j in zip(cortes[:-1], cortes[1:]) if i < j}
+            for local, k in enumerate(pendientes):
+                memo[textos[k]] = con_palabras.get(local, ())
+            texto = pendientes_arr[texto]
+        else:
+            texto = palabra = np.empty(0, dtype=np.int64)
+        return (
+            codigos,
+            len(textos),
+            np.concatenate([np.asarray(pares_t, dtype=np.int64), texto]),
+            np.concatenate([np.asarray(pares_p, dtype=np.int64), palabra]),
+        )
+
+    def _reglas_unicas(self, serie: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (fila de 'aciertos' de cada fila de la serie, aciertos): aciertos es una
+        matriz bool [descripciones con alguna palabra + 1, reglas]; la última fila
+        corresponde a las descripciones sin ninguna palabra (y a los nulos).
+        """
+        codigos, n_unicos, par_texto, par_palabra = self._palabras_unicas(serie)
+        tiene = np.zeros(n_unicos, dtype=bool)
+        tiene[par_texto] = True
+        candidatas = np.flatnonzero(tiene)
+        n_c = len(candidatas)
+        fila_de_unico = np.full(n_unicos + 1, n_c, dtype=np.int64)  # +1: código -1 (nulo) -> última
+        fila_de_unico[candidatas] = np.arange(n_c)
+
+        # Pares (candidata, palabra) ordenados por palabra -> columna bool por palabra bajo demanda
+        orden = np.argsort(par_palabra, kind="stable")
+        filas, cols = fila_de_unico[par_texto[orden]], par_palabra[orden]
+        limites = np.searchsorted(cols, np.arange(len(self.palabras) + 1))
+        cache: Dict[str, np.ndarray] = {}
+
+        def columna(palabra: str) -> np.ndarray:
+            if palabra not in cache:
+                j = self._id_palabra[palabra]
+                c = np.zeros(n_c + 1, dtype=bool)
+                c[filas[limites[j]:limites[j + 1]]] = True
+                cache[palabra] = c
+            return cache[palabra]
+
+        aciertos = np.zeros((n_c + 1, len(self.nombres)), dtype=bool)
+        for r, arbol in enumerate(self._arboles):
+            aciertos[:, r] = _evaluar(arbol, columna)
+        return fila_de_unico[codigos], aciertos
+
+    # --- resultados ---
+
+    @medido("FiltroDescripciones.coincidencias")
+    def coincidencias(self, serie: pd.Series) -> pd.DataFrame:
+        """DataFrame bool (una columna por regla, mismo índice que la serie): True si la fila cumple la regla."""
+        fila, aciertos = self._reglas_unicas(serie)
+        return pd.DataFrame(aciertos[fila], index=serie.index, columns=self.nombres)
+
+    @medido("FiltroDescripciones.mascaras")
+    def mascaras(self, serie: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """
+        (eliminar, conservar): Series bool con el índice de la serie. eliminar es True
+        si la fila cumple alguna regla con acción "eliminar"; conservar = ~eliminar.
+        """
+        fila, aciertos = self._reglas_unicas(serie)
+        de_eliminar = np.array([a == "eliminar" for a in self.acciones], dtype=bool)
+        eliminar_u = aciertos[:, de_eliminar].any(axis=1)
+        eliminar = pd.Series(eliminar_u[fila], index=serie.index, name="eliminar")
+        return eliminar, ~eliminar.rename("conservar")
+
+    @medido("FiltroDescripciones.reglas_por_fila")
+    def reglas_por_fila(self, serie: pd.Series, separador: str = ";") -> pd.Series:
+        """Nombres de las reglas que cumple cada fila, unidos con 'separador' ("" si ninguna)."""
+        fila, aciertos = self._reglas_unicas(serie)
+        nombres = np.array(self.nombres, dtype=object)
+        textos = np.array([separador.join(nombres[a]) for a in aciertos], dtype=object)
+        return pd.Series(textos[fila], index=serie.index, name="reglas")
+
+    def filtrar(self, df: pd.DataFrame, col: str = "descripcion") -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(filas que se conservan, filas eliminadas) de df según la columna col."""
+        eliminar, conservar = self.mascaras(df[col])
+        return df[conservar.to_numpy()], df[eliminar.to_numpy()]
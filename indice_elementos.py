@@ -0,0 +1,209 @@
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parser_registros import registros_desde_lineas
+
+_VERSION_INDICE = 1
+CAMPOS_ELEMENTO = ("elem1", "elem2", "elem3")
+
+
+def _patron_indice(registro: str, campos: Sequence[str]) -> "re.Pattern":
+    """Una sola expresión para encontrar inicios de registro y sus campos identificativos."""
+    nombres = b"|".join(re.escape(c.encode()) for c in campos)
+    return re.compile(
+        rb"^[ \t]*(?:(?P<reg>" + re.escape(registro.encode()) + rb")"
+        rb"|\.(?P<campo>" + nombres + rb")[ \t]*=>[ \t]*(?P<valor>[^\r\n]*?))[ \t]*\r?$",
+        re.MULTILINE,
+    )
+
+
+def _firma(ruta: str, registro: str, campos: Sequence[str]) -> tuple:
+    st = os.stat(ruta)
+    return (st.st_size, st.st_mtime_ns, registro, tuple(campos))
+
+
+def construir_indice(
+    ruta: str,
+    registro: str = "ELEMENTO",
+    campos: Sequence[str] = CAMPOS_ELEMENTO,
+    ruta_indice: Optional[str] = None,
+    encoding: str = "utf-8",
+) -> pd.DataFrame:
+    """
+    Recorre el fichero una vez (mmap, sin cargarlo en memoria) y guarda un índice
+    con la posición en bytes de cada registro y sus campos identificativos.
+
+    Parámetros
+    ----------
+    ruta : fichero de volcado (bloques ELEMENTO ... separados por '#').
+    registro : palabra que abre cada registro.
+    campos : atributos del registro que se guardan en el índice (el primero que aparece).
+    ruta_indice : fichero del índice (por defecto ruta + ".idx").
+
+    Retorna
+    -------
+    DataFrame [offset, longitud, *campos], una fila por registro en orden de fichero.
+    """
+    campos = list(campos)
+    patron = _patron_indice(registro, campos)
+    filas = []
+    tam = os.path.getsize(ruta)
+    if tam:
+        with open(ruta, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            actual = None
+            for m in patron.finditer(mm):
+                if m.group("reg") is not None:
+                    actual = [m.start()] + [None] * len(campos)
+                    filas.append(actual)
+                elif actual is not None:
+                    i = campos.index(m.group("campo").decode()) + 1
+                    if actual[i] is None:
+                        actual[i] = m.group("valor").decode(encoding, "replace")
+
+    indice = pd.DataFrame(filas, columns=["offset"] + campos)
+    offsets = indice["offset"].to_numpy(dtype=np.int64)
+    indice.insert(1, "longitud", np.diff(np.r_[offsets, tam]).astype(np.int64))
+    indice["offset"] = offsets
+
+    pd.to_pickle(
+        {"version": _VERSION_INDICE, "firma": _firma(ruta, registro, campos), "indice": indice},
+        ruta_indice or ruta + ".idx",
+    )
+    return indice
+
+
+def cargar_indice(
+    ruta: str,
+    registro: str = "ELEMENTO",
+    campos: Sequence[str] = CAMPOS_ELEMENTO,
+    ruta_indice: Optional[str] = None,
+    encoding: str = "utf-8",
+) -> pd.DataFrame:
+    """Lee el índice del fichero; si no existe o el fichero ha cambiado, lo reconstruye."""
+    ruta_indice = ruta_indice or ruta + ".idx"
+    if os.path.exists(ruta_indice):
+        guardado = pd.read_pickle(ruta_indice)
+        if (
+            isinstance(guardado, dict)
+            and guardado.get("version") == _VERSION_INDICE
+            and guardado.get("firma") == _firma(ruta, registro, list(campos))
+        ):
+            return guardado["indice"]
+    return construir_indice(ruta, registro, campos, ruta_indice, encoding)
+
+
+def _leer_bytes(ruta: str, inicio: int, fin: int, encoding: str) -> List[str]:
+    with open(ruta, "rb") as f:
+        f.seek(inicio)
+        return f.read(fin - inicio).decode(encoding, "replace").splitlines()
+
+
+def leer_elemento(
+    ruta: str,
+    indice: Optional[pd.DataFrame] = None,
+    registro: str = "ELEMENTO",
+    encoding: str = "utf-8",
+    **filtros: str,
+) -> List[dict]:
+    """
+    Acceso directo: lee sólo los registros cuyos campos coinciden con los filtros
+    (p.ej. leer_elemento("util.txt", elem1="A", elem2="B")), sin recorrer el fichero.
+    Devuelve los registros parseados (dicts, ver parser_registros).
+    """
+    if indice is None:
+        indice = cargar_indice(ruta, registro, encoding=encoding)
+    sel = np.ones(len(indice), dtype=bool)
+    for campo, valor in filtros.items():
+        sel &= (indice[campo] == valor).to_numpy(dtype=bool)
+    out = []
+    for offset, longitud in indice.loc[sel, ["offset", "longitud"]].itertuples(index=False):
+        out.extend(registros_desde_lineas(_leer_bytes(ruta, offset, offset + longitud, encoding), registro))
+    return out
+
+
+def filas_caracteristicas(reg: dict, formato: str = "ancho") -> List[dict]:
+    """
+    Filas de un registro, agrupadas por tipo de bloque: los tipos en el orden en
+    que aparece su primer bloque y, dentro de cada tipo, sus bloques en orden de
+    fichero (el registro parseado guarda una lista por tipo, así que bloques de
+    tipos distintos intercalados en el fichero no salen intercalados).
+      - "ancho": una por bloque de característica -> campos del registro + bloque, num,
+                 ocurrencia (posición entre los bloques del mismo tipo) y sus atributos.
+      - "largo": una por atributo -> campos del registro + bloque, num, ocurrencia, atributo, valor.
+    """
+    cabecera = {k: v for k, v in reg.items() if not isinstance(v, list)}
+    filas = []
+    for bloque, lista in reg.items():
+        if not isinstance(lista, list):
+            continue
+        for ocurrencia, b in enumerate(lista):
+            base = dict(cabecera, bloque=bloque, num=b["_num"], ocurrencia=ocurrencia)
+            atributos = {k: v for k, v in b.items() if k != "_num" and not isinstance(v, list)}
+            if formato == "ancho":
+                base.update(atributos)
+                filas.append(base)
+            else:
+                filas.extend(dict(base, atributo=k, valor=v) for k, v in atributos.items())
+    return filas
+
+
+def _parsear_trozo(args: tuple) -> pd.DataFrame:
+    """Trabajo de un proceso: parsea los registros de un rango de bytes."""
+    ruta, inicio, fin, registro, formato, encoding = args
+    filas = []
+    for reg in registros_desde_lineas(_leer_bytes(ruta, inicio, fin, encoding), registro):
+        filas.extend(filas_caracteristicas(reg, formato))
+    return pd.DataFrame(filas)
+
+
+def _trozos(indice: pd.DataFrame, n_trozos: int) -> List[Tuple[int, int]]:
+    """Parte el fichero en rangos de bytes de tamaño parecido, siempre en límites de registro."""
+    if len(indice) == 0:
+        return []
+    offsets = indice["offset"].to_numpy()
+    fin_total = int(offsets[-1] + indice["longitud"].to_numpy()[-1])
+    objetivo = np.linspace(offsets[0], fin_total, n_trozos + 1)[1:-1]
+    cortes = np.unique(np.r_[offsets[0], offsets[np.minimum(np.searchsorted(offsets, objetivo), len(offsets) - 1)], fin_total])
+    return list(zip(cortes[:-1].tolist(), cortes[1:].tolist()))
+
+
+def leer_caracteristicas(
+    ruta: str,
+    formato: str = "ancho",
+    n_procesos: Optional[int] = None,
+    n_trozos: Optional[int] = None,
+    registro: str = "ELEMENTO",
+    encoding: str = "utf-8",
+) -> pd.DataFrame:
+    """
+    Parsea todo el fichero en paralelo (trozos en límites de registro, un proceso por trozo)
+    y junta las características en un DataFrame.
+
+    Parámetros
+    ----------
+    formato : "ancho" -> una fila por bloque de característica y una columna por atributo.
+              "largo" -> una fila por atributo: [campos del registro, bloque, num, ocurrencia, atributo, valor].
+    n_procesos : nº de procesos (None = nº de CPUs; 1 = sin procesos).
+    n_trozos : nº de trozos (por defecto 4 por proceso).
+    """
+    if formato not in ("ancho", "largo"):
+        raise ValueError("formato debe ser 'ancho' o 'largo'")
+    indice = cargar_indice(ruta, registro, encoding=encoding)
+    n_procesos = n_procesos or os.cpu_count() or 1
+    tareas = [(ruta, a, b, registro, formato, encoding) for a, b in _trozos(indice, n_trozos or 4 * n_procesos)]
+
+    if n_procesos == 1 or len(tareas) <= 1:
+        partes = [_parsear_trozo(t) for t in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=n_procesos) as ex:
+            partes = list(ex.map(_parsear_trozo, tareas))
+    partes = [p for p in partes if len(p)]
+    if not partes:
+        return pd.DataFrame()
+    return pd.concat(partes, ignore_index=True, sort=False)
@@ -1,20 +1,35 @@
+import glob
+import os
+
 import pandas as pd
 
-# Preguntar al usuario la ruta del archivo
-file_path = input("👉 Introduce la ruta del archivo CSV o Excel: ").strip()
+from carga_cache import cargar_tabla
+from carga_masiva import cargar_en_bloque
 
-try:
-    if file_path.endswith('.csv'):
-        df = pd.read_csv(file_path)
-    elif file_path.endswith(('.xlsx', '.xls')):
-        df = pd.read_excel(file_path)
-    else:
-        raise ValueError("Formato no reconocido. Usa .csv o .xlsx")
+# Para muchas conciliaciones seguidas (cierre mensual), en vez de una a una desde aquí:
+#   python lote_conciliaciones.py manifiesto.json --procesos 4 --salida resultados_cierre
+# El bloque va bajo __main__: la carga en bloque usa procesos y, en Windows,
+# cada proceso vuelve a importar este módulo.
+if __name__ == "__main__":
+    # Preguntar al usuario la ruta del archivo (o una carpeta / patrón como datos/*.xlsx)
+    file_path = input("👉 Introduce la ruta del archivo CSV o Excel (o carpeta / patrón): ").strip()
 
-    print(f"\n✅ Archivo cargado correctamente: {file_path}")
-    display(df.head())
+    try:
+        if os.path.isdir(file_path) or glob.has_magic(file_path):
+            # Carga en bloque: todos los libros y hojas en paralelo
+            df, informe = cargar_en_bloque(file_path)
+            errores = informe[informe["error"].notna()]
+            print(f"\n✅ {len(informe) - len(errores)} hojas cargadas ({len(df)} filas) desde: {file_path}")
+            if len(errores):
+                print(f"⚠️ {len(errores)} ficheros/hojas con error:")
+                display(errores)
+        else:
+            # Caché Parquet: la primera carga parsea el fichero, las siguientes leen la caché
+            df = cargar_tabla(file_path)
+            print(f"\n✅ Archivo cargado correctamente: {file_path}")
+        display(df.head())
 
-except FileNotFoundError:
-    print("❌ No se encontró el archivo. Verifica la ruta.")
-except Exception as e:
-    print(f"⚠️ Ocurrió un error: {e}")
+    except FileNotFoundError:
+        print("❌ No se encontró el archivo. Verifica la ruta.")
+    except Exception as e:
+        print(f"⚠️ Ocurrió un error: {e}")
@@ -0,0 +1,303 @@
+import functools
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+COLUMNAS_INFORME = [
+    "id", "padre", "ruta", "nombre", "nivel", "segundos", "cpu_segundos",
+    "filas_entrada", "filas_salida", "mem_entrada_mb", "mem_salida_mb", "pico_mb", "error",
+]
+_MB = 2 ** 20
+
+# Informe activo y etapa en curso (por hilo / tarea asyncio)
+_INFORME: ContextVar[Optional["Informe"]] = ContextVar("informe_instrumentacion", default=None)
+_ETAPA: ContextVar[Optional["_Etapa"]] = ContextVar("etapa_instrumentacion", default=None)
+
+
+def _tablas(obj: Any) -> List[Union[pd.DataFrame, pd.Series]]:
+    """DataFrames / Series contenidos en obj (directamente o en una lista, tupla o dict)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return [obj]
+    if isinstance(obj, (list, tuple)):
+        return [t for x in obj if isinstance(x, (pd.DataFrame, pd.Series, list, tuple)) for t in _tablas(x)]
+    if isinstance(obj, dict):
+        return _tablas(list(obj.values()))
+    return []
+
+
+def _filas(obj: Any) -> Optional[int]:
+    tablas = _tablas(obj)
+    return sum(len(t) for t in tablas) if tablas else None
+
+
+def _memoria_mb(obj: Any, profunda: bool) -> Optional[float]:
+    tablas = _tablas(obj)
+    if not tablas:
+        return None
+    total = 0
+    for t in tablas:
+        uso = t.memory_usage(index=True, deep=profunda)
+        total += int(uso.sum()) if isinstance(uso, pd.Series) else int(uso)
+    return total / _MB
+
+
+class Informe:
+    """
+    Registros de una ejecución instrumentada: uno por llamada o etapa, en orden de fin.
+
+    Cada registro: id, padre (id de la etapa que la contiene), ruta ("comparar_tablas/merge"),
+    nombre, nivel, segundos (reloj), cpu_segundos (CPU del proceso), filas_entrada,
+    filas_salida, mem_entrada_mb / mem_salida_mb (memoria de los DataFrames de entrada
+    y salida), pico_mb (pico de memoria de la etapa sobre la del inicio; None sin
+    tracemalloc) y error (tipo de excepción si falló).
+    """
+
+    def __init__(self, memoria_profunda: bool = False):
+        self.memoria_profunda = memoria_profunda
+        self.registros: List[Dict[str, Any]] = []
+        self._siguiente_id = 0
+
+    def a_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.registros, columns=COLUMNAS_INFORME)
+
+    def resumen(self) -> pd.DataFrame:
+        """Totales por ruta: llamadas, segundos, cpu_segundos, filas y pico máximo."""
+        return _resumen(self.a_dataframe())
+
+    def a_json(self, ruta: Optional[str] = None) -> str:
+        texto = json.dumps({"registros": self.registros}, indent=2, ensure_ascii=False, default=str)
+        if ruta is not None:
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(texto)
+        return texto
+
+    @classmethod
+    def desde_json(cls, fuente: str) -> "Informe":
+        """Lee un informe guardado con a_json (ruta de fichero o el propio texto JSON)."""
+        if fuente.lstrip().startswith("{"):
+            texto = fuente
+        else:
+            with open(fuente, "r", encoding="utf-8") as f:
+                texto = f.read()
+        inf = cls()
+        inf.registros = json.loads(texto)["registros"]
+        inf._siguiente_id = len(inf.registros)
+        return inf
+
+
+class _Etapa:
+    """Una llamada o etapa en curso. salida(obj) registra las filas / memoria del resultado."""
+
+    def __init__(self, informe: Informe, nombre: str, entrada: Any):
+        self.informe = informe
+        self.nombre = nombre
+        self.entrada = entrada
+        self._salida = None
+
+    def salida(self, obj: Any) -> Any:
+        self._salida = obj
+        return obj
+
+    def __enter__(self) -> "_Etapa":
+        inf = self.informe
+        self.padre = _ETAPA.get()
+        self.id = inf._siguiente_id
+        inf._siguiente_id += 1
+        self.ruta = self.nombre if self.padre is None else f"{self.padre.ruta}/{self.nombre}"
+        self.nivel = 0 if self.padre is None else self.padre.nivel + 1
+        self.filas_entrada = _filas(self.entrada)
+        self.mem_entrada = _memoria_mb(self.entrada, inf.memoria_profunda)
+        self.entrada = None  # no retener los DataFrames de entrada
+        self._pico_hijas = 0
+        self._traza = tracemalloc.is_tracing()
+        if self._traza:
+            self._mem_inicio, pico_previo = tracemalloc.get_traced_memory()
+            # reset_peak borra el pico que llevaba la etapa padre: se le guarda aparte
+            if self.padre is not None:
+                self.padre._pico_hijas = max(self.padre._pico_hijas, pico_previo)
+            tracemalloc.reset_peak()
+        self._token = _ETAPA.set(self)
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        return self
+
+    def __exit__(self, tipo, valor, traza) -> bool:
+        segundos = time.perf_counter() - self._t0
+        cpu = time.process_time() - self._cpu0
+        _ETAPA.reset(self._token)
+        pico = None
+        if self._traza and tracemalloc.is_tracing():
+            pico_abs = max(tracemalloc.get_traced_memory()[1], self._pico_hijas)
+            pico = max(0, pico_abs - self._mem_inicio) / _MB
+            if self.padre is not None:
+                self.padre._pico_hijas = max(self.padre._pico_hijas, pico_abs)
+        self.informe.registros.append({
+            "id": self.id,
+            "padre": None if self.padre is None else self.padre.id,
+            "ruta": self.ruta,
+            "nombre": self.nombre,
+            "nivel": self.nivel,
+            "segundos": segundos,
+            "cpu_segundos": cpu,
+            "filas_entrada": self.filas_entrada,
+            "filas_salida": _filas(self._salida),
+            "mem_entrada_mb": self.mem_entrada,
+            "mem_salida_mb": _memoria_mb(self._salida, self.informe.memoria_profunda),
+            "pico_mb": pico,
+            "error": None if tipo is None else tipo.__name__,
+        })
+        self._salida = None
+        return False
+
+
+class _EtapaNula:
+    """Etapa cuando no hay instrumentación activa: no mide nada."""
+
+    def salida(self, obj: Any) -> Any:
+        return obj
+
+    def __enter__(self) -> "_EtapaNula":
+        return self
+
+    def __exit__(self, tipo, valor, traza) -> bool:
+        return False
+
+
+_NULA = _EtapaNula()
+
+
+def activa() -> bool:
+    """True si hay un informe recogiendo medidas en este contexto."""
+    return _INFORME.get() is not None
+
+
+def etapa(nombre: str, entrada: Any = None) -> Union[_Etapa, _EtapaNula]:
+    """
+    Context manager para medir una parte de una función (sub-etapa). Sin
+    instrumentación activa no hace nada (coste: una consulta a un ContextVar).
+
+        with etapa("merge", entrada=[izq, der]) as e:
+            merged = izq.merge(der, ...)
+            e.salida(merged)
+
+    entrada / salida: DataFrames, Series o listas/tuplas/dicts de ellos (para
+    contar filas y memoria); cualquier otro valor se ignora.
+    """
+    inf = _INFORME.get()
+    if inf is None:
+        return _NULA
+    return _Etapa(inf, nombre, entrada)
+
+
+def medido(nombre: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorador: mide cada llamada a la función como una etapa (nombre por defecto:
+    el de la función). Las filas de entrada son las de los DataFrames/Series pasados
+    como argumentos; las de salida, las del resultado (o de la tupla de resultados).
+    """
+    def decorador(funcion: Callable) -> Callable:
+        nombre_etapa = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inf = _INFORME.get()
+            if inf is None:
+                return funcion(*args, **kwargs)
+            with _Etapa(inf, nombre_etapa, [args, kwargs]) as e:
+                return e.salida(funcion(*args, **kwargs))
+        return envoltura
+    return decorador
+
+
+@contextmanager
+def instrumentar(trazar_memoria: bool = True, memoria_profunda: bool = False) -> Iterator[Informe]:
+    """
+    Activa la instrumentación dentro del bloque y devuelve el informe.
+
+        with instrumentar() as informe:
+            res = comparar_tablas(izq, der, keys)
+        informe.a_dataframe()      # una fila por llamada / etapa
+        informe.a_json("hoy.json")
+
+    Parámetros
+    ----------
+    trazar_memoria : mide el pico de memoria de cada etapa con tracemalloc (ralentiza
+                     la ejecución; no cuenta la memoria de Arrow). Si tracemalloc ya
+                     estaba activo se usa tal cual y no se para al salir.
+    memoria_profunda : memory_usage(deep=True) para mem_entrada_mb / mem_salida_mb
+                       (incluye los textos de las columnas object; más lento).
+    """
+    informe = Informe(memoria_profunda)
+    iniciado = trazar_memoria and not tracemalloc.is_tracing()
+    if iniciado:
+        tracemalloc.start()
+    token_inf = _INFORME.set(informe)
+    token_etapa = _ETAPA.set(None)
+    try:
+        yield informe
+    finally:
+        _ETAPA.reset(token_etapa)
+        _INFORME.reset(token_inf)
+        if iniciado:
+            tracemalloc.stop()
+
+
+def _resumen(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame(columns=["ruta", "llamadas", "segundos", "cpu_segundos", "filas_entrada", "filas_salida", "pico_mb"])
+    return (
+        df.groupby("ruta", sort=False)
+        .agg(
+            llamadas=("id", "size"),
+            segundos=("segundos", "sum"),
+            cpu_segundos=("cpu_segundos", "sum"),
+            filas_entrada=("filas_entrada", "sum"),
+            filas_salida=("filas_salida", "sum"),
+            pico_mb=("pico_mb", "max"),
+        )
+        .reset_index()
+    )
+
+
+def comparar_informes(
+    antes: Union[Informe, str],
+    despues: Union[Informe, str],
+    tolerancia: float = 0.25,
+) -> pd.DataFrame:
+    """
+    Compara dos ejecuciones etapa a etapa (por ruta).
+
+    Parámetros
+    ----------
+    antes, despues : Informe o JSON guardado con Informe.a_json.
+    tolerancia : cambio relativo a partir del cual se marca "MAS_LENTO" / "MAS_RAPIDO".
+
+    Retorna
+    -------
+    DataFrame [ruta, segundos_antes, segundos_despues, ratio_segundos, filas_entrada_antes,
+    filas_entrada_despues, pico_mb_antes, pico_mb_despues, cambio], ordenado por la
+    diferencia de tiempo (lo que más ha empeorado primero). cambio: "MAS_LENTO",
+    "MAS_RAPIDO", "IGUAL", "NUEVA" o "DESAPARECE".
+    """
+    a = antes if isinstance(antes, Informe) else Informe.desde_json(antes)
+    d = despues if isinstance(despues, Informe) else Informe.desde_json(despues)
+    cols = ["ruta", "segundos", "filas_entrada", "pico_mb"]
+    out = _resumen(a.a_dataframe())[cols].merge(
+        _resumen(d.a_dataframe())[cols], on="ruta", how="outer", suffixes=("_antes", "_despues"), indicator=True,
+    )
+    out["ratio_segundos"] = out["segundos_despues"] / out["segundos_antes"]
+    out["cambio"] = "IGUAL"
+    out.loc[out["ratio_segundos"] > 1 + tolerancia, "cambio"] = "MAS_LENTO"
+    out.loc[out["ratio_segundos"] < 1 / (1 + tolerancia), "cambio"] = "MAS_RAPIDO"
+    out.loc[out["_merge"] == "right_only", "cambio"] = "NUEVA"
+    out.loc[out["_merge"] == "left_only", "cambio"] = "DESAPARECE"
+    orden = (out["segundos_despues"].fillna(0) - out["segundos_antes"].fillna(0)).sort_values(ascending=False).index
+    return out.loc[orden, [
+        "ruta", "segundos_antes", "segundos_despues", "ratio_segundos",
+        "filas_entrada_antes", "filas_entrada_despues", "pico_mb_antes", "pico_mb_despues", "cambio",
+    ]].reset_index(drop=True)
@@ -0,0 +1,107 @@
+from typing import Any, Callable, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from claves_hash import hash_claves
+
+
+def eliminar_columnas(df: pd.DataFrame, columnas: Iterable[str], errores: str = "ignore") -> pd.DataFrame:
+    """
+    errores: "ignore" no falla si no existe la columna; "raise" para forzar error.
+    """
+    df = df.copy()
+    return df.drop(columns=list(columnas), errors=errores)
+
+
+def construir_columna(
+    df: pd.DataFrame,
+    columnas: Iterable[str],
+    nombre_col: str,
+    separador: str = "-",
+    hash_bits: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Crea un Columna concatenando otras columnas como strings (tras trim). NaN -> "".
+
+    Con hash_bits=64 la columna es, en vez del texto, un entero uint64 con el hash
+    de esas mismas piezas de texto (ver claves_hash.hash_claves): dos filas con las
+    mismas piezas tienen el mismo hash, y los cruces se hacen por una sola columna
+    entera. Con hash_bits=128 se crean dos columnas: nombre_col y nombre_col + "_2".
+    """
+    df = df.copy()
+    for nombre, valores in _columnas_construidas(df, columnas, nombre_col, separador, hash_bits).items():
+        df[nombre] = valores
+    return df
+
+
+def _columnas_construidas(df, columnas: Iterable[str], nombre_col: str, separador: str, hash_bits: Optional[int]) -> dict:
+    """Columnas nuevas de construir_columna (nombre -> valores), sin tocar df."""
+    # NaN -> "" antes de pasar a texto (astype(str) los convertiría en "nan")
+    piezas = [df[c].astype(str).where(df[c].notna(), "").str.strip() for c in columnas]
+    if hash_bits:
+        h = hash_claves(pd.DataFrame(dict(enumerate(piezas))), list(range(len(piezas))), hash_bits)
+        if h.ndim == 1:
+            return {nombre_col: h}
+        return {nombre_col: h[:, 0], f"{nombre_col}_2": h[:, 1]}
+    return {nombre_col: piezas[0].str.cat(piezas[1:], sep=separador) if len(piezas) > 1 else piezas[0]}
+
+
+def añade_col_condicional(
+    df: pd.DataFrame,
+    nombre_columna: str,
+    condicion: Union[str, Callable[[pd.DataFrame], Any]],
+    valor_si: Any,
+    valor_no: Any
+) -> pd.DataFrame:
+    """
+    Añade una nueva columna con valores definidos por una condición.
+
+    Parámetros:
+    -----------
+    df : pd.DataFrame
+        DataFrame original.
+    nombre_columna : str
+        Nombre de la columna nueva.
+    condicion : str o función
+        Condición a evaluar sobre df (debe devolver una Serie booleana).
+        Mejor como función (sin eval): lambda df: df['f inst'].isna()
+        o una Condicion de pipeline_limpieza: col("f inst").isna()
+        Como texto (se evalúa con eval): "df['f inst'].isna()"
+    valor_si : any
+        Valor asignado si la condición se cumple (True).
+    valor_no : any
+        Valor asignado si la condición no se cumple (False).
+
+    Retorna:
+    --------
+    DataFrame con la nueva columna añadida.
+    """
+    df = df.copy()
+    try:
+        if callable(condicion):
+            mask = condicion(df)
+        else:
+            mask = eval(condicion, {"np": np, "pd": pd, "df": df})
+        if not isinstance(mask, (pd.Series, np.ndarray, list)):
+            raise ValueError("La condición debe devolver una serie booleana.")
+        df[nombre_columna] = np.where(mask, valor_si, valor_no)
+    except Exception as e:
+        raise ValueError(f"Error al evaluar la condición: {e}")
+    return df
+
+
+def limpia_f_inst_si_hueco(df: pd.DataFrame, col_estado: str = "es_hueco", col_fecha: str = "f inst") -> pd.DataFrame:
+    """
+    Si el valor de col_estado == 'D', entonces col_fecha se deja vacío (NaN).
+    """
+    df = df.copy()
+    if col_estado not in df.columns or col_fecha not in df.columns:
+        raise ValueError(f"Las columnas '{col_estado}' y '{col_fecha}' deben existir en el DataFrame.")
+
+    df.loc[_es_hueco(df[col_estado]), col_fecha] = np.nan
+    return df
+
+
+def _es_hueco(estado: pd.Series) -> pd.Series:
+    return estado.astype(str).str.upper() == "D"
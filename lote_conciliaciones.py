@@ -0,0 +1,357 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from carga_cache import cargar_tabla
+from comparar_tablas_mejorado import EstadoComparacion, codigos_estado, comparar_tablas
+
+# Argumentos de un trabajo que se pasan tal cual a comparar_tablas
+_ARGS_COMPARAR = (
+    "keys", "include_left", "include_right", "left_name", "right_name",
+    "compare_on", "normalize_text_on", "strip", "lower", "atol", "rtol", "codigos_exactos",
+)
+# Campos que en un manifiesto CSV / Excel son listas separadas por ';'
+_CAMPOS_LISTA = ("keys", "include_left", "include_right", "compare_on", "normalize_text_on")
+_CAMPOS_RUTA = ("left", "right")
+FORMATOS_SALIDA = ("parquet", "excel", "csv", "ninguna")
+CHECKPOINT_DEFECTO = "checkpoint.jsonl"
+RESUMEN_DEFECTO = "resumen.csv"
+
+
+def _valor_tabla(campo: str, v):
+    """Celda de un manifiesto CSV / Excel -> valor del trabajo (vacías fuera, listas con ';')."""
+    if v is None or (isinstance(v, float) and np.isnan(v)) or (isinstance(v, str) and not v.strip()):
+        return None
+    if campo in _CAMPOS_LISTA:
+        return [p.strip() for p in str(v).split(";") if p.strip()]
+    if campo in ("strip", "lower", "codigos_exactos") and isinstance(v, str):
+        return v.strip().lower() in ("1", "true", "si", "sí", "s", "x")
+    if campo in ("atol", "rtol"):
+        return float(v)
+    if campo in ("hoja_left", "hoja_right") and isinstance(v, str) and v.strip().isdigit():
+        return int(v)  # posición de la hoja ("0" en un CSV); cualquier otro texto es el nombre
+    if campo.startswith("dtypes_") and isinstance(v, str):
+        return json.loads(v)
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+
+def leer_manifiesto(ruta: str) -> List[dict]:
+    """
+    Lee un manifiesto de trabajos y devuelve la lista de trabajos (dicts) completa:
+    con los valores por defecto aplicados, rutas absolutas y nombre único.
+
+    Formatos:
+      - JSON: lista de trabajos, o {"defaults": {...}, "trabajos": [...]}.
+      - CSV / Excel: una fila por trabajo y una columna por campo; las listas
+        (keys, compare_on, include_left...) separadas por ';' y los dtypes como JSON.
+
+    Campos de un trabajo:
+      nombre : identificador único (por defecto "<fichero left>__<fichero right>").
+      left, right : ficheros a reconciliar (.csv, .xlsx, .xls, .parquet). Las rutas
+                    relativas son relativas a la carpeta del manifiesto.
+      hoja_left, hoja_right : hoja de Excel (por defecto la primera).
+      dtypes_left, dtypes_right : tipos por columna al cargar (p.ej. {"pn": "string"}).
+      salida : "parquet" (por defecto), "excel", "csv" o "ninguna" (sólo contar).
+      keys, compare_on, include_left, include_right, left_name, right_name,
+      normalize_text_on, strip, lower, atol, rtol, codigos_exactos : los de comparar_tablas.
+
+    Ejemplo (JSON)
+    --------------
+        {"defaults": {"keys": ["pn", "sn"], "compare_on": ["cantidad"], "atol": 0.01,
+                      "left_name": "RDCD", "right_name": "INV"},
+         "trabajos": [
+            {"nombre": "A320_MAD", "left": "rdcd/A320_MAD.xlsx", "right": "inv/A320_MAD.xlsx"},
+            {"nombre": "A320_BCN", "left": "rdcd/A320_BCN.xlsx", "right": "inv/A320_BCN.xlsx", "salida": "excel"}
+         ]}
+    """
+    base = os.path.dirname(os.path.abspath(ruta))
+    if ruta.lower().endswith(".json"):
+        with open(ruta, "r", encoding="utf-8") as f:
+            contenido = json.load(f)
+        if isinstance(contenido, dict):
+            defaults, trabajos = contenido.get("defaults", {}), contenido.get("trabajos", [])
+        else:
+            defaults, trabajos = {}, contenido
+        trabajos = [{**defaults, **t} for t in trabajos]
+    else:
+        tabla = pd.read_csv(ruta, dtype=str) if ruta.lower().endswith(".csv") else pd.read_excel(ruta, dtype=object)
+        trabajos = [
+            {c: _valor_tabla(c, v) for c, v in fila.items() if _valor_tabla(c, v) is not None}
+            for fila in tabla.to_dict("records")
+        ]
+
+    for t in trabajos:
+        faltan = [c for c in ("left", "right", "keys") if not t.get(c)]
+        if faltan:
+            raise ValueError(f"Trabajo sin {faltan}: {t}")
+        for c in _CAMPOS_RUTA:
+            t[c] = os.path.normpath(os.path.join(base, t[c]))
+        if isinstance(t["keys"], str):
+            t["keys"] = [t["keys"]]
+        t.setdefault("nombre", f"{os.path.splitext(os.path.basename(t['left']))[0]}__"
+                               f"{os.path.splitext(os.path.basename(t['right']))[0]}")
+        t.setdefault("salida", "parquet")
+        if t["salida"] not in FORMATOS_SALIDA:
+            raise ValueError(f"Trabajo '{t['nombre']}': salida debe ser una de {FORMATOS_SALIDA}.")
+
+    nombres = pd.Series([t["nombre"] for t in trabajos], dtype=object)
+    repetidos = sorted(nombres[nombres.duplicated()].unique())
+    if repetidos:
+        raise ValueError(f"Nombres de trabajo repetidos en el manifiesto: {repetidos}")
+    return trabajos
+
+
+def firma_trabajo(trabajo: dict) -> str:
+    """Firma de la definición del trabajo y de sus ficheros (tamaño + fecha de modificación)."""
+    ficheros = []
+    for c in _CAMPOS_RUTA:
+        st = os.stat(trabajo[c]) if os.path.exists(trabajo[c]) else None
+        ficheros.append((trabajo[c], st.st_size, st.st_mtime_ns) if st else (trabajo[c], None, None))
+    texto = json.dumps([trabajo, ficheros], sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _leer_lado(ruta: str, hoja, dtypes: Optional[dict]) -> pd.DataFrame:
+    if ruta.lower().endswith((".parquet", ".pq")):
+        df = pd.read_parquet(ruta)
+        return df.astype(dtypes) if dtypes else df
+    # CSV / Excel por la caché Parquet: en el cierre siguiente (o al reanudar) no se vuelve a parsear
+    return cargar_tabla(ruta, 0 if hoja is None else hoja, dtypes=dtypes)
+
+
+def _escribir_salida(res: pd.DataFrame, trabajo: dict, dir_salida: str) -> Optional[str]:
+    """Guarda el resultado del trabajo; los ficheros se escriben aparte y se renombran al terminar."""
+    from exportar_resultados import exportar_excel, exportar_parquet
+
+    formato = trabajo["salida"]
+    nombres = {k: trabajo[k] for k in ("left_name", "right_name") if k in trabajo}
+    if formato == "ninguna":
+        return None
+    if formato == "parquet":
+        ruta = os.path.join(dir_salida, trabajo["nombre"])
+        exportar_parquet(res, ruta, **nombres)
+        return ruta
+    ruta = os.path.join(dir_salida, f"{trabajo['nombre']}.{'xlsx' if formato == 'excel' else 'csv'}")
+    temporal = ruta + ".tmp"
+    if formato == "excel":
+        exportar_excel(res, temporal, **nombres)
+    else:
+        res.to_csv(temporal, index=False)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def ejecutar_trabajo(trabajo: dict, dir_salida: str) -> dict:
+    """
+    Ejecuta un trabajo (leer, comparar_tablas, guardar) y devuelve su resumen.
+    Un error no se propaga: queda en el resumen con estado "error".
+    """
+    t0 = time.perf_counter()
+    r = {
+        "nombre": trabajo["nombre"], "estado": "error", "inicio": datetime.now().isoformat(timespec="seconds"),
+        "segundos": 0.0, "segundos_leer": 0.0, "segundos_comparar": 0.0, "segundos_guardar": 0.0,
+        "filas_left": 0, "filas_right": 0, "filas_resultado": 0,
+        **{e.name: 0 for e in EstadoComparacion},
+        "salida": None, "error": None, "pid": os.getpid(),
+    }
+    try:
+        t = time.perf_counter()
+        left = _leer_lado(trabajo["left"], trabajo.get("hoja_left"), trabajo.get("dtypes_left"))
+        right = _leer_lado(trabajo["right"], trabajo.get("hoja_right"), trabajo.get("dtypes_right"))
+        r.update(filas_left=len(left), filas_right=len(right), segundos_leer=time.perf_counter() - t)
+
+        t = time.perf_counter()
+        kwargs = {k: trabajo[k] for k in _ARGS_COMPARAR if k in trabajo}
+        res = comparar_tablas(left, right, **kwargs)
+        del left, right
+        codigos = codigos_estado(res["estado"], kwargs.get("left_name", "left"), kwargs.get("right_name", "right"))
+        conteo = np.bincount(codigos[codigos >= 0], minlength=len(EstadoComparacion))
+        r.update({e.name: int(conteo[e]) for e in EstadoComparacion})
+        r.update(filas_resultado=len(res), segundos_comparar=time.perf_counter() - t)
+
+        t = time.perf_counter()
+        r["salida"] = _escribir_salida(res, trabajo, dir_salida)
+        r.update(segundos_guardar=time.perf_counter() - t, estado="ok")
+    except Exception as e:
+        r["error"] = f"{type(e).__name__}: {e}"
+        r["traceback"] = traceback.format_exc()
+    r["segundos"] = time.perf_counter() - t0
+    return r
+
+
+def _ejecutar_trabajo_args(args: tuple) -> dict:
+    """Trabajo de un proceso del pool."""
+    return ejecutar_trabajo(*args)
+
+
+def leer_checkpoint(ruta: str) -> Dict[str, dict]:
+    """Última línea de cada trabajo en el checkpoint (una línea a medio escribir se ignora)."""
+    ultimos: Dict[str, dict] = {}
+    if not os.path.exists(ruta):
+        return ultimos
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                r = json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+            ultimos[r["nombre"]] = r
+    return ultimos
+
+
+def _anotar(ruta: str, r: dict) -> None:
+    """Añade un trabajo terminado al checkpoint y lo fuerza a disco antes de seguir."""
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _tamano(trabajo: dict) -> int:
+    return sum(os.path.getsize(trabajo[c]) for c in _CAMPOS_RUTA if os.path.exists(trabajo[c]))
+
+
+def _resultados(
+    pendientes: List[dict],
+    dir_salida: str,
+    n_procesos: int,
+) -> Iterator[dict]:
+    """Ejecuta los trabajos (en un pool de como mucho n_procesos) y los devuelve según terminan."""
+    if n_procesos == 1 or len(pendientes) <= 1:
+        for t in pendientes:
+            yield ejecutar_trabajo(t, dir_salida)
+        return
+    with ProcessPoolExecutor(max_workers=n_procesos) as ex:
+        futuros = {ex.submit(_ejecutar_trabajo_args, (t, dir_salida)): t for t in pendientes}
+        for fut in as_completed(futuros):
+            try:
+                yield fut.result()
+            except Exception as e:  # el proceso murió (memoria, etc.): el trabajo queda como error
+                yield {"nombre": futuros[fut]["nombre"], "estado": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+def ejecutar_lote(
+    trabajos: List[dict],
+    dir_salida: str,
+    n_procesos: Optional[int] = None,
+    checkpoint: Optional[str] = None,
+    reiniciar: bool = False,
+    solo: Optional[List[str]] = None,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """
+    Ejecuta muchas conciliaciones (comparar_tablas) en paralelo y de forma reanudable.
+
+    - Los trabajos se reparten en un pool de n_procesos procesos; los más grandes
+      (por tamaño de fichero) se lanzan primero para que el lote no acabe
+      esperando a uno grande lanzado al final.
+    - Cada trabajo terminado (ok o error) se añade como una línea JSON al
+      checkpoint. Al volver a lanzar el lote se saltan los trabajos ya "ok" cuya
+      definición y ficheros no han cambiado; los que fallaron se reintentan.
+    - Al final se escribe el resumen (tiempos y filas por estado de cada trabajo)
+      en dir_salida/resumen.csv.
+
+    Como usa procesos, en un script la llamada debe ir bajo
+    'if __name__ == "__main__":' (en Windows cada proceso reimporta el módulo).
+
+    Parámetros
+    ----------
+    trabajos : lista de trabajos (ver leer_manifiesto).
+    dir_salida : carpeta de resultados, checkpoint y resumen (se crea).
+    n_procesos : procesos en paralelo (None = nº de CPUs; 1 = sin procesos).
+    checkpoint : fichero JSONL de trabajos terminados (por defecto dir_salida/checkpoint.jsonl).
+    reiniciar : si True, borra el checkpoint y ejecuta todo de nuevo.
+    solo : ejecuta sólo estos trabajos (por nombre); el resumen sigue siendo el de todo el lote.
+    verbose : imprime una línea por trabajo terminado.
+
+    Retorna
+    -------
+    DataFrame resumen: una fila por trabajo del lote con [nombre, estado, segundos,
+    segundos_leer, segundos_comparar, segundos_guardar, filas_left, filas_right,
+    filas_resultado, OK, DISCREPANCIA, SOLO_IZQUIERDA, SOLO_DERECHA, salida, error, reanudado].
+    """
+    os.makedirs(dir_salida, exist_ok=True)
+    checkpoint = checkpoint or os.path.join(dir_salida, CHECKPOINT_DEFECTO)
+    if reiniciar and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    hechos = leer_checkpoint(checkpoint)
+    firmas = {t["nombre"]: firma_trabajo(t) for t in trabajos}
+    desconocidos = sorted(set(solo or ()) - set(firmas))
+    if desconocidos:
+        raise ValueError(f"Trabajos desconocidos: {desconocidos}")
+    pendientes = [
+        t for t in trabajos
+        if (solo is None or t["nombre"] in solo) and not (hechos.get(t["nombre"], {}).get("estado") == "ok" and hechos[t["nombre"]].get("firma") == firmas[t["nombre"]])
+    ]
+    pendientes.sort(key=_tamano, reverse=True)
+    if verbose:
+        print(f"{len(trabajos)} trabajos en el lote, {len(pendientes)} por hacer")
+
+    t0 = time.perf_counter()
+    nuevos = set()
+    for i, r in enumerate(_resultados(pendientes, dir_salida, n_procesos or os.cpu_count() or 1), 1):
+        r["firma"] = firmas[r["nombre"]]
+        _anotar(checkpoint, r)
+        hechos[r["nombre"]] = r
+        nuevos.add(r["nombre"])
+        if verbose:
+            detalle = r["error"] if r["estado"] != "ok" else f"{r.get('filas_resultado', 0):,} filas"
+            print(f"[{i}/{len(pendientes)}] {r['nombre']:40s} {r['estado']:5s} {r.get('segundos', 0.0):8.1f} s  {detalle}")
+
+    resumen = resumen_lote(trabajos, hechos, nuevos)
+    resumen.to_csv(os.path.join(dir_salida, RESUMEN_DEFECTO), index=False)
+    if verbose:
+        errores = int((resumen["estado"] != "ok").sum())
+        print(f"Lote terminado en {time.perf_counter() - t0:.1f} s: {len(resumen) - errores} ok, {errores} con error")
+        print(resumen[[e.name for e in EstadoComparacion]].sum().to_string())
+    return resumen
+
+
+def resumen_lote(trabajos: List[dict], hechos: Dict[str, dict], nuevos: Optional[set] = None) -> pd.DataFrame:
+    """Una fila por trabajo (en el orden del manifiesto) con su última ejecución del checkpoint."""
+    columnas = [
+        "nombre", "estado", "segundos", "segundos_leer", "segundos_comparar", "segundos_guardar",
+        "filas_left", "filas_right", "filas_resultado", *[e.name for e in EstadoComparacion], "salida", "error",
+    ]
+    filas = [{**hechos.get(t["nombre"], {"estado": "pendiente"}), "nombre": t["nombre"]} for t in trabajos]
+    resumen = pd.DataFrame(filas).reindex(columns=columnas)
+    conteos = ["filas_left", "filas_right", "filas_resultado", *[e.name for e in EstadoComparacion]]
+    resumen[conteos] = resumen[conteos].fillna(0).astype("int64")
+    resumen["reanudado"] = resumen["nombre"].isin(set(hechos) - set(nuevos or ()))
+    return resumen
+
+
+def main(argv: Optional[List[str]] = None, prog: str = "python lote_conciliaciones.py") -> int:
+    p = argparse.ArgumentParser(
+        prog=prog,
+        description="Ejecuta en paralelo las conciliaciones (comparar_tablas) de un manifiesto, con checkpoint para reanudar.",
+    )
+    p.add_argument("manifiesto", help="manifiesto de trabajos (.json, .csv o .xlsx)")
+    p.add_argument("--salida", default="resultados_lote", help="carpeta de resultados (por defecto resultados_lote)")
+    p.add_argument("--procesos", type=int, default=None, help="procesos en paralelo (por defecto nº de CPUs)")
+    p.add_argument("--checkpoint", help=f"fichero de checkpoint (por defecto <salida>/{CHECKPOINT_DEFECTO})")
+    p.add_argument("--reiniciar", action="store_true", help="ignora el checkpoint y ejecuta todo de nuevo")
+    p.add_argument("--solo", nargs="*", help="ejecuta sólo estos trabajos (por nombre)")
+    args = p.parse_args(argv)
+
+    trabajos = leer_manifiesto(args.manifiesto)
+    resumen = ejecutar_lote(trabajos, args.salida, args.procesos, args.checkpoint, args.reiniciar, args.solo)
+    hechos = resumen if not args.solo else resumen[resumen["nombre"].isin(args.solo)]
+    return 0 if (hechos["estado"] == "ok").all() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import re
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from instrumentacion import medido
+
+# Una sola expresión clasifica cada valor por su forma:
+#   - serial Excel:           45123 / 45123.5
+#   - año delante:            YYYY/MM/DD o YYYY/DD/MM
+#   - año detrás:             DD/MM/YYYY o MM/DD/YYYY (año de 2 o 4 cifras)
+# con separadores / - . y hora opcional (HH:MM[:SS[.fff]] [AM|PM]).
+_PATRON_FECHA = re.compile(
+    r"""^\s*(?:
+        (?P<serial>\d+(?:\.\d+)?)
+      | (?P<y4>\d{4})[/.\-](?P<a2>\d{1,2})[/.\-](?P<a3>\d{1,2})
+      | (?P<b1>\d{1,2})[/.\-](?P<b2>\d{1,2})[/.\-](?P<by>\d{4}|\d{2})
+    )
+    (?:[ T]+(?P<hh>\d{1,2}):(?P<mi>\d{2})(?::(?P<ss>\d{2})(?:[.,](?P<fr>\d{1,9}))?)?\s*(?P<ampm>[AaPp][Mm])?)?
+    \s*$""",
+    re.VERBOSE,
+)
+
+# Mayor serial Excel admitido (31/12/9999)
+_SERIAL_MAX = 2958465
+_ORIGEN_EXCEL = "1899-12-30"
+
+INTERPRETACIONES = ["excel", "ymd", "ydm", "dmy", "mdy", "otro"]
+
+
+def _compon(anio, mes, dia, hh, mi, ss, us) -> pd.Series:
+    """Construye fechas a partir de componentes numéricos (NaT si no son válidas)."""
+    partes = pd.DataFrame({
+        "year": anio, "month": mes, "day": dia,
+        "hour": hh, "minute": mi, "second": ss, "us": us,
+    })
+    validas = partes[["year", "month", "day"]].notna().all(axis=1).to_numpy()
+    out = pd.Series(pd.NaT, index=partes.index, dtype="datetime64[ns]")
+    if validas.any():
+        out[validas] = pd.to_datetime(partes[validas].astype("int64"), errors="coerce").to_numpy()
+    return out
+
+
+def _parsear_otros(valores: pd.Series, dayfirst: bool) -> pd.Series:
+    """
+    Formatos no reconocidos: último recurso con el parser general de pandas.
+    Los valores con zona horaria ("2024-01-05T10:00:00+02:00") se pasan a UTC y
+    se quedan sin zona, como el resto de fechas. ISO 8601 se lee siempre año-mes-día
+    (dayfirst no se aplica).
+    """
+    try:
+        fechas = pd.to_datetime(valores, errors="coerce", format="ISO8601", utc=True)
+        resto = fechas.isna()
+        if resto.any():
+            fechas[resto] = pd.to_datetime(valores[resto], errors="coerce", dayfirst=dayfirst, format="mixed", utc=True)
+    except (TypeError, ValueError):
+        # pandas < 2.0 no conoce format="ISO8601" ni "mixed" (ya infiere el formato por valor)
+        fechas = pd.to_datetime(valores, errors="coerce", dayfirst=dayfirst, utc=True)
+    return fechas.dt.tz_convert(None)
+
+
+def _parsear_unicos(textos: pd.Series, dayfirst: bool) -> Tuple[pd.Series, np.ndarray]:
+    """Parsea valores únicos (texto). Devuelve (fechas, interpretación)."""
+    n = len(textos)
+    partes = textos.str.extract(_PATRON_FECHA)
+    num = {c: pd.to_numeric(partes[c], errors="coerce").to_numpy(dtype=float) for c in partes.columns if c not in ("ampm", "fr")}
+
+    interp = np.full(n, "otro", dtype=object)
+    anio = np.full(n, np.nan)
+    mes = np.full(n, np.nan)
+    dia = np.full(n, np.nan)
+    alt_mes = np.full(n, np.nan)  # interpretación alternativa (meses/días intercambiados)
+    alt_dia = np.full(n, np.nan)
+
+    # Hora (común a todas las formas con fecha)
+    hh = np.nan_to_num(num["hh"], nan=0.0)
+    pm = partes["ampm"].str.lower().eq("pm").to_numpy(dtype=bool)
+    am = partes["ampm"].str.lower().eq("am").to_numpy(dtype=bool)
+    hh = np.where(pm & (hh < 12), hh + 12, np.where(am & (hh == 12), 0, hh))
+    mi = np.nan_to_num(num["mi"], nan=0.0)
+    ss = np.nan_to_num(num["ss"], nan=0.0)
+    fr = partes["fr"].fillna("").str.ljust(6, "0").str[:6]
+    us = pd.to_numeric(fr.where(fr != "", "0"), errors="coerce").to_numpy(dtype=float)
+
+    # 1) Año delante: YYYY/MM/DD salvo que el 2º campo no pueda ser mes
+    y4 = ~np.isnan(num["y4"])
+    ydm = y4 & (num["a2"] > 12) & (num["a3"] <= 12)
+    ymd = y4 & ~ydm
+    interp[ymd], interp[ydm] = "ymd", "ydm"
+    anio[y4] = num["y4"][y4]
+    mes[ymd], dia[ymd] = num["a2"][ymd], num["a3"][ymd]
+    mes[ydm], dia[ydm] = num["a3"][ydm], num["a2"][ydm]
+    alt_mes[y4], alt_dia[y4] = dia[y4], mes[y4]
+
+    # 2) Año detrás: D/M/Y si el 1º > 12, M/D/Y si el 2º > 12; si es ambiguo, según dayfirst
+    by = ~np.isnan(num["by"])
+    a, b = num["b1"], num["b2"]
+    dmy = by & ((a > 12) | ((b <= 12) & dayfirst))
+    mdy = by & ~dmy
+    interp[dmy], interp[mdy] = "dmy", "mdy"
+    y = num["by"]
+    anio[by] = np.where(y[by] < 100, np.where(y[by] < 69, y[by] + 2000, y[by] + 1900), y[by])
+    dia[dmy], mes[dmy] = a[dmy], b[dmy]
+    mes[mdy], dia[mdy] = a[mdy], b[mdy]
+    alt_mes[by], alt_dia[by] = dia[by], mes[by]
+
+    fechas = _compon(anio, mes, dia, hh, mi, ss, us)
+
+    # 3) Si la interpretación elegida no es una fecha válida, probar la alternativa
+    fallo = (y4 | by) & fechas.isna().to_numpy()
+    if fallo.any():
+        alt = _compon(anio[fallo], alt_mes[fallo], alt_dia[fallo], hh[fallo], mi[fallo], ss[fallo], us[fallo])
+        fechas[fallo] = alt.to_numpy()
+        swap = {"ymd": "ydm", "ydm": "ymd", "dmy": "mdy", "mdy": "dmy"}
+        interp[fallo] = [swap[i] for i in interp[fallo]]
+
+    # 4) Serial Excel
+    serial = num["serial"]
+    es_serial = ~np.isnan(serial) & (serial <= _SERIAL_MAX)
+    if es_serial.any():
+        fechas[es_serial] = pd.to_datetime(
+            serial[es_serial], unit="D", origin=_ORIGEN_EXCEL, errors="coerce"
+        ).to_numpy()
+        interp[es_serial] = "excel"
+
+    # 5) Resto de formatos
+    otros = interp == "otro"
+    if otros.any():
+        fechas[otros] = _parsear_otros(textos[otros], dayfirst).to_numpy()
+
+    interp[fechas.isna().to_numpy()] = None
+    return fechas, interp
+
+
+@medido()
+def parsear_fechas(serie: pd.Series, dayfirst: bool = True) -> Tuple[pd.Series, pd.Series]:
+    """
+    Parsea una columna de fechas con formatos mezclados en una sola pasada.
+
+    Cada valor distinto se clasifica una vez por su forma y se parsea con un
+    formato explícito:
+      - "excel" -> número de serie de Excel (días desde 1899-12-30)
+      - "ymd"   -> YYYY/MM/DD            - "ydm" -> YYYY/DD/MM (si el 2º campo > 12)
+      - "dmy"   -> DD/MM/YYYY            - "mdy" -> MM/DD/YYYY
+      - "otro"  -> cualquier otro formato (parser general de pandas)
+    Separadores / - . y hora opcional. Años de 2 cifras: 00-68 -> 20xx, 69-99 -> 19xx.
+
+    Regla de ambigüedad (la misma para todos los llamantes):
+      - Si el 1º número > 12 -> D/M/Y; si el 2º > 12 -> M/D/Y.
+      - Si ambos <= 12 -> D/M/Y (o M/D/Y con dayfirst=False).
+      - Si la interpretación elegida no es una fecha válida se prueba la otra.
+
+    Parámetros
+    ----------
+    serie : columna a parsear (texto, números, fechas o mezcla).
+    dayfirst : interpretación de las fechas ambiguas.
+
+    Retorna
+    -------
+    (fechas, interpretacion): Serie datetime64 (NaT si no se puede parsear) y Serie
+    con la interpretación usada en cada fila (None si no se pudo parsear).
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        fechas = serie.dt.tz_localize(None) if getattr(serie.dt, "tz", None) is not None else serie
+        interp = pd.Series(np.where(fechas.notna(), "fecha", None), index=serie.index, dtype=object)
+        return fechas, interp
+
+    # Memoización: sólo se parsean los valores distintos
+    codigos, unicos = pd.factorize(serie)
+    textos = pd.Series(unicos, dtype=object).astype(str)
+    fechas_u, interp_u = _parsear_unicos(textos, dayfirst)
+
+    fechas_u = fechas_u.to_numpy()
+    fechas = np.full(len(serie), np.datetime64("NaT"), dtype=fechas_u.dtype)
+    interp = np.full(len(serie), None, dtype=object)
+    validos = codigos >= 0
+    fechas[validos] = fechas_u[codigos[validos]]
+    interp[validos] = interp_u[codigos[validos]]
+    return (
+        pd.Series(fechas, index=serie.index, name=serie.name),
+        pd.Series(interp, index=serie.index, name=serie.name),
+    )
+
+
+@medido()
+def comparar_fechas_mixtas(df: pd.DataFrame, col1: str, col2: str, out_col: str = "resultado") -> pd.DataFrame:
+    """
+    Compara dos columnas de fechas/hora con formato mixto (D-M-Y o M-D-Y).
+    Escribe 'ok' si son iguales (misma marca de tiempo), 'revisar' si no.
+    - Si alguna no se puede parsear -> 'revisar'.
+    - La comparación es exacta (incluye hora, minutos, segundos si existen).
+    """
+    d1, _ = parsear_fechas(df[col1])
+    d2, _ = parsear_fechas(df[col2])
+
+    iguales = (d1.notna() & d2.notna() & (d1 == d2))
+    df[out_col] = np.where(iguales, "ok", "revisar")
+    return df
@@ -0,0 +1,211 @@
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+# Gramática de los volcados de configuración (una línea = un token):
+#   EQUIPMENT / ELEMENTO             -> inicio de registro
+#   LRI_NO(1) / SW_CONFIG(2) / ...   -> inicio de bloque (nombre en mayúsculas + nº opcional)
+#   .atributo => valor               -> atributo del bloque abierto
+#   .file_id(1) => valor             -> atributo indexado (se guarda como "file_id_1")
+#   # ...                            -> fin de registro
+# Cualquier otra línea (vacía, texto suelto) se ignora.
+_TOKEN = re.compile(
+    r"""^[ \t]*(?:
+        \.(?P<attr>\w+)(?:\((?P<attr_n>\d+)\))?[ \t]*=>[ \t]*(?P<valor>.*?)
+      | (?P<bloque>[A-Z][A-Z0-9_]*)(?:\((?P<num>\d+)\))?
+      | (?P<sep>\#.*)
+    )[ \t\r]*$""",
+    re.VERBOSE,
+)
+
+# Bloque -> bloque padre (None = cuelga del registro)
+JERARQUIA_EQUIPOS: Dict[str, Optional[str]] = {
+    "LRI_NO": None,
+    "SW_CONFIG": None,
+    "MODULE_FILE": "SW_CONFIG",
+    "HW_VERSIONS": "SW_CONFIG",
+}
+
+COLUMNAS_EQUIPO = [
+    "equipment_type", "lri_type_code", "lri_num", "ident_code",
+    "sw_part_number", "sw_modification_code", "sw_modification_status",
+    "hw_part_number", "hw_part_number_code",
+]
+_DTYPES_EQUIPO = {c: "string" for c in COLUMNAS_EQUIPO}
+_DTYPES_EQUIPO.update({"lri_num": "Int64", "sw_modification_status": "Int64"})
+
+
+def registros_desde_lineas(
+    lineas: Iterable[str],
+    registro: str = "EQUIPMENT",
+    jerarquia: Optional[Dict[str, Optional[str]]] = None,
+) -> Iterator[dict]:
+    """
+    Núcleo del parser: recorre líneas y va devolviendo cada registro completo
+    en cuanto termina (memoria constante: sólo se guarda el registro en curso).
+
+    Cada registro es un dict con sus atributos y, por cada tipo de bloque, una
+    lista de dicts (con "_num" = número del bloque, sus atributos y sus sub-bloques).
+    Ejemplo EQUIPMENT:
+        {"equipment_type": "ADT", ..., "LRI_NO": [{"_num": 1, "ident_code": "A0", ...}],
+         "SW_CONFIG": [{"_num": 1, ..., "MODULE_FILE": [...], "HW_VERSIONS": [...]}]}
+    """
+    jerarquia = jerarquia or {}
+    match = _TOKEN.match
+    actual = None     # registro en curso
+    destino = None    # dict que recibe los atributos (último bloque abierto)
+    abiertos = {}     # tipo de bloque -> último bloque abierto de ese tipo
+    for linea in lineas:
+        m = match(linea)
+        if m is None:
+            continue
+        attr, bloque = m.group("attr", "bloque")
+        if attr is not None:
+            if destino is not None:
+                n = m.group("attr_n")
+                destino[attr if n is None else f"{attr}_{n}"] = m.group("valor")
+        elif bloque is not None:
+            if bloque == registro:
+                if actual is not None:
+                    yield actual
+                actual = destino = {}
+                abiertos = {}
+            elif actual is not None:
+                padre = jerarquia.get(bloque)
+                contenedor = abiertos.get(padre, actual) if padre else actual
+                num = m.group("num")
+                nuevo = {"_num": int(num) if num is not None else None}
+                contenedor.setdefault(bloque, []).append(nuevo)
+                abiertos[bloque] = destino = nuevo
+        else:  # separador '#'
+            if actual is not None:
+                yield actual
+            actual = destino = None
+    if actual is not None:
+        yield actual
+
+
+def iterar_registros(
+    fuente: Union[str, Iterable[str]],
+    registro: str = "EQUIPMENT",
+    jerarquia: Optional[Dict[str, Optional[str]]] = JERARQUIA_EQUIPOS,
+    encoding: str = "utf-8",
+) -> Iterator[dict]:
+    """
+    Generador de registros de un fichero de volcado (ver registros_desde_lineas).
+
+    Parámetros
+    ----------
+    fuente : ruta del fichero o iterable de líneas (p.ej. un fichero ya abierto).
+    registro : palabra que abre cada registro ("EQUIPMENT", "ELEMENTO", ...).
+    jerarquia : bloque -> bloque padre. Los bloques que no aparecen cuelgan del registro.
+    encoding : codificación del fichero (los caracteres inválidos se reemplazan).
+    """
+    if isinstance(fuente, str):
+        with open(fuente, "r", encoding=encoding, errors="replace") as f:
+            yield from registros_desde_lineas(f, registro, jerarquia)
+    else:
+        yield from registros_desde_lineas(fuente, registro, jerarquia)
+
+
+def filas_equipo(eq: dict) -> Iterator[dict]:
+    """
+    Filas de un EQUIPMENT: una por cada (LRI_NO, SW_CONFIG), con el último
+    HW_VERSIONS de número > 1 de esa configuración (o nulos si no hay).
+    """
+    for lri in eq.get("LRI_NO", ()):
+        for sw in eq.get("SW_CONFIG", ()):
+            hw = None
+            for hv in sw.get("HW_VERSIONS", ()):
+                if (hv["_num"] or 0) > 1:
+                    hw = hv
+            yield {
+                "equipment_type": eq.get("equipment_type"),
+                "lri_type_code": eq.get("lri_type_code"),
+                "lri_num": lri["_num"],
+                "ident_code": lri.get("ident_code"),
+                "sw_part_number": sw.get("sw_part_number"),
+                "sw_modification_code": sw.get("sw_modification_code"),
+                "sw_modification_status": 0,
+                "hw_part_number": hw.get("hw_part_number") if hw else None,
+                "hw_part_number_code": hw.get("hw_part_number_code") if hw else None,
+            }
+
+
+def iterar_lotes(
+    registros: Iterable[dict],
+    aplanar: Callable[[dict], Iterable[dict]],
+    columnas: List[str],
+    tam_lote: int = 100_000,
+    dtypes: Optional[Dict[str, str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Aplana registros a filas y las agrupa en DataFrames de hasta tam_lote filas.
+    Las filas se acumulan por columnas (una lista por columna), no como dicts.
+    """
+    datos = {c: [] for c in columnas}
+    n = 0
+    for reg in registros:
+        for fila in aplanar(reg):
+            for c in columnas:
+                datos[c].append(fila.get(c))
+            n += 1
+            if n >= tam_lote:
+                df = pd.DataFrame(datos, columns=columnas)
+                yield df.astype(dtypes) if dtypes else df
+                datos = {c: [] for c in columnas}
+                n = 0
+    if n:
+        df = pd.DataFrame(datos, columns=columnas)
+        yield df.astype(dtypes) if dtypes else df
+
+
+def escribir_parquet(lotes: Iterable[pd.DataFrame], destino: str) -> int:
+    """
+    Escribe lotes de DataFrames en un único Parquet sin juntarlos en memoria
+    (un row group por lote). Requiere pyarrow. Devuelve el nº de filas escritas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    filas = 0
+    try:
+        for df in lotes:
+            if escritor is None:
+                tabla = pa.Table.from_pandas(df, preserve_index=False)
+                escritor = pq.ParquetWriter(destino, tabla.schema)
+            else:
+                tabla = pa.Table.from_pandas(df, schema=escritor.schema, preserve_index=False)
+            escritor.write_table(tabla)
+            filas += len(df)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return filas
+
+
+def iterar_equipos_lotes(file_path: str, tam_lote: int = 100_000, encoding: str = "utf-8") -> Iterator[pd.DataFrame]:
+    """Filas de parse_equipment_file en lotes de hasta tam_lote filas (tipos fijos)."""
+    return iterar_lotes(
+        iterar_registros(file_path, "EQUIPMENT", JERARQUIA_EQUIPOS, encoding),
+        filas_equipo, COLUMNAS_EQUIPO, tam_lote, _DTYPES_EQUIPO,
+    )
+
+
+def equipos_a_parquet(file_path: str, destino: str, tam_lote: int = 100_000, encoding: str = "utf-8") -> int:
+    """Convierte un volcado EQUIPMENT a Parquet en streaming. Devuelve el nº de filas."""
+    return escribir_parquet(iterar_equipos_lotes(file_path, tam_lote, encoding), destino)
+
+
+def parse_equipment_file(file_path: str, encoding: str = "utf-8") -> pd.DataFrame:
+    """
+    Lee un volcado EQUIPMENT completo a un DataFrame con una fila por (LRI_NO, SW_CONFIG)
+    de cada equipo. Columnas: COLUMNAS_EQUIPO.
+    Para ficheros muy grandes usar iterar_equipos_lotes o equipos_a_parquet.
+    """
+    lotes = list(iterar_equipos_lotes(file_path, encoding=encoding))
+    if not lotes:
+        return pd.DataFrame(columns=COLUMNAS_EQUIPO).astype(_DTYPES_EQUIPO)
+    return pd.concat(lotes, ignore_index=True)
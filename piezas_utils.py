@@ -1,16 +1,385 @@
-from typing import List, Iterable, Tuple, Optional, Union
+from typing import Dict, List, Iterable, Tuple, Optional, Union
+import numpy as np
 import pandas as pd
 
+from instrumentacion import etapa, medido
+
+@medido()
 def _ensure_datetime(df: pd.DataFrame, date_col: str) -> pd.DataFrame:
     """Internal helper to ensure the date column is datetime (no timezone)."""
     out = df.copy()
     out[date_col] = pd.to_datetime(out[date_col], errors="coerce").dt.tz_localize(None)
     return out
 
+def _codigos_columna(s: pd.Series, sort: bool) -> Tuple[np.ndarray, int]:
+    """
+    Internal helper: códigos 0..k-1 de una columna (NaN cuenta como un valor más).
+    Las categóricas (ver codificacion_claves) salen de sus códigos, sin volver a
+    hashear el texto; con sort=True siguen el orden de los valores, no el de las
+    categorías (los valores añadidos a un diccionario van al final).
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        k = len(s.cat.categories)
+        raw = s.cat.codes.to_numpy().astype(np.int64)
+        raw[raw < 0] = k  # NaN al final
+        if sort:
+            # Rango de cada categoría por valor (sólo se ordena el diccionario, no las filas)
+            rango, _ = pd.factorize(s.cat.categories, sort=True)
+            rango = np.append(rango, k)
+            presentes = np.zeros(k + 1, dtype=bool)
+            presentes[rango[np.bincount(raw, minlength=k + 1) > 0]] = True
+            return (np.cumsum(presentes) - 1)[rango[raw]], int(presentes.sum())
+        cod_c, uniq_c = pd.factorize(raw)
+        return cod_c, len(uniq_c)
+    cod_c, uniq_c = pd.factorize(s, use_na_sentinel=False)
+    if sort and len(uniq_c) > 1:
+        # Ordenar sólo los valores únicos (NaN al final) y renumerar
+        rango, _ = pd.factorize(uniq_c, sort=True, use_na_sentinel=False)
+        cod_c = rango[cod_c]
+    return cod_c, len(uniq_c)
+
+
+def _codigos_claves(df: pd.DataFrame, clave_cols: List[str], sort: bool = False) -> Tuple[np.ndarray, int]:
+    """
+    Internal helper: código entero exacto 0..k-1 por fila de la clave compuesta y k.
+    Cada columna se factoriza una vez y los códigos se combinan (código * n + código_col);
+    sólo se re-factoriza cuando el producto de cardinalidades no cabría en int64.
+    """
+    codigos, card = None, 1
+    for c in clave_cols:
+        cod_c, n_c = _codigos_columna(df[c], sort)
+        cod_c = cod_c.astype(np.int64, copy=False)
+        if codigos is None:
+            codigos, card = cod_c, max(n_c, 1)
+            continue
+        if card * max(n_c, 1) >= 2 ** 62:
+            codigos, unicos = pd.factorize(codigos, sort=sort)
+            card = max(len(unicos), 1)
+        codigos = codigos * max(n_c, 1) + cod_c
+        card *= max(n_c, 1)
+    if codigos is None:
+        return np.zeros(len(df), dtype=np.int64), int(len(df) > 0)
+    if len(clave_cols) > 1:
+        codigos, unicos = pd.factorize(codigos, sort=sort)
+        return codigos.astype(np.int64, copy=False), len(unicos)
+    return codigos, (int(codigos.max()) + 1 if len(codigos) else 0)
+
+
+def _factorizar_claves(df: pd.DataFrame, clave_cols: List[str], sort: bool = False) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Internal helper: convierte una o varias columnas clave en un único código entero por fila.
+
+    Retorna (codigos, claves_unicas). claves_unicas[i] es la clave del código i.
+    Con sort=True los códigos siguen el orden lexicográfico de las claves (NaN al final);
+    con sort=False, el orden de primera aparición. Los NaN cuentan como una clave más.
+    """
+    n = len(df)
+    codigos, n_claves = _codigos_claves(df, clave_cols, sort)
+    if n == 0:
+        return codigos, df[clave_cols].iloc[:0].reset_index(drop=True)
+    primera = np.empty(n_claves, dtype=np.int64)
+    primera[codigos[::-1]] = np.arange(n - 1, -1, -1)
+    return codigos, df[clave_cols].iloc[primera].reset_index(drop=True)
+
+
+class PresenceIndex:
+    """
+    Índice de presencia de claves (piezas) en N ficheros, construido una sola vez.
+
+    Las claves de todas las fuentes se factorizan a códigos enteros y, por cada
+    clave, se guarda un bitset con las fuentes que la contienen. Cualquier patrón
+    de presencia/ausencia ("en A y C, no en B ni E") se resuelve después en una
+    sola pasada vectorizada, sin volver a hacer merges ni drop_duplicates.
+
+    Ejemplo
+    -------
+        idx = PresenceIndex({"rdcd": f1, "inv": f2, "movs": f3}, "pieza")
+        idx.consultar(en=["rdcd", "movs"], no_en=["inv"])
+
+    Parámetros
+    ----------
+    fuentes : dict nombre -> DataFrame, o lista de DataFrames (nombres "f1", "f2", ...).
+              Máximo 64 fuentes.
+    clave_cols : columna o lista de columnas clave (deben existir en todas las fuentes).
+    ordenar : si True, las claves quedan ordenadas (como en un merge outer);
+              si False, en orden de primera aparición.
+    """
+
+    @medido("PresenceIndex")
+    def __init__(
+        self,
+        fuentes: Union[Dict[str, pd.DataFrame], List[pd.DataFrame]],
+        clave_cols: Union[str, List[str]],
+        ordenar: bool = False,
+    ):
+        if isinstance(clave_cols, str):
+            clave_cols = [clave_cols]
+        if not isinstance(fuentes, dict):
+            fuentes = {f"f{i + 1}": df for i, df in enumerate(fuentes)}
+        if len(fuentes) > 64:
+            raise ValueError("PresenceIndex admite como máximo 64 fuentes.")
+
+        self.clave_cols = list(clave_cols)
+        self.nombres = list(fuentes)
+        tamanos = [len(df) for df in fuentes.values()]
+        todas = pd.concat([df[self.clave_cols] for df in fuentes.values()], ignore_index=True)
+        codigos, self.claves = _factorizar_claves(todas, self.clave_cols, sort=ordenar)
+
+        self._bits = np.zeros(len(self.claves), dtype=np.uint64)
+        ini = 0
+        for i, tam in enumerate(tamanos):
+            presentes = np.zeros(len(self.claves), dtype=bool)
+            presentes[codigos[ini:ini + tam]] = True
+            self._bits[presentes] |= np.uint64(1) << np.uint64(i)
+            ini += tam
+
+        if len(self.clave_cols) == 1:
+            self._indice = pd.Index(self.claves[self.clave_cols[0]])
+        else:
+            self._indice = pd.MultiIndex.from_frame(self.claves)
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    def _bitmask(self, nombres: Iterable[str]) -> np.uint64:
+        m = np.uint64(0)
+        for nombre in nombres:
+            if nombre not in self.nombres:
+                raise KeyError(f"Fuente desconocida: {nombre!r}. Disponibles: {self.nombres}")
+            m |= np.uint64(1) << np.uint64(self.nombres.index(nombre))
+        return m
+
+    def mascara(self, en: Iterable[str] = (), no_en: Iterable[str] = ()) -> np.ndarray:
+        """Máscara booleana (sobre self.claves) de las claves presentes en todas 'en' y en ninguna 'no_en'."""
+        req = self._bitmask(en)
+        proh = self._bitmask(no_en)
+        return ((self._bits & req) == req) & ((self._bits & proh) == 0)
+
+    def consultar(self, en: Iterable[str] = (), no_en: Iterable[str] = ()) -> pd.DataFrame:
+        """DataFrame con las claves que cumplen el patrón de presencia/ausencia."""
+        return self.claves[self.mascara(en, no_en)].reset_index(drop=True)
+
+    def esta_en(self, claves: pd.DataFrame, fuente: str) -> np.ndarray:
+        """Para cada fila de 'claves' (con las columnas clave), True si está en 'fuente'."""
+        if len(self.clave_cols) == 1:
+            pos = self._indice.get_indexer(claves[self.clave_cols[0]])
+        else:
+            pos = self._indice.get_indexer(pd.MultiIndex.from_frame(claves[self.clave_cols]))
+        bit = self._bitmask([fuente])
+        out = np.zeros(len(claves), dtype=bool)
+        hay = pos >= 0
+        out[hay] = (self._bits[pos[hay]] & bit) != 0
+        return out
+
+
+class MovementHistory:
+    """
+    Historial de movimientos ordenado UNA vez por (claves de pieza, fecha).
+
+    Al construirlo se convierte la fecha a datetime y se calcula el orden y los
+    límites de cada pieza. Después, primero / último / n-ésimo movimiento y el
+    conteo por pieza son simples cortes de ese orden: no se vuelve a ordenar
+    ni a copiar el DataFrame completo en cada consulta.
+
+    Las filas sin fecha válida (NaT) o con alguna clave nula no cuentan como
+    movimiento (igual que groupby + idxmin/idxmax).
+
+    Empates: movimientos de una pieza con la misma fecha quedan en el orden
+    original de las filas, y todas las consultas usan ese orden. primero() es
+    la primera fila de las empatadas en la fecha mínima; ultimo(), nth(-1) y
+    a_fecha() son la última de las empatadas en la fecha máxima (como
+    sort_values + drop_duplicates(keep="last")).
+
+    Ejemplo
+    -------
+        hist = MovementHistory(movs, ["equipo", "componente"], "fecha_movimiento")
+        ultimos = hist.ultimo()
+        primeros = hist.primero()
+        segundos = hist.nth(1)
+
+    Parámetros
+    ----------
+    df : DataFrame de movimientos (no se copia; no debe modificarse mientras se use).
+    clave_cols : columna o lista de columnas que identifican la pieza.
+    fecha_col : columna de fecha del movimiento.
+    """
+
+    @medido("MovementHistory")
+    def __init__(self, df: pd.DataFrame, clave_cols: Union[str, List[str]], fecha_col: str):
+        if isinstance(clave_cols, str):
+            clave_cols = [clave_cols]
+        self.df = df
+        self.clave_cols = list(clave_cols)
+        self.fecha_col = fecha_col
+
+        with etapa("fechas", entrada=df[fecha_col]):
+            fechas = pd.to_datetime(df[fecha_col], errors="coerce")
+            if getattr(fechas.dt, "tz", None) is not None:
+                fechas = fechas.dt.tz_localize(None)
+            self.fechas = fechas.to_numpy()
+
+        with etapa("factorizar_claves", entrada=df):
+            codigos, self._claves = _factorizar_claves(df, self.clave_cols, sort=True)
+        validas = ~np.isnat(self.fechas) & df[self.clave_cols].notna().all(axis=1).to_numpy()
+        pos = np.flatnonzero(validas)
+
+        # Orden estable por (clave, fecha): con empates se mantiene el orden original.
+        # Si cabe en int64, se ordena por una única clave compuesta (más rápido que lexsort).
+        f = self.fechas[pos].view("int64")
+        rango_f, fechas_unicas = pd.factorize(f, sort=True)
+        n_claves = int(codigos.max()) + 1 if len(codigos) else 0
+        if n_claves * max(len(fechas_unicas), 1) < 2 ** 62:
+            compuesta = codigos[pos] * max(len(fechas_unicas), 1) + rango_f
+            self._orden = pos[np.argsort(compuesta, kind="stable")]
+        else:
+            self._orden = pos[np.lexsort((f, codigos[pos]))]
+
+        g = codigos[self._orden]
+        f = self.fechas[self._orden].view("int64")
+        self._fechas_orden = f
+        nuevo_grupo = np.r_[True, g[1:] != g[:-1]] if len(g) else np.empty(0, dtype=bool)
+        self._inicio = np.flatnonzero(nuevo_grupo)
+        self._fin = np.r_[self._inicio[1:], len(g)].astype(np.int64) if len(g) else np.empty(0, dtype=np.int64)
+        self._grupo = g[self._inicio]
+
+        self._indice_grupos = None
+
+    def __len__(self) -> int:
+        """Número de piezas con al menos un movimiento válido."""
+        return len(self._inicio)
+
+    @property
+    def claves(self) -> pd.DataFrame:
+        """Claves de las piezas, ordenadas."""
+        return self._claves.iloc[self._grupo].reset_index(drop=True)
+
+    def _filas(self, pos: np.ndarray) -> pd.DataFrame:
+        """Filas del DataFrame original (con la fecha ya convertida) en las posiciones dadas."""
+        out = self.df.iloc[pos].copy()
+        out[self.fecha_col] = self.fechas[pos]
+        return out
+
+    def posiciones_primero(self) -> np.ndarray:
+        return self._orden[self._inicio]
+
+    def posiciones_ultimo(self) -> np.ndarray:
+        return self._orden[self._fin - 1]
+
+    def _posiciones_max_primera(self) -> np.ndarray:
+        """Como posiciones_ultimo, pero con la primera fila de las empatadas en la fecha máxima (idxmax)."""
+        f = self._fechas_orden
+        empate = np.r_[False, f[1:] == f[:-1]] & (np.arange(len(f)) > np.repeat(self._inicio, self._fin - self._inicio))
+        inicio_tramo = np.maximum.accumulate(np.where(empate, 0, np.arange(len(f))))
+        return self._orden[inicio_tramo[self._fin - 1]]
+
+    def posiciones_nth(self, n: int) -> np.ndarray:
+        tam = self._fin - self._inicio
+        if n >= 0:
+            ok = tam > n
+            return self._orden[self._inicio[ok] + n]
+        ok = tam >= -n
+        return self._orden[self._fin[ok] + n]
+
+    def primero(self) -> pd.DataFrame:
+        """Fila del primer movimiento (fecha mínima) de cada pieza."""
+        return self._filas(self.posiciones_primero())
+
+    def ultimo(self) -> pd.DataFrame:
+        """Fila del último movimiento (fecha máxima) de cada pieza."""
+        return self._filas(self.posiciones_ultimo())
+
+    def nth(self, n: int) -> pd.DataFrame:
+        """Fila del n-ésimo movimiento de cada pieza (0 = primero, -1 = último). Piezas con menos movimientos se omiten."""
+        return self._filas(self.posiciones_nth(n))
+
+    def conteo(self, nombre_col: str = "n_movimientos") -> pd.DataFrame:
+        """Número de movimientos válidos por pieza."""
+        out = self.claves
+        out[nombre_col] = self._fin - self._inicio
+        return out
+
+    def fecha_extremo(self, cual: str = "max") -> pd.DataFrame:
+        """Claves + fecha máxima ('max') o mínima ('min') de cada pieza, en columna {fecha_col}_{cual}."""
+        pos = self._orden[self._fin - 1] if cual == "max" else self._orden[self._inicio]
+        out = self.claves
+        out[f"{self.fecha_col}_{cual}"] = self.fechas[pos]
+        return out
+
+    def posiciones_a_fecha(self, claves: pd.DataFrame, fechas) -> np.ndarray:
+        """
+        Para cada consulta (fila de 'claves' + fecha) devuelve la posición en self.df
+        del último movimiento de esa pieza con fecha <= la fecha consultada (-1 si no hay).
+
+        Búsqueda binaria vectorizada dentro del tramo ordenado de cada pieza:
+        O(q log n) para q consultas, sin filtrar ni ordenar de nuevo los movimientos.
+        """
+        if self._indice_grupos is None:
+            cl = self.claves
+            if len(self.clave_cols) == 1:
+                self._indice_grupos = pd.Index(cl[self.clave_cols[0]])
+            else:
+                self._indice_grupos = pd.MultiIndex.from_frame(cl)
+        if len(self.clave_cols) == 1:
+            g = self._indice_grupos.get_indexer(claves[self.clave_cols[0]])
+        else:
+            g = self._indice_grupos.get_indexer(pd.MultiIndex.from_frame(claves[self.clave_cols]))
+
+        t = pd.to_datetime(pd.Series(fechas), errors="coerce")
+        if getattr(t.dt, "tz", None) is not None:
+            t = t.dt.tz_localize(None)
+        t = t.to_numpy().astype(self.fechas.dtype).view("int64")
+        ok = (g >= 0) & (t != np.iinfo(np.int64).min)
+        lo = np.where(ok, self._inicio[np.maximum(g, 0)] if len(self._inicio) else 0, 0)
+        hi = np.where(ok, self._fin[np.maximum(g, 0)] if len(self._inicio) else 0, 0)
+        inicio = lo.copy()
+
+        # bisect_right(fechas del tramo, t) para todas las consultas a la vez
+        ultimo = len(self._fechas_orden) - 1
+        while True:
+            activo = lo < hi
+            if not activo.any():
+                break
+            mid = (lo + hi) // 2
+            derecha = activo & (self._fechas_orden[np.minimum(mid, ultimo)] <= t)
+            lo = np.where(derecha, mid + 1, lo)
+            hi = np.where(activo & ~derecha, mid, hi)
+
+        pos = np.full(len(g), -1, dtype=np.int64)
+        hay = ok & (lo > inicio)
+        pos[hay] = self._orden[lo[hay] - 1]
+        return pos
+
+    @medido("MovementHistory.a_fecha")
+    def a_fecha(self, consultas: pd.DataFrame, col_fecha_consulta: str = "fecha_consulta") -> pd.DataFrame:
+        """
+        Consulta "as-of" por lotes: para cada fila de 'consultas' (claves + fecha)
+        devuelve el último movimiento de la pieza en o antes de esa fecha.
+
+        Ejemplo: qué pieza había instalada en cada posición de cada avión en cada fecha
+            hist = MovementHistory(movs, ["avion", "posicion"], "fecha_movimiento")
+            hist.a_fecha(consultas)   # consultas: [avion, posicion, fecha_consulta]
+
+        Retorna
+        -------
+        DataFrame con las columnas de 'consultas' + las del movimiento encontrado
+        (NaN si la pieza no tenía movimientos a esa fecha). Si alguna columna del
+        movimiento coincide con una de 'consultas', se le añade el sufijo "_mov".
+        """
+        pos = self.posiciones_a_fecha(consultas, consultas[col_fecha_consulta])
+        hay = pos >= 0
+        out = consultas.reset_index(drop=True)
+        movs = self._filas(pos[hay]).drop(columns=self.clave_cols)
+        movs.index = np.flatnonzero(hay)
+        movs = movs.reindex(range(len(out)))
+        movs.columns = [f"{c}_mov" if c in out.columns else c for c in movs.columns]
+        return pd.concat([out, movs], axis=1)
+
+
 def _presence_mask(keys: pd.DataFrame, other: pd.DataFrame, clave_cols: List[str]) -> pd.Series:
-    other_keys = other[clave_cols].drop_duplicates()
-    return keys.merge(other_keys.assign(__flag=True), on=clave_cols, how="left")["__flag"].fillna(False)
+    indice = PresenceIndex({"other": other}, clave_cols)
+    return pd.Series(indice.esta_en(keys, "other"))
 
+@medido()
 def max_fecha_por_pieza(
     df: pd.DataFrame,
     pieza_col: str,
@@ -27,28 +396,22 @@ def max_fecha_por_pieza(
     pieza_col : Nombre de la columna clave de pieza (str).
     fecha_col : Nombre de la columna de fecha (str).
     keep_rows : 
-        - True  -> devuelve las FILAS completas del último movimiento por pieza.
+        - True  -> devuelve las FILAS completas del último movimiento por pieza
+                   (con varias filas en la fecha máxima, la primera, como idxmax).
         - False -> devuelve un DataFrame con columnas [pieza_col, fecha_col_max].
     
     Retorna
     -------
     DataFrame
     """
-    dft = _ensure_datetime(df, fecha_col)
-    idx = dft.groupby(pieza_col)[fecha_col].idxmax()
+    hist = MovementHistory(df, pieza_col, fecha_col)
     if keep_rows:
-        return dft.loc[idx].sort_values(by=[pieza_col]).reset_index(drop=True)
+        return hist._filas(hist._posiciones_max_primera()).reset_index(drop=True)
     else:
-        out = (
-            dft.groupby(pieza_col, as_index=False)[fecha_col]
-            .max()
-            .rename(columns={fecha_col: f"{fecha_col}_max"})
-            .sort_values(by=[pieza_col])
-            .reset_index(drop=True)
-        )
-        return out
+        return hist.fecha_extremo("max")
 
 
+@medido()
 def min_fecha_por_pieza(
     df: pd.DataFrame,
     pieza_col: str,
@@ -72,25 +435,19 @@ def min_fecha_por_pieza(
     -------
     DataFrame
     """
-    dft = _ensure_datetime(df, fecha_col)
-    idx = dft.groupby(pieza_col)[fecha_col].idxmin()
+    hist = MovementHistory(df, pieza_col, fecha_col)
     if keep_rows:
-        return dft.loc[idx].sort_values(by=[pieza_col]).reset_index(drop=True)
+        return hist.primero().reset_index(drop=True)
     else:
-        out = (
-            dft.groupby(pieza_col, as_index=False)[fecha_col]
-            .min()
-            .rename(columns={fecha_col: f"{fecha_col}_min"})
-            .sort_values(by=[pieza_col])
-            .reset_index(drop=True)
-        )
-        return out
+        return hist.fecha_extremo("min")
 
 
+@medido()
 def comparar_por_clave(
     f1: pd.DataFrame,
     f2: pd.DataFrame,
     clave_cols: Union[str, List[str]],
+    codigos_exactos: bool = False,
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     3) Compara dos ficheros (DataFrames) por clave para obtener:
@@ -102,6 +459,9 @@ def comparar_por_clave(
     ----------
     f1, f2 : DataFrames a comparar.
     clave_cols : columna o lista de columnas clave.
+    codigos_exactos : con claves de muchas columnas, cruza por un código entero
+                      exacto de la clave compuesta (claves_hash.presencia_por_hash).
+                      Las claves salen en orden de aparición, no ordenadas.
     
     Retorna
     -------
@@ -110,19 +470,21 @@ def comparar_por_clave(
     if isinstance(clave_cols, str):
         clave_cols = [clave_cols]
 
-    # Usamos drop_duplicates para claves únicas
-    k1 = f1[clave_cols].drop_duplicates().assign(__src="f1")
-    k2 = f2[clave_cols].drop_duplicates().assign(__src="f2")
+    if codigos_exactos:
+        from claves_hash import presencia_por_hash  # import local: claves_hash importa este módulo
+        return presencia_por_hash(f1, f2, clave_cols)
 
-    merged = k1.merge(k2, on=clave_cols, how="outer", indicator=True)
+    # Un único índice de presencia (claves ordenadas, como en un merge outer)
+    indice = PresenceIndex({"f1": f1, "f2": f2}, clave_cols, ordenar=True)
 
-    solo_f1 = merged[merged["_merge"] == "left_only"][clave_cols].reset_index(drop=True)
-    solo_f2 = merged[merged["_merge"] == "right_only"][clave_cols].reset_index(drop=True)
-    en_ambos = merged[merged["_merge"] == "both"][clave_cols].reset_index(drop=True)
+    solo_f1 = indice.consultar(en=["f1"], no_en=["f2"])
+    solo_f2 = indice.consultar(en=["f2"], no_en=["f1"])
+    en_ambos = indice.consultar(en=["f1", "f2"])
 
     return solo_f1, solo_f2, en_ambos
 
 
+@medido()
 def chequear_primer_movimiento_no_valor(
     f1: pd.DataFrame,
     pieza_col: str,
@@ -164,10 +526,9 @@ def chequear_primer_movimiento_no_valor(
     DataFrame con las piezas que INCUMPLEN la regla. Incluye:
     [pieza_col, fecha_primera, valor_primero, aplica_regla_f2, aplica_regla_f3].
     """
-    dft = _ensure_datetime(f1, fecha_col)
-
     # Primer movimiento por pieza (fecha mínima)
-    first_rows = dft.loc[dft.groupby(pieza_col)[fecha_col].idxmin(), [pieza_col, fecha_col, valor_col]].copy()
+    hist = MovementHistory(f1, pieza_col, fecha_col)
+    first_rows = hist.primero()[[pieza_col, fecha_col, valor_col]].copy()
     first_rows.rename(columns={fecha_col: "fecha_primera", valor_col: "valor_primero"}, inplace=True)
 
     first_rows["aplica_regla_f2"] = True
@@ -206,6 +567,7 @@ def chequear_primer_movimiento_no_valor(
     return violaciones
 
 
+@medido()
 def piezas_por_presencia(
     f1: pd.DataFrame,
     f2: pd.DataFrame,
@@ -230,25 +592,86 @@ def piezas_por_presencia(
     -------
     DataFrame con una única columna [pieza_col] con las piezas que cumplen.
     """
-    keys = pd.DataFrame({pieza_col: pd.concat([f1[pieza_col], f2[pieza_col], f3[pieza_col]]).drop_duplicates()})
-    def present(df):
-        return keys.merge(df[[pieza_col]].drop_duplicates().assign(__p=True), on=pieza_col, how="left")["__p"].fillna(False)
+    indice = PresenceIndex({"f1": f1, "f2": f2, "f3": f3}, pieza_col)
+    flags = {"f1": en_f1, "f2": en_f2, "f3": en_f3}
+    return indice.consultar(
+        en=[k for k, v in flags.items() if v],
+        no_en=[k for k, v in flags.items() if not v],
+    )
+
 
-    mask = pd.Series(True, index=keys.index)
+def _tomar(serie: pd.Series, idx: np.ndarray):
+    """Internal helper: serie.take con -1 = fila ausente (mismo relleno y dtype que un merge)."""
+    valores = serie.array if isinstance(serie.dtype, pd.api.extensions.ExtensionDtype) else serie.to_numpy()
+    return pd.api.extensions.take(valores, idx, allow_fill=True)
 
-    for df, required in [(f1, en_f1), (f2, en_f2), (f3, en_f3)]:
-        m = present(df)
-        mask = mask & (m if required else ~m)
 
-    return keys.loc[mask, [pieza_col]].reset_index(drop=True)
+def _tomar_filas(arr: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """Internal helper: arr[idx] para índices de fila, propagando -1 (sin fila)."""
+    out = np.full(len(idx), -1, dtype=np.int64)
+    hay = idx >= 0
+    out[hay] = arr[idx[hay]]
+    return out
+
+
+def _plan_union(cod_res: np.ndarray, cod_f: np.ndarray, n_codigos: int, how: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Internal helper: un paso de merge resuelto sólo con códigos de clave.
+    Devuelve (fila_res, fila_f): por cada fila de salida, la fila del resultado
+    acumulado y la del fichero (-1 = sin pareja), en el orden que daría pandas
+    (antes de ordenar por clave en el caso 'outer').
+    """
+    cnt = np.bincount(cod_f, minlength=n_codigos)
+    if len(cod_f) == 0 or cnt.max() <= 1:
+        # Caso habitual: clave única en el fichero -> búsqueda directa, sin ordenar
+        pos = np.full(n_codigos, -1, dtype=np.int64)
+        pos[cod_f] = np.arange(len(cod_f), dtype=np.int64)
+        fila_f = pos[cod_res]
+        if how == "inner":
+            fila_res = np.flatnonzero(fila_f >= 0)
+            fila_f = fila_f[fila_res]
+        else:
+            fila_res = np.arange(len(cod_res), dtype=np.int64)
+    else:
+        orden = np.argsort(cod_f, kind="stable")
+        inicio = np.cumsum(cnt) - cnt
+        c_res = cnt[cod_res]
+        reps = c_res if how == "inner" else np.maximum(c_res, 1)
+        total = int(reps.sum())
+        fila_res = np.repeat(np.arange(len(cod_res), dtype=np.int64), reps)
+        j = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(reps) - reps, reps)
+        tiene = np.repeat(c_res > 0, reps)
+        fila_f = np.full(total, -1, dtype=np.int64)
+        fila_f[tiene] = orden[np.repeat(inicio[cod_res], reps)[tiene] + j[tiene]]
+    if how == "outer":
+        en_res = np.zeros(n_codigos, dtype=bool)
+        en_res[cod_res] = True
+        solo_f = np.flatnonzero(~en_res[cod_f])
+        fila_res = np.r_[fila_res, np.full(len(solo_f), -1, dtype=np.int64)]
+        fila_f = np.r_[fila_f, solo_f]
+    return fila_res, fila_f
+
+
+def _concatenar_encadenado(base, ficheros, clave_cols, sufijos, how) -> pd.DataFrame:
+    """Internal helper: merges encadenados (casos que no cubre el join multi-vía)."""
+    result = base.copy()
+    for df, suf in zip(ficheros, sufijos):
+        cols_to_add = [c for c in df.columns if c not in clave_cols]
+        renamed = df[clave_cols + cols_to_add].rename(
+            columns={c: f"{c}{suf}" for c in cols_to_add}
+        )
+        result = result.merge(renamed, on=clave_cols, how=how)
+    return result
 
 
+@medido()
 def concatenar_por_clave(
     base: pd.DataFrame,
     ficheros: List[pd.DataFrame],
     clave_cols: Union[str, List[str]],
     sufijos: Optional[List[str]] = None,
-    how: str = "left"
+    how: str = "left",
+    memoria_max_mb: Optional[float] = None,
 ) -> pd.DataFrame:
     """
     6) Concatena (mergea) columnas de varios ficheros (DataFrames)
@@ -258,6 +681,15 @@ def concatenar_por_clave(
         en_ambos = comparar_por_clave(f1, f2, "pieza")[2]
         resultado = concatenar_por_clave(en_ambos, [f1, f2], "pieza", sufijos=["_f1", "_f2"])
 
+    Para how 'left' / 'inner' / 'outer' no se encadenan merges: las claves de
+    todos los ficheros se factorizan una sola vez, se calcula por cada fichero
+    qué fila va en cada fila de salida (con enteros) y las columnas se montan
+    al final, una sola vez. El resultado es el mismo que el de los merges
+    encadenados (mismas filas, orden, columnas y tipos; en 'inner', si una clave
+    se repite en un fichero, sus filas salen en el orden del fichero). Otros how, claves con
+    tipos distintos entre ficheros o nombres de columna repetidos usan los
+    merges encadenados.
+
     Parámetros
     ----------
     base : DataFrame base, por ejemplo el resultado de 'en_ambos'.
@@ -266,6 +698,8 @@ def concatenar_por_clave(
     sufijos : lista de sufijos a aplicar a las columnas de cada fichero.
               Si no se indica, se usarán automáticamente "_1", "_2", "_3", etc.
     how : tipo de merge con pandas (por defecto 'left').
+    memoria_max_mb : si se indica y el resultado estimado lo supera, se lanza
+                     MemoryError antes de construirlo.
 
     Retorna
     -------
@@ -273,17 +707,73 @@ def concatenar_por_clave(
     """
     if isinstance(clave_cols, str):
         clave_cols = [clave_cols]
+    clave_cols = list(clave_cols)
 
-    result = base.copy()
     n = len(ficheros)
     if sufijos is None:
         sufijos = [f"_{i+1}" for i in range(n)]
-
-    for i, (df, suf) in enumerate(zip(ficheros, sufijos)):
-        cols_to_add = [c for c in df.columns if c not in clave_cols]
-        renamed = df[clave_cols + cols_to_add].rename(
-            columns={c: f"{c}{suf}" for c in cols_to_add}
+    pares = list(zip(ficheros, sufijos))
+
+    # Columnas de salida: las de base + las de cada fichero con su sufijo
+    # (fuente, columna, nombre de salida); fuente 0 = base, i = ficheros[i-1]
+    salida = [(0, c, c) for c in base.columns]
+    for i, (df, suf) in enumerate(pares, start=1):
+        salida += [(i, c, f"{c}{suf}") for c in df.columns if c not in clave_cols]
+    nombres = [nombre for _, _, nombre in salida]
+    multivia = (
+        how in ("left", "inner", "outer")
+        and len(set(nombres)) == len(nombres)
+        and all(df.columns.is_unique for df, _ in pares)
+        and all(c in base.columns for c in clave_cols)
+        and all(c in df.columns and df[c].dtype == base[c].dtype for df, _ in pares for c in clave_cols)
+    )
+    if not pares or not multivia:
+        return _concatenar_encadenado(base, ficheros, clave_cols, sufijos, how)
+
+    # 1) Claves de todos los ficheros factorizadas juntas (ordenadas, como el merge outer)
+    todas = pd.concat([base[clave_cols]] + [df[clave_cols] for df, _ in pares], ignore_index=True)
+    with etapa("factorizar_claves", entrada=todas):
+        codigos_todos, claves_unicas = _factorizar_claves(todas, clave_cols, sort=True)
+    n_codigos = len(claves_unicas)
+    limites = np.cumsum([len(base)] + [len(df) for df, _ in pares])
+    cod_base, *cod_ficheros = np.split(codigos_todos, limites[:-1])
+
+    # 2) Plan de filas: por cada fuente, la fila que aporta a cada fila de salida (-1 = ninguna)
+    with etapa("plan_filas"):
+        codigos = cod_base
+        planes = [np.arange(len(base), dtype=np.int64)]
+        for cod_f in cod_ficheros:
+            fila_res, fila_f = _plan_union(codigos, cod_f, n_codigos, how)
+            planes = [_tomar_filas(p, fila_res) for p in planes] + [fila_f]
+            nuevos = _tomar_filas(codigos, fila_res)
+            solo_f = fila_res < 0  # sólo en 'outer': claves que no estaban en el resultado
+            nuevos[solo_f] = cod_f[fila_f[solo_f]]
+            codigos = nuevos
+            if how == "outer" and np.any(codigos[1:] < codigos[:-1]):
+                orden = np.argsort(codigos, kind="stable")
+                codigos = codigos[orden]
+                planes = [p[orden] for p in planes]
+
+    # 3) Estimación de memoria antes de construir nada
+    n_filas = len(codigos)
+    fuentes = [base] + [df for df, _ in pares]
+    bytes_fila = sum(
+        fuentes[i][c].memory_usage(index=False, deep=False) / max(len(fuentes[i]), 1)
+        for i, c, _ in salida
+    )
+    estimado_mb = n_filas * bytes_fila / 2**20
+    if memoria_max_mb is not None and estimado_mb > memoria_max_mb:
+        raise MemoryError(
+            f"concatenar_por_clave: el resultado tendría {n_filas} filas (~{estimado_mb:.0f} MB), "
+            f"más que memoria_max_mb={memoria_max_mb}"
         )
-        result = result.merge(renamed, on=clave_cols, how=how)
 
-    return result
+    # 4) Montar todas las columnas de una vez
+    with etapa("montar_columnas") as e:
+        columnas = {}
+        for i, c, nombre in salida:
+            if i == 0 and c in clave_cols:
+                columnas[nombre] = _tomar(claves_unicas[c], codigos)
+            else:
+                columnas[nombre] = _tomar(fuentes[i][c], planes[i])
+        return e.salida(pd.DataFrame(columnas, columns=nombres))
@@ -0,0 +1,501 @@
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from carga_cache import cargar_tabla, columnas_tabla
+from instrumentacion import etapa, medido
+from limpieza_utils import _columnas_construidas, _es_hueco
+
+
+class Condicion:
+    """
+    Condición sobre las filas de un DataFrame que sabe qué columnas usa (así el
+    pipeline puede no cargar las demás). Se construye con col() y se combina con & | ~:
+
+        (col("f inst").isna() & col("tipo").isin(["A", "B"])) | ~col("pn").contiene("x")
+
+    Llamada sobre un DataFrame devuelve un array booleano (los nulos cuentan como False).
+    """
+
+    def __init__(self, funcion: Callable[[Any], Any], columnas: Iterable[str]):
+        self.funcion = funcion
+        self.columnas = list(dict.fromkeys(columnas))
+
+    def __call__(self, df) -> np.ndarray:
+        r = self.funcion(df)
+        if isinstance(r, pd.Series):
+            r = r.fillna(False) if r.dtype == object or pd.api.types.is_extension_array_dtype(r.dtype) else r
+        return np.asarray(r, dtype=bool)
+
+    def __and__(self, otra: "Condicion") -> "Condicion":
+        return Condicion(lambda df: self(df) & otra(df), self.columnas + otra.columnas)
+
+    def __or__(self, otra: "Condicion") -> "Condicion":
+        return Condicion(lambda df: self(df) | otra(df), self.columnas + otra.columnas)
+
+    def __invert__(self) -> "Condicion":
+        return Condicion(lambda df: ~self(df), self.columnas)
+
+
+class col:
+    """Referencia a una columna para construir Condiciones: col("f inst").isna(), col("n") > 3."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+
+    def _cond(self, funcion: Callable[[pd.Series], Any]) -> Condicion:
+        nombre = self.nombre
+        return Condicion(lambda df: funcion(df[nombre]), [nombre])
+
+    def isna(self) -> Condicion:
+        return self._cond(lambda s: s.isna())
+
+    def notna(self) -> Condicion:
+        return self._cond(lambda s: s.notna())
+
+    def isin(self, valores: Iterable) -> Condicion:
+        valores = list(valores)
+        return self._cond(lambda s: s.isin(valores))
+
+    def contiene(self, texto: str, case: bool = False, regex: bool = False) -> Condicion:
+        return self._cond(lambda s: s.astype("string").str.contains(texto, case=case, regex=regex, na=False))
+
+    def _comparar(self, op, valor) -> Condicion:
+        if isinstance(valor, col):
+            otro = valor.nombre
+            return Condicion(lambda df: op(df[self.nombre], df[otro]), [self.nombre, otro])
+        return self._cond(lambda s: op(s, valor))
+
+    def __eq__(self, valor) -> Condicion:  # type: ignore[override]
+        return self._comparar(operator.eq, valor)
+
+    def __ne__(self, valor) -> Condicion:  # type: ignore[override]
+        return self._comparar(operator.ne, valor)
+
+    def __lt__(self, valor) -> Condicion:
+        return self._comparar(operator.lt, valor)
+
+    def __le__(self, valor) -> Condicion:
+        return self._comparar(operator.le, valor)
+
+    def __gt__(self, valor) -> Condicion:
+        return self._comparar(operator.gt, valor)
+
+    def __ge__(self, valor) -> Condicion:
+        return self._comparar(operator.ge, valor)
+
+    __hash__ = None
+
+
+def _a_condicion(condicion: Union[Condicion, Callable], usa: Optional[Iterable[str]]) -> Condicion:
+    if isinstance(condicion, Condicion):
+        return condicion
+    if not callable(condicion):
+        raise TypeError("La condición debe ser una Condicion (col(...)) o una función df -> máscara booleana.")
+    # Función libre: si no se dice qué columnas usa, se asume que puede usar todas
+    return Condicion(condicion, usa) if usa is not None else _CondicionLibre(condicion)
+
+
+class _CondicionLibre(Condicion):
+    """Función del usuario sin columnas declaradas: necesita el DataFrame real con todas las columnas."""
+
+    def __init__(self, funcion: Callable):
+        super().__init__(funcion, [])
+
+
+class _Vista:
+    """df + columnas calculadas pendientes de asignar (lectura por nombre)."""
+
+    def __init__(self, df: pd.DataFrame, nuevas: Dict[str, Any]):
+        self.df = df
+        self.nuevas = nuevas
+
+    def __getitem__(self, c):
+        if c in self.nuevas:
+            v = self.nuevas[c]
+            return v if isinstance(v, pd.Series) else pd.Series(v, index=self.df.index, name=c)
+        return self.df[c]
+
+
+# ---------------------------------------------------------------------------
+# Pasos. Cada paso sabe:
+#   - tipo: "columnas" (añade/cambia/quita columnas) o "filas" (quita filas)
+#   - salida(cols): columnas que hay después del paso
+#   - necesita(despues, antes): columnas que necesita antes del paso para dar 'despues'
+#   - produce: columnas que crea o modifica (si ninguna hace falta, el paso se omite)
+# ---------------------------------------------------------------------------
+
+class _Paso:
+    tipo = "columnas"
+    produce: List[str] = []
+
+    def salida(self, cols: List[str]) -> List[str]:
+        return cols
+
+    def necesita(self, despues: set, antes: List[str]) -> set:
+        return set(despues)
+
+
+class _EliminarColumnas(_Paso):
+    def __init__(self, columnas, errores):
+        self.columnas = list(columnas)
+        self.errores = errores
+
+    def salida(self, cols):
+        faltan = [c for c in self.columnas if c not in cols]
+        if faltan and self.errores == "raise":
+            raise KeyError(f"eliminar_columnas: no existen {faltan}")
+        return [c for c in cols if c not in self.columnas]
+
+    def __repr__(self):
+        return f"eliminar_columnas({self.columnas})"
+
+
+class _Seleccionar(_Paso):
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+
+    def salida(self, cols):
+        faltan = [c for c in self.columnas if c not in cols]
+        if faltan:
+            raise KeyError(f"seleccionar: no existen {faltan}")
+        return list(self.columnas)
+
+    def __repr__(self):
+        return f"seleccionar({self.columnas})"
+
+
+class _ConstruirColumna(_Paso):
+    def __init__(self, columnas, nombre_col, separador, hash_bits):
+        self.columnas = list(columnas)
+        self.nombre_col = nombre_col
+        self.separador = separador
+        self.hash_bits = hash_bits
+        self.produce = [nombre_col] + ([f"{nombre_col}_2"] if hash_bits == 128 else [])
+
+    def salida(self, cols):
+        return cols + [c for c in self.produce if c not in cols]
+
+    def necesita(self, despues, antes):
+        if not set(self.produce) & despues:
+            return set(despues)
+        return (set(despues) - set(self.produce)) | set(self.columnas)
+
+    def calcular(self, vista) -> Dict[str, Any]:
+        return _columnas_construidas(vista, self.columnas, self.nombre_col, self.separador, self.hash_bits)
+
+    def __repr__(self):
+        return f"construir_columna({self.columnas} -> {self.nombre_col!r})"
+
+
+class _ColumnaCondicional(_Paso):
+    def __init__(self, nombre_columna, condicion: Condicion, valor_si, valor_no):
+        self.nombre_columna = nombre_columna
+        self.condicion = condicion
+        self.valor_si = valor_si
+        self.valor_no = valor_no
+        self.produce = [nombre_columna]
+
+    def salida(self, cols):
+        return cols + ([self.nombre_columna] if self.nombre_columna not in cols else [])
+
+    def necesita(self, despues, antes):
+        if self.nombre_columna not in despues:
+            return set(despues)
+        usa = set(antes) if isinstance(self.condicion, _CondicionLibre) else set(self.condicion.columnas)
+        return (set(despues) - {self.nombre_columna}) | usa
+
+    def calcular(self, vista) -> Dict[str, Any]:
+        return {self.nombre_columna: np.where(self.condicion(vista), self.valor_si, self.valor_no)}
+
+    def __repr__(self):
+        return f"añade_col_condicional({self.nombre_columna!r})"
+
+
+class _LimpiaFInstSiHueco(_Paso):
+    def __init__(self, col_estado, col_fecha):
+        self.col_estado = col_estado
+        self.col_fecha = col_fecha
+        self.produce = [col_fecha]
+
+    def salida(self, cols):
+        if self.col_estado not in cols or self.col_fecha not in cols:
+            raise ValueError(f"Las columnas '{self.col_estado}' y '{self.col_fecha}' deben existir en el DataFrame.")
+        return cols
+
+    def necesita(self, despues, antes):
+        if self.col_fecha not in despues:
+            return set(despues)
+        return set(despues) | {self.col_estado}
+
+    def calcular(self, vista) -> Dict[str, Any]:
+        fecha = vista[self.col_fecha]
+        return {self.col_fecha: fecha.mask(_es_hueco(vista[self.col_estado]).to_numpy())}
+
+    def __repr__(self):
+        return f"limpia_f_inst_si_hueco({self.col_estado!r}, {self.col_fecha!r})"
+
+
+class _DropDuplicates(_Paso):
+    tipo = "filas"
+
+    def __init__(self, subset, keep):
+        self.subset = None if subset is None else list(subset)
+        self.keep = keep
+
+    def necesita(self, despues, antes):
+        # Sin subset, los duplicados se deciden con TODAS las columnas que hay en ese punto
+        return set(despues) | set(antes if self.subset is None else self.subset)
+
+    def __repr__(self):
+        return f"drop_duplicates(subset={self.subset}, keep={self.keep!r})"
+
+
+class _Filtrar(_Paso):
+    tipo = "filas"
+
+    def __init__(self, condicion: Condicion):
+        self.condicion = condicion
+
+    def necesita(self, despues, antes):
+        usa = set(antes) if isinstance(self.condicion, _CondicionLibre) else set(self.condicion.columnas)
+        return set(despues) | usa
+
+    def __repr__(self):
+        return "filtrar(...)"
+
+
+class PipelineLimpieza:
+    """
+    Plan perezoso de la cadena de limpieza del notebook (eliminar_columnas ->
+    drop_duplicates -> construir_columna -> añade_col_condicional ->
+    limpia_f_inst_si_hueco). Definir los pasos no hace nada; al ejecutar:
+
+      1) Poda de columnas: recorriendo el plan hacia atrás se calcula qué columnas
+         hacen falta de verdad (las de salida + las que usan los pasos). Sólo esas
+         se cargan del fichero (cargar_tabla con proyección); los pasos cuyo
+         resultado no se usa no se ejecutan.
+      2) Fusión: los pasos de columnas consecutivos se calculan juntos y se asignan
+         una sola vez; los filtros / drop_duplicates consecutivos se combinan en
+         una máscara y se aplican con un único take.
+      3) Sin copias intermedias: se trabaja sobre un único DataFrame (la proyección
+         de columnas necesarias), que se modifica en el sitio.
+
+    El resultado es el mismo que el de la cadena de funciones de limpieza_utils.
+    El plan no guarda datos: la misma definición sirve para varios ficheros y ejecuciones.
+
+    Ejemplo
+    -------
+        limpieza = (
+            PipelineLimpieza()
+            .eliminar_columnas(["vidas"])
+            .drop_duplicates()
+            .construir_columna(["s ar", "cola"], "AC", separador="-")
+            .añade_col_condicional("es_hueco", col("f inst").isna(), "D", "M")
+            .limpia_f_inst_si_hueco()
+        )
+        rdcd = limpieza.ejecutar_fichero("rdcd.xlsx", columnas_salida=claves + ["f inst", "es_hueco"])
+        otra = limpieza.ejecutar(df)
+    """
+
+    def __init__(self):
+        self.pasos: List[_Paso] = []
+
+    def _con(self, paso: _Paso) -> "PipelineLimpieza":
+        nuevo = PipelineLimpieza()
+        nuevo.pasos = self.pasos + [paso]
+        return nuevo
+
+    # --- definición (cada método devuelve un pipeline nuevo; el original no cambia) ---
+
+    def eliminar_columnas(self, columnas: Iterable[str], errores: str = "ignore") -> "PipelineLimpieza":
+        return self._con(_EliminarColumnas(columnas, errores))
+
+    def seleccionar(self, columnas: Iterable[str]) -> "PipelineLimpieza":
+        return self._con(_Seleccionar(columnas))
+
+    def drop_duplicates(self, subset: Optional[Iterable[str]] = None, keep: Union[str, bool] = "first") -> "PipelineLimpieza":
+        return self._con(_DropDuplicates(subset, keep))
+
+    def construir_columna(
+        self, columnas: Iterable[str], nombre_col: str, separador: str = "-", hash_bits: Optional[int] = None,
+    ) -> "PipelineLimpieza":
+        return self._con(_ConstruirColumna(columnas, nombre_col, separador, hash_bits))
+
+    def añade_col_condicional(
+        self,
+        nombre_columna: str,
+        condicion: Union[Condicion, Callable[[pd.DataFrame], Any]],
+        valor_si: Any,
+        valor_no: Any,
+        usa: Optional[Iterable[str]] = None,
+    ) -> "PipelineLimpieza":
+        """
+        condicion : Condicion (col("f inst").isna()) o función df -> máscara booleana.
+                    Para una función, 'usa' indica las columnas que lee (si no se
+                    indica, se cargan todas las columnas que haya en ese punto).
+        """
+        return self._con(_ColumnaCondicional(nombre_columna, _a_condicion(condicion, usa), valor_si, valor_no))
+
+    def limpia_f_inst_si_hueco(self, col_estado: str = "es_hueco", col_fecha: str = "f inst") -> "PipelineLimpieza":
+        return self._con(_LimpiaFInstSiHueco(col_estado, col_fecha))
+
+    def filtrar(self, condicion: Union[Condicion, Callable], usa: Optional[Iterable[str]] = None) -> "PipelineLimpieza":
+        """Deja sólo las filas que cumplen la condición (ver añade_col_condicional)."""
+        return self._con(_Filtrar(_a_condicion(condicion, usa)))
+
+    # --- planificación ---
+
+    def plan(self, columnas_origen: Iterable[str], columnas_salida: Optional[Iterable[str]] = None) -> dict:
+        """
+        Resultado de la planificación (sin ejecutar nada):
+          - "cargar": columnas del origen que hay que leer
+          - "salida": columnas del resultado
+          - "pasos": lista de (paso, se_ejecuta)
+          - "fases": grupos de pasos fusionados [(tipo, [índices de paso])]
+          - "necesarias_tras": por paso, columnas que hacen falta después de él
+        """
+        columnas_origen = [str(c) for c in columnas_origen]
+        esquemas = [columnas_origen]
+        for paso in self.pasos:
+            esquemas.append(paso.salida(esquemas[-1]))
+        salida = esquemas[-1] if columnas_salida is None else list(columnas_salida)
+        faltan = [c for c in salida if c not in esquemas[-1]]
+        if faltan:
+            raise KeyError(f"columnas_salida no existen al final del pipeline: {faltan}")
+
+        hace_falta = set(salida)
+        activos = [True] * len(self.pasos)
+        necesarias_tras = [set()] * len(self.pasos)
+        for i in range(len(self.pasos) - 1, -1, -1):
+            paso = self.pasos[i]
+            necesarias_tras[i] = hace_falta
+            if paso.produce and not set(paso.produce) & hace_falta:
+                activos[i] = False
+            hace_falta = paso.necesita(hace_falta, esquemas[i])
+
+        fases = []
+        for i, paso in enumerate(self.pasos):
+            if not activos[i]:
+                continue
+            if fases and fases[-1][0] == paso.tipo:
+                fases[-1][1].append(i)
+            else:
+                fases.append((paso.tipo, [i]))
+        return {
+            "cargar": [c for c in columnas_origen if c in hace_falta],
+            "salida": salida,
+            "pasos": list(zip(self.pasos, activos)),
+            "fases": fases,
+            "necesarias_tras": necesarias_tras,
+        }
+
+    def describir(self, columnas_origen: Iterable[str], columnas_salida: Optional[Iterable[str]] = None) -> str:
+        p = self.plan(columnas_origen, columnas_salida)
+        lineas = [f"cargar {len(p['cargar'])} columnas: {p['cargar']}"]
+        for tipo, indices in p["fases"]:
+            lineas.append(f"fase de {tipo}: " + " + ".join(repr(self.pasos[i]) for i in indices))
+        omitidos = [repr(paso) for paso, activo in p["pasos"] if not activo]
+        if omitidos:
+            lineas.append(f"omitidos (su resultado no se usa): {omitidos}")
+        lineas.append(f"salida: {p['salida']}")
+        return "\n".join(lineas)
+
+    # --- ejecución ---
+
+    @staticmethod
+    def _fase_columnas(w: pd.DataFrame, pasos: List[_Paso]) -> pd.DataFrame:
+        nuevas: Dict[str, Any] = {}
+        vista = _Vista(w, nuevas)
+
+        def volcar():
+            for c, v in nuevas.items():
+                w[c] = v
+            nuevas.clear()
+
+        for paso in pasos:
+            if isinstance(paso, (_EliminarColumnas, _Seleccionar)):
+                volcar()
+                fuera = paso.columnas if isinstance(paso, _EliminarColumnas) else [c for c in w.columns if c not in paso.columnas]
+                w = w.drop(columns=[c for c in fuera if c in w.columns])
+                vista.df = w
+            else:
+                if isinstance(getattr(paso, "condicion", None), _CondicionLibre):
+                    volcar()  # una función libre recibe el DataFrame real
+                    nuevas.update(paso.calcular(w))
+                else:
+                    nuevas.update(paso.calcular(vista))
+        volcar()
+        return w
+
+    @staticmethod
+    def _fase_filas(w: pd.DataFrame, pasos: List[_Paso]) -> pd.DataFrame:
+        quedan = np.ones(len(w), dtype=bool)
+        for paso in pasos:
+            if isinstance(paso, _Filtrar):
+                quedan &= paso.condicion(w)
+            else:
+                if quedan.all():
+                    quedan &= ~w.duplicated(subset=paso.subset, keep=paso.keep).to_numpy()
+                else:
+                    pos = np.flatnonzero(quedan)
+                    dup = w.take(pos).duplicated(subset=paso.subset, keep=paso.keep).to_numpy()
+                    quedan[pos[dup]] = False
+        if quedan.all():
+            return w
+        return w.take(np.flatnonzero(quedan))
+
+    def _ejecutar_plan(self, w: pd.DataFrame, plan: dict) -> pd.DataFrame:
+        for tipo, indices in plan["fases"]:
+            pasos = [self.pasos[i] for i in indices]
+            with etapa(f"fase_{tipo}", entrada=w) as e:
+                if tipo == "columnas":
+                    w = self._fase_columnas(w, pasos)
+                else:
+                    w = self._fase_filas(w, pasos)
+                # Columnas que ya no usa ningún paso posterior ni la salida (un solo drop)
+                sobran = [c for c in w.columns if c not in plan["necesarias_tras"][indices[-1]]]
+                if sobran:
+                    w = w.drop(columns=sobran)
+                e.salida(w)
+        salida = plan["salida"]
+        if list(w.columns) != salida:
+            w = w[salida]
+        return w
+
+    @medido("PipelineLimpieza.ejecutar")
+    def ejecutar(self, df: pd.DataFrame, columnas_salida: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Ejecuta el plan sobre un DataFrame ya cargado. df no se modifica: se trabaja
+        sobre la proyección de las columnas necesarias.
+        columnas_salida : columnas que se quieren al final (None = todas las que quedan).
+        """
+        plan = self.plan(df.columns, columnas_salida)
+        w = df.reindex(columns=plan["cargar"])
+        return self._ejecutar_plan(w, plan)
+
+    @medido("PipelineLimpieza.ejecutar_fichero")
+    def ejecutar_fichero(
+        self,
+        ruta: str,
+        hoja: Union[int, str] = 0,
+        columnas_salida: Optional[Iterable[str]] = None,
+        dtypes: Optional[Dict[str, object]] = None,
+        dir_cache: Optional[str] = None,
+        usar_cache: bool = True,
+        leer_kwargs: Optional[dict] = None,
+    ) -> pd.DataFrame:
+        """
+        Carga (ruta, hoja) con cargar_tabla leyendo sólo las columnas que necesita
+        el plan y lo ejecuta. Los demás parámetros son los de cargar_tabla.
+        """
+        origen = columnas_tabla(ruta, hoja, dir_cache, usar_cache, leer_kwargs)
+        plan = self.plan(origen, columnas_salida)
+        with etapa("cargar"):
+            w = cargar_tabla(
+                ruta, hoja, columnas=plan["cargar"], dtypes=dtypes,
+                dir_cache=dir_cache, usar_cache=usar_cache, leer_kwargs=leer_kwargs,
+            )
+        return self._ejecutar_plan(w, plan)
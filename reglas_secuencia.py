@@ -0,0 +1,379 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from instrumentacion import etapa, medido
+from piezas_utils import MovementHistory, PresenceIndex, _tomar
+
+Fuente = Union[pd.DataFrame, Tuple[pd.DataFrame, Union[str, List[str]]]]
+
+
+def _conjunto(valores: Union[Any, Iterable]) -> frozenset:
+    """Un valor suelto ("RET") o un iterable de valores -> frozenset."""
+    if isinstance(valores, (str, bytes)) or not isinstance(valores, Iterable):
+        return frozenset([valores])
+    return frozenset(valores)
+
+
+class _Contexto:
+    """
+    Historial ya ordenado por (pieza, fecha) visto como arrays: lo calculan todas las
+    reglas a la vez (valores factorizados, grupo de cada posición, vecinos en la pieza).
+    Las posiciones son las del orden de MovementHistory, no las filas del DataFrame.
+    """
+
+    def __init__(self, hist: MovementHistory, valor_col: str, fuentes: Dict[str, Fuente]):
+        self.hist = hist
+        orden = hist._orden
+        self.n = len(orden)
+        self.posiciones = np.arange(self.n)
+        # Inicio / fin (exclusivo) de cada pieza en el orden
+        self.inicio_grupo = hist._inicio
+        self.fin_grupo = hist._fin
+        self.grupo = np.repeat(np.arange(len(self.inicio_grupo)), self.fin_grupo - self.inicio_grupo)
+        self.inicio = self.inicio_grupo[self.grupo]
+        self.fin = self.fin_grupo[self.grupo]
+        # ¿La posición anterior / siguiente es de la misma pieza?
+        self.mismo_previo = self.posiciones > self.inicio
+        self.mismo_siguiente = self.posiciones < self.fin - 1
+
+        self._codigos, self._unicos = pd.factorize(hist.df[valor_col].iloc[orden])
+        self._fuentes = fuentes
+        self._cache_en: Dict[frozenset, np.ndarray] = {}
+        self._cache_presencia: Dict[str, np.ndarray] = {}
+
+    def en(self, valores: frozenset) -> np.ndarray:
+        """Máscara por posición: el valor del movimiento está en 'valores' (los nulos nunca)."""
+        if valores not in self._cache_en:
+            tabla = np.asarray(pd.Index(self._unicos).isin(list(valores)), dtype=bool)
+            self._cache_en[valores] = (self._codigos >= 0) & tabla[np.maximum(self._codigos, 0)] if len(tabla) else np.zeros(self.n, dtype=bool)
+        return self._cache_en[valores]
+
+    def presente(self, fuente: str) -> np.ndarray:
+        """Máscara por pieza (grupo): la pieza está en la fuente auxiliar."""
+        if fuente not in self._cache_presencia:
+            if fuente not in self._fuentes:
+                raise KeyError(f"Fuente desconocida: {fuente!r}. Disponibles: {list(self._fuentes)}")
+            df_f = self._fuentes[fuente]
+            claves = self.hist.clave_cols
+            if isinstance(df_f, tuple):
+                df_f, cols_f = df_f
+                cols_f = [cols_f] if isinstance(cols_f, str) else list(cols_f)
+                df_f = df_f[cols_f].set_axis(claves, axis=1)
+            indice = PresenceIndex({fuente: df_f}, claves)
+            self._cache_presencia[fuente] = indice.esta_en(self.hist.claves, fuente)
+        return self._cache_presencia[fuente]
+
+
+class ReglaSecuencia(ABC):
+    """
+    Regla sobre la secuencia de movimientos de cada pieza. Se crean con las funciones
+    primero_prohibido, ultimo_prohibido, precedido_por, seguido_por, sin_repetir y
+    nada_despues_de (o con reglas_desde_config) y se evalúan con validar_secuencias.
+
+    en / no_en : la regla sólo se aplica a las piezas presentes en todas las fuentes
+                 'en' y en ninguna de 'no_en' (fuentes pasadas a validar_secuencias).
+    """
+
+    tipo = ""
+
+    def __init__(self, nombre: str, en: Iterable[str] = (), no_en: Iterable[str] = ()):
+        self.nombre = nombre
+        self.en = [en] if isinstance(en, str) else list(en)
+        self.no_en = [no_en] if isinstance(no_en, str) else list(no_en)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.nombre!r})"
+
+    @abstractmethod
+    def _violaciones(self, ctx: _Contexto) -> Tuple[np.ndarray, np.ndarray]:
+        """(posiciones que incumplen, posición del movimiento de referencia o -1)."""
+
+    def evaluar(self, ctx: _Contexto) -> Tuple[np.ndarray, np.ndarray]:
+        pos, ref = self._violaciones(ctx)
+        if self.en or self.no_en:
+            aplica = np.ones(len(ctx.hist), dtype=bool)
+            for f in self.en:
+                aplica &= ctx.presente(f)
+            for f in self.no_en:
+                aplica &= ~ctx.presente(f)
+            ok = aplica[ctx.grupo[pos]]
+            pos, ref = pos[ok], ref[ok]
+        return pos, ref
+
+
+class _PrimeroProhibido(ReglaSecuencia):
+    tipo = "primero_prohibido"
+
+    def __init__(self, nombre, valores, en=(), no_en=()):
+        super().__init__(nombre, en, no_en)
+        self.valores = _conjunto(valores)
+
+    def _violaciones(self, ctx):
+        pos = ctx.inicio_grupo[ctx.en(self.valores)[ctx.inicio_grupo]]
+        return pos, np.full(len(pos), -1)
+
+
+class _UltimoProhibido(ReglaSecuencia):
+    tipo = "ultimo_prohibido"
+
+    def __init__(self, nombre, valores, en=(), no_en=()):
+        super().__init__(nombre, en, no_en)
+        self.valores = _conjunto(valores)
+
+    def _violaciones(self, ctx):
+        ultimos = ctx.fin_grupo - 1
+        pos = ultimos[ctx.en(self.valores)[ultimos]]
+        return pos, np.full(len(pos), -1)
+
+
+class _PrecedidoPor(ReglaSecuencia):
+    tipo = "precedido_por"
+
+    def __init__(self, nombre, valor, anteriores, permitir_primero=False, en=(), no_en=()):
+        super().__init__(nombre, en, no_en)
+        self.valor = _conjunto(valor)
+        self.anteriores = _conjunto(anteriores)
+        self.permitir_primero = permitir_primero
+
+    def _violaciones(self, ctx):
+        previo_ok = np.r_[False, ctx.en(self.anteriores)[:-1]] & ctx.mismo_previo
+        if self.permitir_primero:
+            previo_ok |= ~ctx.mismo_previo
+        pos = np.flatnonzero(ctx.en(self.valor) & ~previo_ok)
+        return pos, np.where(ctx.mismo_previo[pos], pos - 1, -1)
+
+
+class _SeguidoPor(ReglaSecuencia):
+    tipo = "seguido_por"
+
+    def __init__(self, nombre, valor, siguientes, permitir_ultimo=True, en=(), no_en=()):
+        super().__init__(nombre, en, no_en)
+        self.valor = _conjunto(valor)
+        self.siguientes = _conjunto(siguientes)
+        self.permitir_ultimo = permitir_ultimo
+
+    def _violaciones(self, ctx):
+        siguiente_ok = np.r_[ctx.en(self.siguientes)[1:], False] & ctx.mismo_siguiente
+        if self.permitir_ultimo:
+            siguiente_ok |= ~ctx.mismo_siguiente
+        pos = np.flatnonzero(ctx.en(self.valor) & ~siguiente_ok)
+        return pos, np.where(ctx.mismo_siguiente[pos], pos + 1, -1)
+
+
+class _SinRepetir(ReglaSecuencia):
+    tipo = "sin_repetir"
+
+    def __init__(self, nombre, valor, entre=None, en=(), no_en=()):
+        super().__init__(nombre, en, no_en)
+        self.valor = _conjunto(valor)
+        self.entre = None if entre is None else _conjunto(entre)
+
+    def _violaciones(self, ctx):
+        es_valor = ctx.en(self.valor)
+        # Subsecuencia con sólo 'valor' y 'entre' (o todos los movimientos si entre es None)
+        sub = ctx.posiciones if self.entre is None else np.flatnonzero(es_valor | ctx.en(self.entre))
+        if len(sub) < 2:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        previo, actual = sub[:-1], sub[1:]
+        repetido = es_valor[previo] & es_valor[actual] & (ctx.grupo[previo] == ctx.grupo[actual])
+        return actual[repetido], previo[repetido]
+
+
+class _NadaDespuesDe(ReglaSecuencia):
+    tipo = "nada_despues_de"
+
+    def __init__(self, nombre, valores, desde_el_ultimo=True, en=(), no_en=()):
+        super().__init__(nombre, en, no_en)
+        self.valores = _conjunto(valores)
+        self.desde_el_ultimo = desde_el_ultimo
+
+    def _violaciones(self, ctx):
+        # Última aparición de 'valores' hasta cada posición (acumulado que no cruza piezas:
+        # se compara con el inicio de la pieza)
+        visto = np.maximum.accumulate(np.where(ctx.en(self.valores), ctx.posiciones, -1)) if ctx.n else ctx.posiciones
+        if self.desde_el_ultimo:
+            ref = visto[ctx.fin - 1]  # última aparición en toda la pieza
+            malo = (ref >= ctx.inicio) & (ctx.posiciones > ref)
+        else:
+            ref = np.r_[-1, visto[:-1]]  # alguna aparición antes de esta posición
+            malo = ref >= ctx.inicio
+        pos = np.flatnonzero(malo)
+        return pos, ref[pos]
+
+
+def primero_prohibido(nombre: str, valores, en: Iterable[str] = (), no_en: Iterable[str] = ()) -> ReglaSecuencia:
+    """El primer movimiento de la pieza no puede tener ninguno de 'valores'."""
+    return _PrimeroProhibido(nombre, valores, en, no_en)
+
+
+def ultimo_prohibido(nombre: str, valores, en: Iterable[str] = (), no_en: Iterable[str] = ()) -> ReglaSecuencia:
+    """El último movimiento de la pieza no puede tener ninguno de 'valores'."""
+    return _UltimoProhibido(nombre, valores, en, no_en)
+
+
+def precedido_por(
+    nombre: str, valor, anteriores, permitir_primero: bool = False,
+    en: Iterable[str] = (), no_en: Iterable[str] = (),
+) -> ReglaSecuencia:
+    """
+    Cada movimiento 'valor' debe ir justo después de uno de 'anteriores'
+    ("un RET debe seguir a un INST": precedido_por("ret_tras_inst", "RET", "INST")).
+    permitir_primero : si True, 'valor' puede ser el primer movimiento de la pieza.
+    """
+    return _PrecedidoPor(nombre, valor, anteriores, permitir_primero, en, no_en)
+
+
+def seguido_por(
+    nombre: str, valor, siguientes, permitir_ultimo: bool = True,
+    en: Iterable[str] = (), no_en: Iterable[str] = (),
+) -> ReglaSecuencia:
+    """
+    Cada movimiento 'valor' debe ir seguido justo por uno de 'siguientes'.
+    permitir_ultimo : si True, 'valor' puede ser el último movimiento de la pieza.
+    """
+    return _SeguidoPor(nombre, valor, siguientes, permitir_ultimo, en, no_en)
+
+
+def sin_repetir(nombre: str, valor, entre=None, en: Iterable[str] = (), no_en: Iterable[str] = ()) -> ReglaSecuencia:
+    """
+    No puede haber dos movimientos 'valor' sin uno de 'entre' en medio
+    ("no dos INST sin un RET": sin_repetir("inst_sin_ret", "INST", entre="RET")).
+    Con entre=None: no puede haber dos 'valor' seguidos.
+    """
+    return _SinRepetir(nombre, valor, entre, en, no_en)
+
+
+def nada_despues_de(
+    nombre: str, valores, desde_el_ultimo: bool = True,
+    en: Iterable[str] = (), no_en: Iterable[str] = (),
+) -> ReglaSecuencia:
+    """
+    No puede haber movimientos después del último 'valores' de la pieza
+    (desde_el_ultimo=False: después de ninguno, es decir, 'valores' es terminal).
+    """
+    return _NadaDespuesDe(nombre, valores, desde_el_ultimo, en, no_en)
+
+
+_TIPOS = {
+    "primero_prohibido": primero_prohibido,
+    "ultimo_prohibido": ultimo_prohibido,
+    "precedido_por": precedido_por,
+    "seguido_por": seguido_por,
+    "sin_repetir": sin_repetir,
+    "nada_despues_de": nada_despues_de,
+}
+
+
+def reglas_desde_config(config: Iterable[Dict[str, Any]]) -> List[ReglaSecuencia]:
+    """
+    Reglas a partir de dicts (p.ej. leídos de un JSON/YAML):
+        [{"tipo": "precedido_por", "nombre": "ret_tras_inst", "valor": "RET", "anteriores": "INST"},
+         {"tipo": "primero_prohibido", "nombre": "primero", "valores": ["RET", "BAJA"], "en": ["f2"]}]
+    """
+    reglas = []
+    for d in config:
+        d = dict(d)
+        tipo = d.pop("tipo", None)
+        if tipo not in _TIPOS:
+            raise ValueError(f"Tipo de regla no válido: {tipo!r}. Disponibles: {list(_TIPOS)}")
+        reglas.append(_TIPOS[tipo](**d))
+    return reglas
+
+
+@medido()
+def validar_secuencias(
+    movs: Union[pd.DataFrame, MovementHistory],
+    clave_cols: Optional[Union[str, List[str]]],
+    fecha_col: Optional[str],
+    valor_col: str,
+    reglas: Iterable[ReglaSecuencia],
+    fuentes: Optional[Dict[str, Fuente]] = None,
+) -> pd.DataFrame:
+    """
+    Evalúa todas las reglas sobre el historial ordenado UNA vez por (pieza, fecha):
+    cada regla es una comparación vectorizada con el movimiento anterior / siguiente
+    de la misma pieza, sin volver a agrupar ni copiar los movimientos por regla.
+
+    Ejemplo
+    -------
+        reglas = [
+            primero_prohibido("primero_no_ret", {"RET", "BAJA"}, en=["f2"], no_en=["f3"]),
+            precedido_por("ret_tras_inst", "RET", "INST"),
+            sin_repetir("inst_sin_ret", "INST", entre="RET"),
+            nada_despues_de("nada_tras_ret", "RET"),
+        ]
+        validar_secuencias(movs, "pieza", "fecha_movimiento", "movimiento", reglas, fuentes={"f2": f2, "f3": f3})
+
+    Parámetros
+    ----------
+    movs : DataFrame de movimientos o un MovementHistory ya construido (entonces
+           clave_cols y fecha_col pueden ser None).
+    clave_cols : columna(s) que identifican la pieza.
+    fecha_col : columna de fecha del movimiento.
+    valor_col : columna con el tipo de movimiento que miran las reglas.
+    reglas : lista de ReglaSecuencia (nombres únicos).
+    fuentes : dict nombre -> DataFrame (o (DataFrame, columnas clave en ese fichero))
+              para las condiciones en / no_en de las reglas.
+
+    Retorna
+    -------
+    DataFrame con una fila por movimiento que incumple cada regla, ordenado por pieza
+    y fecha: [regla, *clave_cols, fila, fecha_col, valor_col, fila_referencia,
+    {fecha_col}_referencia, {valor_col}_referencia]. fila es la etiqueta del índice de
+    movs; la referencia es el movimiento con el que se compara (el anterior, el
+    siguiente, el repetido o el último 'valores'), NaN si no lo hay.
+    Como MovementHistory, las filas sin fecha o con clave nula no cuentan.
+    """
+    reglas = list(reglas)
+    nombres = [r.nombre for r in reglas]
+    repetidas = sorted({n for n in nombres if nombres.count(n) > 1})
+    if repetidas:
+        raise ValueError(f"Reglas repetidas: {repetidas}")
+    hist = movs if isinstance(movs, MovementHistory) else MovementHistory(movs, clave_cols, fecha_col)
+    ctx = _Contexto(hist, valor_col, fuentes or {})
+
+    todas_pos, todas_ref, todas_regla = [], [], []
+    for i, regla in enumerate(reglas):
+        with etapa(f"regla:{regla.nombre}"):
+            pos, ref = regla.evaluar(ctx)
+        todas_pos.append(pos.astype(np.int64))
+        todas_ref.append(ref.astype(np.int64))
+        todas_regla.append(np.full(len(pos), i, dtype=np.int64))
+
+    with etapa("resultado"):
+        pos = np.concatenate(todas_pos) if reglas else np.empty(0, dtype=np.int64)
+        ref = np.concatenate(todas_ref) if reglas else np.empty(0, dtype=np.int64)
+        id_regla = np.concatenate(todas_regla) if reglas else np.empty(0, dtype=np.int64)
+        # Orden del historial (pieza, fecha) y, en la misma fila, el de las reglas
+        orden = np.lexsort((id_regla, pos))
+        pos, ref, id_regla = pos[orden], ref[orden], id_regla[orden]
+
+        filas = hist._orden[pos]
+        filas_ref = np.where(ref >= 0, hist._orden[np.maximum(ref, 0)] if len(hist._orden) else -1, -1)
+        df = hist.df
+        fecha_col = hist.fecha_col
+        out = pd.DataFrame({"regla": pd.Categorical.from_codes(id_regla, categories=pd.Index(nombres, dtype=object))})
+        for c in hist.clave_cols:
+            out[c] = _tomar(df[c], filas)
+        out["fila"] = df.index[filas]
+        out[fecha_col] = hist.fechas[filas]
+        out[valor_col] = _tomar(df[valor_col], filas)
+        out["fila_referencia"] = _tomar(pd.Series(df.index), filas_ref)
+        out[f"{fecha_col}_referencia"] = _tomar(pd.Series(hist.fechas), filas_ref)
+        out[f"{valor_col}_referencia"] = _tomar(df[valor_col], filas_ref)
+    return out
+
+
+def resumen_violaciones(violaciones: pd.DataFrame, clave_cols: Union[str, List[str]]) -> pd.DataFrame:
+    """Por regla: nº de movimientos y de piezas que la incumplen."""
+    if isinstance(clave_cols, str):
+        clave_cols = [clave_cols]
+    return (
+        violaciones.groupby("regla", observed=False)
+        .agg(movimientos=("fila", "size"))
+        .join(violaciones.drop_duplicates(["regla", *clave_cols]).groupby("regla", observed=False).size().rename("piezas"))
+        .reset_index()
+    )
@@ -0,0 +1,48 @@
+import pandas as pd
+
+from benchmarks import generador
+from benchmarks.casos import CASOS
+from benchmarks.ejecutar import BASE_DEFECTO, cargar_resultados, comparar_con_base, ejecutar_benchmarks
+
+
+def test_generador_reproducible():
+    a = generador.movimientos(2_000, 100, tasa_nan=0.05, mezcla_fechas=generador.MEZCLA_FECHAS_DEFECTO, semilla=3)
+    b = generador.movimientos(2_000, 100, tasa_nan=0.05, mezcla_fechas=generador.MEZCLA_FECHAS_DEFECTO, semilla=3)
+    pd.testing.assert_frame_equal(a, b)
+    assert a["pieza"].nunique() <= 100 and a["fecha_movimiento"].isna().any()
+
+
+def test_rdcd_clave_unica_y_pareja():
+    df = generador.rdcd(3_000, n_columnas_clave=5, cardinalidad=6)
+    claves = [c for c in df.columns if c.startswith("k")]
+    assert len(claves) == 5 and not df.duplicated(claves).any()
+    otra = generador.pareja_rdcd(df, tasa_altas=0.1)
+    assert otra[claves[0]].str.startswith("NUEVA").sum() == 300
+
+
+def test_base_del_repositorio_cubre_todos_los_casos():
+    base = cargar_resultados(BASE_DEFECTO)
+    assert base["meta"]["escala"] == 100_000
+    assert set(base["resultados"]) == set(CASOS)
+    assert not any("error" in r for r in base["resultados"].values())
+
+
+def test_ejecutar_y_comparar(tmp_path):
+    res = ejecutar_benchmarks(2_000, casos=["max_fecha_por_pieza", "comparar_por_clave"], repeticiones=1,
+                              verbose=False)
+    assert all(r["filas_s"] > 0 for r in res["resultados"].values())
+    lenta = {"meta": res["meta"], "resultados": {c: dict(r, filas_s=r["filas_s"] * 10)
+                                                 for c, r in res["resultados"].items()}}
+    comparacion = comparar_con_base(res, lenta).set_index("caso")
+    assert (comparacion["estado"] == "REGRESION").all()
+    assert (comparar_con_base(res, {"resultados": {}})["estado"] == "NUEVO").all()
+    assert (comparar_con_base(res, res)["estado"] == "OK").all()
+
+
+def test_otra_escala_no_se_juzga():
+    res = ejecutar_benchmarks(2_000, casos=["comparar_por_clave"], repeticiones=1, verbose=False)
+    base = {"meta": dict(res["meta"], escala=100_000),
+            "resultados": {c: dict(r, filas_s=r["filas_s"] * 10) for c, r in res["resultados"].items()}}
+    comparacion = comparar_con_base(res, base)
+    assert (comparacion["estado"] == "ESCALA_DISTINTA").all()
+    assert comparacion["ratio_memoria"].isna().all() and (comparacion["ratio_tiempo"] > 1).all()
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from carga_cache import cargar_tabla, columnas_tabla, limpiar_cache, ruta_cache
+
+
+@pytest.fixture
+def csv(tmp_path):
+    ruta = tmp_path / "datos.csv"
+    pd.DataFrame({"pn": ["001", "002"], "sn": [1, 2], "mezcla": ["a", "1"]}).to_csv(ruta, index=False)
+    return str(ruta)
+
+
+def test_cache_y_proyeccion(csv, tmp_path):
+    dir_cache = str(tmp_path / "cache")
+    completo = cargar_tabla(csv, dir_cache=dir_cache)
+    destino = ruta_cache(csv, dir_cache=dir_cache)
+    assert os.path.exists(destino)
+    parcial = cargar_tabla(csv, columnas=["sn"], dtypes={"sn": "float64"}, dir_cache=dir_cache)
+    assert list(parcial.columns) == ["sn"] and parcial["sn"].dtype == "float64"
+    assert parcial["sn"].tolist() == completo["sn"].astype(float).tolist()
+    assert columnas_tabla(csv, dir_cache=dir_cache) == ["pn", "sn", "mezcla"]
+
+
+def test_cambio_del_fichero_invalida_la_cache(csv, tmp_path):
+    dir_cache = str(tmp_path / "cache")
+    cargar_tabla(csv, dir_cache=dir_cache)
+    antes = ruta_cache(csv, dir_cache=dir_cache)
+    pd.DataFrame({"pn": ["003"], "sn": [3], "mezcla": ["b"]}).to_csv(csv, index=False)
+    os.utime(csv, ns=(os.stat(csv).st_atime_ns, os.stat(csv).st_mtime_ns + 10**9))
+    assert cargar_tabla(csv, dir_cache=dir_cache)["sn"].tolist() == [3]
+    assert ruta_cache(csv, dir_cache=dir_cache) != antes
+    # La caché obsoleta se borra
+    assert not os.path.exists(antes)
+    assert limpiar_cache(dir_cache) == 1
+
+
+def test_sin_cache_y_leer_kwargs(csv, tmp_path):
+    df = cargar_tabla(csv, usar_cache=False, leer_kwargs={"dtype": {"pn": str}})
+    assert df["pn"].tolist() == ["001", "002"]
+    assert not os.path.exists(os.path.join(os.path.dirname(csv), ".cache_tablas"))
+    with pytest.raises(ValueError):
+        cargar_tabla(str(tmp_path / "datos.json"), usar_cache=False)
+
+
+def _uno_como_numero(v):
+    return 1 if v == "1" else v
+
+
+def test_columnas_mezcladas_como_texto(tmp_path):
+    ruta = str(tmp_path / "mezcla.csv")
+    pd.DataFrame({"k": [1, 2]}).to_csv(ruta, index=False)
+    # Números y texto en la misma columna: en la caché se guarda como texto
+    convertir = {"converters": {"k": _uno_como_numero}}
+    df = cargar_tabla(ruta, dir_cache=str(tmp_path / "cache"), leer_kwargs=convertir)
+    assert df["k"].tolist() == ["1", "2"]
+
+
+def _mayusculas(v):
+    return v.upper()
+
+
+def test_firma_de_leer_kwargs_estable_entre_procesos(csv, tmp_path):
+    dir_cache = str(tmp_path / "cache")
+    kwargs = {"converters": {"mezcla": _mayusculas}, "dtype": {"pn": str}}
+    destino = ruta_cache(csv, dir_cache=dir_cache, leer_kwargs=kwargs)
+    codigo = ("import sys; sys.path.insert(0, sys.argv[3]); import test_carga_cache as t\n"
+              "print(t.ruta_cache(sys.argv[1], dir_cache=sys.argv[2], "
+              "leer_kwargs={'converters': {'mezcla': t._mayusculas}, 'dtype': {'pn': str}}))")
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    otro = subprocess.run([sys.executable, "-c", codigo, csv, dir_cache, raiz], capture_output=True, text=True)
+    assert otro.stdout.strip() == destino
+    assert cargar_tabla(csv, dir_cache=dir_cache, leer_kwargs=kwargs)["mezcla"].tolist() == ["A", "1"]
+    assert ruta_cache(csv, dir_cache=dir_cache, leer_kwargs={"dtype": {"pn": str}}) != destino
+
+
+def test_leer_kwargs_sin_forma_estable(csv, tmp_path):
+    with pytest.raises(ValueError):
+        cargar_tabla(csv, dir_cache=str(tmp_path / "cache"), leer_kwargs={"converters": {"pn": lambda v: v}})
+    # Sin caché no hace falta firmarlos
+    df = cargar_tabla(csv, usar_cache=False, leer_kwargs={"converters": {"pn": lambda v: v}})
+    assert df["pn"].tolist() == ["001", "002"]
@@ -0,0 +1,63 @@
+import os
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+import carga_cache
+from carga_masiva import cargar_en_bloque, expandir_rutas, iterar_en_bloque
+
+pytest.importorskip("openpyxl")
+
+
+def _libro(ruta, hojas):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with pd.ExcelWriter(ruta) as w:
+        for nombre, df in hojas.items():
+            df.to_excel(w, sheet_name=nombre, index=False)
+
+
+@pytest.fixture
+def carpeta(tmp_path):
+    for anio in ("2023", "2024"):
+        _libro(str(tmp_path / anio / "datos.xlsx"), {
+            "A": pd.DataFrame({"pn": [f"{anio}-1", f"{anio}-2"], "v": [1, 2]}),
+            "B": pd.DataFrame({"pn": [f"{anio}-3"], "v": [3]}),
+        })
+    pd.DataFrame({"pn": ["c"], "v": [9]}).to_csv(tmp_path / "suelto.csv", index=False)
+    (tmp_path / "~$temporal.xlsx").write_text("")
+    return tmp_path
+
+
+def test_expandir_rutas(carpeta):
+    ficheros = expandir_rutas(str(carpeta / "**" / "*.xlsx"))
+    assert [os.path.relpath(f, carpeta) for f in ficheros] == [os.path.join("2023", "datos.xlsx"),
+                                                               os.path.join("2024", "datos.xlsx")]
+
+
+def test_ruta_relativa_en_glob_recursivo(carpeta):
+    df, informe = cargar_en_bloque(str(carpeta / "**" / "*.xlsx"), n_procesos=1, usar_cache=False)
+    assert sorted(df["fichero_origen"].unique()) == ["2023/datos.xlsx", "2024/datos.xlsx"]
+    assert len(df) == 6 and informe["error"].isna().all()
+    assert df.loc[df["pn"] == "2024-3", "hoja_origen"].tolist() == ["B"]
+
+
+def test_un_solo_parseo_por_libro(carpeta):
+    ruta = str(carpeta / "2023" / "datos.xlsx")
+    with mock.patch.object(carga_cache.pd, "read_excel", wraps=pd.read_excel) as leer:
+        res = list(iterar_en_bloque(ruta, n_procesos=1, dir_cache=str(carpeta / "cache")))
+    assert leer.call_count == 1
+    assert [(r.hoja, r.filas) for r in res] == [("A", 2), ("B", 1)]
+    # Segunda vez: todo sale de la caché
+    with mock.patch.object(carga_cache.pd, "read_excel", wraps=pd.read_excel) as leer:
+        res = list(iterar_en_bloque(ruta, ["B"], n_procesos=1, dir_cache=str(carpeta / "cache")))
+    assert leer.call_count == 0 and res[0].df["pn"].tolist() == ["2023-3"]
+
+
+def test_hoja_inexistente_no_detiene_el_lote(carpeta):
+    ruta = str(carpeta / "2023" / "datos.xlsx")
+    df, informe = cargar_en_bloque([ruta, str(carpeta / "suelto.csv")], hojas=["A", "Z"], n_procesos=1,
+                                   usar_cache=False)
+    errores = informe.set_index("hoja")["error"]
+    assert pd.isna(errores["A"]) and "Z" in errores["Z"]
+    assert sorted(df["pn"]) == ["2023-1", "2023-2", "c"]
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from claves_hash import _normalizar_claves, filas_en_colision, hash_claves, presencia_por_hash, unir_por_hash
+from piezas_utils import comparar_por_clave
+
+
+def _tablas(semilla=0, n=400):
+    rng = np.random.default_rng(semilla)
+    left = pd.DataFrame({"a": rng.choice(["x", "y", None], n), "b": rng.integers(0, 30, n), "vl": np.arange(n)})
+    right = pd.DataFrame({"a": rng.choice(["x", "z", None], n), "b": rng.integers(0, 30, n), "vr": np.arange(n)})
+    return left, right
+
+
+def _filas(df):
+    return sorted(tuple(map(str, fila)) for fila in df.itertuples(index=False, name=None))
+
+
+@pytest.mark.parametrize("how", ["left", "inner", "outer"])
+def test_unir_como_merge(how):
+    left, right = _tablas()
+    esperado = left.merge(right, on=["a", "b"], how=how, indicator=True)
+    res = unir_por_hash(left, right, ["a", "b"], how=how, indicator=True)
+    assert list(res.columns) == list(esperado.columns)
+    assert _filas(res) == _filas(esperado)
+
+
+def test_unir_orden_left_y_despues_right():
+    left = pd.DataFrame({"k": [3, 1, 2], "vl": [0, 1, 2]})
+    right = pd.DataFrame({"k": [9, 2, 3], "vr": [0, 1, 2]})
+    res = unir_por_hash(left, right, ["k"])
+    assert res["k"].tolist() == [3, 1, 2, 9]
+    assert res["vr"].isna().tolist() == [False, True, False, False]
+    assert res["vl"].isna().tolist() == [False, False, False, True]
+
+
+def test_columnas_repetidas():
+    with pytest.raises(ValueError):
+        unir_por_hash(pd.DataFrame({"k": [1], "v": [1]}), pd.DataFrame({"k": [1], "v": [1]}), ["k"])
+
+
+def test_int_contra_float_con_valores_enteros():
+    grande = 2 ** 53
+    left = pd.DataFrame({"k": np.array([grande, grande + 1, 7], dtype=np.int64), "vl": [0, 1, 2]})
+    right = pd.DataFrame({"k": [float(grande), 7.0], "vr": [0, 1]})
+    cl, cr = _normalizar_claves([left, right], ["k"])
+    assert cl["k"].dtype == cr["k"].dtype == np.int64
+    res = unir_por_hash(left, right, ["k"], how="inner")
+    assert sorted(res["k"].tolist()) == [7, grande]
+
+
+def test_enteros_grandes_contra_float_no_entero():
+    # 2^53 + 1 no se puede confundir con 2^53 aunque el otro lado tenga decimales
+    grande = 2 ** 53
+    left = pd.DataFrame({"k": np.array([grande + 1, 1], dtype=np.int64), "vl": [0, 1]})
+    right = pd.DataFrame({"k": [float(grande), 1.0, 0.5], "vr": [0, 1, 2]})
+    res = unir_por_hash(left, right, ["k"], how="inner")
+    assert res["vl"].tolist() == [1]
+    solo_1, solo_2, ambos = presencia_por_hash(left, right, ["k"])
+    assert len(ambos) == 1 and len(solo_1) == 1 and len(solo_2) == 2
+
+
+def test_presencia_como_comparar_por_clave():
+    left, right = _tablas(1)
+    rapido = presencia_por_hash(left, right, ["a", "b"])
+    normal = comparar_por_clave(left, right, ["a", "b"])
+    for r, n in zip(rapido, normal):
+        assert _filas(r) == _filas(n)
+
+
+def test_hash_y_colisiones():
+    df = pd.DataFrame({"a": ["x", "x", "y"], "b": [1, 1, 2]})
+    h = hash_claves(df, ["a", "b"])
+    assert h[0] == h[1] != h[2]
+    assert hash_claves(df, ["a", "b"], bits=128).shape == (3, 2)
+    assert not filas_en_colision(df, np.array([0, 0, 1])).any()
+    # Mismo código para claves distintas -> colisión en las dos filas
+    assert filas_en_colision(df, np.array([0, 0, 0])).tolist() == [True, True, True]
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from codificacion_claves import CodificadorClaves
+from piezas_utils import MovementHistory, max_fecha_por_pieza
+
+
+def _movs(piezas, fecha):
+    return pd.DataFrame({"pn": piezas, "fecha": pd.to_datetime([fecha] * len(piezas))})
+
+
+def test_actualizar_deja_el_tipo_comun():
+    cod = CodificadorClaves({"pn": ["pn"]})
+    e1 = cod.codificar(_movs(["a", "z", "b"], "2024-01-01"))
+    e2 = cod.codificar(_movs(["c", "a"], "2024-01-02"))
+    assert e1["pn"].dtype != e2["pn"].dtype
+    e1 = cod.actualizar(e1)
+    assert e1["pn"].dtype == e2["pn"].dtype
+    assert e1["pn"].tolist() == ["a", "z", "b"]
+    assert cod.decodificar(e1)["pn"].tolist() == ["a", "z", "b"]
+
+
+def test_codificar_todos_mismo_tipo():
+    cod = CodificadorClaves({"pn": ["pn", "pn_padre"]})
+    a = pd.DataFrame({"pn": ["x", "y"], "pn_padre": ["y", None]})
+    b = pd.DataFrame({"pn": ["w"]})
+    ea, eb = cod.codificar_todos([a, b])
+    assert ea["pn"].dtype == ea["pn_padre"].dtype == eb["pn"].dtype
+    assert ea["pn_padre"].isna().tolist() == [False, True]
+
+
+def test_sin_registrar_valores_nuevos_quedan_nulos():
+    cod = CodificadorClaves({"pn": ["pn"]})
+    cod.registrar(pd.DataFrame({"pn": ["a"]}))
+    assert cod.codificar(pd.DataFrame({"pn": ["a", "b"]}), registrar=False)["pn"].isna().tolist() == [False, True]
+
+
+def test_orden_por_valor_aunque_las_categorias_no_lo_esten():
+    cod = CodificadorClaves({"pn": ["pn"]})
+    e1 = cod.codificar(_movs(["a", "z", "b"], "2024-01-01"))
+    e2 = cod.codificar(_movs(["c"], "2024-01-02"))
+    movs = pd.concat([cod.actualizar(e1), e2], ignore_index=True)
+    assert list(cod.tipo("pn").categories) == ["a", "b", "z", "c"]
+    assert max_fecha_por_pieza(movs, "pn", "fecha")["pn"].tolist() == ["a", "b", "c", "z"]
+    texto = movs.astype({"pn": str})
+    hist, hist_texto = MovementHistory(movs, "pn", "fecha"), MovementHistory(texto, "pn", "fecha")
+    assert hist.ultimo()["pn"].astype(str).tolist() == hist_texto.ultimo()["pn"].tolist()
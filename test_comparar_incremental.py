@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparar_incremental import comparar_tablas_incremental, leer_snapshot
+from comparar_tablas_mejorado import comparar_tablas
+
+
+def _tablas(n=400, semilla=0):
+    rng = np.random.default_rng(semilla)
+    left = pd.DataFrame({"pn": rng.integers(0, 150, n), "sn": rng.choice(list("abcd"), n),
+                         "v": rng.integers(0, 5, n).astype(float), "t": rng.choice(["x", "X ", "y"], n)})
+    right = left.sample(frac=0.9, random_state=semilla).reset_index(drop=True)
+    right.loc[:30, "v"] += 1
+    return left, right
+
+
+def _cambiar(df, semilla):
+    rng = np.random.default_rng(semilla)
+    df = df.copy()
+    filas = rng.choice(len(df), 15, replace=False)
+    df.loc[df.index[filas], "v"] = rng.integers(0, 5, 15).astype(float)
+    return pd.concat([df.drop(df.index[:5]), df.iloc[:3].assign(pn=999)], ignore_index=True)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"normalize_text_on": ["t"], "atol": 0.5}])
+def test_igual_que_comparar_tablas_en_ejecuciones_sucesivas(tmp_path, kwargs):
+    ruta = str(tmp_path / "snap.pkl")
+    left, right = _tablas()
+    for paso in range(4):
+        res = comparar_tablas_incremental(left, right, ["pn", "sn"], ruta, **kwargs)
+        esperado = comparar_tablas(left, right, ["pn", "sn"], **kwargs)
+        esperado = esperado.sort_values(["pn", "sn"], kind="stable").reset_index(drop=True)
+        pd.testing.assert_frame_equal(res, esperado)
+        assert res.attrs["delta"]["completo"] == (paso == 0)
+        left, right = _cambiar(left, paso), _cambiar(right, paso + 10)
+
+
+def test_solo_recompara_lo_cambiado(tmp_path):
+    ruta = str(tmp_path / "snap.pkl")
+    left, right = _tablas()
+    comparar_tablas_incremental(left, right, ["pn", "sn"], ruta)
+    res = comparar_tablas_incremental(left, right, ["pn", "sn"], ruta)
+    repetidas = left.duplicated(["pn", "sn"], keep=False) | left.set_index(["pn", "sn"]).index.isin(
+        right.loc[right.duplicated(["pn", "sn"], keep=False)].set_index(["pn", "sn"]).index)
+    assert res.attrs["delta"]["claves_recomparadas"] == left.loc[repetidas, ["pn", "sn"]].drop_duplicates().shape[0]
+    right2 = right.copy()
+    right2.loc[0, "v"] = -1
+    res = comparar_tablas_incremental(left, right2, ["pn", "sn"], ruta)
+    assert res.attrs["delta"]["modificadas_right"] == 1
+
+
+def test_snapshot_compacto(tmp_path):
+    ruta = str(tmp_path / "snap.pkl")
+    left, right = _tablas()
+    comparar_tablas_incremental(left, right, ["pn", "sn"], ruta)
+    snap = leer_snapshot(ruta)
+    assert "resultado" not in snap
+    assert len(snap["claves"]) == len(snap["estado"]) == len(snap["diferencias"])
+
+
+def test_claves_int_contra_float(tmp_path):
+    ruta = str(tmp_path / "snap.pkl")
+    left = pd.DataFrame({"k": [1, 2, 3], "v": [1, 2, 3]})
+    right = pd.DataFrame({"k": [1.0, 2.0, 4.0], "v": [1, 5, 4]})
+    primero = comparar_tablas_incremental(left, right, ["k"], ruta)
+    segundo = comparar_tablas_incremental(left, right, ["k"], ruta)
+    pd.testing.assert_frame_equal(primero, segundo)
+    assert segundo.attrs["delta"]["claves_recomparadas"] == 0
+    assert segundo["estado"].astype(str).tolist()[:2] == ["OK", "DISCREPANCIA"]
+
+
+def test_otros_parametros_comparacion_completa(tmp_path):
+    ruta = str(tmp_path / "snap.pkl")
+    left, right = _tablas()
+    comparar_tablas_incremental(left, right, ["pn", "sn"], ruta)
+    res = comparar_tablas_incremental(left, right, ["pn", "sn"], ruta, atol=1.0)
+    assert res.attrs["delta"]["completo"]
+
+
+@pytest.mark.parametrize("quitar", range(4))
+def test_claves_eliminadas_de_los_dos_lados(tmp_path, quitar):
+    # Cualquier clave (también la de hash mayor) puede desaparecer entre ejecuciones
+    ruta = str(tmp_path / "snap.pkl")
+    df = pd.DataFrame({"k": [1, 2, 3, 4], "v": [1, 2, 3, 4]})
+    comparar_tablas_incremental(df, df, ["k"], ruta)
+    menos = df.drop(index=quitar)
+    res = comparar_tablas_incremental(menos, menos, ["k"], ruta)
+    esperado = comparar_tablas(menos, menos, ["k"]).sort_values("k", kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(res, esperado)
+    assert res.attrs["delta"]["eliminadas_left"] == 1
+    assert res.attrs["delta"]["claves_recomparadas"] == 0
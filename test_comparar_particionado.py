@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparar_particionado import comparar_por_clave_particionado, comparar_tablas_particionado
+from comparar_tablas_mejorado import comparar_tablas
+from piezas_utils import comparar_por_clave
+
+
+def _juntar(partes):
+    res = pd.concat(list(partes), ignore_index=True)
+    res["estado"] = res["estado"].astype(str)
+    return res
+
+
+def _por_clave(res, keys):
+    return sorted(zip(*(res[k].astype(str) for k in keys), res["estado"], res["diferencias"]))
+
+
+def _tablas(n=300, semilla=0):
+    rng = np.random.default_rng(semilla)
+    # Importes en cuartos: el CSV los lee exactos
+    left = pd.DataFrame({"pn": rng.integers(0, 200, n), "sn": rng.choice(list("abcde"), n),
+                         "v": rng.integers(0, 400, n) / 4})
+    left = left.drop_duplicates(["pn", "sn"]).reset_index(drop=True)
+    right = left.sample(frac=0.8, random_state=semilla).copy()
+    right.loc[right.index[:20], "v"] += 1
+    extra = pd.DataFrame({"pn": rng.integers(200, 250, 30), "sn": "z", "v": 0.5}).drop_duplicates(["pn"])
+    return left, pd.concat([right, extra], ignore_index=True)
+
+
+@pytest.mark.parametrize("n_particiones", [1, 7])
+def test_igual_que_comparar_tablas(n_particiones):
+    left, right = _tablas()
+    esperado = comparar_tablas(left, right, ["pn", "sn"])
+    res = _juntar(comparar_tablas_particionado(left, right, ["pn", "sn"], n_particiones=n_particiones))
+    assert _por_clave(res, ["pn", "sn"]) == _por_clave(esperado, ["pn", "sn"])
+
+
+def test_claves_int_contra_float():
+    left = pd.DataFrame({"k": [1, 2], "v": [10, 20]})
+    right = pd.DataFrame({"k": [1.0, 2.0], "v": [10, 20]})
+    res = _juntar(comparar_tablas_particionado(left, right, ["k"], n_particiones=16))
+    assert (res["estado"] == "OK").all() and len(res) == 2
+
+
+def test_csv_contra_parquet(tmp_path):
+    left, right = _tablas()
+    ruta_left, ruta_right = str(tmp_path / "left.csv"), str(tmp_path / "right.parquet")
+    left.to_csv(ruta_left, index=False)
+    right.to_parquet(ruta_right)
+    esperado = comparar_tablas(left, right, ["pn", "sn"])
+    res = _juntar(comparar_tablas_particionado(ruta_left, ruta_right, ["pn", "sn"], n_particiones=5))
+    assert _por_clave(res, ["pn", "sn"]) == _por_clave(esperado, ["pn", "sn"])
+
+
+def test_dos_csv_claves_como_texto(tmp_path):
+    left, right = _tablas()
+    for df, nombre in ((left, "left.csv"), (right, "right.csv")):
+        df.to_csv(tmp_path / nombre, index=False)
+    res = _juntar(comparar_tablas_particionado(str(tmp_path / "left.csv"), str(tmp_path / "right.csv"),
+                                               ["pn", "sn"], n_particiones=3, memoria_mb=1))
+    assert _por_clave(res, ["pn", "sn"]) == _por_clave(comparar_tablas(left, right, ["pn", "sn"]), ["pn", "sn"])
+
+
+def test_por_clave_particionado(tmp_path):
+    left, right = _tablas()
+    right = right.astype({"pn": "float64"})
+    ruta = str(tmp_path / "right.parquet")
+    right.to_parquet(ruta)
+    partes = list(comparar_por_clave_particionado(left, ruta, ["pn", "sn"], n_particiones=4))
+    totales = [sum(len(p[i]) for p in partes) for i in range(3)]
+    assert totales == [len(x) for x in comparar_por_clave(left, right, ["pn", "sn"])]
@@ -0,0 +1,101 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparar_tablas_mejorado import (
+    EstadoComparacion,
+    _iguales_escalar,
+    codigos_estado,
+    comparar_tablas,
+    etiquetas_estado,
+)
+
+
+def _referencia(left, right, keys, atol=0.0, rtol=0.0):
+    """comparar_tablas celda a celda (la versión con iterrows): estado y diferencias por clave."""
+    bases = [c for c in left.columns if c not in keys and c in right.columns]
+    m = left.merge(right, on=keys, how="outer", suffixes=("_left", "_right"), indicator=True)
+    out = {}
+    for _, fila in m.iterrows():
+        clave = tuple(fila[k] for k in keys)
+        if fila["_merge"] != "both":
+            out[clave] = (fila["_merge"], "")
+            continue
+        difs = [b for b in bases if not _iguales_escalar(fila[f"{b}_left"], fila[f"{b}_right"], atol, rtol)]
+        out[clave] = ("DISCREPANCIA" if difs else "OK", ", ".join(difs))
+    return out
+
+
+def _resultado(res, keys):
+    solo = {etiquetas_estado()[EstadoComparacion.SOLO_IZQUIERDA]: "left_only",
+            etiquetas_estado()[EstadoComparacion.SOLO_DERECHA]: "right_only"}
+    return {
+        tuple(f[k] for k in keys): (solo.get(f["estado"], f["estado"]), f["diferencias"])
+        for _, f in res.astype({"estado": object}).iterrows()
+    }
+
+
+def test_columnas_mezcladas_como_celda_a_celda():
+    # Columnas object con números, textos, fechas, bytes, Decimal y nulos (lo normal en un Excel)
+    valores = [1, 1.0, "1", " 1.0 ", "nan", "NaN", None, np.nan, pd.NaT, pd.Timestamp("2024-01-01"),
+               "2024-01-01 00:00:00", b"1", b"x", Decimal("1"), Decimal("NaN"), "x", "X", True, 0]
+    rng = np.random.default_rng(1)
+    n = 600
+    left = pd.DataFrame({"k": np.arange(n), "a": rng.choice(np.array(valores, dtype=object), n),
+                         "b": rng.choice(np.array(valores, dtype=object), n)})
+    right = pd.DataFrame({"k": np.arange(20, n + 20), "a": rng.choice(np.array(valores, dtype=object), n),
+                          "b": rng.choice(np.array(valores, dtype=object), n)})
+    res = comparar_tablas(left, right, ["k"])
+    assert _resultado(res, ["k"]) == _referencia(left, right, ["k"])
+
+
+def test_fecha_y_numero_en_la_misma_columna():
+    left = pd.DataFrame({"k": [1, 2], "x": [pd.Timestamp("2024-01-01"), 1]})
+    res = comparar_tablas(left, left.copy(), ["k"])
+    assert (res["estado"] == "OK").all()
+
+
+@pytest.mark.parametrize("valor", [b"ab", Decimal("1.5"), pd.Timestamp("2024-01-01")])
+def test_tipos_no_texto_contra_texto_nan(valor):
+    left = pd.DataFrame({"k": [1, 2], "x": pd.Series([valor, None], dtype=object)})
+    right = pd.DataFrame({"k": [1, 2], "x": pd.Series([valor, "nan"], dtype=object)})
+    res = comparar_tablas(left, right, ["k"])
+    assert res["estado"].tolist() == ["OK", "DISCREPANCIA"]
+
+
+def test_tolerancia_y_estados():
+    left = pd.DataFrame({"k": ["a", "b", "c"], "v": [1.0, 2.0, 3.0], "t": ["x", "y", "z"]})
+    right = pd.DataFrame({"k": ["a", "b", "d"], "v": [1.05, 2.0, 4.0], "t": ["x", "Y", "w"]})
+    res = comparar_tablas(left, right, ["k"], atol=0.1).set_index("k")
+    assert res.loc["a", "estado"] == "OK"
+    assert res.loc["b", "estado"] == "DISCREPANCIA" and res.loc["b", "diferencias"] == "t"
+    codigos = codigos_estado(res["estado"])
+    assert codigos[res.index.get_loc("c")] == EstadoComparacion.SOLO_IZQUIERDA
+    assert codigos[res.index.get_loc("d")] == EstadoComparacion.SOLO_DERECHA
+    normalizado = comparar_tablas(left, right, ["k"], atol=0.1, normalize_text_on=["t"]).set_index("k")
+    assert normalizado.loc["b", "estado"] == "OK"
+
+
+def test_codigos_exactos_mismo_resultado():
+    rng = np.random.default_rng(2)
+    left = pd.DataFrame({"a": rng.choice(["x", "y"], 300), "b": rng.integers(0, 60, 300), "v": rng.integers(0, 3, 300)})
+    left = left.drop_duplicates(["a", "b"])
+    right = left.sample(frac=0.7, random_state=1).assign(b=lambda d: d["b"].astype("float64"))
+    right.loc[right.index[:10], "v"] += 1
+    normal = comparar_tablas(left, right, ["a", "b"])
+    codigos = comparar_tablas(left, right, ["a", "b"], codigos_exactos=True)
+    assert _resultado(codigos, ["a", "b"]) == _resultado(normal, ["a", "b"])
+
+
+@pytest.mark.parametrize("dtype", [object, "string", "str"])
+def test_columnas_de_texto_repetido_como_celda_a_celda(dtype):
+    # Pocos valores distintos repetidos en muchas filas: se convierten una vez por valor
+    valores = ["1", " 1.0 ", "nan", "NaN", "None", "x", "X", "2.50", "2.5", None]
+    rng = np.random.default_rng(3)
+    n = 2_000
+    left = pd.DataFrame({"k": np.arange(n), "a": pd.Series(rng.choice(np.array(valores, dtype=object), n), dtype=dtype)})
+    right = pd.DataFrame({"k": np.arange(n), "a": pd.Series(rng.choice(np.array(valores, dtype=object), n), dtype=dtype)})
+    res = comparar_tablas(left, right, ["k"], atol=0.1)
+    assert _resultado(res, ["k"]) == _referencia(left, right, ["k"], atol=0.1)
@@ -0,0 +1,74 @@
+import importlib
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import cosasutiles
+from cosasutiles.cli import main
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+
+def _python(*args):
+    return subprocess.run([sys.executable, *args], cwd=RAIZ, capture_output=True, text=True)
+
+
+def test_importar_no_carga_pandas():
+    r = _python("-c", "import sys, cosasutiles; cosasutiles.__version__; print('pandas' in sys.modules)")
+    assert r.stdout.strip() == "False"
+
+
+def test_help_no_carga_pandas():
+    codigo = ("import sys, runpy; sys.argv = ['cosasutiles', '--help']\n"
+              "try:\n    runpy.run_module('cosasutiles', run_name='__main__')\n"
+              "except SystemExit:\n    pass\nprint('pandas' in sys.modules)")
+    r = _python("-c", codigo)
+    assert "compare" in r.stdout and r.stdout.strip().endswith("False")
+
+
+@pytest.mark.parametrize("nombre", cosasutiles.__all__)
+def test_reexporta_todo(nombre):
+    valor = getattr(cosasutiles, nombre)
+    if nombre in cosasutiles._EXPORTACIONES:
+        assert valor is importlib.import_module(nombre)
+    else:
+        assert valor is getattr(importlib.import_module(cosasutiles._MODULO_DE[nombre]), nombre)
+
+
+def test_nombre_desconocido():
+    with pytest.raises(AttributeError):
+        cosasutiles.no_existe
+    assert "MovementHistory" in dir(cosasutiles)
+
+
+@pytest.mark.parametrize("argv", [
+    ["compare", "no_existe.csv", "no_existe.csv", "--keys", "pn"],
+    ["dates", "test_cosasutiles.py", "a", "b"],
+    ["parse-dump", "test_cosasutiles.py", "-o", "equipos.txt"],
+])
+def test_argumentos_no_validos(argv, capsys):
+    with pytest.raises(SystemExit) as e:
+        main(argv)
+    assert e.value.code == 2
+    assert "error:" in capsys.readouterr().err
+
+
+def test_compare_y_presence(tmp_path, capsys):
+    left = pd.DataFrame({"pn": [1, 2, 3], "cantidad": [1, 1, 1]})
+    right = pd.DataFrame({"pn": [2, 3, 4], "cantidad": [1, 2, 1]})
+    ruta_left, ruta_right = str(tmp_path / "left.csv"), str(tmp_path / "right.parquet")
+    left.to_csv(ruta_left, index=False)
+    right.to_parquet(ruta_right)
+
+    salida = str(tmp_path / "res.csv")
+    assert main(["compare", ruta_left, ruta_right, "--keys", "pn", "-o", salida]) == 0
+    res = pd.read_csv(salida)
+    assert sorted(res["pn"]) == [1, 2, 3, 4]
+    assert "DISCREPANCIA    1" in capsys.readouterr().out
+
+    assert main(["presence", ruta_left, ruta_right, "--keys", "pn", "-o", str(tmp_path / "p")]) == 0
+    assert pd.read_csv(tmp_path / "p" / "solo_left.csv")["pn"].tolist() == [1]
+    assert main(["presence", ruta_left, ruta_right, "--keys", "sn"]) == 1
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cubo_consultas import CuboConsultas
+
+
+def _res(n=300, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "estado": rng.choice(["OK", "DISCREPANCIA"], n),
+        "avion": rng.choice([101, 102, 103], n),
+        "fecha": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+        "importe": rng.integers(0, 100, n).astype(float),
+    })
+
+
+def _cubo(df):
+    return CuboConsultas(df, ["estado", "avion"], fecha_col="fecha", frecuencia="M",
+                         medidas={"importe": ("importe", "sum"), "medio": ("importe", "mean")})
+
+
+def test_consultar_como_groupby():
+    df = _res()
+    res = _cubo(df).consultar({"estado": ["OK"]}, por=["avion"])
+    esperado = df[df["estado"] == "OK"].groupby("avion")["importe"].agg(["size", "sum", "mean"])
+    assert res["avion"].tolist() == esperado.index.tolist()
+    assert res["n_filas"].tolist() == esperado["size"].tolist()
+    assert np.allclose(res["importe"], esperado["sum"]) and np.allclose(res["medio"], esperado["mean"])
+
+
+def test_anadir_con_otro_tipo_de_categorias():
+    df = _res()
+    nuevo = _res(50, semilla=1).assign(avion=lambda d: "AC" + d["avion"].astype(str))
+    cubo = _cubo(df).anadir(nuevo)
+    total = cubo.totales()
+    assert total["n_filas"] == len(df) + len(nuevo)
+    assert total["importe"] == pytest.approx(df["importe"].sum() + nuevo["importe"].sum())
+    assert cubo.consultar({"avion": [101]})["n_filas"].iloc[0] == (df["avion"] == 101).sum()
+    assert cubo.consultar({"avion": ["AC101"]})["n_filas"].iloc[0] == (nuevo["avion"] == "AC101").sum()
+
+
+def test_anadir_int_y_float():
+    df = _res()
+    cubo = _cubo(df).anadir(_res(20, semilla=2).assign(avion=104.5))
+    assert 104.5 in cubo.valores("avion") and 101 in cubo.valores("avion")
+
+
+def test_reemplazar_y_cache():
+    df = _res()
+    cubo = _cubo(df)
+    cubo.consultar({"avion": [101]})
+    cubo.consultar({"avion": [101]})
+    assert (cubo.aciertos, cubo.fallos) == (1, 1)
+    nuevo = df[df["avion"] == 101].assign(importe=1.0)
+    cubo.reemplazar(nuevo, por="avion")
+    assert cubo.totales({"avion": [101]})["importe"] == len(nuevo)
+    assert cubo.totales()["n_filas"] == len(df)
+
+
+def test_guardar_y_cargar(tmp_path):
+    cubo = _cubo(_res())
+    cubo.guardar(str(tmp_path / "cubo.pkl"))
+    otro = CuboConsultas.cargar(str(tmp_path / "cubo.pkl"))
+    pd.testing.assert_frame_equal(otro.consultar(por=["estado"]), cubo.consultar(por=["estado"]))
+
+
+@pytest.mark.parametrize("semilla", range(3))
+def test_anadir_y_reemplazar_como_cubo_nuevo(semilla):
+    # Valores nuevos menores que los del cubo: el orden de los grupos es el de los valores
+    df = _res(semilla=semilla)
+    nuevo = _res(80, semilla=semilla + 10).assign(avion=lambda d: d["avion"] - 50)
+    cubo = _cubo(df).anadir(nuevo)
+    todo = pd.concat([df, nuevo], ignore_index=True)
+    pd.testing.assert_frame_equal(cubo.consultar(por=["avion"]), _cubo(todo).consultar(por=["avion"]))
+
+    cambio = nuevo[nuevo["avion"] == 51].assign(avion=40)
+    cubo.reemplazar(cambio, por="avion")
+    esperado = pd.concat([df, nuevo[nuevo["avion"] != 40], cambio], ignore_index=True)
+    pd.testing.assert_frame_equal(cubo.consultar(por=["avion", "estado"]),
+                                  _cubo(esperado).consultar(por=["avion", "estado"]))
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from duplicados_movimientos import marcar_casi_duplicados, marcar_duplicados_exactos
+
+
+def _movs(fechas, unidad="ns"):
+    return pd.DataFrame({
+        "pn": ["A"] * len(fechas),
+        "movimiento": ["INST"] * len(fechas),
+        "fecha": pd.to_datetime(fechas).astype(f"datetime64[{unidad}]"),
+    })
+
+
+@pytest.mark.parametrize("unidad", ["s", "ms", "us", "ns"])
+def test_ventana_en_la_unidad_de_las_fechas(unidad):
+    movs = _movs(["2024-01-01", "2024-01-03", "2024-06-01"], unidad)
+    marcas = marcar_casi_duplicados(movs, "pn", "fecha", iguales="movimiento", ventana="3D")
+    assert marcas["grupo_duplicado"].tolist() == [0, 0, -1]
+    assert marcas["superviviente"].tolist() == [True, False, True]
+    assert marcas["desfase"].iloc[1] == pd.Timedelta("2D")
+
+
+@pytest.mark.parametrize("unidad", ["s", "us"])
+def test_ventana_menor_que_un_dia(unidad):
+    movs = _movs(["2024-01-01 00:00", "2024-01-01 11:00", "2024-01-02 00:00"], unidad)
+    marcas = marcar_casi_duplicados(movs, "pn", "fecha", ventana="12h", ventana_desde="primero")
+    assert marcas["grupo_duplicado"].tolist() == [0, 0, -1]
+
+
+def test_ventana_desde_anterior_encadena_y_desde_primero_no():
+    movs = _movs(["2024-01-01", "2024-01-03", "2024-01-05"])
+    anterior = marcar_casi_duplicados(movs, "pn", "fecha", ventana="3D")
+    primero = marcar_casi_duplicados(movs, "pn", "fecha", ventana="3D", ventana_desde="primero")
+    assert anterior["tam_grupo"].tolist() == [3, 3, 3]
+    assert primero["tam_grupo"].tolist() == [2, 2, 1]
+
+
+def test_superviviente_y_preferencia():
+    movs = _movs(["2024-01-01", "2024-01-02", "2024-01-03"])
+    movs["sistema"] = ["SAP", "AMOS", "SAP"]
+    ultimo = marcar_casi_duplicados(movs, "pn", "fecha", ventana="3D", superviviente="ultimo")
+    assert ultimo["fila_superviviente"].tolist() == [2, 2, 2]
+    preferido = marcar_casi_duplicados(movs, "pn", "fecha", ventana="3D", preferir=("sistema", ["AMOS"]))
+    assert preferido["fila_superviviente"].tolist() == [1, 1, 1]
+
+
+def test_sin_fecha_o_clave_nula_queda_sola():
+    movs = pd.DataFrame({"pn": ["A", "A", None], "fecha": ["2024-01-01", None, "2024-01-01"]})
+    marcas = marcar_casi_duplicados(movs, "pn", "fecha")
+    assert marcas["grupo_duplicado"].tolist() == [-1, -1, -1]
+    assert marcas["superviviente"].all()
+
+
+def test_vacio():
+    marcas = marcar_casi_duplicados(_movs([]), "pn", "fecha", superviviente="ultimo")
+    assert len(marcas) == 0
+
+
+def test_ventana_negativa():
+    with pytest.raises(ValueError):
+        marcar_casi_duplicados(_movs(["2024-01-01"]), "pn", "fecha", ventana="-1D")
+
+
+@pytest.mark.parametrize("keep", ["first", "last"])
+def test_exactos_como_duplicated(keep):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "pn": rng.choice(["A", "B", None], 500),
+        "n": rng.integers(0, 4, 500),
+        "x": rng.choice([1.5, np.nan], 500),
+    })
+    marcas = marcar_duplicados_exactos(df, keep=keep)
+    assert (marcas["superviviente"] == ~df.duplicated(keep=keep)).all()
+    tam = df.groupby(list(df.columns), dropna=False)["n"].transform("size")
+    assert (marcas["tam_grupo"] == tam).all()
+    assert ((marcas["grupo_duplicado"] >= 0) == (tam >= 2)).all()
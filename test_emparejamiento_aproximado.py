@@ -0,0 +1,58 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparar_tablas_mejorado import comparar_tablas
+from emparejamiento_aproximado import emparejar_aproximado, normalizar_clave, pendientes_de_resultado
+
+
+def _dice(a, b, n=3):
+    ga = Counter(("^" + a + "$")[i:i + n] for i in range(max(1, len(a) + 3 - n)))
+    gb = Counter(("^" + b + "$")[i:i + n] for i in range(max(1, len(b) + 3 - n)))
+    return 2 * sum((ga & gb).values()) / (sum(ga.values()) + sum(gb.values()))
+
+
+def test_normalizar_clave():
+    s = pd.Series([" 12345-01 ", "AB 12", None], index=[5, 6, 7])
+    assert normalizar_clave(s).tolist() == ["1234501", "ab12", ""]
+    assert normalizar_clave(s).index.tolist() == [5, 6, 7]
+
+
+@pytest.mark.parametrize("numpy_1", [False, True])
+def test_como_fuerza_bruta(numpy_1, monkeypatch):
+    if numpy_1:
+        # NumPy 1.x: sin np.bitwise_count
+        monkeypatch.delattr(np, "bitwise_count", raising=False)
+    rng = np.random.default_rng(0)
+    base = ["".join(rng.choice(list("abc123"), rng.integers(3, 9))) for _ in range(60)]
+    izq = pd.DataFrame({"pn": base[:40]})
+    der = pd.DataFrame({"pn": [b + rng.choice(["", "-1", "x"]) for b in base[20:]]}, index=range(100, 140))
+    res = emparejar_aproximado(izq, der, "pn", long_prefijo=0, umbral=0.5, max_candidatos=1000)
+    esperado = {
+        (i, j): _dice(normalizar_clave(izq["pn"])[i], normalizar_clave(der["pn"])[j])
+        for i in izq.index for j in der.index
+    }
+    esperado = {k: v for k, v in esperado.items() if v >= 0.5}
+    obtenido = {(i, j): s for i, j, s in zip(res["fila_left"], res["fila_right"], res["similitud"])}
+    assert obtenido.keys() == esperado.keys()
+    assert all(obtenido[k] == pytest.approx(esperado[k]) for k in esperado)
+
+
+def test_bloqueo_y_uno_a_uno():
+    izq = pd.DataFrame({"pn": ["12345", "12345"], "avion": ["A", "B"]})
+    der = pd.DataFrame({"pn": ["12345-01"], "avion": ["b"]})
+    res = emparejar_aproximado(izq, der, "pn", bloquear_por="avion", umbral=0.5)
+    assert res["fila_left"].tolist() == [1]
+    res = emparejar_aproximado(izq, der, "pn", umbral=0.5, uno_a_uno=True)
+    assert len(res) == 1 and res["rango"].tolist() == [1]
+    with pytest.raises(ValueError):
+        emparejar_aproximado(izq, der, "pn", umbral=0)
+
+
+def test_pendientes_de_resultado():
+    left = pd.DataFrame({"k": ["a", "b"], "v": [1, 2]})
+    right = pd.DataFrame({"k": ["b", "c"], "v": [2, 3]})
+    solo_izq, solo_der = pendientes_de_resultado(comparar_tablas(left, right, ["k"]), ["k"])
+    assert solo_izq["k"].tolist() == ["a"] and solo_der["k"].tolist() == ["c"]
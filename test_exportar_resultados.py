@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparar_tablas_mejorado import EstadoComparacion, codigos_estado, comparar_tablas, etiquetas_estado
+from exportar_resultados import exportar_excel, exportar_parquet, nombres_hojas
+
+
+def _resultado(n=200, semilla=0):
+    rng = np.random.default_rng(semilla)
+    left = pd.DataFrame({"k": np.arange(n), "v": rng.integers(0, 3, n), "t": rng.choice(["x", None], n),
+                         "f": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 30, n), unit="D")})
+    right = left.iloc[20:].copy()
+    right.loc[right.index[:30], "v"] += 1
+    extra = pd.DataFrame({"k": np.arange(n, n + 15), "v": 0, "t": "y", "f": pd.Timestamp("2024-02-01")})
+    return comparar_tablas(left, pd.concat([right, extra], ignore_index=True), ["k"])
+
+
+def _por_estado(res):
+    codigos = codigos_estado(res["estado"])
+    return {e: res[codigos == e] for e in EstadoComparacion}
+
+
+def test_excel_una_hoja_por_estado(tmp_path):
+    res = _resultado()
+    ruta = str(tmp_path / "res.xlsx")
+    filas = exportar_excel(res, ruta, filas_por_trozo=17)
+    hojas = pd.read_excel(ruta, sheet_name=None)
+    nombres = nombres_hojas()
+    assert list(hojas) == [nombres[e] for e in EstadoComparacion]
+    for estado, esperado in _por_estado(res).items():
+        hoja = hojas[nombres[estado]]
+        assert filas[nombres[estado]] == len(esperado) == len(hoja)
+        assert hoja["k"].tolist() == esperado["k"].tolist()
+        assert hoja["t_left"].isna().tolist() == esperado["t_left"].isna().tolist()
+        pd.testing.assert_series_equal(pd.to_datetime(hoja["f_right"]), esperado["f_right"].reset_index(drop=True),
+                                       check_dtype=False)
+
+
+def test_excel_hojas_de_continuacion_y_nombres(tmp_path):
+    res = _resultado()
+    ruta = str(tmp_path / "res.xlsx")
+    hojas = {EstadoComparacion.OK: "OK: [todas]/las filas que coinciden"}
+    filas = exportar_excel(res, ruta, left_name="rdcd", hojas=hojas, max_filas_hoja=51)
+    leidas = pd.read_excel(ruta, sheet_name=None)
+    ok = [h for h in leidas if h.startswith("OK_ _todas__las")]
+    assert len(ok) > 1 and all(len(h) <= 31 for h in leidas)
+    assert ok[1].endswith(" (2)")
+    assert sum(len(leidas[h]) for h in ok) == filas[hojas[EstadoComparacion.OK]]
+    assert "Solo en rdcd" in leidas
+
+
+def test_excel_sin_vacias_y_estado_como_texto(tmp_path):
+    res = _resultado()
+    res = res[codigos_estado(res["estado"]) <= EstadoComparacion.DISCREPANCIA].astype({"estado": str})
+    ruta = str(tmp_path / "res.xlsx")
+    filas = exportar_excel([res.iloc[:50], res.iloc[50:]], ruta, incluir_vacias=False)
+    assert list(pd.read_excel(ruta, sheet_name=None)) == ["OK", "DISCREPANCIA"]
+    assert sum(filas.values()) == len(res)
+
+
+def test_parquet_particionado_por_estado(tmp_path):
+    res = _resultado()
+    directorio = str(tmp_path / "res")
+    filas = exportar_parquet(res, directorio, filas_por_trozo=13)
+    esperado = _por_estado(res)
+    assert filas == {e.name: len(d) for e, d in esperado.items() if len(d)}
+    discrepancias = pd.read_parquet(directorio, filters=[("estado", "=", "DISCREPANCIA")])
+    assert discrepancias["k"].tolist() == esperado[EstadoComparacion.DISCREPANCIA]["k"].tolist()
+
+
+def test_parquet_reexportar_quita_particiones_viejas(tmp_path):
+    res = _resultado()
+    directorio = str(tmp_path / "res")
+    exportar_parquet(res, directorio)
+    solo_ok = res[codigos_estado(res["estado"]) == EstadoComparacion.OK]
+    exportar_parquet(solo_ok, directorio)
+    leido = pd.read_parquet(directorio)
+    assert len(leido) == len(solo_ok)
+    assert set(leido["estado"].astype(str)) == {"OK"}
+
+
+def test_codigos_estado_texto_y_categoria():
+    etiquetas = etiquetas_estado("a", "b")
+    texto = pd.Series(etiquetas[::-1] + ["otro"])
+    assert codigos_estado(texto, "a", "b").tolist() == [3, 2, 1, 0, -1]
+    categoria = pd.Series(pd.Categorical(etiquetas[1:2] * 2, categories=etiquetas))
+    assert codigos_estado(categoria, "a", "b").tolist() == [EstadoComparacion.DISCREPANCIA] * 2
+
+
+@pytest.mark.parametrize("estado", list(EstadoComparacion))
+def test_etiqueta_de_cada_estado(estado):
+    assert etiquetas_estado()[estado] == estado.etiqueta()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from filtrar_movs import filtra_movimiento_a_fecha, filtra_ultimo_movimiento
+
+
+def _anterior(df, claves, col_fecha):
+    """filtra_ultimo_movimiento antes de MovementHistory."""
+    df = df.copy()
+    df[col_fecha] = pd.to_datetime(df[col_fecha], errors="coerce")
+    return df.sort_values(claves + [col_fecha]).drop_duplicates(subset=claves, keep="last")
+
+
+def test_como_antes_con_empates():
+    rng = np.random.default_rng(0)
+    n = 400
+    df = pd.DataFrame({
+        "equipo": rng.choice(["E1", "E2", "E3"], n),
+        "componente": rng.choice(["C1", "C2"], n),
+        "fecha_movimiento": rng.choice(["2024-01-01", "2024-02-01", "2024-03-01"], n),
+        "fila": np.arange(n),
+    })
+    res = filtra_ultimo_movimiento(df, ["equipo", "componente"])
+    esperado = _anterior(df, ["equipo", "componente"], "fecha_movimiento")
+    pd.testing.assert_frame_equal(res, esperado)
+
+
+def test_sin_fecha_o_clave_nula_no_salen():
+    df = pd.DataFrame({
+        "equipo": ["E1", "E1", None],
+        "fecha_movimiento": ["2024-01-01", None, "2024-02-01"],
+    })
+    res = filtra_ultimo_movimiento(df, ["equipo"])
+    assert res["equipo"].tolist() == ["E1"]
+    assert res["fecha_movimiento"].tolist() == [pd.Timestamp("2024-01-01")]
+
+
+def test_a_fecha():
+    df = pd.DataFrame({
+        "equipo": ["E1", "E1", "E2"],
+        "movimiento": ["INST", "RET", "INST"],
+        "fecha_movimiento": ["2024-01-01", "2024-03-01", "2023-05-01"],
+    })
+    consultas = pd.DataFrame({"equipo": ["E1", "E1", "E2"],
+                              "fecha_consulta": ["2024-02-01", "2024-06-01", "2023-01-01"]})
+    res = filtra_movimiento_a_fecha(df, ["equipo"], consultas)
+    assert res["movimiento"].tolist()[:2] == ["INST", "RET"]
+    assert pd.isna(res["movimiento"].iloc[2])
+
+
+def test_sin_movimientos_validos():
+    vacio = pd.DataFrame({"p": pd.Series([], dtype=object), "f": pd.Series([], dtype=object)})
+    sin_fecha = pd.DataFrame({"p": ["A", "B"], "f": [None, "no es fecha"]})
+    for df in (vacio, sin_fecha):
+        res = filtra_ultimo_movimiento(df, ["p"], "f")
+        assert len(res) == 0 and list(res.columns) == ["p", "f"]
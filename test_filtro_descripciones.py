@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filtro_descripciones import FiltroDescripciones
+
+
+def _contiene(serie, palabra):
+    return serie.str.contains(palabra, case=False, regex=False, na=False)
+
+
+def test_como_str_contains():
+    rng = np.random.default_rng(0)
+    palabras = np.array(["Matiz", "hola", "HOLANDA", "adios", "pieza de prueba", "real", "otra", "x"], dtype=object)
+    serie = pd.Series([" ".join(rng.choice(palabras, 3)) for _ in range(500)] + [None], index=range(10, 511))
+    filtro = FiltroDescripciones({"matiz_saludo": "matiz & (hola | adios)", "prueba": '"pieza de prueba" & ~real'})
+    esperado_1 = _contiene(serie, "matiz") & (_contiene(serie, "hola") | _contiene(serie, "adios"))
+    esperado_2 = _contiene(serie, "pieza de prueba") & ~_contiene(serie, "real")
+    res = filtro.coincidencias(serie)
+    assert (res["matiz_saludo"] == esperado_1).all() and (res["prueba"] == esperado_2).all()
+    eliminar, conservar = filtro.mascaras(serie)
+    assert (eliminar == (esperado_1 | esperado_2)).all() and (conservar == ~eliminar).all()
+    # Segunda llamada: sale de la memoria de descripciones ya vistas
+    assert filtro.coincidencias(serie).equals(res)
+
+
+def test_palabra_completa_y_acciones():
+    serie = pd.Series(["hola mundo", "holanda", "solo marca"])
+    filtro = FiltroDescripciones([("saludo", "hola"), ("marca", "marca", "marcar")], palabra_completa=True)
+    assert filtro.coincidencias(serie)["saludo"].tolist() == [True, False, False]
+    assert filtro.reglas_por_fila(serie).tolist() == ["saludo", "", "marca"]
+    conservadas, eliminadas = filtro.filtrar(pd.DataFrame({"descripcion": serie}))
+    assert eliminadas["descripcion"].tolist() == ["hola mundo"]
+    assert len(conservadas) == 2
+
+
+def test_reglas_no_validas():
+    with pytest.raises(ValueError):
+        FiltroDescripciones([("a", "hola"), ("a", "adios")])
+    with pytest.raises(ValueError):
+        FiltroDescripciones([("a", "hola", "borrar")])
@@ -0,0 +1,61 @@
+import pytest
+
+from indice_elementos import cargar_indice, construir_indice, filas_caracteristicas, leer_caracteristicas, leer_elemento
+
+_VOLCADO = """ELEMENTO
+.elem1 => A
+.elem2 => X
+CARACT(1)
+.valor => 1
+OTRA(1)
+.valor => o1
+CARACT(2)
+.valor => 2
+#
+ELEMENTO
+.elem1 => B
+.elem2 => Y
+CARACT(1)
+.valor => 3
+#
+"""
+
+
+@pytest.fixture
+def volcado(tmp_path):
+    ruta = tmp_path / "volcado.txt"
+    ruta.write_text(_VOLCADO * 20, encoding="utf-8")
+    return str(ruta)
+
+
+def test_indice_y_acceso_directo(volcado):
+    indice = construir_indice(volcado)
+    assert len(indice) == 40 and indice["elem1"].tolist()[:2] == ["A", "B"]
+    assert indice["longitud"].sum() == len(_VOLCADO.encode()) * 20
+    regs = leer_elemento(volcado, indice, elem1="B")
+    assert len(regs) == 20 and regs[0]["CARACT"] == [{"_num": 1, "valor": "3"}]
+
+
+def test_indice_se_reconstruye_si_cambia_el_fichero(volcado):
+    assert len(cargar_indice(volcado)) == 40
+    with open(volcado, "a", encoding="utf-8") as f:
+        f.write(_VOLCADO)
+    assert len(cargar_indice(volcado)) == 42
+
+
+def test_filas_agrupadas_por_tipo_de_bloque(volcado):
+    reg = leer_elemento(volcado, elem1="A")[0]
+    ancho = filas_caracteristicas(reg)
+    assert [(f["bloque"], f["num"], f["ocurrencia"]) for f in ancho] == [("CARACT", 1, 0), ("CARACT", 2, 1),
+                                                                          ("OTRA", 1, 0)]
+    largo = filas_caracteristicas(reg, "largo")
+    assert [f["valor"] for f in largo] == ["1", "2", "o1"]
+
+
+@pytest.mark.parametrize("n_procesos", [1, 2])
+def test_leer_caracteristicas_en_trozos(volcado, n_procesos):
+    res = leer_caracteristicas(volcado, n_procesos=n_procesos, n_trozos=3)
+    assert len(res) == 80
+    assert res.groupby("elem1").size().to_dict() == {"A": 60, "B": 20}
+    with pytest.raises(ValueError):
+        leer_caracteristicas(volcado, formato="otro")
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from instrumentacion import Informe, activa, comparar_informes, etapa, instrumentar, medido
+
+
+@medido()
+def _duplicar(df):
+    with etapa("concat", entrada=df) as e:
+        return e.salida(pd.concat([df, df]))
+
+
+@medido("fallo")
+def _fallar(df):
+    raise ValueError("x")
+
+
+def test_sin_instrumentacion_no_mide():
+    assert not activa()
+    assert len(_duplicar(pd.DataFrame({"a": [1]}))) == 2
+
+
+def test_etapas_anidadas():
+    df = pd.DataFrame({"a": np.arange(10)})
+    with instrumentar() as informe:
+        assert activa()
+        _duplicar(df)
+    assert not activa()
+    reg = informe.a_dataframe().set_index("ruta")
+    assert list(reg.index) == ["_duplicar/concat", "_duplicar"]
+    assert reg.loc["_duplicar/concat", "padre"] == reg.loc["_duplicar", "id"]
+    assert reg.loc["_duplicar", "filas_entrada"] == 10 and reg.loc["_duplicar", "filas_salida"] == 20
+    assert reg.loc["_duplicar", "pico_mb"] >= 0 and reg["error"].isna().all()
+
+
+def test_error_queda_registrado():
+    with instrumentar(trazar_memoria=False) as informe:
+        with pytest.raises(ValueError):
+            _fallar(pd.DataFrame())
+    fila = informe.a_dataframe().iloc[0]
+    assert fila["ruta"] == "fallo" and fila["error"] == "ValueError" and pd.isna(fila["pico_mb"])
+
+
+@pytest.mark.filterwarnings("error::ResourceWarning", "error::pytest.PytestUnraisableExceptionWarning")
+def test_json_y_comparar(tmp_path):
+    with instrumentar(trazar_memoria=False) as antes:
+        _duplicar(pd.DataFrame({"a": [1]}))
+    ruta = str(tmp_path / "antes.json")
+    antes.a_json(ruta)
+    leido = Informe.desde_json(ruta)
+    assert leido.registros == antes.registros
+    despues = Informe.desde_json(ruta)
+    despues.registros = [dict(r, segundos=r["segundos"] * 10 + 1) for r in despues.registros]
+    despues.registros.append(dict(despues.registros[0], ruta="nueva"))
+    cambios = comparar_informes(ruta, despues).set_index("ruta")["cambio"]
+    assert cambios["_duplicar"] == "MAS_LENTO" and cambios["nueva"] == "NUEVA"
+    assert Informe().resumen().empty
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from limpieza_utils import añade_col_condicional, construir_columna, eliminar_columnas
+
+
+def test_construir_columna_nulos_como_vacio():
+    df = pd.DataFrame({"s ar": [" 12 ", None, np.nan], "cola": ["A", "B", None]})
+    res = construir_columna(df, ["s ar", "cola"], "AC")
+    assert res["AC"].tolist() == ["12-A", "-B", "-"]
+    assert "AC" not in df.columns
+
+
+def test_construir_columna_hash_igual_para_las_mismas_piezas():
+    df = pd.DataFrame({"a": ["x ", "x", None, ""], "b": [1, 1, 2, 2]})
+    res = construir_columna(df, ["a", "b"], "h", hash_bits=64)
+    assert res["h"].iloc[0] == res["h"].iloc[1]
+    assert res["h"].iloc[2] == res["h"].iloc[3]
+    assert res["h"].iloc[0] != res["h"].iloc[2]
+    assert list(construir_columna(df, ["a", "b"], "h", hash_bits=128).columns[-2:]) == ["h", "h_2"]
+
+
+def test_eliminar_y_condicional():
+    df = pd.DataFrame({"f inst": [None, "2024-01-01"], "x": [1, 2]})
+    assert list(eliminar_columnas(df, ["x", "no_existe"]).columns) == ["f inst"]
+    res = añade_col_condicional(df, "hueco", lambda d: d["f inst"].isna(), "si", "no")
+    assert res["hueco"].tolist() == ["si", "no"]
@@ -0,0 +1,126 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparar_tablas_mejorado import EstadoComparacion, codigos_estado, comparar_tablas
+from lote_conciliaciones import ejecutar_lote, ejecutar_trabajo, leer_checkpoint, leer_manifiesto, resumen_lote
+
+
+def _ficheros(carpeta, nombre, semilla=0, n=120):
+    rng = np.random.default_rng(semilla)
+    left = pd.DataFrame({"pn": rng.integers(0, 1000, n), "cantidad": rng.integers(0, 5, n)}).drop_duplicates("pn")
+    right = left.sample(frac=0.8, random_state=semilla).copy()
+    right.loc[right.index[:10], "cantidad"] += 1
+    os.makedirs(carpeta / "rdcd", exist_ok=True)
+    os.makedirs(carpeta / "inv", exist_ok=True)
+    left.to_csv(carpeta / "rdcd" / f"{nombre}.csv", index=False)
+    right.to_parquet(carpeta / "inv" / f"{nombre}.parquet")
+    return left, right
+
+
+def _manifiesto(carpeta, nombres, **extra):
+    contenido = {
+        "defaults": {"keys": ["pn"], "compare_on": ["cantidad"], "salida": "ninguna", **extra},
+        "trabajos": [{"nombre": n, "left": f"rdcd/{n}.csv", "right": f"inv/{n}.parquet"} for n in nombres],
+    }
+    ruta = carpeta / "manifiesto.json"
+    ruta.write_text(json.dumps(contenido), encoding="utf-8")
+    return str(ruta)
+
+
+def test_manifiesto_json_y_csv(tmp_path):
+    trabajos = leer_manifiesto(_manifiesto(tmp_path, ["a", "b"]))
+    assert [t["nombre"] for t in trabajos] == ["a", "b"]
+    assert trabajos[0]["left"] == str(tmp_path / "rdcd" / "a.csv")
+    assert trabajos[0]["keys"] == ["pn"] and trabajos[0]["salida"] == "ninguna"
+
+    (tmp_path / "m.csv").write_text(
+        "left,right,keys,atol,strip\nrdcd/a.csv,inv/a.parquet,pn; sn,0.5,sí\n", encoding="utf-8")
+    (t,) = leer_manifiesto(str(tmp_path / "m.csv"))
+    assert t["keys"] == ["pn", "sn"] and t["atol"] == 0.5 and t["strip"] is True
+    assert t["nombre"] == "a__a" and t["salida"] == "parquet"
+
+
+@pytest.mark.parametrize("contenido", [
+    [{"left": "x.csv", "right": "y.csv"}],
+    [{"left": "x.csv", "right": "y.csv", "keys": "pn", "salida": "pdf"}],
+    [{"nombre": "a", "left": "x.csv", "right": "y.csv", "keys": "pn"}] * 2,
+])
+def test_manifiesto_no_valido(tmp_path, contenido):
+    ruta = tmp_path / "m.json"
+    ruta.write_text(json.dumps(contenido), encoding="utf-8")
+    with pytest.raises(ValueError):
+        leer_manifiesto(str(ruta))
+
+
+def test_trabajo_cuenta_como_comparar_tablas(tmp_path):
+    left, right = _ficheros(tmp_path, "a")
+    (trabajo,) = leer_manifiesto(_manifiesto(tmp_path, ["a"], salida="parquet"))
+    r = ejecutar_trabajo(trabajo, str(tmp_path / "salida"))
+    assert r["estado"] == "ok", r["error"]
+    esperado = comparar_tablas(left, right, ["pn"], compare_on=["cantidad"])
+    conteo = np.bincount(codigos_estado(esperado["estado"]), minlength=len(EstadoComparacion))
+    assert [r[e.name] for e in EstadoComparacion] == conteo.tolist()
+    assert len(pd.read_parquet(r["salida"])) == len(esperado)
+
+
+def test_error_queda_en_el_resumen(tmp_path):
+    (trabajo,) = leer_manifiesto(_manifiesto(tmp_path, ["no_existe"]))
+    r = ejecutar_trabajo(trabajo, str(tmp_path / "salida"))
+    assert r["estado"] == "error" and r["error"].startswith("FileNotFoundError")
+
+
+def test_lote_reanudable(tmp_path):
+    for i, nombre in enumerate(["a", "b", "c"]):
+        _ficheros(tmp_path, nombre, semilla=i)
+    trabajos = leer_manifiesto(_manifiesto(tmp_path, ["a", "b", "c"]))
+    salida = str(tmp_path / "salida")
+    primero = ejecutar_lote(trabajos, salida, n_procesos=1, solo=["a", "b"], verbose=False)
+    assert primero["estado"].tolist() == ["ok", "ok", "pendiente"]
+    assert not primero["reanudado"].any()
+
+    # Cambia un fichero: ese trabajo se repite, el otro se salta
+    _ficheros(tmp_path, "b", semilla=9, n=50)
+    segundo = ejecutar_lote(trabajos, salida, n_procesos=2, verbose=False)
+    assert segundo["estado"].tolist() == ["ok", "ok", "ok"]
+    assert segundo["reanudado"].tolist() == [True, False, False]
+    guardado = pd.read_csv(os.path.join(salida, "resumen.csv"))
+    assert guardado[["nombre", "estado", "OK"]].equals(segundo[["nombre", "estado", "OK"]])
+
+    hechos = leer_checkpoint(os.path.join(salida, "checkpoint.jsonl"))
+    assert set(hechos) == {"a", "b", "c"}
+    tercero = ejecutar_lote(trabajos, salida, n_procesos=1, reiniciar=True, verbose=False)
+    assert not tercero["reanudado"].any()
+    with pytest.raises(ValueError):
+        ejecutar_lote(trabajos, salida, solo=["z"], verbose=False)
+
+
+def test_checkpoint_con_linea_a_medias(tmp_path):
+    ruta = tmp_path / "checkpoint.jsonl"
+    ruta.write_text('{"nombre": "a", "estado": "error"}\n{"nombre": "a", "estado": "ok"}\n{"nombre": "b", "est',
+                    encoding="utf-8")
+    hechos = leer_checkpoint(str(ruta))
+    assert list(hechos) == ["a"] and hechos["a"]["estado"] == "ok"
+    resumen = resumen_lote([{"nombre": "a"}, {"nombre": "b"}], hechos)
+    assert resumen["estado"].tolist() == ["ok", "pendiente"]
+    assert resumen["OK"].tolist() == [0, 0]
+
+
+def test_manifiesto_csv_hoja_por_posicion(tmp_path):
+    left, right = _ficheros(tmp_path, "a")
+    with pd.ExcelWriter(tmp_path / "libro.xlsx") as libro:
+        right.to_excel(libro, sheet_name="otra", index=False)
+        left.to_excel(libro, sheet_name="datos", index=False)
+    (tmp_path / "m.csv").write_text(
+        "nombre,left,right,hoja_left,hoja_right,keys,salida\n"
+        "pos,libro.xlsx,inv/a.parquet,1,,pn,ninguna\n"
+        "nombre,libro.xlsx,inv/a.parquet,datos,,pn,ninguna\n", encoding="utf-8")
+    trabajos = leer_manifiesto(str(tmp_path / "m.csv"))
+    assert [t["hoja_left"] for t in trabajos] == [1, "datos"]
+    for trabajo in trabajos:
+        r = ejecutar_trabajo(trabajo, str(tmp_path / "salida"))
+        assert r["estado"] == "ok", r["error"]
+        assert r["filas_left"] == len(left)
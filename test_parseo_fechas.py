@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from fechas_quality_check import check_date
+from parseo_fechas import comparar_fechas_mixtas, parsear_fechas
+
+
+@pytest.mark.parametrize("texto, esperado, interp", [
+    ("31/01/2024", "2024-01-31", "dmy"),
+    ("01/31/2024", "2024-01-31", "mdy"),
+    ("02/03/2024", "2024-03-02", "dmy"),
+    ("2024-03-02", "2024-03-02", "ymd"),
+    ("2024/31/01", "2024-01-31", "ydm"),
+    ("02.03.24", "2024-03-02", "dmy"),
+    ("02/03/75", "1975-03-02", "dmy"),
+    ("31/01/2024 13:45", "2024-01-31 13:45", "dmy"),
+    ("01/31/2024 01:45:10 PM", "2024-01-31 13:45:10", "mdy"),
+    ("45322", "2024-01-31", "excel"),
+    ("45322.5", "2024-01-31 12:00", "excel"),
+    ("31 Jan 2024", "2024-01-31", "otro"),
+])
+def test_formatos(texto, esperado, interp):
+    fechas, usada = parsear_fechas(pd.Series([texto]))
+    assert fechas.iloc[0] == pd.Timestamp(esperado)
+    assert usada.iloc[0] == interp
+
+
+def test_ambiguas_con_dayfirst_false():
+    fechas, _ = parsear_fechas(pd.Series(["02/03/2024", "13/03/2024"]), dayfirst=False)
+    assert fechas.tolist() == [pd.Timestamp("2024-02-03"), pd.Timestamp("2024-03-13")]
+
+
+def test_nulos_invalidos_y_tipos_mezclados():
+    serie = pd.Series([None, "", "31/02/2024", "basura", 45322, pd.Timestamp("2024-01-31")], index=list("abcdef"))
+    fechas, usada = parsear_fechas(serie)
+    assert fechas.index.tolist() == list("abcdef")
+    assert fechas.isna().tolist() == [True, True, True, True, False, False]
+    assert pd.isna(usada["a"])
+    assert (fechas[["e", "f"]] == pd.Timestamp("2024-01-31")).all()
+
+
+def test_columna_datetime_sin_reparsear():
+    serie = pd.Series(pd.to_datetime(["2024-01-01", None]).tz_localize("UTC"))
+    fechas, usada = parsear_fechas(serie)
+    assert fechas.dt.tz is None and usada.tolist() == ["fecha", None]
+
+
+def test_comparar_fechas_mixtas():
+    df = pd.DataFrame({"a": ["31/01/2024 10:00", "02/03/2024", None], "b": ["01/31/2024 10:00", "2024-03-03", None]})
+    assert comparar_fechas_mixtas(df, "a", "b")["resultado"].tolist() == ["ok", "revisar", "revisar"]
+
+
+def test_check_date():
+    futuro = (pd.Timestamp.now() + pd.Timedelta(days=400)).strftime("%d/%m/%Y")
+    df = pd.DataFrame({"f": ["15/01/1999", "15/01/2010", futuro, None]})
+    res = check_date(df, "fuera", "f", col_interp_name="interp")
+    assert res["fuera"].tolist() == [True, False, True, False]
+    assert res["interp"].tolist()[:3] == ["dmy", "dmy", "dmy"]
+
+
+def test_zona_horaria_a_utc_sin_zona():
+    serie = pd.Series(["2024-01-05T10:00:00+02:00", "05/01/2024", "2024-01-05T10:00:00-03:00", "5 Jan 2024"])
+    fechas, interp = parsear_fechas(serie)
+    assert fechas.dt.tz is None
+    assert fechas.tolist() == [pd.Timestamp(t) for t in ("2024-01-05 08:00", "2024-01-05", "2024-01-05 13:00",
+                                                         "2024-01-05")]
+    assert interp.tolist() == ["otro", "dmy", "otro", "otro"]
+    df = pd.DataFrame({"a": ["2024-01-05T10:00:00+02:00"], "b": ["05/01/2024 08:00"]})
+    assert comparar_fechas_mixtas(df, "a", "b")["resultado"].tolist() == ["ok"]
+    assert check_date(pd.DataFrame({"f": serie}), "fuera", "f")["fuera"].tolist() == [False] * 4
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from parser_registros import (
+    COLUMNAS_EQUIPO,
+    equipos_a_parquet,
+    iterar_equipos_lotes,
+    iterar_registros,
+    parse_equipment_file,
+    registros_desde_lineas,
+)
+
+_EQUIPO = """EQUIPMENT
+.equipment_type => ADT
+.lri_type_code => L1
+LRI_NO(1)
+.ident_code => A0
+LRI_NO(2)
+.ident_code => A1
+SW_CONFIG(1)
+.sw_part_number => SW-1
+.sw_modification_code => M1
+MODULE_FILE(1)
+.file_id(1) => F1
+.file_id(2) => F2
+HW_VERSIONS(1)
+.hw_part_number => HW-1
+HW_VERSIONS(2)
+.hw_part_number => HW-2
+.hw_part_number_code => C2
+línea suelta que se ignora
+# fin
+"""
+
+
+@pytest.fixture
+def volcado(tmp_path):
+    ruta = tmp_path / "equipos.txt"
+    ruta.write_text(_EQUIPO * 3, encoding="utf-8")
+    return str(ruta)
+
+
+def test_registro_con_jerarquia(volcado):
+    regs = list(iterar_registros(volcado))
+    assert len(regs) == 3
+    reg = regs[0]
+    assert reg["equipment_type"] == "ADT" and [b["_num"] for b in reg["LRI_NO"]] == [1, 2]
+    sw = reg["SW_CONFIG"][0]
+    assert sw["MODULE_FILE"] == [{"_num": 1, "file_id_1": "F1", "file_id_2": "F2"}]
+    assert [h["hw_part_number"] for h in sw["HW_VERSIONS"]] == ["HW-1", "HW-2"]
+
+
+def test_sin_jerarquia_los_bloques_cuelgan_del_registro():
+    reg = next(registros_desde_lineas(_EQUIPO.splitlines()))
+    assert "HW_VERSIONS" in reg and "HW_VERSIONS" not in reg["SW_CONFIG"][0]
+
+
+def test_filas_de_equipos(volcado):
+    df = parse_equipment_file(volcado)
+    assert list(df.columns) == COLUMNAS_EQUIPO and len(df) == 6
+    assert df["ident_code"].tolist()[:2] == ["A0", "A1"]
+    assert (df["sw_part_number"] == "SW-1").all()
+    assert (df["hw_part_number"] == "HW-2").all() and (df["hw_part_number_code"] == "C2").all()
+    assert df["lri_num"].dtype == "Int64"
+
+
+def test_lotes_y_parquet(volcado, tmp_path):
+    lotes = list(iterar_equipos_lotes(volcado, tam_lote=4))
+    assert [len(l) for l in lotes] == [4, 2]
+    destino = str(tmp_path / "equipos.parquet")
+    assert equipos_a_parquet(volcado, destino, tam_lote=4) == 6
+    pd.testing.assert_frame_equal(pd.read_parquet(destino), parse_equipment_file(volcado))
+
+
+def test_fichero_vacio(tmp_path):
+    ruta = tmp_path / "vacio.txt"
+    ruta.write_text("")
+    df = parse_equipment_file(str(ruta))
+    assert len(df) == 0 and list(df.columns) == COLUMNAS_EQUIPO
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from piezas_utils import (
+    MovementHistory,
+    PresenceIndex,
+    comparar_por_clave,
+    concatenar_por_clave,
+    max_fecha_por_pieza,
+    min_fecha_por_pieza,
+    piezas_por_presencia,
+)
+
+
+def _movs(n=500, semilla=0):
+    rng = np.random.default_rng(semilla)
+    # Pocas fechas distintas: muchos empates dentro de cada pieza
+    return pd.DataFrame({
+        "pieza": rng.choice(["a", "b", "c", "d"], n),
+        "fecha": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 5, n), unit="D"),
+        "fila": np.arange(n),
+    })
+
+
+def test_empates_misma_regla_en_ultimo_nth_y_a_fecha():
+    movs = _movs()
+    hist = MovementHistory(movs, "pieza", "fecha")
+    esperado = movs.sort_values(["pieza", "fecha"], kind="stable").drop_duplicates("pieza", keep="last")
+    assert hist.ultimo()["fila"].tolist() == esperado["fila"].tolist()
+    assert hist.nth(-1)["fila"].tolist() == esperado["fila"].tolist()
+    consultas = pd.DataFrame({"pieza": esperado["pieza"], "fecha_consulta": pd.Timestamp("2025-01-01")})
+    assert hist.a_fecha(consultas)["fila"].tolist() == esperado["fila"].tolist()
+
+
+def test_primero_y_nth():
+    movs = _movs(semilla=1)
+    hist = MovementHistory(movs, "pieza", "fecha")
+    ordenado = movs.sort_values(["pieza", "fecha"], kind="stable")
+    assert hist.primero()["fila"].tolist() == ordenado.groupby("pieza").head(1)["fila"].tolist()
+    assert hist.nth(1)["fila"].tolist() == ordenado.groupby("pieza").nth(1)["fila"].tolist()
+    assert hist.conteo()["n_movimientos"].tolist() == movs["pieza"].value_counts().sort_index().tolist()
+
+
+def test_a_fecha_antes_del_primer_movimiento_y_pieza_desconocida():
+    movs = pd.DataFrame({"pieza": ["a", "a"], "fecha": ["2024-01-01", "2024-02-01"], "v": [1, 2]})
+    consultas = pd.DataFrame({"pieza": ["a", "a", "a", "z"],
+                              "fecha_consulta": ["2023-12-31", "2024-01-15", "2024-02-01", "2024-03-01"]})
+    res = MovementHistory(movs, "pieza", "fecha").a_fecha(consultas)
+    assert res["v"].tolist()[1:3] == [1, 2]
+    assert res["v"].isna().tolist() == [True, False, False, True]
+
+
+@pytest.mark.parametrize("semilla", [0, 1])
+def test_max_y_min_fecha_como_idxmax_idxmin(semilla):
+    movs = _movs(semilla=semilla)
+    idx_max = movs.groupby("pieza")["fecha"].idxmax()
+    idx_min = movs.groupby("pieza")["fecha"].idxmin()
+    assert max_fecha_por_pieza(movs, "pieza", "fecha")["fila"].tolist() == movs.loc[idx_max, "fila"].tolist()
+    assert min_fecha_por_pieza(movs, "pieza", "fecha")["fila"].tolist() == movs.loc[idx_min, "fila"].tolist()
+    fechas = max_fecha_por_pieza(movs, "pieza", "fecha", keep_rows=False)
+    assert fechas["fecha_max"].tolist() == movs.groupby("pieza")["fecha"].max().tolist()
+
+
+def test_sin_fecha_o_clave_nula_no_cuenta():
+    movs = pd.DataFrame({"pieza": ["a", "a", None], "fecha": ["2024-01-01", None, "2024-05-01"]})
+    hist = MovementHistory(movs, "pieza", "fecha")
+    assert len(hist) == 1 and hist.ultimo()["fecha"].tolist() == [pd.Timestamp("2024-01-01")]
+
+
+def test_presence_index_patrones():
+    rng = np.random.default_rng(3)
+    fuentes = {n: pd.DataFrame({"pieza": rng.choice(list("abcdefghij"), 8), "v": 0}) for n in ("rdcd", "inv", "movs")}
+    idx = PresenceIndex(fuentes, "pieza", ordenar=True)
+    conjuntos = {n: set(df["pieza"]) for n, df in fuentes.items()}
+    res = idx.consultar(en=["rdcd", "movs"], no_en=["inv"])
+    assert res["pieza"].tolist() == sorted((conjuntos["rdcd"] & conjuntos["movs"]) - conjuntos["inv"])
+    assert len(idx) == len(set().union(*conjuntos.values()))
+    consulta = pd.DataFrame({"pieza": ["a", "zz"]})
+    assert idx.esta_en(consulta, "inv").tolist() == ["a" in conjuntos["inv"], False]
+    with pytest.raises(KeyError):
+        idx.consultar(en=["otra"])
+
+
+def test_comparar_y_piezas_por_presencia():
+    f1 = pd.DataFrame({"pieza": ["a", "b", "c", "c"], "sn": [1, 2, 3, 3]})
+    f2 = pd.DataFrame({"pieza": ["c", "d"], "sn": [3, 4]})
+    f3 = pd.DataFrame({"pieza": ["b", "c"], "sn": [0, 0]})
+    solo_1, solo_2, ambos = comparar_por_clave(f1, f2, ["pieza", "sn"])
+    assert solo_1["pieza"].tolist() == ["a", "b"] and solo_2["pieza"].tolist() == ["d"]
+    assert ambos.values.tolist() == [["c", 3]]
+    assert piezas_por_presencia(f1, f2, f3, "pieza", en_f2=False)["pieza"].tolist() == ["b"]
+
+
+def _encadenado(base, ficheros, claves, sufijos, how):
+    """concatenar_por_clave con merges encadenados (la versión anterior)."""
+    res = base.copy()
+    for df, suf in zip(ficheros, sufijos):
+        cols = [c for c in df.columns if c not in claves]
+        res = res.merge(df[claves + cols].rename(columns={c: f"{c}{suf}" for c in cols}), on=claves, how=how)
+    return res
+
+
+@pytest.mark.parametrize("how", ["left", "inner", "outer"])
+def test_concatenar_como_merges_encadenados(how):
+    rng = np.random.default_rng(4)
+    base = pd.DataFrame({"pieza": rng.choice(list("abcdef"), 6, replace=False), "x": np.arange(6)})
+    ficheros = [
+        pd.DataFrame({"pieza": rng.choice(list("abcdefgh"), 7), "v": rng.integers(0, 9, 7)}),
+        pd.DataFrame({"pieza": rng.choice(list("abcxyz"), 5), "v": rng.random(5), "t": list("pqrst")}),
+    ]
+    res = concatenar_por_clave(base, ficheros, "pieza", sufijos=["_1", "_2"], how=how)
+    pd.testing.assert_frame_equal(res, _encadenado(base, ficheros, ["pieza"], ["_1", "_2"], how))
+
+
+def test_concatenar_limite_de_memoria():
+    base = pd.DataFrame({"k": [1] * 1000})
+    with pytest.raises(MemoryError):
+        concatenar_por_clave(base, [pd.DataFrame({"k": [1] * 1000, "v": 1.0})], "k", memoria_max_mb=1)
+
+
+@pytest.mark.parametrize("fechas", [[], [None, None]])
+def test_sin_movimientos_validos(fechas):
+    movs = pd.DataFrame({"pieza": ["a"] * len(fechas), "fecha": pd.Series(fechas, dtype=object), "v": range(len(fechas))})
+    hist = MovementHistory(movs, "pieza", "fecha")
+    assert len(hist) == 0
+    for res in (hist.ultimo(), hist.nth(-1), hist.nth(0), max_fecha_por_pieza(movs, "pieza", "fecha"),
+                max_fecha_por_pieza(movs, "pieza", "fecha", keep_rows=False)):
+        assert len(res) == 0
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from limpieza_utils import añade_col_condicional, construir_columna, eliminar_columnas, limpia_f_inst_si_hueco
+from pipeline_limpieza import PipelineLimpieza, col
+
+
+def _rdcd(n=300, semilla=0):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "s ar": rng.choice(["A1", " B2 ", None], n),
+        "cola": rng.choice(["X", "Y"], n),
+        "f inst": rng.choice(np.array([pd.Timestamp("2024-01-01"), pd.NaT], dtype=object), n),
+        "vidas": rng.integers(0, 3, n),
+        "otra": rng.integers(0, 5, n),
+    })
+    df["f inst"] = pd.to_datetime(df["f inst"])
+    return df
+
+
+def _limpieza():
+    return (
+        PipelineLimpieza()
+        .eliminar_columnas(["vidas"])
+        .drop_duplicates()
+        .construir_columna(["s ar", "cola"], "AC", separador="-")
+        .añade_col_condicional("es_hueco", col("f inst").isna(), "D", "M")
+        .limpia_f_inst_si_hueco()
+    )
+
+
+def _cadena(df):
+    """La misma limpieza con las funciones de limpieza_utils, paso a paso."""
+    df = eliminar_columnas(df, ["vidas"]).drop_duplicates()
+    df = construir_columna(df, ["s ar", "cola"], "AC", separador="-")
+    df = añade_col_condicional(df, "es_hueco", lambda d: d["f inst"].isna(), "D", "M")
+    return limpia_f_inst_si_hueco(df)
+
+
+def test_igual_que_la_cadena_de_funciones():
+    df = _rdcd()
+    original = df.copy()
+    res = _limpieza().ejecutar(df)
+    pd.testing.assert_frame_equal(res, _cadena(df))
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_columnas_salida_poda_pasos_y_columnas():
+    limpieza = _limpieza()
+    origen = list(_rdcd().columns)
+    plan = limpieza.plan(origen, ["AC"])
+    # drop_duplicates sin subset necesita todas las columnas que hay en ese punto
+    assert plan["cargar"] == ["s ar", "cola", "f inst", "otra"]
+    omitidos = [repr(paso) for paso, activo in plan["pasos"] if not activo]
+    assert len(omitidos) == 2 and "omitidos" in limpieza.describir(origen, ["AC"])
+    df = _rdcd()
+    res = limpieza.ejecutar(df, ["AC"])
+    assert res["AC"].tolist() == _cadena(df)["AC"].tolist()
+
+
+def test_columna_salida_inexistente():
+    with pytest.raises(KeyError):
+        _limpieza().plan(["s ar", "cola", "f inst"], ["no_existe"])
+
+
+def test_definir_no_modifica_el_pipeline():
+    base = PipelineLimpieza().eliminar_columnas(["vidas"])
+    base.filtrar(col("otra") > 2)
+    assert len(base.pasos) == 1
+
+
+@pytest.mark.parametrize("usa", [None, ["otra"]])
+def test_filtros_fusionados(usa):
+    df = _rdcd()
+    limpieza = (
+        PipelineLimpieza()
+        .filtrar((col("otra") >= 1) & ~col("s ar").isna())
+        .filtrar(lambda d: d["otra"] != 3, usa=usa)
+        .drop_duplicates(["s ar", "cola"], keep="last")
+    )
+    assert [tipo for tipo, _ in limpieza.plan(df.columns)["fases"]] == ["filas"]
+    esperado = df[(df["otra"] >= 1) & df["s ar"].notna() & (df["otra"] != 3)]
+    esperado = esperado.drop_duplicates(["s ar", "cola"], keep="last")
+    pd.testing.assert_frame_equal(limpieza.ejecutar(df), esperado)
+
+
+def test_condiciones():
+    df = pd.DataFrame({"a": [1, 2, 3], "b": [3, 2, 1], "t": ["Xy", None, "zz"]})
+    assert (col("a") < col("b"))(df).tolist() == [True, False, False]
+    assert col("t").contiene("x")(df).tolist() == [True, False, False]
+    assert (col("a").isin([1, 3]) | col("t").isna())(df).tolist() == [True, True, True]
+    assert (col("a") == 2).columnas == ["a"]
+    with pytest.raises(TypeError):
+        PipelineLimpieza().filtrar("df['a'] > 1")
+
+
+def test_ejecutar_fichero_lee_solo_lo_necesario(tmp_path):
+    df = _rdcd(50)
+    ruta = str(tmp_path / "rdcd.xlsx")
+    df.to_excel(ruta, index=False)
+    limpieza = PipelineLimpieza().construir_columna(["s ar", "cola"], "AC")
+    res = limpieza.ejecutar_fichero(ruta, columnas_salida=["AC"], dir_cache=str(tmp_path / "cache"))
+    assert res["AC"].tolist() == construir_columna(df, ["s ar", "cola"], "AC")["AC"].tolist()
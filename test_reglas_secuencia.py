@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from reglas_secuencia import (
+    ReglaSecuencia,
+    nada_despues_de,
+    precedido_por,
+    primero_prohibido,
+    reglas_desde_config,
+    resumen_violaciones,
+    seguido_por,
+    sin_repetir,
+    ultimo_prohibido,
+    validar_secuencias,
+)
+
+
+def _movs(n=400, semilla=0):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "pieza": rng.choice([f"P{i}" for i in range(40)], n),
+        "dia": rng.permutation(n),
+        "movimiento": rng.choice(["INST", "RET", "REP", None], n, p=[0.4, 0.3, 0.2, 0.1]),
+    })
+    df["fecha"] = pd.Timestamp("2020-01-01") + pd.to_timedelta(df["dia"], unit="D")
+    return df.drop(columns="dia").sample(frac=1, random_state=semilla)
+
+
+def _referencia(movs):
+    """Las reglas del ejemplo de validar_secuencias, recorriendo pieza a pieza en Python."""
+    out = set()
+    for _, g in movs.sort_values("fecha").groupby("pieza"):
+        filas, valores = list(g.index), list(g["movimiento"])
+        if valores[0] in ("RET", "BAJA"):
+            out.add(("primero", filas[0], None))
+        if valores[-1] == "INST":
+            out.add(("ultimo", filas[-1], None))
+        ultimo_inst = None
+        for i, v in enumerate(valores):
+            if v == "RET" and (i == 0 or valores[i - 1] != "INST"):
+                out.add(("ret_tras_inst", filas[i], filas[i - 1] if i else None))
+            if v == "REP" and i < len(valores) - 1 and valores[i + 1] != "INST":
+                out.add(("rep_y_inst", filas[i], filas[i + 1]))
+            if v == "INST":
+                if ultimo_inst is not None:
+                    out.add(("inst_sin_ret", filas[i], filas[ultimo_inst]))
+                ultimo_inst = i
+            elif v == "RET":
+                ultimo_inst = None
+        rets = [i for i, v in enumerate(valores) if v == "RET"]
+        if rets:
+            for i in range(rets[-1] + 1, len(valores)):
+                out.add(("nada_tras_ret", filas[i], filas[rets[-1]]))
+    return out
+
+
+REGLAS = [
+    primero_prohibido("primero", {"RET", "BAJA"}),
+    ultimo_prohibido("ultimo", "INST"),
+    precedido_por("ret_tras_inst", "RET", "INST"),
+    seguido_por("rep_y_inst", "REP", "INST"),
+    sin_repetir("inst_sin_ret", "INST", entre="RET"),
+    nada_despues_de("nada_tras_ret", "RET"),
+]
+
+
+def _violaciones(res):
+    return {
+        (r, f, None if pd.isna(ref) else ref)
+        for r, f, ref in zip(res["regla"].astype(str), res["fila"], res["fila_referencia"])
+    }
+
+
+@pytest.mark.parametrize("semilla", [0, 1])
+def test_como_recorrido_por_pieza(semilla):
+    movs = _movs(semilla=semilla)
+    res = validar_secuencias(movs, "pieza", "fecha", "movimiento", REGLAS)
+    assert _violaciones(res) == _referencia(movs)
+    # Ordenado por pieza y fecha
+    assert res[["pieza", "fecha"]].equals(res.sort_values(["pieza", "fecha"], kind="stable")[["pieza", "fecha"]])
+
+
+def test_fuentes_en_y_no_en():
+    movs = pd.DataFrame({
+        "pieza": ["A", "B", "C"],
+        "fecha": pd.to_datetime(["2024-01-01"] * 3),
+        "movimiento": ["RET"] * 3,
+    })
+    f2 = pd.DataFrame({"pieza": ["A", "B"]})
+    f3 = pd.DataFrame({"pn": ["B"]})
+    regla = primero_prohibido("primero", "RET", en=["f2"], no_en=["f3"])
+    res = validar_secuencias(movs, "pieza", "fecha", "movimiento", [regla], fuentes={"f2": f2, "f3": (f3, "pn")})
+    assert res["pieza"].tolist() == ["A"]
+    with pytest.raises(KeyError):
+        validar_secuencias(movs, "pieza", "fecha", "movimiento", [regla], fuentes={"f2": f2})
+
+
+def test_permitir_primero_y_ultimo():
+    movs = pd.DataFrame({
+        "pieza": ["A", "A"],
+        "fecha": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+        "movimiento": ["RET", "REP"],
+    })
+    reglas = [precedido_por("p", "RET", "INST", permitir_primero=True),
+              seguido_por("s", "REP", "INST", permitir_ultimo=False)]
+    res = validar_secuencias(movs, "pieza", "fecha", "movimiento", reglas)
+    assert res["regla"].astype(str).tolist() == ["s"]
+    assert pd.isna(res["fila_referencia"].iloc[0])
+
+
+def test_nada_despues_de_ninguno():
+    movs = pd.DataFrame({
+        "pieza": ["A"] * 4,
+        "fecha": pd.date_range("2024-01-01", periods=4),
+        "movimiento": ["RET", "INST", "RET", "INST"],
+    })
+    ultimo = validar_secuencias(movs, "pieza", "fecha", "movimiento", [nada_despues_de("n", "RET")])
+    cualquiera = validar_secuencias(movs, "pieza", "fecha", "movimiento",
+                                    [nada_despues_de("n", "RET", desde_el_ultimo=False)])
+    assert ultimo["fila"].tolist() == [3]
+    assert cualquiera["fila"].tolist() == [1, 2, 3]
+    assert cualquiera["fila_referencia"].tolist() == [0, 0, 2]
+
+
+def test_config_y_resumen():
+    reglas = reglas_desde_config([
+        {"tipo": "precedido_por", "nombre": "ret_tras_inst", "valor": "RET", "anteriores": "INST"},
+        {"tipo": "sin_repetir", "nombre": "sin_rep", "valor": "INST"},
+    ])
+    movs = _movs()
+    res = validar_secuencias(movs, "pieza", "fecha", "movimiento", reglas)
+    resumen = resumen_violaciones(res, "pieza").set_index("regla")
+    for nombre in ("ret_tras_inst", "sin_rep"):
+        propias = res[res["regla"] == nombre]
+        assert resumen.loc[nombre, "movimientos"] == len(propias)
+        assert resumen.loc[nombre, "piezas"] == propias["pieza"].nunique()
+    with pytest.raises(ValueError):
+        reglas_desde_config([{"tipo": "no_existe", "nombre": "x"}])
+
+
+def test_reglas_repetidas():
+    with pytest.raises(ValueError):
+        validar_secuencias(_movs(), "pieza", "fecha", "movimiento", [sin_repetir("a", "INST"), sin_repetir("a", "RET")])
+
+
+def test_regla_sin_violaciones_falla_al_crearla():
+    class SinViolaciones(ReglaSecuencia):
+        tipo = "mal_definida"
+
+    with pytest.raises(TypeError):
+        SinViolaciones("x")